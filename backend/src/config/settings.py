@@ -28,6 +28,27 @@ class ServerConfig(BaseSettings):
     sandbox_enabled: bool = True
     max_tool_execution_time: int = 30
     
+    # Browser pool (shared by fetch, playwright and browser tools)
+    browser_pool_size: int = 1
+    browser_max_pages_per_browser: int = 100
+    browser_max_sessions: int = 16
+    browser_max_pages: int = 32
+    # Resource types aborted when scraping (image, media, font, stylesheet, script, ...)
+    browser_block_resources: List[str] = ["image", "media", "font", "stylesheet"]
+    browser_block_domains: List[str] = []
+    browser_block_trackers: bool = True
+
+    # HTTP cache shared by fetch_url, playwright_fetch and open_page
+    http_cache_enabled: bool = True
+    http_cache_dir: Optional[str] = None  # defaults to <workspace>/cache/http
+    http_cache_max_mb: int = 256
+    http_cache_default_ttl: int = 300
+
+    # In-memory cache of web search results (search_duckduckgo, search_searxng, ...)
+    search_cache_enabled: bool = True
+    search_cache_ttl: int = 600
+    search_cache_max_entries: int = 1000
+    
     # Feature Flags
     enable_integrations: bool = True
     
@@ -1,63 +1,296 @@
+import json
+import time
+import asyncio
+import logging
+from urllib.parse import urlparse
 from ..base import MCPIntegration
+from ...utils.browser_pool import get_browser_pool
+from ...utils.http import DEFAULT_MAX_RESPONSE_BYTES, get_http_client
+from ...utils.http_cache import get_http_cache
+from ...utils.html_text import extract, needs_browser
+from ...utils.progress import report_progress
+from ...utils.resource_policy import navigate
 from typing import Dict, Any, List
-from playwright.async_api import async_playwright
+
+logger = logging.getLogger(__name__)
+
+HTML_TYPES = {"text/html", "application/xhtml+xml"}
+# Returned as-is (JSON is pretty-printed); never worth rendering in a browser
+TEXT_TYPES = {"application/json", "application/ld+json", "application/xml", "text/xml", "text/csv"}
+RENDER_MODES = ("auto", "http", "browser")
+# Cache variant holding browser-rendered output (raw responses use the default variant)
+RENDERED_VARIANT = "rendered"
+
+# fetch_urls limits
+MAX_BATCH_URLS = 100
+DEFAULT_CONCURRENCY = 8
+MAX_CONCURRENCY = 32
+DEFAULT_PER_HOST = 2
+DEFAULT_URL_TIMEOUT = 30
+# Per-URL text is cut to this many characters so a batch stays a reasonable response
+DEFAULT_BATCH_MAX_CHARS = 20000
+
 
 class FetchIntegration(MCPIntegration):
+    """
+    Tiered URL fetcher.
+
+    Pages are fetched with the shared pooled HTTP client and converted to
+    text with a streaming HTML parser. Chromium (from the shared browser pool)
+    is only used when ``render="browser"`` is requested, or in ``auto`` mode
+    when the HTTP result looks like a client-side rendered app, was blocked
+    (401/403/429/503), or the HTTP client is unavailable.
+
+    Both tiers go through the shared HTTP cache when it is enabled: raw
+    responses are cached with their extracted text, rendered pages under a
+    separate variant. ``no_cache`` skips the cached copy and refreshes it.
+    """
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.category = "browser"
         self.name = "fetch"
-        self.browser = None
-        self.playwright = None
-        
+        self.max_bytes = config.get("max_bytes", DEFAULT_MAX_RESPONSE_BYTES)
+        self.timeout = config.get("timeout", 15)
+
     async def initialize(self) -> None:
         try:
-            print("Fetch integration initialized (using playwright).")
+            print("Fetch integration initialized (HTTP first, shared browser pool on demand).")
         except Exception as e:
             print(f"Failed to initialize Fetch integration: {e}")
-    
+
     async def shutdown(self) -> None:
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
-    
+        # The HTTP client and browser pool are shared and closed by the server on exit
+        pass
+
     def list_tools(self) -> List[Dict[str, Any]]:
         return [{
             "name": "fetch_url",
-            "description": "Fetch content from a URL and return as text",
+            "description": "Fetch content from a URL and return as text. Uses plain HTTP and only "
+                           "renders in a headless browser when the page needs JavaScript.",
             "category": "browser",
             "integration": "fetch",
             "parameters": {
                 "type": "object",
                 "properties": {
-                    "url": {"type": "string", "description": "URL to fetch"}
+                    "url": {"type": "string", "description": "URL to fetch"},
+                    "render": {
+                        "type": "string",
+                        "enum": list(RENDER_MODES),
+                        "description": "auto (default): HTTP, escalating to the browser if needed; "
+                                       "http: never use the browser; browser: always render",
+                    },
+                    "max_bytes": {"type": "integer", "description": "Maximum response size to read"},
+                    "no_cache": {"type": "boolean", "description": "Bypass the HTTP cache and refetch"}
                 },
                 "required": ["url"]
             }
+        }, {
+            "name": "fetch_urls",
+            "description": "Fetch many URLs concurrently (same tiers and cache as fetch_url). Results come "
+                           "back in input order; progress is reported as each URL finishes.",
+            "category": "browser",
+            "integration": "fetch",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "urls": {"type": "array", "items": {"type": "string"},
+                             "description": f"URLs to fetch (at most {MAX_BATCH_URLS})"},
+                    "render": {"type": "string", "enum": list(RENDER_MODES)},
+                    "concurrency": {"type": "integer",
+                                    "description": f"Fetches in flight at once (default {DEFAULT_CONCURRENCY})"},
+                    "per_host": {"type": "integer",
+                                 "description": f"Fetches in flight per host (default {DEFAULT_PER_HOST})"},
+                    "timeout": {"type": "number",
+                                "description": f"Seconds allowed per URL (default {DEFAULT_URL_TIMEOUT})"},
+                    "max_chars": {"type": "integer",
+                                  "description": f"Text characters kept per URL (default {DEFAULT_BATCH_MAX_CHARS})"},
+                    "no_cache": {"type": "boolean"}
+                },
+                "required": ["urls"]
+            }
         }]
-    
+
     async def call_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
         if tool_name == "fetch_url":
             url = args.get("url")
             if not url:
                 return {"error": "URL parameter is required"}
-            
+            render = args.get("render", "auto")
+            if render not in RENDER_MODES:
+                return {"error": f"render must be one of: {', '.join(RENDER_MODES)}"}
+            max_bytes = int(args.get("max_bytes") or self.max_bytes)
+            return await self._fetch(url, render, max_bytes, bool(args.get("no_cache", False)))
+
+        if tool_name == "fetch_urls":
+            return await self._fetch_many(args)
+
+        raise ValueError(f"Unknown tool: {tool_name}")
+
+    async def _fetch(self, url: str, render: str, max_bytes: int, no_cache: bool) -> Dict[str, Any]:
+        reason = "requested" if render == "browser" else None
+        result = None
+        if reason is None:
             try:
-                async with async_playwright() as p:
-                    browser = await p.chromium.launch(headless=True)
-                    page = await browser.new_page()
-                    await page.goto(url, timeout=30000)
-                    content = await page.content()
-                    text = await page.evaluate("() => document.body.innerText")
-                    await browser.close()
-                    
-                    return {
-                        "url": url,
-                        "text": text,
-                        "html_length": len(content)
-                    }
+                result, reason = await self._fetch_http(url, max_bytes, no_cache)
+                if reason is None or render == "http":
+                    # No result when HTTP fetching isn't possible at all
+                    return result if result is not None else {"error": f"Failed to fetch URL: {reason}"}
             except Exception as e:
-                return {"error": f"Failed to fetch URL: {str(e)}"}
-            
-        raise ValueError(f"Unknown tool: {tool_name}")
+                if render == "http":
+                    return {"error": f"Failed to fetch URL: {str(e)}"}
+                reason = f"http failed: {e}"
+
+        logger.info(f"fetch_url escalating to browser for {url} ({reason})")
+        try:
+            result = await self._fetch_browser(url, no_cache)
+            result["escalation_reason"] = reason
+            return result
+        except Exception as e:
+            if result is not None:
+                # Better the static HTML than nothing
+                result["escalation_error"] = str(e)
+                return result
+            return {"error": f"Failed to fetch URL: {str(e)}"}
+
+    async def _fetch_many(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        urls = args.get("urls") or []
+        if not isinstance(urls, list) or not urls:
+            return {"error": "urls must be a non-empty list"}
+        if len(urls) > MAX_BATCH_URLS:
+            return {"error": f"Too many URLs: {len(urls)} > {MAX_BATCH_URLS}"}
+        render = args.get("render", "auto")
+        if render not in RENDER_MODES:
+            return {"error": f"render must be one of: {', '.join(RENDER_MODES)}"}
+        concurrency = min(max(int(args.get("concurrency") or DEFAULT_CONCURRENCY), 1), MAX_CONCURRENCY)
+        per_host = max(int(args.get("per_host") or DEFAULT_PER_HOST), 1)
+        timeout = float(args.get("timeout") or DEFAULT_URL_TIMEOUT)
+        max_chars = int(args.get("max_chars") or DEFAULT_BATCH_MAX_CHARS)
+        max_bytes = int(args.get("max_bytes") or self.max_bytes)
+        no_cache = bool(args.get("no_cache", False))
+
+        start = time.perf_counter()
+        unique = list(dict.fromkeys(urls))
+        limit = asyncio.Semaphore(concurrency)
+        hosts: Dict[str, asyncio.Semaphore] = {}
+
+        async def fetch_one(url: str) -> Dict[str, Any]:
+            host = urlparse(url).netloc.lower()
+            host_limit = hosts.setdefault(host, asyncio.Semaphore(per_host))
+            async with host_limit, limit:
+                try:
+                    result = await asyncio.wait_for(self._fetch(url, render, max_bytes, no_cache), timeout)
+                except asyncio.TimeoutError:
+                    result = {"url": url, "error": f"Timed out after {timeout:g}s"}
+            result.setdefault("url", url)
+            text = result.get("text")
+            if isinstance(text, str) and len(text) > max_chars:
+                result["text"] = text[:max_chars]
+                result["text_truncated"] = True
+            return result
+
+        results: Dict[str, Dict[str, Any]] = {}
+        tasks = [asyncio.ensure_future(fetch_one(url)) for url in unique]
+        try:
+            for done, next_result in enumerate(asyncio.as_completed(tasks), start=1):
+                result = await next_result
+                results[result["url"]] = result
+                status = "error" if "error" in result else f"ok via {result.get('via')}"
+                await report_progress(done, len(unique), f"{result['url']}: {status}")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        ordered = [results[url] for url in urls]
+        failed = sum(1 for r in results.values() if "error" in r)
+        return {
+            "results": ordered,
+            "succeeded": len(unique) - failed,
+            "failed": failed,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    async def _fetch_http(self, url: str, max_bytes: int, no_cache: bool = False):
+        """Return (result, escalation_reason); the reason is None when the result is final."""
+        client = get_http_client()
+        if not client.is_available:
+            return None, "aiohttp not installed"
+        cache = get_http_cache()
+        if cache is not None:
+            resp = await cache.get(client, url, max_bytes=max_bytes, bypass=no_cache, timeout=self.timeout)
+        else:
+            resp = await client.get(url, max_bytes=max_bytes, timeout=self.timeout)
+        result = {
+            "url": url,
+            "final_url": resp.url,
+            "status": resp.status,
+            "content_type": resp.content_type,
+            "via": "http",
+            "elapsed_ms": round(resp.elapsed * 1000, 1),
+            "truncated": resp.truncated,
+            "cache": resp.cache_status,
+        }
+        if resp.status in (401, 403, 429, 503):
+            result["error"] = f"HTTP {resp.status}"
+            return result, f"blocked with HTTP {resp.status}"
+
+        entry = resp.cache_entry
+        if entry is not None and "text" in entry.extra:
+            # Extraction already done for this exact response
+            result.update({"title": entry.extra.get("title"), "text": entry.extra["text"],
+                           "html_length": len(resp.body)})
+            return result, entry.extra.get("escalate")
+
+        body = resp.text()
+        if resp.content_type in HTML_TYPES or (not resp.content_type and "<html" in body[:1024].lower()):
+            title, text = extract(body)
+            result.update({"title": title, "text": text, "html_length": len(resp.body)})
+            reason = "page looks client-side rendered" if needs_browser(body, text) else None
+            if entry is not None:
+                get_http_cache().update_extra(entry, title=title, text=text, escalate=reason)
+            return result, reason
+
+        if resp.content_type in TEXT_TYPES or resp.content_type.startswith("text/"):
+            if "json" in resp.content_type:
+                try:
+                    body = json.dumps(json.loads(body), indent=2, ensure_ascii=False)
+                except ValueError:
+                    pass
+            result["text"] = body
+            return result, None
+
+        result["text"] = None
+        result["error"] = f"Unsupported content type: {resp.content_type or 'unknown'}"
+        return result, None
+
+    async def _fetch_browser(self, url: str, no_cache: bool = False) -> Dict[str, Any]:
+        start = time.perf_counter()
+        cache = get_http_cache()
+        if cache is not None and not no_cache:
+            entry = cache.fresh(url, RENDERED_VARIANT)
+            if entry is not None:
+                return {**entry.extra, "url": url, "via": "browser", "cache": "hit",
+                        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+        pool = get_browser_pool()
+        async with pool.context(pool.resource_policy) as context:
+            if cache is not None and not no_cache:
+                await cache.install(context)
+            page = await context.new_page()
+            response = await navigate(page, url, timeout=30000)
+            content = await page.content()
+            text = await page.evaluate("() => document.body.innerText")
+
+            result = {
+                "url": url,
+                "final_url": page.url,
+                "status": response.status if response else None,
+                "title": await page.title(),
+                "text": text,
+                "html_length": len(content),
+            }
+        if cache is not None and response is not None:
+            await asyncio.to_thread(cache.store, url, response.status, response.headers, content.encode("utf-8"),
+                                    variant=RENDERED_VARIANT, extra=result)
+        return {**result, "via": "browser", "cache": "bypass" if no_cache else "miss",
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)}
@@ -1,6 +1,10 @@
+import asyncio
 from ..base import MCPIntegration
+from ...utils.browser_pool import get_browser_pool
+from ...utils.extraction import FORMATS, IMAGE_MODES, LINK_MODES, extract_content
+from ...utils.http_cache import get_http_cache
+from ...utils.resource_policy import navigate
 from typing import Dict, Any, List
-import asyncio
 try:
     from playwright.async_api import async_playwright
 except ImportError:
@@ -25,14 +29,24 @@ class PlaywrightIntegration(MCPIntegration):
             
         return [{
             "name": "playwright_fetch",
-            "description": "Fetch web page content using Playwright (headless browser).",
+            "description": "Fetch web page content using Playwright (headless browser), reduced to "
+                           "readable Markdown within a size budget.",
             "category": "browser",
             "integration": "playwright",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "url": {"type": "string"},
-                    "wait_for_selector": {"type": "string", "description": "Wait for specific element to appear"}
+                    "wait_for_selector": {"type": "string", "description": "Wait for specific element to appear"},
+                    "no_cache": {"type": "boolean", "description": "Bypass the HTTP cache and re-render"},
+                    "format": {"type": "string", "enum": list(FORMATS),
+                               "description": "markdown (default): main content as Markdown; text; html: raw page"},
+                    "max_chars": {"type": "integer", "description": "Budget for the returned content (default 20000)"},
+                    "max_tokens": {"type": "integer", "description": "Budget in tokens (~4 characters each)"},
+                    "cursor": {"type": "string", "description": "next_cursor from a previous call"},
+                    "main_only": {"type": "boolean", "description": "Drop navigation and boilerplate (default true)"},
+                    "links": {"type": "string", "enum": list(LINK_MODES)},
+                    "images": {"type": "string", "enum": list(IMAGE_MODES)}
                 },
                 "required": ["url"]
             }
@@ -47,15 +61,39 @@ class PlaywrightIntegration(MCPIntegration):
             
         url = args.get("url")
         wait_for = args.get("wait_for_selector")
-        
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            try:
-                await page.goto(url)
-                if wait_for:
-                    await page.wait_for_selector(wait_for)
+        no_cache = bool(args.get("no_cache", False))
+
+        # Rendered output depends on what we waited for
+        cache = get_http_cache()
+        variant = f"rendered:{wait_for or ''}"
+        entry = cache.fresh(url, variant) if cache is not None and not no_cache else None
+        if entry is not None:
+            content = entry.body().decode("utf-8")
+        else:
+            pool = get_browser_pool()
+            async with pool.context(pool.resource_policy) as context:
+                if cache is not None and not no_cache:
+                    await cache.install(context)
+                page = await context.new_page()
+                response = await navigate(page, url, wait_for_selector=wait_for)
                 content = await page.content()
-                return content
-            finally:
-                await browser.close()
+            if cache is not None and response is not None:
+                await asyncio.to_thread(cache.store, url, response.status, response.headers,
+                                        content.encode("utf-8"), variant=variant)
+
+        # Paging through a long page re-extracts from the cached render
+        try:
+            result = await asyncio.to_thread(
+                extract_content, content, url,
+                format=args.get("format", "markdown"),
+                main_only=args.get("main_only", True),
+                links=args.get("links", "inline"),
+                images=args.get("images", "alt"),
+                max_chars=args.get("max_chars"),
+                max_tokens=args.get("max_tokens"),
+                cursor=args.get("cursor"),
+            )
+        except ValueError as e:
+            return f"Error: {str(e)}"
+        result["cache"] = "hit" if entry is not None else ("bypass" if no_cache else "miss")
+        return result
@@ -1,6 +1,99 @@
 from ..base import MCPIntegration
-from typing import Dict, Any, List
+from ...utils.output import HeadTailBuffer
+from ...utils.progress import report_progress
+from ...utils.sftp_transfer import (
+    DEFAULT_CHUNK_BYTES, DEFAULT_WINDOW_BYTES, SFTP_REQUEST_BYTES, TransferProgress,
+    download_file, is_remote_dir, plan_download, plan_upload, remote_makedirs, upload_file,
+)
+from ...utils.ssh_pool import SshPool, is_transient
+from typing import Dict, Any, List, Optional, Tuple
+import os
+import time
+import shlex
+import select
 import asyncio
+import logging
+import posixpath
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MANY_CONCURRENCY = 16
+MAX_MANY_CONCURRENCY = 128
+DEFAULT_HOST_TIMEOUT = 60
+MAX_HOSTS = 1000
+DEFAULT_PARALLEL_FILES = 4
+MAX_PARALLEL_FILES = 32
+DEFAULT_TRANSFER_RETRIES = 3
+# Seconds between transfer progress notifications
+PROGRESS_INTERVAL = 0.5
+# Command output kept per stream (half from the start, half from the end)
+DEFAULT_MAX_OUTPUT_BYTES = 1024 * 1024
+READ_CHUNK_BYTES = 32 * 1024
+READ_POLL_INTERVAL = 0.2
+# Seconds between streamed output notifications, and their size cap
+STREAM_INTERVAL = 0.25
+STREAM_MESSAGE_CHARS = 4000
+PTY_COLUMNS = 200
+PTY_ROWS = 50
+# First line of stdout when the command is wrapped to report its PID
+PID_MARKER = "__ssh_mcp_pid="
+# Seconds between SIGTERM and SIGKILL for a timed-out command
+KILL_GRACE_SECONDS = 2
+KILL_TIMEOUT = 10
+
+
+def parse_host(spec: Any, username: Optional[str] = None, port: int = 22) -> Dict[str, Any]:
+    """
+    Turn "host", "user@host", "user@host:port" ("[v6addr]:port" for IPv6) or
+    a {"host", "username", "port"} object into a connection target,
+    falling back to the shared username and port.
+    """
+    if isinstance(spec, dict):
+        target = {"host": spec.get("host"), "username": spec.get("username") or username,
+                  "port": spec.get("port") or port}
+    else:
+        user, _, hostport = str(spec).strip().rpartition("@")
+        host = hostport
+        if hostport.startswith("["):
+            host, _, rest = hostport[1:].partition("]")
+            if rest.startswith(":") and rest[1:].isdigit():
+                port = int(rest[1:])
+        elif hostport.count(":") == 1:
+            name, _, number = hostport.partition(":")
+            if number.isdigit():
+                host, port = name, int(number)
+        target = {"host": host, "username": user or username, "port": port}
+    if not target["host"] or not target["username"]:
+        raise ValueError(f"Host entry needs a host and username: {spec!r}")
+    return target
+
+
+class _OutputNotifier:
+    """Batches command output into progress notifications, one per STREAM_INTERVAL at most."""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.total = 0
+        self.last = 0.0
+
+    async def feed(self, name: str, data: bytes):
+        self.total += len(data)
+        text = data.decode(errors="replace")
+        self.parts.append(f"[stderr] {text}" if name == "stderr" else text)
+        if time.monotonic() - self.last >= STREAM_INTERVAL:
+            await self.flush()
+
+    async def flush(self):
+        if not self.parts:
+            return
+        message = "".join(self.parts)
+        if len(message) > STREAM_MESSAGE_CHARS:
+            message = "..." + message[-STREAM_MESSAGE_CHARS:]
+        self.parts = []
+        self.last = time.monotonic()
+        await report_progress(self.total, None, message)
+
 
 class SshIntegration(MCPIntegration):
     """SSH integration for remote command execution."""
@@ -9,7 +102,14 @@ class SshIntegration(MCPIntegration):
         super().__init__(config)
         self.category = "command"
         self.name = "ssh"
-        self.connections: Dict[str, Any] = {}
+        # Authenticated transports are reused across calls; each command
+        # only opens a new channel on them
+        self.pool = SshPool(
+            keepalive=config.get("keepalive", 30),
+            idle_timeout=config.get("idle_timeout", 300),
+            max_connections=config.get("max_connections", 64),
+            max_channels=config.get("max_channels", 8),
+        )
         
     async def initialize(self) -> None:
         # SSH connections are established on-demand
@@ -17,10 +117,7 @@ class SshIntegration(MCPIntegration):
     
     async def shutdown(self) -> None:
         # Close all connections
-        for conn in self.connections.values():
-            if hasattr(conn, 'close'):
-                conn.close()
-        self.connections.clear()
+        self.pool.close()
     
     def list_tools(self) -> List[Dict[str, Any]]:
         return [
@@ -37,14 +134,42 @@ class SshIntegration(MCPIntegration):
                         "command": {"type": "string", "description": "Command to execute"},
                         "port": {"type": "integer", "description": "SSH port (default 22)"},
                         "password": {"type": "string", "description": "SSH password (optional, use key-based auth if not provided)"},
-                        "key_file": {"type": "string", "description": "Path to SSH private key file (optional)"}
+                        "key_file": {"type": "string", "description": "Path to SSH private key file (optional)"},
+                        "timeout": {"type": "number", "description": "Seconds before the remote command is killed (default: no limit)"},
+                        "pty": {"type": "boolean", "description": "Run in a pseudo-terminal; stderr is then merged into output (default false)", "default": False},
+                        "max_output": {"type": "integer", "description": "Bytes kept per stream, from its start and end (default 1048576)"},
+                        "stream": {"type": "boolean", "description": "Send output as progress notifications while the command runs (default true)", "default": True}
                     },
                     "required": ["host", "username", "command"]
                 }
             },
+            {
+                "name": "ssh_execute_many",
+                "description": "Execute a command on many remote hosts concurrently over SSH and return per-host exit codes and output",
+                "category": "command",
+                "integration": "ssh",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "hosts": {
+                            "type": "array",
+                            "items": {"type": ["string", "object"]},
+                            "description": "Hosts as \"host\", \"user@host\", \"user@host:port\" or {host, username, port}"
+                        },
+                        "command": {"type": "string", "description": "Command to execute on every host"},
+                        "username": {"type": "string", "description": "SSH username for hosts that don't name one"},
+                        "port": {"type": "integer", "description": "SSH port for hosts that don't name one (default 22)"},
+                        "password": {"type": "string", "description": "SSH password (optional)"},
+                        "key_file": {"type": "string", "description": "Path to SSH private key file (optional)"},
+                        "concurrency": {"type": "integer", "description": "Hosts to run at once (default 16)"},
+                        "timeout": {"type": "number", "description": "Per-host timeout in seconds (default 60)"}
+                    },
+                    "required": ["hosts", "command"]
+                }
+            },
             {
                 "name": "ssh_upload",
-                "description": "Upload a file to a remote host via SCP/SFTP",
+                "description": "Upload a file or directory to a remote host via SFTP (resumable, with checksums and progress)",
                 "category": "command",
                 "integration": "ssh",
                 "parameters": {
@@ -52,18 +177,29 @@ class SshIntegration(MCPIntegration):
                     "properties": {
                         "host": {"type": "string"},
                         "username": {"type": "string"},
-                        "local_path": {"type": "string", "description": "Local file path"},
+                        "local_path": {"type": "string", "description": "Local file or directory path"},
                         "remote_path": {"type": "string", "description": "Remote destination path"},
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "object"},
+                            "description": "Several transfers at once: [{local_path, remote_path}, ...]"
+                        },
                         "port": {"type": "integer"},
                         "password": {"type": "string"},
-                        "key_file": {"type": "string"}
+                        "key_file": {"type": "string"},
+                        "chunk_size": {"type": "integer", "description": "Bytes per read/write (default 262144)"},
+                        "window": {"type": "integer", "description": "Bytes in flight before waiting for acknowledgements (default 4194304)"},
+                        "parallel": {"type": "integer", "description": "Files transferred at once for directories and file lists (default 4)"},
+                        "resume": {"type": "boolean", "description": "Continue from a partial earlier transfer (default true)", "default": True},
+                        "verify": {"type": "boolean", "description": "Compare SHA-256 checksums on both ends with sha256sum (default true)", "default": True},
+                        "retries": {"type": "integer", "description": "Reconnect-and-resume attempts per file after a dropped connection (default 3)"},
                     },
-                    "required": ["host", "username", "local_path", "remote_path"]
+                    "required": ["host", "username"]
                 }
             },
             {
                 "name": "ssh_download",
-                "description": "Download a file from a remote host via SCP/SFTP",
+                "description": "Download a file or directory from a remote host via SFTP (resumable, with checksums and progress)",
                 "category": "command",
                 "integration": "ssh",
                 "parameters": {
@@ -71,80 +207,388 @@ class SshIntegration(MCPIntegration):
                     "properties": {
                         "host": {"type": "string"},
                         "username": {"type": "string"},
-                        "remote_path": {"type": "string", "description": "Remote file path"},
+                        "remote_path": {"type": "string", "description": "Remote file or directory path"},
                         "local_path": {"type": "string", "description": "Local destination path"},
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "object"},
+                            "description": "Several transfers at once: [{remote_path, local_path}, ...]"
+                        },
                         "port": {"type": "integer"},
                         "password": {"type": "string"},
-                        "key_file": {"type": "string"}
+                        "key_file": {"type": "string"},
+                        "chunk_size": {"type": "integer", "description": "Bytes per read/write (default 262144)"},
+                        "window": {"type": "integer", "description": "Bytes in flight before waiting for acknowledgements (default 4194304)"},
+                        "parallel": {"type": "integer", "description": "Files transferred at once for directories and file lists (default 4)"},
+                        "resume": {"type": "boolean", "description": "Continue from a partial earlier transfer (default true)", "default": True},
+                        "verify": {"type": "boolean", "description": "Compare SHA-256 checksums on both ends with sha256sum (default true)", "default": True},
+                        "retries": {"type": "integer", "description": "Reconnect-and-resume attempts per file after a dropped connection (default 3)"},
                     },
-                    "required": ["host", "username", "remote_path", "local_path"]
+                    "required": ["host", "username"]
                 }
             }
         ]
     
     async def call_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
-        try:
-            import paramiko
-        except ImportError:
+        if tool_name not in ("ssh_execute", "ssh_execute_many", "ssh_upload", "ssh_download"):
+            raise ValueError(f"Unknown tool: {tool_name}")
+        if not self.pool.is_available:
             return "Error: paramiko package is required. Install with: pip install paramiko"
+        if tool_name == "ssh_execute_many":
+            return await self._execute_many(args)
         
         host = args.get("host")
-        username = args.get("username")
-        port = args.get("port", 22)
-        password = args.get("password")
-        key_file = args.get("key_file")
-        
-        # Create SSH client
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        target = {
+            "host": host,
+            "username": args.get("username"),
+            "port": args.get("port", 22),
+            "password": args.get("password"),
+            "key_file": args.get("key_file"),
+        }
         
         try:
-            # Connect
-            connect_kwargs = {
-                "hostname": host,
-                "port": port,
-                "username": username,
-            }
-            if key_file:
-                connect_kwargs["key_filename"] = key_file
-            elif password:
-                connect_kwargs["password"] = password
-            else:
-                # Try default key locations
-                connect_kwargs["look_for_keys"] = True
-                
-            await asyncio.to_thread(client.connect, **connect_kwargs)
-            
             if tool_name == "ssh_execute":
-                command = args.get("command")
-                stdin, stdout, stderr = await asyncio.to_thread(client.exec_command, command)
-                output = await asyncio.to_thread(stdout.read)
-                error = await asyncio.to_thread(stderr.read)
-                exit_code = stdout.channel.recv_exit_status()
-                
-                return {
-                    "output": output.decode(),
-                    "error": error.decode(),
-                    "exit_code": exit_code
-                }
-                
-            elif tool_name == "ssh_upload":
-                sftp = await asyncio.to_thread(client.open_sftp)
-                local_path = args.get("local_path")
-                remote_path = args.get("remote_path")
-                await asyncio.to_thread(sftp.put, local_path, remote_path)
-                sftp.close()
-                return f"Uploaded {local_path} to {host}:{remote_path}"
+                timeout = args.get("timeout")
+                return await self.execute(
+                    target, args.get("command"),
+                    timeout=float(timeout) if timeout else None,
+                    pty=bool(args.get("pty", False)),
+                    max_output=int(args.get("max_output") or DEFAULT_MAX_OUTPUT_BYTES),
+                    stream=args.get("stream", True),
+                )
                 
-            elif tool_name == "ssh_download":
-                sftp = await asyncio.to_thread(client.open_sftp)
-                remote_path = args.get("remote_path")
-                local_path = args.get("local_path")
-                await asyncio.to_thread(sftp.get, remote_path, local_path)
-                sftp.close()
-                return f"Downloaded {host}:{remote_path} to {local_path}"
+            else:
+                return await self._transfer(tool_name == "ssh_upload", args, target)
                 
         except Exception as e:
             return f"SSH Error: {str(e)}"
+
+    async def execute(self, target: Dict[str, Any], command: str, timeout: Optional[float] = None,
+                      pty: bool = False, max_output: int = DEFAULT_MAX_OUTPUT_BYTES,
+                      stream: bool = False, kill_on_timeout: bool = True) -> Dict[str, Any]:
+        """
+        Run one command on a pooled connection to ``target``, reading stdout
+        and stderr as they arrive. Each stream keeps at most ``max_output``
+        bytes (its head and tail); with ``stream`` the output is also sent as
+        progress notifications. After ``timeout`` seconds the remote process
+        group is killed and the partial output returned.
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        buffers = {"stdout": HeadTailBuffer(max_output), "stderr": HeadTailBuffer(max_output)}
+        notifier = _OutputNotifier() if stream else None
+        track_pid = kill_on_timeout and timeout is not None
+        if track_pid:
+            # A POSIX sh replaces the login shell (keeping its PID, which sshd
+            # made a process group leader) and prints that PID first, so the
+            # whole command tree can be signalled on timeout. Without a timeout
+            # the command runs untouched under the user's own shell.
+            command = "exec sh -c " + shlex.quote(f"printf '{PID_MARKER}%s\\n' \"$$\"; {command}")
+        pid: Optional[int] = None
+        pending = b"" if track_pid else None
+        timed_out = False
+        start = time.perf_counter()
+        deadline = start + timeout if timeout else None
+
+        def emit(item):
+            loop.call_soon_threadsafe(chunks.put_nowait, item)
+
+        async with self.pool.session(**target) as channel:
+            reader = asyncio.ensure_future(asyncio.to_thread(self._pump, channel, command, pty, emit, stop))
+            try:
+                while True:
+                    wait = None if deadline is None else max(deadline - time.perf_counter(), 0)
+                    try:
+                        name, data = await asyncio.wait_for(chunks.get(), wait)
+                    except asyncio.TimeoutError:
+                        timed_out = True
+                        await self._kill(target, channel, pid, pty)
+                        break
+                    if name is None:
+                        break
+                    if name == "stdout" and pending is not None:
+                        pending += data
+                        if b"\n" not in pending and len(pending) < 64:
+                            continue
+                        line, newline, rest = pending.partition(b"\n")
+                        line = line.rstrip(b"\r")
+                        if newline and line.startswith(PID_MARKER.encode()) and line[len(PID_MARKER):].isdigit():
+                            pid = int(line[len(PID_MARKER):])
+                            data = rest
+                        else:
+                            data = pending
+                        pending = None
+                        if not data:
+                            continue
+                    buffers[name].feed(data)
+                    if notifier:
+                        await notifier.feed(name, data)
+            finally:
+                stop.set()
+                await reader
+            exit_code = channel.exit_status if channel.exit_status_ready() and not timed_out else None
+
+        if pending:
+            buffers["stdout"].feed(pending)
+        if notifier:
+            await notifier.flush()
+        stdout, stderr = buffers["stdout"], buffers["stderr"]
+        return {
+            "output": stdout.text(),
+            "error": stderr.text(),
+            "exit_code": exit_code,
+            "timed_out": timed_out,
+            "truncated": stdout.truncated or stderr.truncated,
+            "output_bytes": stdout.total,
+            "error_bytes": stderr.total,
+            "elapsed": round(time.perf_counter() - start, 3),
+        }
+
+    @staticmethod
+    def _pump(channel, command: str, pty: bool, emit, stop: threading.Event):
+        """
+        Worker thread: start ``command`` and hand each chunk of stdout and
+        stderr to ``emit`` as soon as it arrives, so neither stream's window
+        can fill up and stall the remote process. Ends with (None, None).
+        """
+        try:
+            if pty:
+                channel.get_pty(term="xterm", width=PTY_COLUMNS, height=PTY_ROWS)
+            channel.exec_command(command)
+            while not stop.is_set():
+                readable, _, _ = select.select([channel], [], [], READ_POLL_INTERVAL)
+                got = False
+                while channel.recv_ready():
+                    data = channel.recv(READ_CHUNK_BYTES)
+                    if not data:
+                        break
+                    emit(("stdout", data))
+                    got = True
+                while channel.recv_stderr_ready():
+                    data = channel.recv_stderr(READ_CHUNK_BYTES)
+                    if not data:
+                        break
+                    emit(("stderr", data))
+                    got = True
+                if got:
+                    continue
+                if channel.eof_received or channel.closed:
+                    # Output is complete; the exit status may trail the EOF
+                    channel.status_event.wait(READ_POLL_INTERVAL)
+                    if channel.exit_status_ready() or channel.closed:
+                        break
+        finally:
+            emit((None, None))
+
+    async def _kill(self, target: Dict[str, Any], channel, pid: Optional[int], pty: bool):
+        """Stop a timed-out command: SIGTERM its process group, SIGKILL shortly after."""
+        if pty:
+            try:
+                channel.send(b"\x03")
+            except Exception:
+                pass
+        if pid is None:
+            # Closing the channel is all that's left; with a PTY that hangs the command up
+            return
+        group = f"-- -{pid}"
+        script = (
+            f"kill -TERM {group} 2>/dev/null || kill -TERM {pid}; "
+            f"(sleep {KILL_GRACE_SECONDS}; kill -KILL {group} 2>/dev/null || kill -KILL {pid}) "
+            f">/dev/null 2>&1 </dev/null &"
+        )
+        try:
+            async with self.pool.session(**target) as killer:
+                await asyncio.wait_for(asyncio.to_thread(self._run, killer, script), KILL_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Could not kill timed-out command on {target.get('host')}: {e}")
+
+    @staticmethod
+    def _run(channel, command: str) -> Tuple[bytes, bytes, int]:
+        """Run a command with small output to completion (blocking)."""
+        channel.exec_command(command)
+        output = channel.makefile("rb").read()
+        error = channel.makefile_stderr("rb").read()
+        return output, error, channel.recv_exit_status()
+
+    async def _execute_many(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        hosts = args.get("hosts") or []
+        command = args.get("command")
+        if not command:
+            return {"error": "command is required"}
+        if not isinstance(hosts, list) or not hosts:
+            return {"error": "hosts must be a non-empty list"}
+        if len(hosts) > MAX_HOSTS:
+            return {"error": f"At most {MAX_HOSTS} hosts per call"}
+        try:
+            targets = [parse_host(h, args.get("username"), args.get("port", 22)) for h in hosts]
+        except ValueError as e:
+            return {"error": str(e)}
+        for target in targets:
+            target["password"] = args.get("password")
+            target["key_file"] = args.get("key_file")
+
+        concurrency = max(1, min(int(args.get("concurrency") or DEFAULT_MANY_CONCURRENCY), MAX_MANY_CONCURRENCY))
+        timeout = float(args.get("timeout") or DEFAULT_HOST_TIMEOUT)
+        slots = asyncio.Semaphore(concurrency)
+
+        async def run(target: Dict[str, Any]) -> Dict[str, Any]:
+            label = f"{target['username']}@{target['host']}:{target['port']}"
+            async with slots:
+                start = time.perf_counter()
+                try:
+                    # The outer limit only matters if connecting or killing hangs
+                    result = await asyncio.wait_for(self.execute(target, command, timeout=timeout),
+                                                    timeout + KILL_TIMEOUT)
+                except asyncio.TimeoutError:
+                    result = {"output": "", "error": "", "exit_code": None, "timed_out": True}
+                except Exception as e:
+                    result = {"output": "", "error": f"SSH Error: {str(e)}", "exit_code": None, "timed_out": False}
+                return {"host": label, **result, "elapsed": round(time.perf_counter() - start, 3)}
+
+        tasks = [asyncio.create_task(run(t)) for t in targets]
+        done = 0
+        succeeded = 0
+        # Stream each host's outcome as it finishes
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            done += 1
+            if result["exit_code"] == 0:
+                succeeded += 1
+            if result.get("timed_out"):
+                message = f"{result['host']}: timed out after {timeout:g}s"
+            elif result["exit_code"] is None:
+                message = f"{result['host']}: {result['error']}"
+            else:
+                first_line = result["output"].strip().split("\n", 1)[0][:200]
+                message = f"{result['host']}: exit {result['exit_code']}" + (f": {first_line}" if first_line else "")
+            await report_progress(done, len(tasks), message)
+
+        results = [t.result() for t in tasks]
+        return {
+            "command": command,
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+        }
+
+    async def _transfer(self, upload: bool, args: Dict[str, Any], target: Dict[str, Any]) -> Dict[str, Any]:
+        pairs = args.get("files") or [{"local_path": args.get("local_path"), "remote_path": args.get("remote_path")}]
+        if not all(isinstance(p, dict) and p.get("local_path") and p.get("remote_path") for p in pairs):
+            return {"error": "local_path and remote_path are required (or files: [{local_path, remote_path}])"}
+        options = {
+            "chunk_size": max(SFTP_REQUEST_BYTES, int(args.get("chunk_size") or DEFAULT_CHUNK_BYTES)),
+            "window": max(SFTP_REQUEST_BYTES, int(args.get("window") or DEFAULT_WINDOW_BYTES)),
+        }
+        parallel = max(1, min(int(args.get("parallel") or DEFAULT_PARALLEL_FILES), MAX_PARALLEL_FILES))
+        resume = args.get("resume", True)
+        verify = args.get("verify", True)
+        retries = max(0, int(args.get("retries", DEFAULT_TRANSFER_RETRIES)))
+
+        # Expand directories into individual files (and create remote directories)
+        async with self.pool.sftp(**target) as sftp:
+            plan = await asyncio.to_thread(self._plan_transfer, sftp, upload, pairs)
+
+        progress = TransferProgress(sum(size for _, _, size in plan))
+        slots = asyncio.Semaphore(parallel)
+        start = time.perf_counter()
+
+        async def run(source: str, destination: str) -> Dict[str, Any]:
+            async with slots:
+                try:
+                    return await self._transfer_file(
+                        upload, target, source, destination, progress.callback(destination),
+                        options, resume, verify, retries,
+                    )
+                except Exception as e:
+                    return {"source": source, "destination": destination, "error": str(e)}
+
+        reporter = asyncio.create_task(self._report_transfer(progress, len(plan)))
+        try:
+            files = await asyncio.gather(*(run(source, destination) for source, destination, _ in plan))
         finally:
-            client.close()
+            reporter.cancel()
+        await report_progress(progress.done, progress.total, f"Transferred {len(plan)} file(s)")
+
+        elapsed = time.perf_counter() - start
+        failed = sum(1 for f in files if "error" in f or f.get("verified") is False)
+        return {
+            "host": target["host"],
+            "files": files,
+            "succeeded": len(files) - failed,
+            "failed": failed,
+            "bytes": progress.total,
+            "elapsed": round(elapsed, 3),
+            "mb_per_s": round(progress.total / elapsed / 1e6, 2) if elapsed > 0 else None,
+        }
+
+    @staticmethod
+    def _plan_transfer(sftp, upload: bool, pairs: List[Dict[str, str]]) -> List[Tuple[str, str, int]]:
+        plan = []
+        for pair in pairs:
+            local_path = os.path.expanduser(pair["local_path"])
+            remote_path = pair["remote_path"]
+            if upload:
+                if not os.path.isdir(local_path) and is_remote_dir(sftp, remote_path):
+                    remote_path = posixpath.join(remote_path, os.path.basename(local_path))
+                files = plan_upload(local_path, remote_path)
+                for directory in sorted({posixpath.dirname(remote) for _, remote, _ in files}):
+                    remote_makedirs(sftp, directory)
+            else:
+                if os.path.isdir(local_path) and not is_remote_dir(sftp, remote_path):
+                    local_path = os.path.join(local_path, posixpath.basename(remote_path))
+                files = plan_download(sftp, remote_path, local_path)
+            plan.extend(files)
+        return plan
+
+    async def _transfer_file(self, upload: bool, target: Dict[str, Any], source: str, destination: str,
+                             on_bytes, options: Dict[str, int], resume: bool, verify: bool,
+                             retries: int) -> Dict[str, Any]:
+        """
+        Transfer one file on its own SFTP channel. A dropped connection is
+        retried (reconnecting and resuming from the partial file) up to
+        ``retries`` times; a resumed file whose checksum doesn't match is
+        transferred again from scratch.
+        """
+        transfer = upload_file if upload else download_file
+        attempt = 0
+        while True:
+            try:
+                async with self.pool.sftp(**target) as sftp:
+                    result = await asyncio.to_thread(
+                        transfer, sftp, source, destination, on_bytes, resume=resume, **options
+                    )
+            except Exception as e:
+                if not is_transient(e) or attempt >= retries:
+                    raise
+                attempt += 1
+                resume = True
+                await asyncio.sleep(min(0.5 * 2 ** attempt, 5))
+                continue
+
+            result = {"source": source, "destination": destination, **result, "retries": attempt}
+            if not verify:
+                return result
+            remote_sha256 = await self._remote_sha256(target, destination if upload else source)
+            result["verified"] = None if remote_sha256 is None else remote_sha256 == result["sha256"]
+            if result["verified"] is False and result["resumed_from"]:
+                # The partial file we continued from was bad
+                resume = False
+                continue
+            return result
+
+    async def _remote_sha256(self, target: Dict[str, Any], path: str) -> Optional[str]:
+        """SHA-256 of a remote file via sha256sum, or None where that isn't available."""
+        try:
+            result = await self.execute(target, f"sha256sum -- {shlex.quote(path)}")
+        except Exception:
+            return None
+        if result["exit_code"] != 0 or not result["output"]:
+            return None
+        return result["output"].split()[0].lstrip("\\").lower()
+
+    async def _report_transfer(self, progress: TransferProgress, count: int):
+        while True:
+            await report_progress(progress.done, progress.total,
+                                  f"{progress.done} of {progress.total} bytes ({count} file(s))")
+            await asyncio.sleep(PROGRESS_INTERVAL)
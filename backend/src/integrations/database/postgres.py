@@ -1,54 +1,366 @@
 from ..base import MCPIntegration
-from ...utils.subprocess_mgmt import SubprocessManager
-from typing import Dict, Any, List
+from ...utils.db_results import LAYOUTS, CursorStore, DEFAULT_CURSOR_TTL, format_rows, page_size
+from ...utils.query_cache import (
+    DEFAULT_QUERY_CACHE_ENTRIES, DEFAULT_QUERY_CACHE_TTL, DEFAULT_SCHEMA_TTL, QueryCache, SchemaCache,
+    is_cacheable_read, is_ddl, may_write, referenced_tables, written_tables,
+)
+from typing import Dict, Any, List, Optional
+import re
+import time
+import asyncio
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+DEFAULT_POOL_SIZE = 10
+# Prepared statements kept per connection (asyncpg's LRU statement cache)
+DEFAULT_STATEMENT_CACHE = 256
+DEFAULT_QUERY_TIMEOUT = 30.0
+# Statements whose rows are read through a server-side cursor; anything else
+# is executed and reports its command status
+_ROW_STATEMENT = re.compile(
+    r"^\s*(?:(?:--[^\n]*\n|/\*.*?\*/)\s*)*(select|with|values|table|show|explain|fetch)\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+_COLUMNS_SQL = """
+SELECT c.table_schema, c.table_name, t.table_type, c.column_name, c.data_type,
+       c.is_nullable = 'YES' AS nullable, c.column_default
+FROM information_schema.columns c
+JOIN information_schema.tables t ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+WHERE c.table_schema NOT IN ('pg_catalog', 'information_schema') AND c.table_schema NOT LIKE 'pg_toast%'
+ORDER BY c.table_schema, c.table_name, c.ordinal_position
+"""
+_CONSTRAINTS_SQL = """
+SELECT n.nspname AS table_schema, cl.relname AS table_name, con.contype::text AS contype, con.conname,
+       ARRAY(SELECT a.attname FROM unnest(con.conkey) WITH ORDINALITY k(attnum, i)
+             JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum ORDER BY k.i) AS columns,
+       con.confrelid::regclass::text AS ref_table,
+       ARRAY(SELECT a.attname FROM unnest(con.confkey) WITH ORDINALITY k(attnum, i)
+             JOIN pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.attnum ORDER BY k.i) AS ref_columns
+FROM pg_constraint con
+JOIN pg_class cl ON cl.oid = con.conrelid
+JOIN pg_namespace n ON n.oid = cl.relnamespace
+WHERE con.contype IN ('p', 'f', 'u') AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+ORDER BY con.conname
+"""
+
+
+# Relations named in a query plus, recursively, everything the views among
+# them select from (a view's rewrite rule depends on the relations it reads)
+_BASE_TABLES_SQL = """
+WITH RECURSIVE rels(oid) AS (
+    SELECT c.oid FROM pg_class c WHERE lower(c.relname) = ANY($1::text[])
+  UNION
+    SELECT d.refobjid
+    FROM rels
+    JOIN pg_rewrite r ON r.ev_class = rels.oid
+    JOIN pg_depend d ON d.classid = 'pg_rewrite'::regclass AND d.objid = r.oid
+                    AND d.refclassid = 'pg_class'::regclass
+)
+SELECT DISTINCT lower(c.relname) FROM rels JOIN pg_class c ON c.oid = rels.oid
+"""
+
+
+class _PortalCursor:
+    """An open server-side cursor, with the connection and transaction it lives in."""
+
+    def __init__(self, conn, transaction, cursor):
+        self.conn = conn
+        self.transaction = transaction
+        self.cursor = cursor
+        self.columns: List[str] = []
+        self.pending: List[Any] = []
+        self.more = True
+
+    async def page(self, size: int, timeout: Optional[float]) -> List[Any]:
+        rows = self.pending + await self.cursor.fetch(size + 1 - len(self.pending), timeout=timeout)
+        self.pending = rows[size:]
+        self.more = bool(self.pending)
+        return rows[:size]
+
 
 class PostgresIntegration(MCPIntegration):
+    """
+    Native PostgreSQL provider on an asyncpg connection pool. Queries run in
+    a transaction (read-only unless ``read_only: false``) and rows are read
+    through a server-side cursor a page at a time; cancelling the tool call
+    cancels the statement on the server.
+    """
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.category = "database"
         self.name = "postgres"
-        self.manager = None
-        
+        self.pool = None
+        self.cursors: Optional[CursorStore] = None
+        self.read_only = config.get("read_only", True)
+        self.query_timeout = float(config.get("query_timeout", DEFAULT_QUERY_TIMEOUT))
+        self.schema_cache = SchemaCache(config.get("schema_cache_ttl", DEFAULT_SCHEMA_TTL))
+        # Result caching is opt-in: writes the SQL doesn't show (triggers,
+        # functions, other clients) are only bounded by the TTL
+        self.query_cache: Optional[QueryCache] = None
+        if config.get("query_cache", False):
+            self.query_cache = QueryCache(config.get("query_cache_max_entries", DEFAULT_QUERY_CACHE_ENTRIES),
+                                          config.get("query_cache_ttl", DEFAULT_QUERY_CACHE_TTL))
+
+    @property
+    def is_available(self) -> bool:
+        return asyncpg is not None
+
     async def initialize(self) -> None:
         # Requires connection string in config or env
         db_url = self.config.get("url")
         if not db_url:
             print("Warning: Postgres URL not configured.")
             return
-            
-        cmd = ["npx", "-y", "@modelcontextprotocol/server-postgres", db_url]
-        self.manager = SubprocessManager(cmd)
+        if asyncpg is None:
+            print("Warning: asyncpg package is required for Postgres. Install with: pip install asyncpg")
+            return
+
+        pool_size = max(int(self.config.get("pool_size", DEFAULT_POOL_SIZE)), 2)
         try:
-            self.manager.start()
+            self.pool = await asyncpg.create_pool(
+                db_url,
+                min_size=1,
+                max_size=pool_size,
+                statement_cache_size=self.config.get("statement_cache", DEFAULT_STATEMENT_CACHE),
+                max_inactive_connection_lifetime=self.config.get("idle_timeout", 300),
+            )
             print("Postgres integration started.")
         except Exception as e:
             print(f"Failed to start Postgres integration: {e}")
-            self.manager = None
-    
+            self.pool = None
+            return
+        # Each open cursor holds a pooled connection; leave one for queries
+        self.cursors = CursorStore(pool_size - 1, self.config.get("cursor_ttl", DEFAULT_CURSOR_TTL))
+
     async def shutdown(self) -> None:
-        if self.manager:
-            self.manager.stop()
-    
+        if self.cursors:
+            await self.cursors.close_all()
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
     def list_tools(self) -> List[Dict[str, Any]]:
-        return [{
-            "name": "postgres_query",
-            "description": "Execute a read-only query on PostgreSQL",
-            "category": "database",
-            "integration": "postgres",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string"}
-                },
-                "required": ["query"]
-            }
-        }]
-    
+        layout = {"type": "string", "enum": list(LAYOUTS),
+                  "description": "columnar: one value list per column (default); rows: one array per row"}
+        timeout = {"type": "number", "description": "Seconds before the statement is cancelled (default 30)"}
+        return [
+            {
+                "name": "postgres_query",
+                "description": "Execute a read-only query on PostgreSQL. Results come back a page at a time with a cursor for the rest.",
+                "category": "database",
+                "integration": "postgres",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "query": {"type": "string"},
+                        "params": {"type": "array", "description": "Values for $1, $2, ... placeholders"},
+                        "page_size": {"type": "integer", "description": "Rows per page (default 500)"},
+                        "layout": layout,
+                        "timeout": timeout,
+                        "no_cache": {"type": "boolean", "description": "Bypass the query result cache", "default": False},
+                    },
+                    "required": ["query"]
+                }
+            },
+            {
+                "name": "postgres_fetch",
+                "description": "Fetch the next page of a postgres_query result, or close its cursor",
+                "category": "database",
+                "integration": "postgres",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "cursor": {"type": "string", "description": "Cursor returned by postgres_query"},
+                        "page_size": {"type": "integer", "description": "Rows per page (default 500)"},
+                        "layout": layout,
+                        "timeout": timeout,
+                        "close": {"type": "boolean", "description": "Close the cursor instead of fetching", "default": False},
+                    },
+                    "required": ["cursor"]
+                }
+            },
+            {
+                "name": "postgres_describe_schema",
+                "description": "List tables and views with their columns and keys (cached; refreshed after DDL)",
+                "category": "database",
+                "integration": "postgres",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "table": {"type": "string", "description": "Describe only this table or view (name or schema.name)"},
+                        "no_cache": {"type": "boolean", "description": "Reload the schema", "default": False},
+                    },
+                }
+            },
+        ]
+
     async def call_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
-        if not self.manager:
+        if tool_name not in ("postgres_query", "postgres_fetch", "postgres_describe_schema"):
+            raise ValueError(f"Unknown tool: {tool_name}")
+        if not self.pool:
             return "Error: Postgres integration is not running."
-            
-        return await self.manager.send_request("tools/call", {
-            "name": "query",
-            "arguments": args
-        })
+        layout = args.get("layout") or "columnar"
+        if layout not in LAYOUTS:
+            return f"Error: layout must be one of {', '.join(LAYOUTS)}"
+        timeout = float(args.get("timeout") or self.query_timeout)
+        start = time.perf_counter()
+        try:
+            if tool_name == "postgres_query":
+                params = args.get("params") or []
+                if not isinstance(params, list):
+                    return "Error: params must be a list of values for $1, $2, ..."
+                result = await self.query(args.get("query") or "", params, page_size(args.get("page_size")),
+                                          layout, timeout, not args.get("no_cache"))
+            elif tool_name == "postgres_describe_schema":
+                result = await self.describe_schema(args.get("table"), timeout, not args.get("no_cache"))
+            elif args.get("close"):
+                return {"closed": await self.cursors.close(args.get("cursor") or "")}
+            else:
+                result = await self.fetch(args.get("cursor") or "", page_size(args.get("page_size")),
+                                          layout, timeout)
+        except asyncio.TimeoutError:
+            return f"Error: query timed out after {timeout:g}s and was cancelled"
+        except KeyError as e:
+            return f"Error: {e.args[0]}"
+        except (asyncpg.PostgresError, asyncpg.InterfaceError, ValueError) as e:
+            return f"Error: {e}"
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+    async def query(self, sql: str, params: List[Any], size: int, layout: str, timeout: float,
+                    use_cache: bool = True) -> Dict[str, Any]:
+        cache = None
+        if self.query_cache is not None and use_cache and is_cacheable_read(sql):
+            key = self.query_cache.key(sql, params, size)
+            hit = self.query_cache.get(key)
+            if hit is not None:
+                columns, page = hit
+                return {**format_rows(columns, page, layout), "row_count": len(page), "cursor": None, "cached": True}
+            cache = (key, referenced_tables(sql), self.query_cache.generation)
+        try:
+            return await self._query(sql, params, size, layout, timeout, cache)
+        finally:
+            if not self.read_only and may_write(sql):
+                self._invalidate(sql)
+
+    def _invalidate(self, sql: str):
+        ddl = is_ddl(sql)
+        if ddl:
+            self.schema_cache.invalidate()
+        if self.query_cache is not None:
+            tables = written_tables(sql)
+            self.query_cache.invalidate(tables if tables and not ddl else None)
+
+    async def _query(self, sql: str, params: List[Any], size: int, layout: str, timeout: float,
+                     cache=None) -> Dict[str, Any]:
+        conn = await self.pool.acquire(timeout=timeout)
+        transaction = conn.transaction(readonly=self.read_only)
+        try:
+            await transaction.start()
+            if _ROW_STATEMENT.match(sql):
+                # Rows stream from a portal inside the transaction instead of
+                # being materialized; its statement comes from the cache
+                cursor = await conn.cursor(sql, *params, timeout=timeout)
+                portal = _PortalCursor(conn, transaction, cursor)
+                page = await portal.page(size, timeout)
+                if page:
+                    portal.columns = list(page[0].keys())
+                else:
+                    statement = await conn.prepare(sql, timeout=timeout)
+                    portal.columns = [a.name for a in statement.get_attributes()]
+            else:
+                status = await conn.execute(sql, *params, timeout=timeout)
+                portal = None
+        except BaseException:
+            # Also runs when the MCP request is cancelled; asyncpg has
+            # already asked the server to cancel the running statement
+            await asyncio.shield(self._release(conn, transaction))
+            raise
+
+        if portal is None:
+            await self._release(conn, transaction, commit=True)
+            return {"status": status}
+        cursor_id = None
+        if portal.more:
+            cursor_id = await self.cursors.add(portal, lambda: self._release(conn, transaction))
+        else:
+            if cache is not None:
+                key, tables, generation = cache
+                try:
+                    # Index the result under the tables behind any views it names too
+                    rows = await conn.fetch(_BASE_TABLES_SQL, list(tables), timeout=timeout)
+                    tables = tables | {r[0] for r in rows}
+                except (asyncio.TimeoutError, asyncpg.PostgresError):
+                    cache = None
+            await self._release(conn, transaction, commit=True)
+            if cache is not None:
+                self.query_cache.put(key, tables, (portal.columns, page), generation)
+        return {**format_rows(portal.columns, page, layout), "row_count": len(page), "cursor": cursor_id}
+
+    async def fetch(self, cursor_id: str, size: int, layout: str, timeout: float) -> Dict[str, Any]:
+        async def next_page(portal: _PortalCursor):
+            return portal, await portal.page(size, timeout)
+
+        try:
+            portal, page = await self.cursors.use(cursor_id, next_page)
+        except (asyncio.TimeoutError, asyncio.CancelledError, asyncpg.PostgresError):
+            # The transaction is aborted; the cursor can't continue
+            await asyncio.shield(self.cursors.close(cursor_id))
+            raise
+        if not portal.more:
+            await self.cursors.close(cursor_id)
+        return {**format_rows(portal.columns, page, layout), "row_count": len(page),
+                "cursor": cursor_id if portal.more else None}
+
+    async def describe_schema(self, table: Optional[str], timeout: float, use_cache: bool = True) -> Dict[str, Any]:
+        if not use_cache:
+            self.schema_cache.invalidate()
+        tables, cached = await self.schema_cache.get(lambda: self._describe(timeout))
+        if table:
+            wanted = table.lower()
+            tables = [t for t in tables
+                      if wanted in (t["name"].lower(), f"{t['schema']}.{t['name']}".lower())]
+            if not tables:
+                raise ValueError(f"No table or view named {table}")
+        return {"tables": tables, "cached": cached}
+
+    async def _describe(self, timeout: float) -> List[Dict[str, Any]]:
+        async with self.pool.acquire(timeout=timeout) as conn:
+            columns = await conn.fetch(_COLUMNS_SQL, timeout=timeout)
+            constraints = await conn.fetch(_CONSTRAINTS_SQL, timeout=timeout)
+        tables: Dict[Any, Dict[str, Any]] = {}
+        for c in columns:
+            t = tables.setdefault((c["table_schema"], c["table_name"]), {
+                "schema": c["table_schema"], "name": c["table_name"],
+                "type": "view" if c["table_type"] == "VIEW" else "table",
+                "columns": [], "foreign_keys": [], "unique": [],
+            })
+            t["columns"].append({"name": c["column_name"], "type": c["data_type"], "nullable": c["nullable"],
+                                 "default": c["column_default"], "primary_key": False})
+        for con in constraints:
+            t = tables.get((con["table_schema"], con["table_name"]))
+            if t is None:
+                continue
+            if con["contype"] == "p":
+                for column in t["columns"]:
+                    column["primary_key"] = column["name"] in con["columns"]
+            elif con["contype"] == "f":
+                t["foreign_keys"].append({"name": con["conname"], "columns": list(con["columns"]),
+                                          "references": con["ref_table"], "ref_columns": list(con["ref_columns"])})
+            else:
+                t["unique"].append(list(con["columns"]))
+        return list(tables.values())
+
+    async def _release(self, conn, transaction, commit: bool = False):
+        try:
+            if commit:
+                await transaction.commit()
+        finally:
+            # Releasing resets the connection, which rolls back an open
+            # transaction (and closes it if that fails)
+            await self.pool.release(conn)
@@ -1,49 +1,375 @@
 from ..base import MCPIntegration
-from ...utils.subprocess_mgmt import SubprocessManager
-from typing import Dict, Any, List
+from ...utils.db_results import (
+    DEFAULT_CURSOR_TTL, DEFAULT_MAX_CURSORS, LAYOUTS, MAX_PAGE_SIZE, CursorStore, format_rows, page_size,
+)
+from ...utils.query_cache import (
+    DEFAULT_QUERY_CACHE_ENTRIES, DEFAULT_QUERY_CACHE_TTL, DEFAULT_SCHEMA_TTL, QueryCache, SchemaCache,
+    is_cacheable_read, is_ddl, may_write, referenced_tables, written_tables,
+)
+from ...utils.sqlite_pool import DEFAULT_BUSY_TIMEOUT, DEFAULT_READERS, DEFAULT_STATEMENT_CACHE, SqlitePool
+from typing import Dict, Any, List, Optional, Set
+import re
+import time
+import sqlite3
+
+MAX_BATCH_ROWS = 100000
+# Statements that can run on a read-only connection; anything that turns
+# out to write after all is retried on the writer
+_READ_STATEMENT = re.compile(r"^\s*(?:(?:--[^\n]*\n|/\*.*?\*/)\s*)*(select|with|values|explain)\b",
+                             re.IGNORECASE | re.DOTALL)
+
+
+class _RowCursor:
+    """A sqlite3 cursor paged ``size`` rows at a time, with one row of lookahead."""
+
+    def __init__(self, cursor: sqlite3.Cursor, tables: Set[str]):
+        self.cursor = cursor
+        self.columns = [d[0] for d in cursor.description]
+        # Tables the statement actually reads, views expanded
+        self.tables = tables
+        self.pending: List[Any] = []
+        self.more = True
+        self.truncated = False
+
+    def page(self, size: int) -> List[Any]:
+        rows = self.pending
+        if self.cursor is not None:
+            rows = rows + self.cursor.fetchmany(size + 1 - len(rows))
+        self.pending = rows[size:]
+        self.more = bool(self.pending)
+        return rows[:size]
+
+    def drain(self, limit: int):
+        """Buffer up to ``limit`` more rows and finish the statement; later pages come from memory."""
+        rows = self.pending + self.cursor.fetchmany(limit + 1 - len(self.pending))
+        self.truncated = len(rows) > limit
+        self.pending = rows[:limit]
+        self.more = bool(self.pending)
+        self.cursor.close()
+        self.cursor = None
+
+
+def _start(conn: sqlite3.Connection, sql: str, params: Any, size: int, collect_tables: bool = False):
+    changes = conn.total_changes
+    tables: Set[str] = set()
+    if collect_tables:
+        # SQLite reports every table it reads while preparing, including the
+        # ones behind views. Setting an authorizer expires cached statements,
+        # so this one is re-prepared (and reported) even if it was cached.
+        def authorize(action, table, column, database, source):
+            if action == sqlite3.SQLITE_READ and table:
+                tables.add(table.lower())
+            return sqlite3.SQLITE_OK
+        conn.set_authorizer(authorize)
+    try:
+        cursor = conn.execute(sql, params)
+    finally:
+        if collect_tables:
+            conn.set_authorizer(None)
+    if cursor.description is None:
+        # rowcount is -1 for statements sqlite3 doesn't recognize as DML (e.g. WITH ... INSERT)
+        return None, None, {"rows_affected": conn.total_changes - changes, "last_row_id": cursor.lastrowid}
+    rows = _RowCursor(cursor, tables)
+    return rows, rows.page(size), None
+
+
+def _start_on_writer(conn: sqlite3.Connection, sql: str, params: Any, size: int, collect_tables: bool = False):
+    # A statement left unfinished keeps its implicit transaction open, so a
+    # cursor parked on the writer would hold its write uncommitted and
+    # invisible to readers; drain it now and page the rest from memory
+    rows, page, info = _start(conn, sql, params, size, collect_tables)
+    if rows is not None and rows.more:
+        rows.drain(MAX_PAGE_SIZE)
+    return rows, page, info
+
+
+def _next_page(conn: sqlite3.Connection, rows: _RowCursor, size: int) -> List[Any]:
+    return rows.page(size)
+
+
+def _close_cursor(conn: sqlite3.Connection, rows: _RowCursor):
+    if rows.cursor is not None:
+        rows.cursor.close()
+
+
+def _schema_version(conn: sqlite3.Connection) -> int:
+    # Bumped by SQLite on every schema change, including other processes'
+    return conn.execute("PRAGMA schema_version").fetchone()[0]
+
+
+def _describe(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    tables = []
+    objects = conn.execute("SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view') "
+                           "AND name NOT LIKE 'sqlite_%' ORDER BY name").fetchall()
+    for name, kind in objects:
+        columns = [
+            {"name": c[1], "type": c[2], "nullable": not c[3] and not c[5], "default": c[4], "primary_key": bool(c[5])}
+            # hidden == 1 marks virtual table internals; generated columns are 2 and 3
+            for c in conn.execute("SELECT * FROM pragma_table_xinfo(?)", (name,)) if c[6] != 1
+        ]
+        foreign_keys: Dict[int, Dict[str, Any]] = {}
+        for fk_id, _, ref_table, column, ref_column, *_ in conn.execute(
+                "SELECT * FROM pragma_foreign_key_list(?) ORDER BY id, seq", (name,)):
+            fk = foreign_keys.setdefault(fk_id, {"columns": [], "references": ref_table, "ref_columns": []})
+            fk["columns"].append(column)
+            fk["ref_columns"].append(ref_column)
+        indexes = [
+            {"name": index, "unique": bool(unique),
+             "columns": [r[2] for r in conn.execute("SELECT * FROM pragma_index_info(?) ORDER BY seqno", (index,))]}
+            for _, index, unique, *_ in conn.execute("SELECT * FROM pragma_index_list(?)", (name,))
+        ]
+        tables.append({"name": name, "type": kind, "columns": columns,
+                       "foreign_keys": list(foreign_keys.values()), "indexes": indexes})
+    return tables
+
+
+def _execute_many(conn: sqlite3.Connection, sql: str, params: List[Any]) -> int:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.executemany(sql, params)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return cursor.rowcount
+
 
 class SqliteIntegration(MCPIntegration):
+    """
+    Native SQLite provider: queries run in-process on a pool of connections
+    (one writer plus read-only readers in WAL mode) and results are paged
+    through cursors.
+    """
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.category = "database"
         self.name = "sqlite"
-        self.manager = None
-        
+        self.pool: Optional[SqlitePool] = None
+        self.cursors: Optional[CursorStore] = None
+        self.schema_cache = SchemaCache(config.get("schema_cache_ttl", DEFAULT_SCHEMA_TTL))
+        # Result caching is opt-in: writes the SQL doesn't show (triggers,
+        # other processes) are only bounded by the TTL
+        self.query_cache: Optional[QueryCache] = None
+        if config.get("query_cache", False):
+            self.query_cache = QueryCache(config.get("query_cache_max_entries", DEFAULT_QUERY_CACHE_ENTRIES),
+                                          config.get("query_cache_ttl", DEFAULT_QUERY_CACHE_TTL))
+
     async def initialize(self) -> None:
-        db_path = self.config.get("path", "test.db")
-        cmd = ["npx", "-y", "@modelcontextprotocol/server-sqlite", "--file", db_path]
-        self.manager = SubprocessManager(cmd)
+        pool = SqlitePool(
+            self.config.get("path", "test.db"),
+            readers=self.config.get("readers", DEFAULT_READERS),
+            statement_cache=self.config.get("statement_cache", DEFAULT_STATEMENT_CACHE),
+            busy_timeout=self.config.get("busy_timeout", DEFAULT_BUSY_TIMEOUT),
+        )
         try:
-            self.manager.start()
-            print("SQLite integration started.")
+            await pool.open()
         except Exception as e:
-            print(f"Failed to start SQLite integration: {e}")
-            self.manager = None
-    
+            print(f"Failed to open SQLite database: {e}")
+            await pool.close()
+            return
+        self.pool = pool
+        # Every open cursor on a reader keeps that reader; leave one for queries
+        max_cursors = pool.reader_count - 1 if pool.reader_count else DEFAULT_MAX_CURSORS
+        self.cursors = CursorStore(max_cursors, self.config.get("cursor_ttl", DEFAULT_CURSOR_TTL))
+        print("SQLite integration started.")
+
     async def shutdown(self) -> None:
-        if self.manager:
-            self.manager.stop()
-    
+        if self.cursors:
+            await self.cursors.close_all()
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
     def list_tools(self) -> List[Dict[str, Any]]:
-        return [{
-            "name": "sqlite_query",
-            "description": "Execute a query on SQLite database",
-            "category": "database",
-            "integration": "sqlite",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string"}
-                },
-                "required": ["query"]
-            }
-        }]
-    
+        layout = {"type": "string", "enum": list(LAYOUTS),
+                  "description": "columnar: one value list per column (default); rows: one array per row"}
+        return [
+            {
+                "name": "sqlite_query",
+                "description": "Execute a query on SQLite database. Results come back a page at a time with a cursor for the rest.",
+                "category": "database",
+                "integration": "sqlite",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "query": {"type": "string"},
+                        "params": {"type": ["array", "object"], "description": "Values for ? or :name placeholders"},
+                        "page_size": {"type": "integer", "description": "Rows per page (default 500)"},
+                        "layout": layout,
+                        "no_cache": {"type": "boolean", "description": "Bypass the query result cache", "default": False},
+                    },
+                    "required": ["query"]
+                }
+            },
+            {
+                "name": "sqlite_fetch",
+                "description": "Fetch the next page of a sqlite_query result, or close its cursor",
+                "category": "database",
+                "integration": "sqlite",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "cursor": {"type": "string", "description": "Cursor returned by sqlite_query"},
+                        "page_size": {"type": "integer", "description": "Rows per page (default 500)"},
+                        "layout": layout,
+                        "close": {"type": "boolean", "description": "Close the cursor instead of fetching", "default": False},
+                    },
+                    "required": ["cursor"]
+                }
+            },
+            {
+                "name": "sqlite_executemany",
+                "description": "Run one statement for each parameter set in a single transaction (bulk inserts and updates)",
+                "category": "database",
+                "integration": "sqlite",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "query": {"type": "string"},
+                        "params": {"type": "array", "items": {"type": ["array", "object"]}},
+                    },
+                    "required": ["query", "params"]
+                }
+            },
+            {
+                "name": "sqlite_describe_schema",
+                "description": "List tables and views with their columns, keys and indexes (cached until the schema changes)",
+                "category": "database",
+                "integration": "sqlite",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "table": {"type": "string", "description": "Describe only this table or view"},
+                        "no_cache": {"type": "boolean", "description": "Reload the schema", "default": False},
+                    },
+                }
+            },
+        ]
+
     async def call_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
-        if not self.manager:
+        if tool_name not in ("sqlite_query", "sqlite_fetch", "sqlite_executemany", "sqlite_describe_schema"):
+            raise ValueError(f"Unknown tool: {tool_name}")
+        if not self.pool:
             return "Error: SQLite integration is not running."
-            
-        return await self.manager.send_request("tools/call", {
-            "name": "query",
-            "arguments": args
-        })
+        layout = args.get("layout") or "columnar"
+        if layout not in LAYOUTS:
+            return f"Error: layout must be one of {', '.join(LAYOUTS)}"
+        start = time.perf_counter()
+        try:
+            if tool_name == "sqlite_query":
+                result = await self.query(args.get("query") or "", args.get("params"),
+                                          page_size(args.get("page_size")), layout, not args.get("no_cache"))
+            elif tool_name == "sqlite_describe_schema":
+                result = await self.describe_schema(args.get("table"), not args.get("no_cache"))
+            elif tool_name == "sqlite_fetch":
+                if args.get("close"):
+                    return {"closed": await self.cursors.close(args.get("cursor") or "")}
+                result = await self.fetch(args.get("cursor") or "", page_size(args.get("page_size")), layout)
+            else:
+                params = args.get("params")
+                if not isinstance(params, list) or len(params) > MAX_BATCH_ROWS:
+                    return f"Error: params must be a list of at most {MAX_BATCH_ROWS} parameter sets"
+                try:
+                    rowcount = await self.pool.write(_execute_many, args.get("query") or "", params)
+                finally:
+                    self._invalidate(args.get("query") or "")
+                result = {"rows_affected": rowcount, "batches": len(params)}
+        except (sqlite3.Error, KeyError, ValueError) as e:
+            return f"Error: {e.args[0] if isinstance(e, KeyError) else e}"
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+    async def query(self, sql: str, params: Any, size: int, layout: str, use_cache: bool = True) -> Dict[str, Any]:
+        if params is None:
+            params = ()
+        cache = None
+        if self.query_cache is not None and use_cache and is_cacheable_read(sql):
+            key = self.query_cache.key(sql, params, size)
+            hit = self.query_cache.get(key)
+            if hit is not None:
+                columns, page = hit
+                return {**format_rows(columns, page, layout), "row_count": len(page), "cursor": None, "cached": True}
+            cache = (key, referenced_tables(sql), self.query_cache.generation)
+        try:
+            if _READ_STATEMENT.match(sql):
+                worker = await self.pool.acquire_reader()
+                try:
+                    # Without readers (e.g. in-memory) reads land on the writer; a
+                    # plain read holds no write open, so its cursor pages from
+                    # SQLite like a reader's instead of being drained and capped
+                    drain = worker is self.pool.writer and may_write(sql)
+                    start = _start_on_writer if drain else _start
+                    rows, page, info = await worker.run(start, sql, params, size, cache is not None)
+                except sqlite3.OperationalError as e:
+                    self.pool.release_reader(worker)
+                    if "readonly" not in str(e):
+                        raise
+                except BaseException:
+                    self.pool.release_reader(worker)
+                    raise
+                else:
+                    return await self._result(worker, rows, page, info, layout, cache)
+            rows, page, info = await self.pool.write(_start_on_writer, sql, params, size)
+            return await self._result(self.pool.writer, rows, page, info, layout)
+        finally:
+            if may_write(sql):
+                self._invalidate(sql)
+
+    def _invalidate(self, sql: str):
+        ddl = is_ddl(sql)
+        if ddl:
+            self.schema_cache.invalidate()
+        if self.query_cache is not None:
+            tables = written_tables(sql)
+            self.query_cache.invalidate(tables if tables and not ddl else None)
+
+    async def _result(self, worker, rows: Optional[_RowCursor], page, info, layout: str,
+                      cache=None) -> Dict[str, Any]:
+        if rows is None:
+            self.pool.release_reader(worker)
+            return info
+        cursor_id = None
+        if rows.more:
+            async def release():
+                try:
+                    await worker.run(_close_cursor, rows)
+                finally:
+                    self.pool.release_reader(worker)
+            cursor_id = await self.cursors.add((worker, rows), release)
+        else:
+            await worker.run(_close_cursor, rows)
+            self.pool.release_reader(worker)
+            if cache is not None:
+                key, tables, generation = cache
+                self.query_cache.put(key, tables | rows.tables, (rows.columns, page), generation)
+        result = {**format_rows(rows.columns, page, layout), "row_count": len(page), "cursor": cursor_id}
+        if rows.truncated:
+            result["truncated"] = True
+        return result
+
+    async def describe_schema(self, table: Optional[str] = None, use_cache: bool = True) -> Dict[str, Any]:
+        if not use_cache:
+            self.schema_cache.invalidate()
+        worker = await self.pool.acquire_reader()
+        try:
+            version = await worker.run(_schema_version)
+            tables, cached = await self.schema_cache.get(lambda: worker.run(_describe), version)
+        finally:
+            self.pool.release_reader(worker)
+        if table:
+            tables = [t for t in tables if t["name"].lower() == table.lower()]
+            if not tables:
+                raise ValueError(f"No table or view named {table}")
+        return {"tables": tables, "cached": cached}
+
+    async def fetch(self, cursor_id: str, size: int, layout: str) -> Dict[str, Any]:
+        async def next_page(state):
+            worker, rows = state
+            return rows, await worker.run(_next_page, rows, size)
+
+        rows, page = await self.cursors.use(cursor_id, next_page)
+        if not rows.more:
+            await self.cursors.close(cursor_id)
+        return {**format_rows(rows.columns, page, layout), "row_count": len(page),
+                "cursor": cursor_id if rows.more else None}
@@ -1,48 +1,181 @@
 from ..base import MCPIntegration
-from ...utils.subprocess_mgmt import SubprocessManager
-from typing import Dict, Any, List
+from ...utils.doc_convert import DEFAULT_CACHE_BYTES, ConversionCache, convert_document, converter_for, count_pages
+from ...utils.progress import report_progress
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import multiprocessing
+
+DEFAULT_MAX_PAGES = 50
+DEFAULT_MAX_CHARS = 200_000
+MAX_BATCH_FILES = 100
+# Seconds between progress reports while a document converts
+PROGRESS_INTERVAL = 0.5
+
 
 class MarkitdownIntegration(MCPIntegration):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.category = "filesystem"
         self.name = "markitdown"
-        self.manager = None
-        
+        self.cache: Optional[ConversionCache] = None
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+
     async def initialize(self) -> None:
-        cmd = ["npx", "-y", "@microsoft/markitdown-mcp"] # Verify package name
-        self.manager = SubprocessManager(cmd)
-        try:
-            self.manager.start()
-            print("MarkItDown integration started.")
-        except Exception as e:
-            print(f"Failed to start MarkItDown integration: {e}")
-            self.manager = None
-    
+        cache_dir = os.path.expanduser(
+            self.config.get("cache_dir") or os.path.join(tempfile.gettempdir(), "mcp-markitdown"))
+        self.cache = ConversionCache(cache_dir, self.config.get("cache_bytes", DEFAULT_CACHE_BYTES))
+        self.cache.clear_stale()
+        print("MarkItDown integration started.")
+
     async def shutdown(self) -> None:
-        if self.manager:
-            self.manager.stop()
-    
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Started on first use; spawn, because forking a process running an event loop isn't safe
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.config.get("workers") or min(4, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self.executor
+
     def list_tools(self) -> List[Dict[str, Any]]:
         return [{
             "name": "convert_to_markdown",
-            "description": "Convert file to Markdown using MarkItDown",
+            "description": "Convert files (PDF, DOCX, PPTX, XLSX, HTML, ...) to Markdown using MarkItDown. "
+                           "Conversions are cached by content; long documents are returned a range of pages at a time.",
             "category": "filesystem",
             "integration": "markitdown",
             "parameters": {
                 "type": "object",
                 "properties": {
-                    "path": {"type": "string"}
+                    "path": {"type": "string"},
+                    "paths": {"type": "array", "items": {"type": "string"},
+                              "description": "Convert several files in parallel instead of one"},
+                    "page": {"type": "integer", "description": "First page to return, 1-based (from next_page)", "default": 1},
+                    "max_pages": {"type": "integer", "description": f"Pages to return (default {DEFAULT_MAX_PAGES})"},
+                    "no_cache": {"type": "boolean", "description": "Convert again even if cached", "default": False},
                 },
-                "required": ["path"]
             }
         }]
-    
+
     async def call_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
-        if not self.manager:
+        if tool_name != "convert_to_markdown":
+            raise ValueError(f"Unknown tool: {tool_name}")
+        if not self.cache:
             return "Error: MarkItDown integration is not running."
-            
-        return await self.manager.send_request("tools/call", {
-            "name": "convert", # Verify tool name
-            "arguments": args
-        })
+        page = max(int(args.get("page") or 1), 1)
+        max_pages = max(int(args.get("max_pages") or DEFAULT_MAX_PAGES), 1)
+        use_cache = not args.get("no_cache")
+        start = time.perf_counter()
+
+        if args.get("paths"):
+            paths = args["paths"]
+            if not isinstance(paths, list) or len(paths) > MAX_BATCH_FILES:
+                return f"Error: paths must be a list of at most {MAX_BATCH_FILES} files"
+            results = await asyncio.gather(
+                *(self.convert(path, page, max_pages, use_cache) for path in paths), return_exceptions=True)
+            return {
+                "results": [
+                    {"path": path, "error": str(r)} if isinstance(r, BaseException) else r
+                    for path, r in zip(paths, results)
+                ],
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+            }
+
+        if not args.get("path"):
+            return "Error: path or paths is required"
+        try:
+            result = await self.convert(args["path"], page, max_pages, use_cache)
+        except (OSError, ValueError, RuntimeError) as e:
+            return f"Error: {e}"
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+    async def convert(self, path: str, page: int = 1, max_pages: int = DEFAULT_MAX_PAGES,
+                      use_cache: bool = True) -> Dict[str, Any]:
+        path = os.path.expanduser(path)
+        if not os.path.isfile(path):
+            raise ValueError(f"Not a file: {path}")
+        converter = converter_for(path)
+        if converter is None:
+            raise RuntimeError("markitdown is not installed (pip install 'markitdown[all]')")
+        loop = asyncio.get_running_loop()
+        sha = await loop.run_in_executor(None, self.cache.content_hash, path)
+        key = self.cache.key(sha, *converter)
+
+        meta = self.cache.lookup(key) if use_cache else None
+        cached = meta is not None
+        if meta is None:
+            pending = self._pending.get(key)
+            if pending is not None:
+                # Same content already converting (maybe under another name)
+                meta = await asyncio.shield(pending)
+                cached = True
+            else:
+                future = loop.create_future()
+                self._pending[key] = future
+                try:
+                    meta = await self._run(path, converter[0], key)
+                except BaseException as e:
+                    future.set_exception(e)
+                    future.exception()
+                    raise
+                else:
+                    future.set_result(meta)
+                finally:
+                    self._pending.pop(key, None)
+
+        pages = self.cache.read_pages(key, page, max_pages, self.config.get("max_chars", DEFAULT_MAX_CHARS))
+        end = page + len(pages) - 1
+        if len(pages) == 1 or meta["pages"] <= 1:
+            markdown = "".join(pages)
+        else:
+            markdown = "\n".join(f"<!-- page {n} -->\n{text}" for n, text in zip(range(page, end + 1), pages))
+        return {
+            "path": path,
+            "sha256": sha,
+            "converter": f"{converter[0]} {converter[1]}",
+            "title": meta.get("title"),
+            "pages": meta["pages"],
+            "page_start": page if pages else None,
+            "page_end": end if pages else None,
+            "next_page": end + 1 if pages and end < meta["pages"] else None,
+            "markdown": markdown,
+            "cached": cached,
+        }
+
+    async def _run(self, path: str, converter: str, key: str) -> Dict[str, Any]:
+        tmp_dir = self.cache.begin()
+        try:
+            try:
+                future = asyncio.wrap_future(self._pool().submit(convert_document, path, converter, tmp_dir))
+            except BrokenProcessPool:
+                self.executor = None
+                future = asyncio.wrap_future(self._pool().submit(convert_document, path, converter, tmp_dir))
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=PROGRESS_INTERVAL)
+                if done:
+                    break
+                written, total = count_pages(tmp_dir)
+                await report_progress(written, total, f"Converted {written} pages of {os.path.basename(path)}")
+            try:
+                meta = future.result()
+            except BrokenProcessPool:
+                self.executor = None
+                raise RuntimeError("conversion worker crashed")
+            except Exception as e:
+                raise RuntimeError(f"conversion failed: {e}")
+            return self.cache.commit(key, tmp_dir, meta)
+        finally:
+            if os.path.isdir(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -1,11 +1,16 @@
 import os
 import shutil
+import hashlib
 import subprocess
 import stat
 import logging
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Optional, Union
 from backend.src.integrations.base import MCPIntegration
 from backend.src.utils.security import BoxedPath, atomic_writer, SecurityError
+from backend.src.utils.listing import scan_directory, SORT_KEYS, DEFAULT_PAGE_ENTRIES, DEFAULT_MAX_RESPONSE_BYTES, MAX_PAGE_ENTRIES
+from backend.src.utils.transfer import ChunkedTransferManager, DEFAULT_CHUNK_BYTES, DEFAULT_MAX_UPLOAD_BYTES, file_sha256
+from backend.src.utils.blobstore import BlobStore
+from backend.src.utils.patching import apply_unified_diff, apply_search_replace, PatchError
 
 logger = logging.getLogger(__name__)
 
@@ -23,25 +28,45 @@ class FileSystemIntegration(MCPIntegration):
         self.name = "filesystem"
         self.category = "system"
         self.root_dir = config.get("root_dir", os.getcwd())
+        self.transfers = ChunkedTransferManager(
+            self.root_dir,
+            chunk_bytes=config.get("chunk_bytes", DEFAULT_CHUNK_BYTES),
+            max_upload_bytes=config.get("max_upload_bytes", DEFAULT_MAX_UPLOAD_BYTES),
+        )
+        # Optional content-addressed mode: files indexed by hash, sharing blobs where reflinks allow
+        self.blobs = None
+        if config.get("content_addressed", False):
+            blob_dir = config.get("blob_dir", os.path.join(self.root_dir, ".cas"))
+            self.blobs = BlobStore(self.root_dir, blob_dir)
         logger.info(f"FileSystemIntegration initialized with root: {self.root_dir}")
 
     async def initialize(self) -> None:
         pass
 
     async def shutdown(self) -> None:
-        pass
+        self.transfers.close()
+        if self.blobs:
+            self.blobs.close()
 
     def list_tools(self) -> List[Dict[str, Any]]:
         return [
             {
                 "name": "list_directory",
-                "description": "List files and directories in a path.",
-                "input_schema": {"type": "object", "properties": {"path": {"type": "string", "default": "."}}}
+                "description": "List files and directories with type, size, mtime and permissions. Supports recursion depth, sorting and cursor pagination. Later pages come from the first page's scan while no listed directory changes, so sizes and mtimes of files modified in place can be stale.",
+                "input_schema": {"type": "object", "properties": {
+                    "path": {"type": "string", "default": "."},
+                    "depth": {"type": "integer", "default": 1, "description": "Levels to recurse (1 = direct children)"},
+                    "sort_by": {"type": "string", "enum": list(SORT_KEYS), "default": "name"},
+                    "reverse": {"type": "boolean", "default": False},
+                    "cursor": {"type": "string", "description": "next_cursor from a previous call"},
+                    "limit": {"type": "integer", "default": DEFAULT_PAGE_ENTRIES, "maximum": MAX_PAGE_ENTRIES},
+                    "max_bytes": {"type": "integer", "default": DEFAULT_MAX_RESPONSE_BYTES, "description": "Cap on response size"}
+                }}
             },
             {
                 "name": "read_file",
-                "description": "Read the contents of a file.",
-                "input_schema": {"type": "object", "properties": {"path": {"type": "string"}}, "required": ["path"]}
+                "description": "Read the contents of a file. Pass if_none_match with a known SHA-256 to skip the content when it is unchanged.",
+                "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "if_none_match": {"type": "string", "description": "SHA-256 the caller already has"}}, "required": ["path"]}
             },
             {
                 "name": "write_file",
@@ -82,6 +107,59 @@ class FileSystemIntegration(MCPIntegration):
                 "name": "chmod_file",
                 "description": "Change file permissions (restricted modes only).",
                 "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "mode": {"type": "integer"}}, "required": ["path", "mode"]}
+            },
+            {
+                "name": "edit_file",
+                "description": "Edit a file with search/replace hunks. Each search text must match exactly once unless all=true. Pass base_sha256 to reject the edit if the file changed since you read it.",
+                "input_schema": {"type": "object", "properties": {
+                    "path": {"type": "string"},
+                    "edits": {"type": "array", "items": {"type": "object", "properties": {"search": {"type": "string"}, "replace": {"type": "string"}, "all": {"type": "boolean", "default": False}}, "required": ["search", "replace"]}},
+                    "base_sha256": {"type": "string", "description": "Expected SHA-256 of the current file"}
+                }, "required": ["path", "edits"]}
+            },
+            {
+                "name": "apply_patch",
+                "description": "Apply a single-file unified diff to a file. Pass base_sha256 to reject the patch if the file changed since you read it.",
+                "input_schema": {"type": "object", "properties": {
+                    "path": {"type": "string"},
+                    "patch": {"type": "string", "description": "Unified diff (hunks starting with @@)"},
+                    "base_sha256": {"type": "string", "description": "Expected SHA-256 of the current file"}
+                }, "required": ["path", "patch"]}
+            },
+            {
+                "name": "begin_upload",
+                "description": "Start a chunked upload. Returns an upload_id and the preferred chunk size.",
+                "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "size": {"type": "integer", "description": "Total size in bytes (optional)"}, "sha256": {"type": "string", "description": "Expected SHA-256 of the whole file (optional)"}}, "required": ["path"]}
+            },
+            {
+                "name": "write_chunk",
+                "description": "Write a base64-encoded chunk of an upload at the given byte offset.",
+                "input_schema": {"type": "object", "properties": {"upload_id": {"type": "string"}, "offset": {"type": "integer"}, "data": {"type": "string", "description": "Base64-encoded bytes"}}, "required": ["upload_id", "offset", "data"]}
+            },
+            {
+                "name": "upload_status",
+                "description": "Get the number of bytes received so far, to resume an interrupted upload.",
+                "input_schema": {"type": "object", "properties": {"upload_id": {"type": "string"}}, "required": ["upload_id"]}
+            },
+            {
+                "name": "commit_upload",
+                "description": "Verify an upload's size and hash and move it into place atomically.",
+                "input_schema": {"type": "object", "properties": {"upload_id": {"type": "string"}, "sha256": {"type": "string"}}, "required": ["upload_id"]}
+            },
+            {
+                "name": "abort_upload",
+                "description": "Discard an in-progress upload.",
+                "input_schema": {"type": "object", "properties": {"upload_id": {"type": "string"}}, "required": ["upload_id"]}
+            },
+            {
+                "name": "begin_download",
+                "description": "Get size, SHA-256 and chunk size of a file before downloading it in chunks.",
+                "input_schema": {"type": "object", "properties": {"path": {"type": "string"}}, "required": ["path"]}
+            },
+            {
+                "name": "read_chunk",
+                "description": "Read a base64-encoded chunk of a file at the given byte offset.",
+                "input_schema": {"type": "object", "properties": {"path": {"type": "string"}, "offset": {"type": "integer", "default": 0}, "length": {"type": "integer"}}, "required": ["path"]}
             }
         ]
 
@@ -90,9 +168,17 @@ class FileSystemIntegration(MCPIntegration):
         
         try:
             if tool_name == "list_directory":
-                return self._list_directory(args.get("path", "."))
+                return self._list_directory(
+                    args.get("path", "."),
+                    depth=args.get("depth", 1),
+                    sort_by=args.get("sort_by", "name"),
+                    reverse=args.get("reverse", False),
+                    cursor=args.get("cursor"),
+                    limit=args.get("limit", DEFAULT_PAGE_ENTRIES),
+                    max_bytes=args.get("max_bytes", DEFAULT_MAX_RESPONSE_BYTES),
+                )
             elif tool_name == "read_file":
-                return self._read_file(args["path"])
+                return self._read_file(args["path"], args.get("if_none_match"))
             elif tool_name == "write_file":
                 return self._write_file(args["path"], args["content"])
             elif tool_name == "delete_file":
@@ -109,8 +195,34 @@ class FileSystemIntegration(MCPIntegration):
                 return self._append_file(args["path"], args["content"])
             elif tool_name == "chmod_file":
                 return self._chmod_file(args["path"], args["mode"])
+            elif tool_name == "edit_file":
+                return self._edit_file(args["path"], args.get("base_sha256"),
+                                       lambda text: apply_search_replace(text, args["edits"]))
+            elif tool_name == "apply_patch":
+                return self._edit_file(args["path"], args.get("base_sha256"),
+                                       lambda text: apply_unified_diff(text, args["patch"]),
+                                       allow_create=True)
+            elif tool_name == "begin_upload":
+                self._boxed(args["path"])
+                return self.transfers.begin_upload(args["path"], args.get("size"), args.get("sha256"))
+            elif tool_name == "write_chunk":
+                return self.transfers.write_chunk(args["upload_id"], args["offset"], args["data"])
+            elif tool_name == "upload_status":
+                return self.transfers.upload_status(args["upload_id"])
+            elif tool_name == "commit_upload":
+                return self.transfers.commit_upload(args["upload_id"], args.get("sha256"))
+            elif tool_name == "abort_upload":
+                return self.transfers.abort_upload(args["upload_id"])
+            elif tool_name == "begin_download":
+                self._boxed(args["path"])
+                return self.transfers.begin_download(args["path"])
+            elif tool_name == "read_chunk":
+                self._boxed(args["path"])
+                return self.transfers.read_chunk(args["path"], args.get("offset", 0), args.get("length"))
             else:
                 raise ValueError(f"Unknown tool: {tool_name}")
+        except PatchError as e:
+            return f"Error: Patch failed - {str(e)}"
         except SecurityError as e:
             logger.warning(f"SECURITY AUDIT: Violation in {tool_name}: {e}")
             return f"Error: Access Denied - {str(e)}"
@@ -118,39 +230,77 @@ class FileSystemIntegration(MCPIntegration):
             logger.error(f"Error executing {tool_name}: {e}")
             return f"Error: {str(e)}"
 
-    def _list_directory(self, path: str) -> Union[List[str], str]:
+    def _boxed(self, path: str) -> BoxedPath:
         boxed = BoxedPath(path, self.root_dir)
+        if self.blobs and self.blobs.contains(boxed.full_path):
+            raise SecurityError("Access to the content-addressed blob store is not allowed")
+        return boxed
+
+    def _hidden_names(self) -> List[str]:
+        if self.blobs and os.path.dirname(self.blobs.store_dir) == os.path.realpath(self.root_dir):
+            return [os.path.basename(self.blobs.store_dir)]
+        return []
+
+    def _file_hash(self, boxed: BoxedPath) -> str:
+        if self.blobs:
+            return self.blobs.hash_of(boxed.full_path)
+        return file_sha256(boxed.full_path)
+
+    def _store(self, boxed: BoxedPath, content: str) -> Optional[str]:
+        """Write text content; returns the SHA-256 when it was already stored unchanged."""
+        if self.blobs:
+            if not boxed.full_path.parent.exists():
+                raise FileNotFoundError(f"Directory does not exist: {boxed.full_path.parent}")
+            sha256, changed = self.blobs.write_bytes(boxed.full_path, content.encode("utf-8"))
+            return None if changed else sha256
+        with atomic_writer(boxed, mode="w", encoding="utf-8") as f:
+            f.write(content)
+        return None
+
+    def _list_directory(self, path: str, **options) -> Union[Dict[str, Any], str]:
+        boxed = self._boxed(path)
         if not boxed.is_dir():
             return f"Error: Not a directory: {path}"
-        return os.listdir(boxed.full_path)
+        return scan_directory(boxed.full_path, boxed.root_dir, exclude=self._hidden_names(), **options)
 
-    def _read_file(self, path: str) -> str:
-        boxed = BoxedPath(path, self.root_dir)
+    def _read_file(self, path: str, if_none_match: Optional[str] = None) -> Union[Dict[str, Any], str]:
+        boxed = self._boxed(path)
         if not boxed.is_file():
             return f"Error: Not a file: {path}"
+        if if_none_match:
+            sha256 = self._file_hash(boxed)
+            if sha256 == if_none_match.lower():
+                return {"path": path, "sha256": sha256, "not_modified": True}
         with open(boxed.full_path, "r", encoding="utf-8") as f:
             return f.read()
 
     def _write_file(self, path: str, content: str) -> str:
-        boxed = BoxedPath(path, self.root_dir)
-        with atomic_writer(boxed, mode="w", encoding="utf-8") as f:
-            f.write(content)
+        boxed = self._boxed(path)
+        unchanged = self._store(boxed, content)
+        if unchanged:
+            return f"Unchanged: {path} already has this content (sha256 {unchanged})"
         return f"Successfully wrote to {path}"
 
     def _delete_file(self, path: str) -> str:
-        boxed = BoxedPath(path, self.root_dir)
+        boxed = self._boxed(path)
         if not boxed.is_file():
             return f"Error: Not a file: {path}"
         if str(boxed.full_path) == str(self.root_dir):
             raise SecurityError("Cannot delete root directory")
-        os.remove(boxed.full_path)
+        if self.blobs:
+            self.blobs.delete(boxed.full_path)
+        else:
+            os.remove(boxed.full_path)
         return f"Successfully deleted {path}"
 
     def _search_files(self, query: str, path: str) -> Union[List[str], str]:
-        boxed = BoxedPath(path, self.root_dir)
+        boxed = self._boxed(path)
         if not boxed.is_dir():
             return f"Error: Search path is not a directory: {path}"
-        cmd = ["find", str(boxed.full_path), "-name", query]
+        cmd = ["find", str(boxed.full_path)]
+        if self.blobs:
+            cmd += ["-path", self.blobs.store_dir, "-prune", "-o"]
+        cmd += ["-name", query, "-print"]
         result = subprocess.run(cmd, capture_output=True, text=True)
         if result.returncode != 0:
             return f"Error: {result.stderr}"
@@ -158,38 +308,68 @@ class FileSystemIntegration(MCPIntegration):
         return [os.path.relpath(p, self.root_dir) for p in lines][:100]
 
     def _mkdir(self, path: str, parents: bool = False) -> str:
-        boxed = BoxedPath(path, self.root_dir)
+        boxed = self._boxed(path)
         boxed.mkdir(parents=parents, exist_ok=True)
         return f"Successfully created directory {path}"
 
     def _copy_file(self, src: str, dest: str) -> str:
-        src_boxed = BoxedPath(src, self.root_dir)
-        dest_boxed = BoxedPath(dest, self.root_dir)
+        src_boxed = self._boxed(src)
+        dest_boxed = self._boxed(dest)
         if not src_boxed.is_file():
             return f"Error: Source is not a file: {src}"
-        shutil.copy2(str(src_boxed.full_path), str(dest_boxed.full_path))
+        if self.blobs:
+            self.blobs.copy(src_boxed.full_path, dest_boxed.full_path)
+        else:
+            shutil.copy2(str(src_boxed.full_path), str(dest_boxed.full_path))
         return f"Successfully copied {src} to {dest}"
 
     def _move_file(self, src: str, dest: str) -> str:
-        src_boxed = BoxedPath(src, self.root_dir)
-        dest_boxed = BoxedPath(dest, self.root_dir)
+        src_boxed = self._boxed(src)
+        dest_boxed = self._boxed(dest)
         if not src_boxed.exists():
             return f"Error: Source does not exist: {src}"
+        is_file = src_boxed.is_file()
         os.replace(str(src_boxed.full_path), str(dest_boxed.full_path))
+        if self.blobs and is_file:
+            self.blobs.rename(src_boxed.full_path, dest_boxed.full_path)
         return f"Successfully moved {src} to {dest}"
 
     def _append_file(self, path: str, content: str) -> str:
-        boxed = BoxedPath(path, self.root_dir)
+        boxed = self._boxed(path)
         existing = ""
         if boxed.is_file():
             with open(boxed.full_path, "r", encoding="utf-8") as f:
                 existing = f.read()
-        with atomic_writer(boxed, mode="w", encoding="utf-8") as f:
-            f.write(existing + content)
+        self._store(boxed, existing + content)
         return f"Successfully appended to {path}"
 
+    def _edit_file(self, path: str, base_sha256: Optional[str], edit, allow_create: bool = False) -> Union[Dict[str, Any], str]:
+        boxed = self._boxed(path)
+        if boxed.is_file():
+            if base_sha256:
+                current = self._file_hash(boxed)
+                if current != base_sha256.lower():
+                    return f"Error: Conflict - {path} has sha256 {current}, expected {base_sha256}"
+            with open(boxed.full_path, "r", encoding="utf-8", newline="") as f:
+                text = f.read()
+        elif allow_create and not boxed.exists():
+            text = ""
+        else:
+            return f"Error: Not a file: {path}"
+
+        new_text, applied = edit(text)
+        if new_text != text:
+            self._store(boxed, new_text)
+        data = new_text.encode("utf-8")
+        return {
+            "path": path,
+            "applied": applied,
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+        }
+
     def _chmod_file(self, path: str, mode: int) -> str:
-        boxed = BoxedPath(path, self.root_dir)
+        boxed = self._boxed(path)
         if not boxed.exists():
             return f"Error: Path does not exist: {path}"
         if mode not in SAFE_MODES:
@@ -1,67 +1,391 @@
 from ..base import MCPIntegration
-from ...utils.subprocess_mgmt import SubprocessManager
-from typing import Dict, Any, List
+from ...utils.git_repo import (
+    DEFAULT_COMMIT_CACHE, DEFAULT_MAX_REPOS, DEFAULT_SCAN_BUDGET, DEFAULT_TREE_CACHE,
+    GitError, GitRepo, RepoCache, entry_type, run_git,
+)
+from typing import Dict, Any, List, Optional
+import time
+
+DEFAULT_LOG_COUNT = 50
+MAX_LOG_COUNT = 1000
+DEFAULT_MAX_LINES = 500
+MAX_LINES = 10000
+DEFAULT_TREE_ENTRIES = 1000
+MAX_TREE_ENTRIES = 10000
+MAX_STATUS_ENTRIES = 200
+# Bytes inspected when deciding whether a blob is binary, as git does
+BINARY_PROBE_BYTES = 8000
+
+
+def _bounded(value: Any, default: int, maximum: int, minimum: int = 1) -> int:
+    if value is None:
+        return default
+    return max(minimum, min(int(value), maximum))
+
+
+def _rev(value: Any, default: Optional[str] = "HEAD") -> Optional[str]:
+    rev = value or default
+    if rev is not None and (rev.startswith("-") or "\n" in rev):
+        raise ValueError(f"Invalid revision: {rev}")
+    return rev
+
+
+def _summary(commit: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "sha": commit["sha"],
+        "parents": commit["parents"],
+        "author": commit["author"]["name"],
+        "email": commit["author"]["email"],
+        "date": commit["author"]["date"],
+        "subject": commit["message"].split("\n", 1)[0],
+    }
+
+
+def _parse_blame(lines: List[str], start: int) -> List[Dict[str, Any]]:
+    """Group ``git blame --porcelain`` output into hunks of consecutive lines from one commit."""
+    commits: Dict[str, Dict[str, Any]] = {}
+    hunks: List[Dict[str, Any]] = []
+    current = None
+    sha = None
+    line_no = start
+    for line in lines:
+        if line.startswith("\t"):
+            if hunks and hunks[-1]["sha"] == sha and hunks[-1]["end"] == line_no - 1:
+                hunk = hunks[-1]
+            else:
+                info = commits[sha]
+                hunk = {"sha": sha, "author": info.get("author"), "email": info.get("author-mail", "").strip("<>"),
+                        "time": int(info.get("author-time", 0)), "summary": info.get("summary"),
+                        "start": line_no, "end": line_no, "lines": []}
+                hunks.append(hunk)
+            hunk["end"] = line_no
+            hunk["lines"].append(line[1:])
+            continue
+        key, _, value = line.partition(" ")
+        if len(key) in (40, 64) and all(c in "0123456789abcdef" for c in key):
+            sha = key
+            line_no = int(value.split(" ")[1])
+            current = commits.setdefault(sha, {})
+        elif current is not None:
+            current[key] = value
+    return hunks
+
 
 class GitIntegration(MCPIntegration):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.category = "vcs"
         self.name = "git"
-        self.manager = None
-        
+        self.repos: Optional[RepoCache] = None
+
     async def initialize(self) -> None:
-        cmd = ["npx", "-y", "@modelcontextprotocol/server-git"]
-        self.manager = SubprocessManager(cmd)
-        try:
-            self.manager.start()
-            print("Git integration started.")
-        except Exception as e:
-            print(f"Failed to start Git integration: {e}")
-            self.manager = None
-    
+        self.repos = RepoCache(
+            self.config.get("max_repos", DEFAULT_MAX_REPOS),
+            commit_cache=self.config.get("commit_cache", DEFAULT_COMMIT_CACHE),
+            tree_cache=self.config.get("tree_cache", DEFAULT_TREE_CACHE),
+        )
+        print("Git integration started.")
+
     async def shutdown(self) -> None:
-        if self.manager:
-            self.manager.stop()
-    
+        if self.repos:
+            await self.repos.close()
+            self.repos = None
+
     def list_tools(self) -> List[Dict[str, Any]]:
+        path = {"type": "string", "description": "Path inside the repository"}
+        lines = {
+            "offset": {"type": "integer", "description": "Output lines to skip (from next_offset)", "default": 0},
+            "max_lines": {"type": "integer", "description": f"Lines per page (default {DEFAULT_MAX_LINES})"},
+        }
         return [
             {
                 "name": "git_read_repo",
-                "description": "Read git repository info",
+                "description": "Read git repository info: HEAD, branches, tags, remotes and working tree status",
                 "category": "vcs",
                 "integration": "git",
                 "parameters": {
                     "type": "object",
                     "properties": {
-                        "path": {"type": "string"}
+                        "path": path
                     },
                     "required": ["path"]
                 }
             },
             {
                 "name": "git_log",
-                "description": "Read git log",
+                "description": "Read git log, newest first, a page at a time. Pass the returned cursor to continue.",
                 "category": "vcs",
                 "integration": "git",
                 "parameters": {
                     "type": "object",
                     "properties": {
-                        "path": {"type": "string"},
-                        "max_count": {"type": "integer"}
+                        "path": path,
+                        "rev": {"type": "string", "description": "Branch, tag or commit to start from (default HEAD)"},
+                        "file": {"type": "string", "description": "Only commits that changed this file or directory"},
+                        "max_count": {"type": "integer", "description": f"Commits per page (default {DEFAULT_LOG_COUNT})"},
+                        "cursor": {"type": "string", "description": "Cursor from the previous page"},
                     },
                     "required": ["path"]
                 }
-            }
+            },
+            {
+                "name": "git_show",
+                "description": "Show a commit with its patch, or a file's content at a revision",
+                "category": "vcs",
+                "integration": "git",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "path": path,
+                        "rev": {"type": "string", "description": "Commit to show (default HEAD)"},
+                        "file": {"type": "string", "description": "Show this file at rev instead of the commit"},
+                        **lines,
+                    },
+                    "required": ["path"]
+                }
+            },
+            {
+                "name": "git_diff",
+                "description": "Diff two revisions, or a revision against the working tree",
+                "category": "vcs",
+                "integration": "git",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "path": path,
+                        "base": {"type": "string", "description": "Base revision (default HEAD)"},
+                        "target": {"type": "string", "description": "Target revision (default: the working tree)"},
+                        "files": {"type": "array", "items": {"type": "string"}, "description": "Limit to these paths"},
+                        "stat": {"type": "boolean", "description": "Only a per-file summary", "default": False},
+                        "context": {"type": "integer", "description": "Context lines around changes (default 3)"},
+                        **lines,
+                    },
+                    "required": ["path"]
+                }
+            },
+            {
+                "name": "git_blame",
+                "description": "Show which commit last changed each line of a file, for a range of lines",
+                "category": "vcs",
+                "integration": "git",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "path": path,
+                        "file": {"type": "string"},
+                        "rev": {"type": "string", "description": "Revision to blame (default HEAD)"},
+                        "start_line": {"type": "integer", "description": "First line, 1-based (from next_line)", "default": 1},
+                        "max_lines": {"type": "integer", "description": f"Lines per page (default {DEFAULT_MAX_LINES})"},
+                    },
+                    "required": ["path", "file"]
+                }
+            },
+            {
+                "name": "git_ls_tree",
+                "description": "List files and directories at a revision",
+                "category": "vcs",
+                "integration": "git",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "path": path,
+                        "rev": {"type": "string", "description": "Revision (default HEAD)"},
+                        "tree_path": {"type": "string", "description": "Directory to list (default: the root)"},
+                        "recursive": {"type": "boolean", "default": False},
+                        "long": {"type": "boolean", "description": "Include blob sizes", "default": False},
+                        "offset": {"type": "integer", "description": "Entries to skip (from next_offset)", "default": 0},
+                        "limit": {"type": "integer", "description": f"Entries per page (default {DEFAULT_TREE_ENTRIES})"},
+                    },
+                    "required": ["path"]
+                }
+            },
         ]
-    
+
     async def call_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
-        if not self.manager:
+        handlers = {
+            "git_read_repo": self.read_repo,
+            "git_log": self.log,
+            "git_show": self.show,
+            "git_diff": self.diff,
+            "git_blame": self.blame,
+            "git_ls_tree": self.ls_tree,
+        }
+        if tool_name not in handlers:
+            raise ValueError(f"Unknown tool: {tool_name}")
+        if not self.repos:
             return "Error: Git integration is not running."
-        
-        external_name = tool_name.replace("git_", "")
-        # Mapping might be needed
-        
-        return await self.manager.send_request("tools/call", {
-            "name": external_name,
-            "arguments": args
-        })
+        if not args.get("path"):
+            return "Error: path is required"
+        start = time.perf_counter()
+        try:
+            repo = await self.repos.get(args["path"])
+            result = await handlers[tool_name](repo, args)
+        except (GitError, ValueError, TypeError) as e:
+            return f"Error: {e}"
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+    async def read_repo(self, repo: GitRepo, args: Dict[str, Any]) -> Dict[str, Any]:
+        head = await repo.object_info("HEAD^{commit}")
+        try:
+            branch = (await run_git(repo.root, "symbolic-ref", "--short", "HEAD")).strip()
+        except GitError:
+            branch = None  # detached HEAD
+        refs = await run_git(repo.root, "for-each-ref", "--format=%(refname)%09%(objectname)",
+                             "refs/heads", "refs/tags", "refs/remotes")
+        branches, tags, remote_branches = [], 0, 0
+        for line in refs.splitlines():
+            name, _, sha = line.partition("\t")
+            if name.startswith("refs/heads/"):
+                branches.append({"name": name[len("refs/heads/"):], "sha": sha})
+            elif name.startswith("refs/tags/"):
+                tags += 1
+            else:
+                remote_branches += 1
+        remotes: Dict[str, str] = {}
+        for line in (await run_git(repo.root, "remote", "-v")).splitlines():
+            name, _, rest = line.partition("\t")
+            remotes.setdefault(name, rest.rsplit(" ", 1)[0])
+        result = {
+            "root": repo.root,
+            "git_dir": repo.git_dir,
+            "head": head[0] if head else None,
+            "branch": branch,
+            "branches": branches,
+            "tags": tags,
+            "remote_branches": remote_branches,
+            "remotes": remotes,
+        }
+        if repo.root != repo.git_dir:
+            status, more = await repo.lines("status", "--porcelain", limit=MAX_STATUS_ENTRIES)
+            result["status"] = status
+            result["status_truncated"] = more
+        return result
+
+    async def log(self, repo: GitRepo, args: Dict[str, Any]) -> Dict[str, Any]:
+        page = await repo.log(
+            _rev(args.get("rev")),
+            _bounded(args.get("max_count"), DEFAULT_LOG_COUNT, MAX_LOG_COUNT),
+            cursor=args.get("cursor"),
+            path=args.get("file"),
+            scan_budget=self.config.get("scan_budget", DEFAULT_SCAN_BUDGET),
+        )
+        return {
+            "commits": [_summary(c) for c in page["commits"]],
+            "scanned": page["scanned"],
+            "cursor": page["cursor"],
+            "cache": dict(repo.stats),
+        }
+
+    async def show(self, repo: GitRepo, args: Dict[str, Any]) -> Dict[str, Any]:
+        rev = _rev(args.get("rev"))
+        offset = _bounded(args.get("offset"), 0, 2 ** 31, minimum=0)
+        max_lines = _bounded(args.get("max_lines"), DEFAULT_MAX_LINES, MAX_LINES)
+        if args.get("file"):
+            sha, kind, data = await repo.read(f"{rev}:{args['file'].strip('/')}")
+            if kind != "blob":
+                raise GitError(f"{args['file']} is a {kind} at {rev}; use git_ls_tree")
+            result: Dict[str, Any] = {"file": args["file"], "sha": sha, "size": len(data)}
+            if b"\0" in data[:BINARY_PROBE_BYTES]:
+                result["binary"] = True
+                return result
+            text = data.decode(errors="replace").split("\n")
+            if text and text[-1] == "":
+                text.pop()
+            result["lines"] = text[offset:offset + max_lines]
+            result["total_lines"] = len(text)
+            result["next_offset"] = offset + max_lines if offset + max_lines < len(text) else None
+            return result
+
+        commit = await repo.commit(await repo.resolve(rev))
+        patch, more = await repo.lines("show", "--no-color", "--format=", "--patch", "--stat", commit["sha"],
+                                       offset=offset, limit=max_lines)
+        return {
+            **_summary(commit),
+            "committer": commit["committer"]["name"],
+            "commit_date": commit["committer"]["date"],
+            "message": commit["message"],
+            "patch": patch,
+            "next_offset": offset + len(patch) if more else None,
+        }
+
+    async def diff(self, repo: GitRepo, args: Dict[str, Any]) -> Dict[str, Any]:
+        offset = _bounded(args.get("offset"), 0, 2 ** 31, minimum=0)
+        max_lines = _bounded(args.get("max_lines"), DEFAULT_MAX_LINES, MAX_LINES)
+        command = ["diff", "--no-color", "--no-ext-diff"]
+        if args.get("stat"):
+            command.append("--stat")
+        if args.get("context") is not None:
+            command.append(f"-U{_bounded(args['context'], 3, 1000, minimum=0)}")
+        command.append(_rev(args.get("base")))
+        target = _rev(args.get("target"), None)
+        if target:
+            command.append(target)
+        command.append("--")
+        command.extend(args.get("files") or [])
+        diff, more = await repo.lines(*command, offset=offset, limit=max_lines)
+        return {"diff": diff, "next_offset": offset + len(diff) if more else None}
+
+    async def blame(self, repo: GitRepo, args: Dict[str, Any]) -> Dict[str, Any]:
+        rev = _rev(args.get("rev"))
+        file = (args.get("file") or "").strip("/")
+        if not file:
+            raise ValueError("file is required")
+        start = _bounded(args.get("start_line"), 1, 2 ** 31)
+        max_lines = _bounded(args.get("max_lines"), DEFAULT_MAX_LINES, MAX_LINES)
+        _, kind, data = await repo.read(f"{rev}:{file}")
+        if kind != "blob":
+            raise GitError(f"{file} is a {kind} at {rev}")
+        total = data.count(b"\n") + (0 if not data or data.endswith(b"\n") else 1)
+        if start > total:
+            return {"file": file, "hunks": [], "total_lines": total, "next_line": None}
+        end = min(start + max_lines - 1, total)
+        # -L limits the work to the requested range instead of blaming the whole file
+        output, _ = await repo.lines("blame", "--porcelain", "-L", f"{start},{end}", await repo.resolve(rev), "--", file,
+                                     limit=2 ** 31)
+        return {
+            "file": file,
+            "hunks": _parse_blame(output, start),
+            "total_lines": total,
+            "next_line": end + 1 if end < total else None,
+        }
+
+    async def ls_tree(self, repo: GitRepo, args: Dict[str, Any]) -> Dict[str, Any]:
+        rev = _rev(args.get("rev"))
+        tree_path = (args.get("tree_path") or "").strip("/")
+        offset = _bounded(args.get("offset"), 0, 2 ** 31, minimum=0)
+        limit = _bounded(args.get("limit"), DEFAULT_TREE_ENTRIES, MAX_TREE_ENTRIES)
+        commit = await repo.commit(await repo.resolve(rev))
+        found = await repo.entry(commit["tree"], tree_path)
+        if found is None or found[0] != "40000":
+            raise GitError(f"No directory {tree_path or '/'} at {rev}")
+
+        entries: List[Dict[str, Any]] = []
+        index = 0
+        more = False
+        # Depth-first over cached trees, stopping once the page is full
+        stack = [(tree_path, found[1])]
+        while stack and not more:
+            prefix, sha = stack.pop()
+            children = []
+            for mode, name, entry_sha in await repo.tree(sha):
+                full = f"{prefix}/{name}" if prefix else name
+                if index >= offset:
+                    if len(entries) >= limit:
+                        more = True
+                        break
+                    entries.append({"path": full, "type": entry_type(mode), "mode": mode, "sha": entry_sha})
+                index += 1
+                if args.get("recursive") and mode == "40000":
+                    children.append((full, entry_sha))
+            stack.extend(reversed(children))
+        if args.get("long"):
+            for entry in entries:
+                if entry["type"] == "blob":
+                    info = await repo.object_info(entry["sha"])
+                    entry["size"] = info[2] if info else None
+        return {
+            "rev": commit["sha"],
+            "entries": entries,
+            "next_offset": offset + len(entries) if more else None,
+        }
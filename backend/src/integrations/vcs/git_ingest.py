@@ -1,95 +1,185 @@
 from ..base import MCPIntegration
-from ...utils.subprocess_mgmt import SubprocessManager
-from typing import Dict, Any, List
+from ...utils.git_repo import DEFAULT_MAX_REPOS, GitError, GitRepo, RepoCache, entry_type, run_git
+from ...utils.repo_digest import (
+    BINARY_PROBE_BYTES, DEFAULT_DIGEST_CACHE, DEFAULT_DIGEST_TTL, DEFAULT_MAX_FILE_BYTES, DEFAULT_MAX_TOKENS,
+    DEFAULT_SUMMARY_CACHE, RepoDigester,
+)
+from typing import Dict, Any, List, Optional, Tuple
+import os
+import re
+import time
+import asyncio
+import hashlib
+import tempfile
+
+# Seconds between fetches of a remote repository's mirror
+DEFAULT_FETCH_INTERVAL = 60
+MAX_TOKENS_LIMIT = 1_000_000
+_REMOTE = re.compile(r"^(?:https?://|ssh://|git://|file://|[\w.-]+@[\w.-]+:)")
+
 
 class GitIngestIntegration(MCPIntegration):
-    """Git Ingest integration for analyzing GitHub repositories."""
-    
+    """
+    Git Ingest integration for analyzing repositories: local clones directly,
+    remote URLs through a mirror clone that is fetched before analysis.
+    """
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.category = "vcs"
         self.name = "git_ingest"
-        self.manager = None
-        
+        self.repos: Optional[RepoCache] = None
+        self.digester: Optional[RepoDigester] = None
+        self.clone_dir = os.path.expanduser(
+            self.config.get("clone_dir") or os.path.join(tempfile.gettempdir(), "mcp-git-ingest"))
+        self._fetched: Dict[str, float] = {}
+        self._mirror_locks: Dict[str, asyncio.Lock] = {}
+
     async def initialize(self) -> None:
-        # Start the git-ingest MCP server via uvx
-        cmd = self.config.get("args", ["uvx", "mcp-git-ingest"])
-        self.manager = SubprocessManager(cmd)
-        try:
-            self.manager.start()
-            print("Git Ingest integration started.")
-        except Exception as e:
-            print(f"Failed to start Git Ingest integration: {e}")
-            self.manager = None
-    
+        self.repos = RepoCache(self.config.get("max_repos", DEFAULT_MAX_REPOS))
+        self.digester = RepoDigester(
+            summary_cache=self.config.get("summary_cache", DEFAULT_SUMMARY_CACHE),
+            digest_cache=self.config.get("digest_cache", DEFAULT_DIGEST_CACHE),
+            digest_ttl=self.config.get("digest_ttl", DEFAULT_DIGEST_TTL),
+        )
+        print("Git Ingest integration started.")
+
     async def shutdown(self) -> None:
-        if self.manager:
-            self.manager.stop()
-    
+        if self.repos:
+            await self.repos.close()
+            self.repos = None
+
     def list_tools(self) -> List[Dict[str, Any]]:
+        repo_url = {"type": "string", "description": "Local repository path, or a remote URL to mirror"}
+        branch = {"type": "string", "description": "Branch, tag or commit (default: the repository's HEAD)"}
         return [
             {
                 "name": "github_analyze",
-                "description": "Analyze a GitHub repository structure and content",
+                "description": "Analyze a repository: file tree, per-file summaries and file contents within a token budget. "
+                               "Results are cached per commit.",
                 "category": "vcs",
                 "integration": "git_ingest",
                 "parameters": {
                     "type": "object",
                     "properties": {
-                        "repo_url": {"type": "string", "description": "GitHub repository URL"},
-                        "branch": {"type": "string", "description": "Branch to analyze (default: main)"},
+                        "repo_url": repo_url,
+                        "branch": branch,
                         "include_patterns": {"type": "array", "items": {"type": "string"}, "description": "File patterns to include"},
-                        "exclude_patterns": {"type": "array", "items": {"type": "string"}, "description": "File patterns to exclude"}
+                        "exclude_patterns": {"type": "array", "items": {"type": "string"},
+                                             "description": "File patterns to exclude (default: lock files, minified and vendored code)"},
+                        "max_tokens": {"type": "integer", "description": f"Approximate size limit of the digest (default {DEFAULT_MAX_TOKENS})"},
                     },
                     "required": ["repo_url"]
                 }
             },
             {
                 "name": "github_read_file",
-                "description": "Read a specific file from a GitHub repository",
+                "description": "Read a specific file from a repository",
                 "category": "vcs",
                 "integration": "git_ingest",
                 "parameters": {
                     "type": "object",
                     "properties": {
-                        "repo_url": {"type": "string", "description": "GitHub repository URL"},
+                        "repo_url": repo_url,
                         "file_path": {"type": "string", "description": "Path to the file within the repository"},
-                        "branch": {"type": "string", "description": "Branch to read from (default: main)"}
+                        "branch": branch,
                     },
                     "required": ["repo_url", "file_path"]
                 }
             },
             {
                 "name": "github_list_files",
-                "description": "List files in a GitHub repository directory",
+                "description": "List files in a repository directory",
                 "category": "vcs",
                 "integration": "git_ingest",
                 "parameters": {
                     "type": "object",
                     "properties": {
-                        "repo_url": {"type": "string", "description": "GitHub repository URL"},
+                        "repo_url": repo_url,
                         "directory": {"type": "string", "description": "Directory path (default: root)"},
-                        "branch": {"type": "string", "description": "Branch to list from (default: main)"}
+                        "branch": branch,
                     },
                     "required": ["repo_url"]
                 }
             }
         ]
-    
+
     async def call_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
-        if not self.manager:
+        if tool_name not in ("github_analyze", "github_read_file", "github_list_files"):
+            raise ValueError(f"Unknown tool: {tool_name}")
+        if not self.repos:
             return "Error: Git Ingest integration is not running."
-            
-        # Map tool names to the underlying MCP server tool names
-        tool_mapping = {
-            "github_analyze": "ingest",
-            "github_read_file": "read_file",
-            "github_list_files": "list_files"
+        if not args.get("repo_url"):
+            return "Error: repo_url is required"
+        start = time.perf_counter()
+        try:
+            repo, commit = await self._open(args["repo_url"], args.get("branch"))
+            if tool_name == "github_analyze":
+                result = await self.analyze(repo, commit, args)
+            elif tool_name == "github_read_file":
+                result = await self.read_file(repo, commit, args.get("file_path") or "")
+            else:
+                result = await self.list_files(repo, commit, args.get("directory") or "")
+        except (GitError, ValueError, TypeError) as e:
+            return f"Error: {e}"
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+    async def _open(self, repo_url: str, branch: Optional[str]) -> Tuple[GitRepo, Dict[str, Any]]:
+        rev = branch or "HEAD"
+        if rev.startswith("-") or "\n" in rev:
+            raise ValueError(f"Invalid branch: {rev}")
+        path = await self._mirror(repo_url) if _REMOTE.match(repo_url) else os.path.expanduser(repo_url)
+        repo = await self.repos.get(path)
+        return repo, await repo.commit(await repo.resolve(rev))
+
+    async def _mirror(self, url: str) -> str:
+        """Path of a mirror clone of ``url``, cloned or fetched as needed."""
+        path = os.path.join(self.clone_dir, hashlib.sha256(url.encode()).hexdigest()[:16] + ".git")
+        async with self._mirror_locks.setdefault(path, asyncio.Lock()):
+            if not os.path.isdir(path):
+                os.makedirs(self.clone_dir, exist_ok=True)
+                await run_git(self.clone_dir, "clone", "--quiet", "--mirror", "--", url, path)
+                self._fetched[path] = time.monotonic()
+            elif time.monotonic() - self._fetched.get(path, 0) > self.config.get("fetch_interval", DEFAULT_FETCH_INTERVAL):
+                await run_git(path, "fetch", "--quiet", "--prune")
+                self._fetched[path] = time.monotonic()
+        return path
+
+    async def analyze(self, repo: GitRepo, commit: Dict[str, Any], args: Dict[str, Any]) -> Dict[str, Any]:
+        max_tokens = args.get("max_tokens") or self.config.get("max_tokens", DEFAULT_MAX_TOKENS)
+        max_tokens = max(1, min(int(max_tokens), MAX_TOKENS_LIMIT))
+        blobs_read = self.digester.blobs_read
+        digest, cached = await self.digester.digest(
+            repo, commit,
+            include=args.get("include_patterns") or (),
+            exclude=args.get("exclude_patterns"),
+            max_tokens=max_tokens,
+            max_file_bytes=self.config.get("max_file_bytes", DEFAULT_MAX_FILE_BYTES),
+        )
+        return {
+            "repository": repo.root,
+            "branch": args.get("branch") or "HEAD",
+            **digest,
+            "cached": cached,
+            "blobs_read": self.digester.blobs_read - blobs_read,
+        }
+
+    async def read_file(self, repo: GitRepo, commit: Dict[str, Any], file_path: str) -> Dict[str, Any]:
+        found = await repo.entry(commit["tree"], file_path)
+        if found is None or entry_type(found[0]) not in ("blob", "symlink"):
+            raise GitError(f"No file {file_path} at {commit['sha'][:12]}")
+        _, _, data = await repo.read(found[1])
+        if b"\0" in data[:BINARY_PROBE_BYTES]:
+            return {"path": file_path, "sha": found[1], "size": len(data), "binary": True}
+        return {"path": file_path, "sha": found[1], "size": len(data), "content": data.decode(errors="replace")}
+
+    async def list_files(self, repo: GitRepo, commit: Dict[str, Any], directory: str) -> Dict[str, Any]:
+        found = await repo.entry(commit["tree"], directory)
+        if found is None or found[0] != "40000":
+            raise GitError(f"No directory {directory or '/'} at {commit['sha'][:12]}")
+        return {
+            "directory": directory.strip("/"),
+            "commit": commit["sha"],
+            "entries": [{"name": name, "type": entry_type(mode), "sha": sha} for mode, name, sha in await repo.tree(found[1])],
         }
-        
-        external_name = tool_mapping.get(tool_name, tool_name)
-        
-        return await self.manager.send_request("tools/call", {
-            "name": external_name,
-            "arguments": args
-        })
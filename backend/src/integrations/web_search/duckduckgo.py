@@ -1,28 +1,50 @@
+import asyncio
+import queue
 from ..base import MCPIntegration
+from ...utils.cache import get_search_cache, normalize_query
 from typing import Dict, Any, List
 try:
-    from duckduckgo_search import DDGS
+    from ddgs import DDGS
 except ImportError:
-    DDGS = None
+    try:
+        # Package name before the ddgs rename
+        from duckduckgo_search import DDGS
+    except ImportError:
+        DDGS = None
+
+DEFAULT_POOL_SIZE = 4
 
 class DuckduckgoIntegration(MCPIntegration):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.category = "web_search"
         self.name = "duckduckgo"
-        
+        # DDGS is synchronous and its HTTP client is not safe to share between
+        # threads, so searches run in worker threads, each borrowing a client
+        # from this pool (keeping its connections warm between queries).
+        self.pool_size = max(int(config.get("pool_size", DEFAULT_POOL_SIZE)), 1)
+        self._clients: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = asyncio.Semaphore(self.pool_size)
+
     async def initialize(self) -> None:
         if DDGS is None:
             print("Warning: duckduckgo-search not installed. DuckDuckGo integration will be disabled.")
         pass
-    
+
     async def shutdown(self) -> None:
-        pass
-    
+        while not self._clients.empty():
+            client = self._clients.get_nowait()
+            close = getattr(client, "__exit__", None)
+            if close is not None:
+                try:
+                    close(None, None, None)
+                except Exception:
+                    pass
+
     def list_tools(self) -> List[Dict[str, Any]]:
         if DDGS is None:
             return []
-            
+
         return [{
             "name": "search_duckduckgo",
             "description": "Search the web using DuckDuckGo. Returns a list of results with title, link, and snippet.",
@@ -39,25 +61,53 @@ class DuckduckgoIntegration(MCPIntegration):
                         "type": "integer",
                         "description": "Maximum number of results to return (default: 10)",
                         "default": 10
+                    },
+                    "no_cache": {
+                        "type": "boolean",
+                        "description": "Skip the search result cache",
+                        "default": False
                     }
                 },
                 "required": ["query"]
             }
         }]
-    
+
     async def call_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
         if tool_name != "search_duckduckgo":
             raise ValueError(f"Unknown tool: {tool_name}")
-            
+
         if DDGS is None:
             return "Error: duckduckgo-search library not installed."
-            
+
         query = args.get("query")
         max_results = args.get("max_results", 10)
-        
-        results = []
-        with DDGS() as ddgs:
-            for r in ddgs.text(query, max_results=max_results):
-                results.append(r)
-                
+        if not query or not query.strip():
+            return "Error: query is required."
+
+        cache = get_search_cache()
+        if cache is None or args.get("no_cache"):
+            return await self.search(query, max_results)
+        results, _ = await cache.get_or_set(
+            ("duckduckgo", normalize_query(query), max_results),
+            lambda: self.search(query, max_results),
+            cacheable=lambda value: isinstance(value, list),
+        )
+        return results
+
+    async def search(self, query: str, max_results: int = 10) -> Any:
+        """Run a text search off the event loop on a pooled client."""
+        async with self._slots:
+            try:
+                return await asyncio.to_thread(self._search, query, max_results)
+            except Exception as e:
+                return f"Error: DuckDuckGo search failed: {str(e)}"
+
+    def _search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        try:
+            client = self._clients.get_nowait()
+        except queue.Empty:
+            client = DDGS()
+        results = list(client.text(query, max_results=max_results) or [])
+        # Only clients that just worked go back; a failed one may hold a broken connection
+        self._clients.put(client)
         return results
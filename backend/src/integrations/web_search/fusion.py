@@ -0,0 +1,129 @@
+"""
+Merging of result lists from several search providers.
+
+Results are keyed by a canonical URL so the same page found by two engines
+counts once, then ranked with reciprocal-rank fusion (RRF): each provider
+contributes 1 / (k + rank) for every result it returned. RRF needs no
+score calibration between engines and rewards pages several engines agree on.
+"""
+import json
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+# Standard RRF constant; damps the advantage of the very top ranks
+RRF_K = 60
+
+# Query parameters that only track the click, never change the page
+TRACKING_PARAMS = {
+    "gclid", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid", "igshid",
+    "ref", "ref_src", "spm", "_hsenc", "_hsmi",
+}
+TRACKING_PREFIXES = ("utm_",)
+# Redirect wrappers some engines put around result links, and where the target is
+REDIRECT_PARAMS = {
+    "duckduckgo.com": "uddg",
+    "www.google.com": "q",
+    "google.com": "q",
+    "www.bing.com": "u",
+}
+
+_URL_KEYS = ("url", "href", "link")
+_SNIPPET_KEYS = ("snippet", "body", "content", "description")
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    A comparison key for ``url``: scheme, "www.", default ports, fragments,
+    tracking parameters, parameter order and trailing slashes are ignored,
+    and known redirect wrappers are unwrapped.
+    """
+    url = (url or "").strip()
+    if url.startswith("//"):
+        url = "https:" + url
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    target = REDIRECT_PARAMS.get(host)
+    if target:
+        wrapped = dict(parse_qsl(parts.query)).get(target)
+        if wrapped and wrapped.startswith(("http://", "https://")):
+            return canonicalize_url(unquote(wrapped))
+
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip("/")
+    return urlunsplit(("", host, path, urlencode(query), "")).lstrip("/")
+
+
+def normalize_results(raw: Any) -> List[Dict[str, str]]:
+    """
+    Turn one provider's response into ``[{title, url, snippet}]`` in rank
+    order. Understands plain result lists, ``{"results": [...]}`` payloads
+    and MCP tool results whose text content holds either of those.
+    """
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return []
+    if isinstance(raw, dict):
+        if isinstance(raw.get("content"), list):
+            items: List[Any] = []
+            for block in raw["content"]:
+                if isinstance(block, dict) and block.get("type") == "text":
+                    items.extend(normalize_results(block.get("text", "")))
+            return items
+        raw = raw.get("results", [])
+    if not isinstance(raw, list):
+        return []
+
+    results = []
+    for item in raw:
+        if not isinstance(item, dict):
+            continue
+        url = next((item[k] for k in _URL_KEYS if isinstance(item.get(k), str) and item[k]), None)
+        if not url:
+            continue
+        snippet = next((item[k] for k in _SNIPPET_KEYS if isinstance(item.get(k), str) and item[k]), "")
+        results.append({"title": (item.get("title") or "").strip(), "url": url, "snippet": snippet.strip()})
+    return results
+
+
+def fuse(ranked: Dict[str, List[Dict[str, str]]], max_results: Optional[int] = None,
+         k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Merge per-provider result lists (``{provider: [result, ...]}``, best
+    first) into one list ordered by reciprocal-rank fusion score.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for provider, results in ranked.items():
+        seen = set()
+        for rank, result in enumerate(results, start=1):
+            key = canonicalize_url(result["url"])
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = {
+                    "title": result["title"], "url": result["url"], "snippet": result["snippet"],
+                    "score": 0.0, "providers": [],
+                }
+            else:
+                if not entry["title"]:
+                    entry["title"] = result["title"]
+                # Keep the most informative snippet
+                if len(result["snippet"]) > len(entry["snippet"]):
+                    entry["snippet"] = result["snippet"]
+            entry["score"] += 1.0 / (k + rank)
+            entry["providers"].append(provider)
+
+    fused = sorted(merged.values(), key=lambda e: (-e["score"], -len(e["providers"])))
+    for entry in fused:
+        entry["score"] = round(entry["score"], 6)
+    return fused[:max_results] if max_results else fused
@@ -1,13 +1,25 @@
+import asyncio
 from ..base import MCPIntegration
+from ...utils.cache import get_search_cache, normalize_query
 from ...utils.subprocess_mgmt import SubprocessManager
 from typing import Dict, Any, List
 
+
+def _is_result(value: Any) -> bool:
+    """False for errors, which must not be cached: ours ("Error: ...") and the tool's (isError)."""
+    if isinstance(value, str):
+        return not value.startswith("Error")
+    return not (isinstance(value, dict) and value.get("isError"))
+
+
 class MultiEngineIntegration(MCPIntegration):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.category = "web_search"
         self.name = "multi_engine"
         self.manager = None
+        # The subprocess answers one JSON-RPC request at a time over stdio
+        self._lock = asyncio.Lock()
         
     async def initialize(self) -> None:
         cmd = self.config.get("args")
@@ -37,7 +49,8 @@ class MultiEngineIntegration(MCPIntegration):
                 "type": "object",
                 "properties": {
                     "query": {"type": "string"},
-                    "engine": {"type": "string", "description": "Specific engine to use (optional)"}
+                    "engine": {"type": "string", "description": "Specific engine to use (optional)"},
+                    "no_cache": {"type": "boolean", "description": "Bypass the search result cache", "default": False}
                 },
                 "required": ["query"]
             }
@@ -47,13 +60,28 @@ class MultiEngineIntegration(MCPIntegration):
         if not self.manager:
             return "Error: Multi-engine search integration is not running."
             
+        query = args.get("query") or ""
+        no_cache = args.get("no_cache")
+        # The subprocess doesn't know the option
+        args = {k: v for k, v in args.items() if k != "no_cache"}
+        cache = get_search_cache()
+        if cache is None or no_cache:
+            return await self._search(args)
+        result, _ = await cache.get_or_set(
+            ("multi_engine", args.get("engine"), normalize_query(query)),
+            lambda: self._search(args),
+            cacheable=_is_result,
+        )
+        return result
+
+    async def _search(self, args: Dict[str, Any]) -> Any:
         # The open-websearch server likely exposes a tool named 'search' or similar.
         # We need to map our 'search_multi_engine' to the underlying tool.
         # Assuming the underlying tool is simply 'search' based on common MCP patterns.
         # If we could list tools from the subprocess, we would do that, but here we assume.
         
-        return await self.manager.send_request("tools/call", {
-            "name": "search", 
-            "arguments": args
-        })
-
+        async with self._lock:
+            return await self.manager.send_request("tools/call", {
+                "name": "search", 
+                "arguments": args
+            })
@@ -1,21 +1,28 @@
+import json
+import asyncio
 from ..base import MCPIntegration
+from ...utils.cache import get_search_cache, normalize_query
+from ...utils.http import get_http_client
 from typing import Dict, Any, List
-import aiohttp
+
+DEFAULT_TIMEOUT = 15
 
 class SearxngIntegration(MCPIntegration):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.category = "web_search"
         self.name = "searxng"
-        self.instance_url = config.get("instance_url")
-        
+        self.instance_url = (config.get("instance_url") or "").rstrip("/") or None
+        self.timeout = config.get("timeout", DEFAULT_TIMEOUT)
+
     async def initialize(self) -> None:
         if not self.instance_url:
             print("Warning: SearXNG instance URL not configured.")
-    
+
     async def shutdown(self) -> None:
+        # The HTTP client is shared and closed by the server
         pass
-    
+
     def list_tools(self) -> List[Dict[str, Any]]:
         return [{
             "name": "search_searxng",
@@ -25,22 +32,50 @@ class SearxngIntegration(MCPIntegration):
             "parameters": {
                 "type": "object",
                 "properties": {
-                    "query": {"type": "string"}
+                    "query": {"type": "string"},
+                    "no_cache": {
+                        "type": "boolean",
+                        "description": "Skip the search result cache",
+                        "default": False
+                    }
                 },
                 "required": ["query"]
             }
         }]
-    
+
     async def call_tool(self, tool_name: str, args: Dict[str, Any]) -> Any:
         if not self.instance_url:
             return "Error: SearXNG instance URL not configured."
-            
+
         query = args.get("query")
-        # Example implementation using aiohttp to query SearXNG JSON API
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{self.instance_url}/search", params={"q": query, "format": "json"}) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    return data.get("results", [])
-                else:
-                    return f"Error: SearXNG returned status {resp.status}"
+        if not query or not query.strip():
+            return "Error: query is required."
+
+        cache = get_search_cache()
+        if cache is None or args.get("no_cache"):
+            return await self.search(query)
+        results, _ = await cache.get_or_set(
+            ("searxng", self.instance_url, normalize_query(query)),
+            lambda: self.search(query),
+            cacheable=lambda value: isinstance(value, list),
+        )
+        return results
+
+    async def search(self, query: str) -> Any:
+        """Query the SearXNG JSON API over the shared keep-alive HTTP client."""
+        try:
+            resp = await get_http_client().get(
+                f"{self.instance_url}/search", params={"q": query, "format": "json"},
+                headers={"Accept": "application/json"}, timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            return f"Error: SearXNG timed out after {self.timeout}s"
+        except Exception as e:
+            return f"Error: SearXNG request failed: {str(e)}"
+        if resp.status != 200:
+            return f"Error: SearXNG returned status {resp.status}"
+        try:
+            data = json.loads(resp.text())
+        except ValueError:
+            return "Error: SearXNG returned invalid JSON (is the json format enabled?)"
+        return data.get("results", [])
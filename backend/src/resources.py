@@ -0,0 +1,217 @@
+import os
+import json
+import asyncio
+import logging
+import mimetypes
+import weakref
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Union
+from urllib.parse import quote, unquote, urlparse
+
+from .workspace import Workspace
+from .utils.listing import scan_directory
+from .utils.watcher import ChangeCoalescer, PollingWatcher, create_watcher, coalesce, CREATED, DELETED, MODIFIED
+
+logger = logging.getLogger(__name__)
+
+URI_SCHEME = "workspace"
+
+# Cap on resources returned by resources/list
+MAX_LISTED_RESOURCES = 1000
+
+
+def path_to_uri(path: str, directory: bool = False) -> str:
+    """Map a workspace-relative path to its resource URI (directories end with '/')."""
+    path = "" if path in ("", ".") else path.replace(os.sep, "/").strip("/")
+    uri = f"{URI_SCHEME}:///{quote(path)}"
+    if directory and path:
+        uri += "/"
+    return uri
+
+
+def uri_to_path(uri: str) -> str:
+    """Map a resource URI back to a workspace-relative path."""
+    parsed = urlparse(str(uri))
+    if parsed.scheme != URI_SCHEME:
+        raise ValueError(f"Unsupported resource URI: {uri}")
+    return unquote(parsed.path).strip("/") or "."
+
+
+def _affected_uris(path: str) -> Set[str]:
+    """The file's own URI plus the URI of every ancestor directory."""
+    uris = {path_to_uri(path), path_to_uri(path, directory=True)}
+    parent = os.path.dirname(path)
+    while True:
+        uris.add(path_to_uri(parent, directory=True))
+        if not parent:
+            break
+        parent = os.path.dirname(parent)
+    return uris
+
+
+class WorkspaceResources:
+    """
+    Exposes workspace files as MCP resources with change subscriptions.
+
+    A filesystem watcher (inotify, or polling where unavailable) feeds a
+    debouncing coalescer; each batch is recorded in a change journal and
+    ``resources/updated`` is sent once per subscribed URI that the batch
+    touched. Subscribing to a directory URI covers everything below it.
+    Clients fetch exactly what changed with ``changes_since`` instead of
+    re-listing the tree.
+    """
+
+    def __init__(self, workspace: Workspace, debounce: float = 0.2, max_delay: float = 1.0,
+                 poll_interval: float = 2.0, journal_size: int = 1000):
+        self.workspace = workspace
+        self.root = workspace.files_path
+        self.poll_interval = poll_interval
+        self.subscriptions: Dict[str, "weakref.WeakSet"] = {}
+        self.sessions: "weakref.WeakSet" = weakref.WeakSet()
+        self.sequence = 0
+        self.journal: deque = deque(maxlen=journal_size)
+        self._evicted_through = 0
+        self.coalescer = ChangeCoalescer(self._on_changes, debounce=debounce, max_delay=max_delay)
+        self.watcher = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self.coalescer.bind(self._loop)
+        self.watcher = create_watcher(self.root, self.coalescer, self.poll_interval)
+        try:
+            self.watcher.start(self._loop)
+        except OSError as e:
+            logger.warning(f"File watcher failed to start ({e}); falling back to polling")
+            self.watcher = PollingWatcher(self.root, self.coalescer, self.poll_interval)
+            self.watcher.start(self._loop)
+
+    async def stop(self):
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+        self.coalescer.close()
+        for task in list(self._tasks):
+            task.cancel()
+
+    # --- Resources ---
+
+    def list_resources(self) -> List[Dict[str, Any]]:
+        """List files as resources (bounded by MAX_LISTED_RESOURCES)."""
+        listing = scan_directory(self.root, self.root, depth=64, limit=MAX_LISTED_RESOURCES,
+                                 max_bytes=1 << 30)
+        resources = [{
+            "uri": path_to_uri("", directory=True),
+            "name": "workspace",
+            "mimeType": "application/json",
+        }]
+        for entry in listing["entries"]:
+            is_dir = entry["type"] == "directory"
+            resources.append({
+                "uri": path_to_uri(entry["path"], directory=is_dir),
+                "name": entry["path"],
+                "mimeType": "application/json" if is_dir else
+                            (mimetypes.guess_type(entry["name"])[0] or "text/plain"),
+                "size": None if is_dir else entry["size"],
+            })
+        return resources
+
+    def read(self, uri: str) -> Union[str, bytes]:
+        """
+        Read a file resource, or a directory resource as a JSON listing.
+        Files that aren't UTF-8 text are returned as bytes (sent as a base64 blob).
+        """
+        path = uri_to_path(uri)
+        full_path = self.workspace.validate_path(path)
+        if full_path.is_dir():
+            return json.dumps(scan_directory(full_path, self.root))
+        if not full_path.is_file():
+            raise FileNotFoundError(f"Resource not found: {uri}")
+        data = full_path.read_bytes()
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return data
+
+    # --- Subscriptions ---
+
+    def track_session(self, session):
+        self.sessions.add(session)
+
+    def subscribe(self, uri: str, session):
+        uri_to_path(uri)
+        self.subscriptions.setdefault(str(uri), weakref.WeakSet()).add(session)
+        self.sessions.add(session)
+
+    def unsubscribe(self, uri: str, session):
+        sessions = self.subscriptions.get(str(uri))
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                del self.subscriptions[str(uri)]
+
+    # --- Changes ---
+
+    def notify(self, path: str, kind: str = MODIFIED):
+        """Report a change made through a tool (the watcher may report it too)."""
+        if self._loop is None:
+            return
+        try:
+            full_path = self.workspace.validate_path(path)
+        except ValueError:
+            return
+        self.coalescer.add(os.path.relpath(full_path, self.root), kind)
+
+    def changes_since(self, sequence: int = 0) -> Dict[str, Any]:
+        """
+        Return net changes after ``sequence``. ``reset`` is True when the
+        journal no longer reaches back that far and the client must re-list.
+        """
+        net: Dict[str, Optional[str]] = {}
+        for seq, path, kind in self.journal:
+            if seq > sequence:
+                net[path] = coalesce(net.get(path), kind)
+        return {
+            "sequence": self.sequence,
+            "reset": sequence < self._evicted_through,
+            "changes": [{"path": p, "kind": k} for p, k in sorted(net.items()) if k],
+        }
+
+    def _on_changes(self, changes: Dict[str, str]):
+        self.sequence += 1
+        for path, kind in changes.items():
+            if len(self.journal) == self.journal.maxlen:
+                self._evicted_through = self.journal[0][0]
+            self.journal.append((self.sequence, path, kind))
+        task = self._loop.create_task(self._publish(changes))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, changes: Dict[str, str]):
+        touched: Set[str] = set()
+        for path in changes:
+            touched |= _affected_uris(path)
+
+        for uri in touched & set(self.subscriptions):
+            for session in list(self.subscriptions.get(uri, ())):
+                await self._send(session, uri)
+
+        if any(kind in (CREATED, DELETED) for kind in changes.values()):
+            for session in list(self.sessions):
+                await self._send(session, None)
+
+    async def _send(self, session, uri: Optional[str]):
+        try:
+            if uri is None:
+                await session.send_resource_list_changed()
+            else:
+                await session.send_resource_updated(uri)
+        except Exception as e:
+            # The client went away; forget the session everywhere
+            logger.info(f"Dropping resource session after send failure: {e}")
+            self.sessions.discard(session)
+            for sessions in self.subscriptions.values():
+                sessions.discard(session)
@@ -4,14 +4,20 @@ import asyncio
 import json
 import logging
 import atexit
-from typing import Any, Dict
+import uuid
+import weakref
+from typing import Any, Dict, List, Optional
 import psutil
-from mcp.server.fastmcp import FastMCP, Context
+from mcp import types
+from mcp.server.fastmcp import FastMCP, Context, Image
+from mcp.server.lowlevel import NotificationOptions
+from mcp.server.stdio import stdio_server
 
 # Add backend to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from backend.src.workspace import Workspace
+from backend.src.resources import WorkspaceResources
 from backend.src.registry import ToolRegistry
 from backend.src.config.settings import ServerConfig
 from backend.src.security import validate_token, AuthenticationError
@@ -21,7 +27,14 @@ from backend.src.tools.meta import MetaTools
 from backend.src.tools.time import TimeTools
 from backend.src.tools.browser import BrowserTools
 from backend.src.tools.interaction import InteractionTools
+from backend.src.tools.search import SearchTools
 from backend.src.middleware import logged, rate_limited
+from backend.src.utils.cache import configure_search_cache, get_search_cache
+from backend.src.utils.browser_pool import configure_browser_pool, get_browser_pool
+from backend.src.utils.http import close_http_client
+from backend.src.utils.http_cache import configure_http_cache, get_http_cache
+from backend.src.utils.progress import context_reporter, progress_reporter
+from backend.src.utils.resource_policy import ResourcePolicy
 
 # Load Configuration
 # Build absolute path relative to this module's location
@@ -126,22 +139,47 @@ atexit.register(cleanup_pid_file)
 # Initialize MCP Server
 mcp = FastMCP("My Custom MCP Server")
 
-# Notification Callback (Placeholder until strict FastMCP API confirmed)
+# Initialize Registry and Tools
+configure_browser_pool(
+    size=config.browser_pool_size,
+    max_pages_per_browser=config.browser_max_pages_per_browser,
+    resource_policy=ResourcePolicy(
+        block_types=config.browser_block_resources,
+        block_domains=config.browser_block_domains,
+        block_trackers=config.browser_block_trackers,
+    ),
+)
+workspace = Workspace(config.workspace_dir)
+if config.http_cache_enabled:
+    configure_http_cache(
+        config.http_cache_dir or workspace.cache_path / "http",
+        max_bytes=config.http_cache_max_mb * 1024 * 1024,
+        default_ttl=config.http_cache_default_ttl,
+    )
+if config.search_cache_enabled:
+    configure_search_cache(max_entries=config.search_cache_max_entries, ttl=config.search_cache_ttl)
+workspace_resources = WorkspaceResources(workspace)
+
+# Notification Callback: changes made through tools are pushed to the same
+# coalescer as the file watcher, so subscribers hear about them immediately.
 def on_file_changed(path: str):
     logger.info(f"FileSystem Notification: File changed: {path}")
-    # TODO: Use mcp.server.send_resource_updated if available in future
-    # or expose via context.
+    workspace_resources.notify(path)
 
-# Initialize Registry and Tools
-workspace = Workspace(config.workspace_dir)
 registry = ToolRegistry(workspace, config)
 
 fs_tools = FilesystemTools(workspace, on_change=on_file_changed)
 exec_tools = ExecutionTools(workspace, config)
 meta_tools = MetaTools(registry)
 time_tools = TimeTools()
-browser_tools = BrowserTools(workspace)
+browser_tools = BrowserTools(
+    workspace,
+    max_sessions=config.browser_max_sessions,
+    max_pages=config.browser_max_pages,
+    on_change=on_file_changed,
+)
 interaction_tools = InteractionTools()
+search_tools = SearchTools(registry)
 
 
 # --- Register System Tools with Categories ---
@@ -149,6 +187,14 @@ registry.register_system_tool("read_file", fs_tools.read_file, "File Operations"
 registry.register_system_tool("write_file", fs_tools.write_file, "File Operations")
 registry.register_system_tool("delete_file", fs_tools.delete_file, "File Operations")
 registry.register_system_tool("list_files", fs_tools.list_files, "File Operations")
+registry.register_system_tool("list_directory", fs_tools.list_directory, "File Operations")
+registry.register_system_tool("begin_upload", fs_tools.begin_upload, "File Operations")
+registry.register_system_tool("write_chunk", fs_tools.write_chunk, "File Operations")
+registry.register_system_tool("upload_status", fs_tools.upload_status, "File Operations")
+registry.register_system_tool("commit_upload", fs_tools.commit_upload, "File Operations")
+registry.register_system_tool("abort_upload", fs_tools.abort_upload, "File Operations")
+registry.register_system_tool("begin_download", fs_tools.begin_download, "File Operations")
+registry.register_system_tool("read_chunk", fs_tools.read_chunk, "File Operations")
 
 registry.register_system_tool("execute_python_code", exec_tools.execute_python_code, "Code Execution")
 
@@ -162,9 +208,14 @@ registry.register_system_tool("get_content", browser_tools.get_content, "Browser
 registry.register_system_tool("click", browser_tools.click, "Browser Automation")
 registry.register_system_tool("type", browser_tools.type, "Browser Automation")
 registry.register_system_tool("screenshot", browser_tools.screenshot, "Browser Automation")
+registry.register_system_tool("list_tabs", browser_tools.list_tabs, "Browser Automation")
+registry.register_system_tool("close_tab", browser_tools.close_tab, "Browser Automation")
+registry.register_system_tool("close_browser_session", browser_tools.close_session, "Browser Automation")
 
 registry.register_system_tool("ask_human", interaction_tools.ask_human, "Interaction")
 
+registry.register_system_tool("search_web", search_tools.search_web, "Web Search")
+
 
 # --- Expose Tools via FastMCP ---
 
@@ -172,9 +223,15 @@ registry.register_system_tool("ask_human", interaction_tools.ask_human, "Interac
 @mcp.tool()
 @logged
 @rate_limited
-def read_file(path: str) -> str:
-    """Reads a file from the workspace."""
-    return fs_tools.read_file(path)
+def read_file(path: str, if_none_match: str = None) -> str:
+    """
+    Reads a file from the workspace.
+
+    Args:
+        if_none_match: SHA-256 the caller already has; if the file still matches,
+            a small "not_modified" JSON object is returned instead of the content.
+    """
+    return fs_tools.read_file(path, if_none_match)
 
 @mcp.tool()
 @logged
@@ -193,6 +250,60 @@ def list_files(path: str = ".") -> str:
     """Lists files in a directory within the workspace."""
     return fs_tools.list_files(path)
 
+@mcp.tool()
+def list_directory(path: str = ".", depth: int = 1, sort_by: str = "name", reverse: bool = False,
+                   cursor: str = None, limit: int = 500, max_bytes: int = 65536) -> str:
+    """
+    Lists a directory with type, size, mtime and permissions for each entry.
+
+    Args:
+        depth: Levels to recurse (1 = direct children)
+        sort_by: "name", "size", "mtime" or "type"
+        cursor: next_cursor from a previous call, to fetch the next page. Later
+            pages come from the first page's scan while no listed directory
+            changes, so sizes and mtimes of files modified in place can be stale.
+        limit: Entries per page (at most 10000)
+        max_bytes: Cap on the size of the response
+    """
+    return fs_tools.list_directory(path, depth, sort_by, reverse, cursor, limit, max_bytes)
+
+@mcp.tool()
+@logged
+def begin_upload(path: str, size: int = None, sha256: str = None) -> str:
+    """Starts a chunked upload. Returns an upload_id and the preferred chunk size."""
+    return fs_tools.begin_upload(path, size, sha256)
+
+@mcp.tool()
+def write_chunk(upload_id: str, offset: int, data: str) -> str:
+    """Writes a base64-encoded chunk of an upload at the given byte offset."""
+    return fs_tools.write_chunk(upload_id, offset, data)
+
+@mcp.tool()
+def upload_status(upload_id: str) -> str:
+    """Gets the bytes received so far, to resume an interrupted upload."""
+    return fs_tools.upload_status(upload_id)
+
+@mcp.tool()
+@logged
+def commit_upload(upload_id: str, sha256: str = None) -> str:
+    """Verifies an upload's size and hash and moves it into place atomically."""
+    return fs_tools.commit_upload(upload_id, sha256)
+
+@mcp.tool()
+def abort_upload(upload_id: str) -> str:
+    """Discards an in-progress upload."""
+    return fs_tools.abort_upload(upload_id)
+
+@mcp.tool()
+def begin_download(path: str) -> str:
+    """Gets size, SHA-256 and chunk size of a file before a chunked download."""
+    return fs_tools.begin_download(path)
+
+@mcp.tool()
+def read_chunk(path: str, offset: int = 0, length: int = None) -> str:
+    """Reads a base64-encoded chunk of a file at the given byte offset."""
+    return fs_tools.read_chunk(path, offset, length)
+
 # Execution
 @mcp.tool()
 @logged
@@ -218,33 +329,163 @@ def get_current_time(format: str = "long", timezone: str = "UTC") -> str:
     """Gets the current time in a specific format and timezone."""
     return time_tools.get_current_time(format, timezone)
 
+@mcp.tool()
+def get_http_cache_stats() -> str:
+    """Returns hit/miss counters and size of the HTTP cache used by the fetch tools."""
+    cache = get_http_cache()
+    if cache is None:
+        return json.dumps({"enabled": False})
+    return json.dumps({"enabled": True, **cache.stats()})
+
+@mcp.tool()
+def get_search_cache_stats() -> str:
+    """Returns hit/miss counters and size of the web search result cache."""
+    cache = get_search_cache()
+    if cache is None:
+        return json.dumps({"enabled": False})
+    return json.dumps({"enabled": True, **cache.stats()})
+
 # Browser
+# MCP client session -> browser session id; unlike id(), never reused by a later client
+_client_sessions: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+
+def _browser_session(session_id: Optional[str], ctx: Optional[Context]) -> Optional[str]:
+    """An explicit session_id wins; otherwise each MCP client session gets its own context."""
+    if session_id:
+        return session_id
+    try:
+        session = ctx.session if ctx else None
+    except ValueError:
+        # Context used outside of a request
+        return None
+    if session is None:
+        return None
+    if session not in _client_sessions:
+        _client_sessions[session] = f"mcp-{uuid.uuid4().hex}"
+    return _client_sessions[session]
+
 @mcp.tool()
 @logged
 @rate_limited
-async def open_page(url: str) -> str:
-    """Opens a URL in the browser."""
-    return await browser_tools.open_page(url)
+async def open_page(url: str, session_id: str = None, tab_id: str = None, new_tab: bool = False,
+                    no_cache: bool = False, ctx: Context = None) -> str:
+    """
+    Opens a URL in the browser.
+
+    Args:
+        session_id: Browser session to use (defaults to one per client); sessions
+            have separate cookies and storage.
+        tab_id: Tab to navigate (defaults to the active tab).
+        new_tab: Open the URL in a new tab.
+        no_cache: Load the page from the network instead of the HTTP cache.
+    """
+    return await browser_tools.open_page(url, _browser_session(session_id, ctx), tab_id, new_tab, no_cache)
 
 @mcp.tool()
-async def get_page_content() -> str:
-    """Gets the text content of the current page."""
-    return await browser_tools.get_content()
+async def get_page_content(session_id: str = None, tab_id: str = None, format: str = "markdown",
+                           max_chars: int = None, max_tokens: int = None, cursor: str = None,
+                           main_only: bool = True, links: str = "inline", images: str = "alt",
+                           ctx: Context = None) -> str:
+    """
+    Gets the readable content of the current page as JSON.
+
+    Args:
+        format: "markdown" (default), "text", or "html" for the raw page.
+        max_chars: Budget for the returned content (default 20000).
+        max_tokens: Alternative budget in tokens (~4 characters each).
+        cursor: next_cursor from a previous call, to continue reading.
+        main_only: Keep only the main content block, dropping navigation and boilerplate.
+        links: "inline", "summary" (numbered references listed separately) or "none".
+        images: "alt" (alt text only), "inline", "summary" or "none".
+    """
+    return await browser_tools.get_content(
+        _browser_session(session_id, ctx), tab_id, format, max_chars, max_tokens, cursor,
+        main_only, links, images,
+    )
 
 @mcp.tool()
-async def click_element(selector: str) -> str:
+async def click_element(selector: str, session_id: str = None, tab_id: str = None,
+                        ctx: Context = None) -> str:
     """Clicks an element matching the selector."""
-    return await browser_tools.click(selector)
+    return await browser_tools.click(selector, _browser_session(session_id, ctx), tab_id)
 
 @mcp.tool()
-async def type_text(selector: str, text: str) -> str:
+async def type_text(selector: str, text: str, session_id: str = None, tab_id: str = None,
+                    ctx: Context = None) -> str:
     """Types text into an element matching the selector."""
-    return await browser_tools.type(selector, text)
+    return await browser_tools.type(selector, text, _browser_session(session_id, ctx), tab_id)
+
+@mcp.tool()
+async def take_screenshot(filename: str = None, session_id: str = None, tab_id: str = None,
+                          format: str = "png", quality: int = None, selector: str = None,
+                          clip: Dict[str, float] = None, full_page: bool = False,
+                          max_width: int = None, if_changed: bool = False, inline: bool = None,
+                          ctx: Context = None):
+    """
+    Takes a screenshot of the current page.
+
+    Returns JSON metadata, followed by the image itself when inline.
+
+    Args:
+        filename: Workspace path to save the image to.
+        format: "png" (default), "jpeg" or "webp".
+        quality: JPEG/WebP quality, 1-100.
+        selector: Capture only the first element matching this selector.
+        clip: Capture a region: {"x", "y", "width", "height"} in CSS pixels.
+        full_page: Capture the whole scrollable page instead of the viewport.
+        max_width: Downscale the image to at most this many pixels wide.
+        if_changed: Compare with the tab's previous screenshot and return no
+            image (changed=false) if the page looks the same.
+        inline: Return the image in the response (default: when no filename is given).
+    """
+    try:
+        result = await browser_tools.capture(
+            _browser_session(session_id, ctx), tab_id, filename=filename, format=format, quality=quality,
+            selector=selector, clip=clip, full_page=full_page, max_width=max_width, if_changed=if_changed,
+        )
+    except (LookupError, ValueError) as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Error taking screenshot: {str(e)}"
+
+    data = result.pop("data")
+    if inline is None:
+        inline = not filename
+    if data is None or not inline:
+        return json.dumps(result)
+    return [json.dumps(result), Image(data=data, format=result["format"])]
+
+@mcp.tool()
+async def list_tabs(session_id: str = None, ctx: Context = None) -> str:
+    """Lists the open tabs of a browser session (the active tab is marked with *)."""
+    return await browser_tools.list_tabs(_browser_session(session_id, ctx))
 
 @mcp.tool()
-async def take_screenshot(filename: str) -> str:
-    """Takes a screenshot and saves it to the workspace."""
-    return await browser_tools.screenshot(filename)
+async def close_tab(tab_id: str, session_id: str = None, ctx: Context = None) -> str:
+    """Closes a browser tab."""
+    return await browser_tools.close_tab(tab_id, _browser_session(session_id, ctx))
+
+@mcp.tool()
+async def close_browser_session(session_id: str = None, ctx: Context = None) -> str:
+    """Closes a browser session and all of its tabs."""
+    return await browser_tools.close_session(_browser_session(session_id, ctx))
+
+# Web Search
+@mcp.tool()
+async def search_web(query: str, max_results: int = 10, providers: List[str] = None,
+                     timeout: float = 8.0, ctx: Context = None) -> str:
+    """
+    Searches the web with all enabled search providers at once and returns
+    merged, de-duplicated results ranked by agreement between providers.
+
+    Args:
+        query: The search query.
+        max_results: Number of merged results to return (default 10).
+        providers: Restrict the search to these providers (e.g. ["duckduckgo", "searxng"]).
+        timeout: Seconds to wait for slow providers before answering with what has arrived.
+    """
+    with progress_reporter(context_reporter(ctx)):
+        return await search_tools.search_web(query, max_results, providers, timeout)
 
 # Interaction
 @mcp.tool()
@@ -255,6 +496,39 @@ async def ask_human(question: str, ctx: Context = None) -> str:
     return await interaction_tools.ask_human(question, ctx=ctx)
 
 
+# --- Workspace Resources ---
+# Registered on the low-level server: FastMCP resource templates match a single
+# path segment, which cannot express nested workspace paths.
+
+@mcp._mcp_server.list_resources()
+async def list_workspace_resources() -> list[types.Resource]:
+    workspace_resources.track_session(mcp._mcp_server.request_context.session)
+    return [types.Resource(**r) for r in workspace_resources.list_resources()]
+
+@mcp._mcp_server.read_resource()
+async def read_workspace_resource(uri) -> str | bytes:
+    return workspace_resources.read(str(uri))
+
+@mcp._mcp_server.subscribe_resource()
+async def subscribe_workspace_resource(uri) -> None:
+    workspace_resources.subscribe(str(uri), mcp._mcp_server.request_context.session)
+
+@mcp._mcp_server.unsubscribe_resource()
+async def unsubscribe_workspace_resource(uri) -> None:
+    workspace_resources.unsubscribe(str(uri), mcp._mcp_server.request_context.session)
+
+@mcp.tool()
+def get_changes(since: int = 0) -> str:
+    """
+    Returns workspace files changed after a change sequence number.
+
+    Call after a resources/updated notification with the last sequence you saw.
+    If "reset" is true, the change journal no longer reaches back that far
+    and the directory should be listed again.
+    """
+    return json.dumps(workspace_resources.changes_since(since))
+
+
 # --- Dynamic Tool Loading ---
 registry.load_dynamic_tools()
 
@@ -366,8 +640,10 @@ def create_mcp_tool_wrapper(mcp_instance, tool_def, tool_registry):
     tool_name = tool_def["name"]
     
     @mcp_instance.tool(name=tool_name)
-    async def wrapper(**kwargs):
-        return await tool_registry.call_tool(tool_name, kwargs)
+    async def wrapper(ctx: Context = None, **kwargs):
+        # Integrations have no MCP context; let them report progress through ours
+        with progress_reporter(context_reporter(ctx)):
+            return await tool_registry.call_tool(tool_name, kwargs)
     
     wrapper.__name__ = tool_name
     wrapper.__doc__ = tool_def.get("description", "")
@@ -385,9 +661,25 @@ if __name__ == "__main__":
         # Load integrations
         await load_integrations_and_register()
         
-        # Run MCP server
-        # run_stdio_async runs the server over stdio
-        await mcp.run_stdio_async()
+        # Watch the workspace for resource subscriptions
+        await workspace_resources.start()
+
+        # Run MCP server over stdio. Equivalent to mcp.run_stdio_async(), but
+        # advertises resource subscriptions and list_changed notifications.
+        server = mcp._mcp_server
+        options = server.create_initialization_options(NotificationOptions(resources_changed=True))
+        if options.capabilities.resources is not None:
+            options.capabilities.resources.subscribe = True
+        try:
+            async with stdio_server() as (read_stream, write_stream):
+                await server.run(read_stream, write_stream, options)
+        finally:
+            await workspace_resources.stop()
+            await browser_tools.close()
+            await get_browser_pool().close()
+            await close_http_client()
+            if get_http_cache() is not None:
+                get_http_cache().close()
 
     try:
         asyncio.run(main())
@@ -1,78 +1,413 @@
+import json
+import time
 import asyncio
-from playwright.async_api import async_playwright, Page, Browser
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+try:
+    from playwright.async_api import Page, BrowserContext
+except ImportError:
+    # Only used for annotations; the pool reports playwright as unavailable
+    Page = BrowserContext = Any
 from ..workspace import Workspace
+from ..utils.browser_pool import BrowserPool, get_browser_pool
+from ..utils.extraction import extract_content
+from ..utils.http_cache import get_http_cache
+from ..utils.imaging import NATIVE_FORMATS, fingerprint, image_size, normalize_format, transcode, visual_diff
+from ..utils.resource_policy import ResourcePolicy, navigate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION = "default"
+DEFAULT_MAX_SESSIONS = 16
+DEFAULT_MAX_PAGES = 32
+# Sessions untouched for this long are closed on the next browser call
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+
+
+def _save(path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+class BrowserSession:
+    """One isolated browser context with its own cookies, storage and tabs."""
+
+    def __init__(self, session_id: str, context: BrowserContext):
+        self.session_id = session_id
+        self.context = context
+        self.tabs: Dict[str, Page] = {}
+        self.active: Optional[str] = None
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()
+        # Calls that were handed this session and haven't finished with it
+        self.users = 0
+        # Set for the duration of a no_cache navigation
+        self.bypass_cache = False
+        # Last screenshot per tab, kept for if_changed comparisons
+        self.last_shots: Dict[str, Tuple[tuple, bytes]] = {}
+        self._next_tab = 1
+        # Popups opened by the page (target=_blank, window.open) become tabs too
+        context.on("page", self._register)
+
+    def _register(self, page: Page) -> str:
+        for tab_id, existing in self.tabs.items():
+            if existing is page:
+                return tab_id
+        tab_id = f"t{self._next_tab}"
+        self._next_tab += 1
+        self.tabs[tab_id] = page
+        page.on("close", lambda _page: self._forget(tab_id))
+        return tab_id
+
+    def _forget(self, tab_id: str):
+        self.tabs.pop(tab_id, None)
+        self.last_shots.pop(tab_id, None)
+        if self.active == tab_id:
+            self.active = next(reversed(self.tabs), None)
+
+    async def new_tab(self) -> str:
+        page = await self.context.new_page()
+        tab_id = self._register(page)
+        self.active = tab_id
+        return tab_id
+
+    def page(self, tab_id: Optional[str] = None) -> Optional[Page]:
+        tab_id = tab_id or self.active
+        page = self.tabs.get(tab_id) if tab_id else None
+        if page is not None and page.is_closed():
+            self._forget(tab_id)
+            return None
+        return page
+
+    @property
+    def busy(self) -> bool:
+        return self.users > 0 or self.lock.locked()
+
+    @property
+    def connected(self) -> bool:
+        return self.context.browser is None or self.context.browser.is_connected()
+
 
 class BrowserTools:
-    def __init__(self, workspace: Workspace):
+    """
+    Browser automation with per-session contexts and multiple tabs.
+
+    Each session (an MCP client session or an explicit ``session_id``) gets
+    its own context on the shared browser pool, so agents browsing in
+    parallel never share cookies or clobber each other's page. Calls within
+    a session are serialized; different sessions run concurrently. Idle
+    sessions are evicted least-recently-used first when ``max_sessions`` or
+    the ``max_pages`` cap on open tabs across all sessions is reached.
+
+    Contexts use the interactive variant of the pool's resource policy:
+    trackers and media are blocked, images and styles still load.
+    """
+
+    def __init__(self, workspace: Workspace, pool: BrowserPool = None,
+                 max_sessions: int = DEFAULT_MAX_SESSIONS, max_pages: int = DEFAULT_MAX_PAGES,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 resource_policy: Optional[ResourcePolicy] = None, on_change=None):
         self.workspace = workspace
-        self.browser: Browser = None
-        self.page: Page = None
-        self.playwright = None
-
-    async def _ensure_browser(self):
-        if not self.playwright:
-            self.playwright = await async_playwright().start()
-        
-        if not self.browser:
-            self.browser = await self.playwright.chromium.launch(headless=True)
-            
-        if not self.page:
-            self.page = await self.browser.new_page()
-
-    async def open_page(self, url: str) -> str:
-        """Opens a URL in the browser."""
-        await self._ensure_browser()
+        self.on_change = on_change
+        self.pool = pool or get_browser_pool()
+        self.resource_policy = resource_policy or self.pool.resource_policy.interactive()
+        self.max_sessions = max(max_sessions, 1)
+        self.max_pages = max(max_pages, 1)
+        self.idle_timeout = idle_timeout
+        self.sessions: "OrderedDict[str, BrowserSession]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    # --- Sessions ---
+
+    @property
+    def open_pages(self) -> int:
+        return sum(len(s.tabs) for s in self.sessions.values())
+
+    async def _session(self, session_id: Optional[str], create: bool = True) -> Optional[BrowserSession]:
+        session_id = session_id or DEFAULT_SESSION
+        async with self._lock:
+            await self._expire_idle()
+            session = self.sessions.get(session_id)
+            if session is not None and not session.connected:
+                # The pooled browser crashed or was recycled; start over on a healthy one
+                await self._close_session(session_id)
+                session = None
+            if session is None:
+                if not create:
+                    return None
+                while len(self.sessions) >= self.max_sessions and await self._evict(exclude=session_id):
+                    pass
+                context = await self.pool.acquire_context(self.resource_policy)
+                session = BrowserSession(session_id, context)
+                cache = get_http_cache()
+                if cache is not None:
+                    await cache.install(context, bypass=lambda: session.bypass_cache)
+                self.sessions[session_id] = session
+            self.sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            # Counted before _lock is released, so eviction can't close it
+            # before the caller gets hold of session.lock
+            session.users += 1
+            return session
+
+    @asynccontextmanager
+    async def _using(self, session_id: Optional[str], create: bool = True):
+        """Hold a session's lock for one call; yields None if it doesn't exist and create is False."""
+        session = await self._session(session_id, create)
+        if session is None:
+            yield None
+            return
+        try:
+            async with session.lock:
+                yield session
+        finally:
+            session.users -= 1
+
+    async def _expire_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for session_id, session in list(self.sessions.items()):
+            if session.last_used < cutoff and not session.busy:
+                logger.info(f"Closing idle browser session {session_id}")
+                await self._close_session(session_id)
+
+    async def _evict(self, exclude: str) -> bool:
+        """Close the least recently used idle session other than ``exclude``."""
+        for session_id, session in self.sessions.items():
+            if session_id != exclude and not session.busy:
+                logger.info(f"Evicting browser session {session_id}")
+                await self._close_session(session_id)
+                return True
+        return False
+
+    async def _close_session(self, session_id: str):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            await self.pool.release_context(session.context)
+
+    async def _make_room(self, session: BrowserSession):
+        """Free a page slot before opening a tab, or raise if none can be freed."""
+        async with self._lock:
+            while self.open_pages >= self.max_pages:
+                if await self._evict(exclude=session.session_id):
+                    continue
+                # Only this session holds pages: recycle its oldest background tab
+                stale = next((t for t in session.tabs if t != session.active), None)
+                if stale is None:
+                    raise RuntimeError(f"Open page limit reached ({self.max_pages})")
+                await session.tabs[stale].close()
+                session._forget(stale)
+
+    async def _page(self, session: BrowserSession, tab_id: Optional[str]) -> Page:
+        page = session.page(tab_id)
+        if page is None:
+            if tab_id:
+                raise LookupError(f"No tab '{tab_id}' in session '{session.session_id}'")
+            raise LookupError("No page open.")
+        if tab_id:
+            session.active = tab_id
+        return page
+
+    # --- Tools ---
+
+    async def open_page(self, url: str, session_id: str = None, tab_id: str = None,
+                        new_tab: bool = False, no_cache: bool = False) -> str:
+        """Opens a URL in the browser (in the active tab, a given tab, or a new tab)."""
         try:
-            await self.page.goto(url)
-            return f"Successfully opened {url}"
+            async with self._using(session_id) as session:
+                if new_tab or (not tab_id and session.page() is None):
+                    await self._make_room(session)
+                    tab_id = await session.new_tab()
+                page = await self._page(session, tab_id)
+                session.bypass_cache = no_cache
+                try:
+                    await navigate(page, url)
+                finally:
+                    session.bypass_cache = False
+                return f"Successfully opened {url} (tab {session.active})"
+        except LookupError as e:
+            return f"Error: {str(e)}"
         except Exception as e:
             return f"Error opening page: {str(e)}"
 
-    async def get_content(self) -> str:
-        """Gets the text content of the current page."""
-        if not self.page:
-            return "Error: No page open."
-        return await self.page.content()
+    async def get_content(self, session_id: str = None, tab_id: str = None, format: str = "markdown",
+                          max_chars: int = None, max_tokens: int = None, cursor: str = None,
+                          main_only: bool = True, links: str = "inline", images: str = "alt") -> str:
+        """
+        Gets the readable content of the current page as JSON.
 
-    async def click(self, selector: str) -> str:
-        """Clicks an element matching the selector."""
-        if not self.page:
-            return "Error: No page open."
+        The page is reduced to its main content as Markdown (or plain text,
+        or raw HTML with format="html") and cut to the max_chars/max_tokens
+        budget; pass next_cursor back as cursor to read further.
+        """
+        async with self._using(session_id, create=False) as session:
+            if session is None:
+                return "Error: No page open."
+            try:
+                page = await self._page(session, tab_id)
+            except LookupError as e:
+                return f"Error: {str(e)}"
+            html = await page.content()
+            url = page.url
         try:
-            await self.page.click(selector)
-            return f"Clicked {selector}"
-        except Exception as e:
-            return f"Error clicking {selector}: {str(e)}"
+            # Parsing a large page takes a while; keep the event loop responsive
+            result = await asyncio.to_thread(
+                extract_content, html, url, format=format, main_only=main_only, links=links, images=images,
+                max_chars=max_chars, max_tokens=max_tokens, cursor=cursor,
+            )
+        except ValueError as e:
+            return f"Error: {str(e)}"
+        return json.dumps(result)
+
+    async def click(self, selector: str, session_id: str = None, tab_id: str = None) -> str:
+        """Clicks an element matching the selector."""
+        async with self._using(session_id, create=False) as session:
+            if session is None:
+                return "Error: No page open."
+            try:
+                page = await self._page(session, tab_id)
+                await page.click(selector)
+                return f"Clicked {selector}"
+            except LookupError as e:
+                return f"Error: {str(e)}"
+            except Exception as e:
+                return f"Error clicking {selector}: {str(e)}"
 
-    async def type(self, selector: str, text: str) -> str:
+    async def type(self, selector: str, text: str, session_id: str = None, tab_id: str = None) -> str:
         """Types text into an element matching the selector."""
-        if not self.page:
-            return "Error: No page open."
-        try:
-            await self.page.fill(selector, text)
-            return f"Typed text into {selector}"
-        except Exception as e:
-            return f"Error typing into {selector}: {str(e)}"
-
-    async def screenshot(self, filename: str) -> str:
-        """Takes a screenshot and saves it to the workspace."""
-        if not self.page:
-            return "Error: No page open."
-            
-        # Validate path to ensure it's in workspace
+        async with self._using(session_id, create=False) as session:
+            if session is None:
+                return "Error: No page open."
+            try:
+                page = await self._page(session, tab_id)
+                await page.fill(selector, text)
+                return f"Typed text into {selector}"
+            except LookupError as e:
+                return f"Error: {str(e)}"
+            except Exception as e:
+                return f"Error typing into {selector}: {str(e)}"
+
+    async def capture(self, session_id: str = None, tab_id: str = None, filename: str = None,
+                      format: str = "png", quality: int = None, selector: str = None,
+                      clip: Dict[str, float] = None, full_page: bool = False,
+                      max_width: int = None, if_changed: bool = False) -> Dict[str, Any]:
+        """
+        Captures a screenshot and returns its metadata plus the encoded image
+        under "data" (None when if_changed is set and nothing changed).
+
+        Raises LookupError without a page and ValueError on bad options.
+        """
+        format = normalize_format(format)
+        if quality is not None and not 1 <= quality <= 100:
+            raise ValueError("quality must be between 1 and 100")
+        if selector and clip:
+            raise ValueError("Pass either selector or clip, not both")
+        if clip is not None:
+            try:
+                clip = {k: float(clip[k]) for k in ("x", "y", "width", "height")}
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("clip needs numeric x, y, width and height")
+        if max_width is not None and max_width < 1:
+            raise ValueError("max_width must be positive")
+        full_path = self.workspace.validate_path(filename) if filename else None
+
+        async with self._using(session_id, create=False) as session:
+            if session is None:
+                raise LookupError("No page open.")
+            page = await self._page(session, tab_id)
+            tab = session.active
+            # Let the browser encode natively where it can; WebP goes through Pillow
+            options: Dict[str, Any] = {
+                "type": format if format in NATIVE_FORMATS else "png",
+                "scale": "css", "animations": "disabled", "caret": "hide",
+            }
+            if options["type"] == "jpeg" and quality:
+                options["quality"] = quality
+            if selector:
+                raw = await page.locator(selector).first.screenshot(**options)
+            else:
+                raw = await page.screenshot(full_page=full_page, clip=clip, **options)
+
+            key = (format, quality, selector, tuple(sorted(clip.items())) if clip else None, full_page, max_width)
+            previous = session.last_shots.get(tab)
+            session.last_shots[tab] = (key, raw)
+
+        result: Dict[str, Any] = {"tab_id": tab, "url": page.url, "format": format}
+        if if_changed:
+            if previous is None or previous[0] != key:
+                result.update(changed=True, baseline=True)
+            else:
+                result.update(visual_diff(previous[1], raw))
+            if not result["changed"]:
+                result["data"] = None
+                return result
+
+        data = await asyncio.to_thread(transcode, raw, format, quality, max_width)
+        size = image_size(data)
+        if size:
+            result["width"], result["height"] = size
+        result.update(bytes=len(data), sha256=fingerprint(data), data=data)
+        if full_path is not None:
+            await asyncio.to_thread(_save, full_path, data)
+            result["path"] = filename
+            if self.on_change:
+                try:
+                    self.on_change(filename)
+                except Exception:
+                    logger.debug(f"Change notification failed for {filename}", exc_info=True)
+        return result
+
+    async def screenshot(self, filename: str, session_id: str = None, tab_id: str = None,
+                         **options) -> str:
+        """
+        Takes a screenshot and saves it to the workspace.
+
+        Accepts the options of ``capture`` (format, quality, selector, clip,
+        full_page, max_width, if_changed).
+        """
         try:
-            full_path = self.workspace.validate_path(filename)
-            await self.page.screenshot(path=str(full_path))
-            return f"Screenshot saved to {filename}"
+            result = await self.capture(session_id, tab_id, filename=filename, **options)
+        except (LookupError, ValueError) as e:
+            return f"Error: {str(e)}"
         except Exception as e:
             return f"Error taking screenshot: {str(e)}"
+        if result["data"] is None:
+            return "Screenshot unchanged since the last capture; nothing saved."
+        return f"Screenshot saved to {filename}"
+
+    async def list_tabs(self, session_id: str = None) -> str:
+        """Lists the open tabs of a session."""
+        async with self._using(session_id, create=False) as session:
+            if session is None:
+                return "No tabs open."
+            lines = []
+            for tab_id, page in list(session.tabs.items()):
+                marker = "*" if tab_id == session.active else " "
+                lines.append(f"{marker} {tab_id}: {page.url}")
+        return "\n".join(lines) or "No tabs open."
+
+    async def close_tab(self, tab_id: str, session_id: str = None) -> str:
+        """Closes one tab of a session."""
+        async with self._using(session_id, create=False) as session:
+            if session is None or tab_id not in session.tabs:
+                return f"Error: No tab '{tab_id}'"
+            page = session.tabs.get(tab_id)
+            if page is not None:
+                await page.close()
+            session._forget(tab_id)
+        return f"Closed tab {tab_id}"
+
+    async def close_session(self, session_id: str = None) -> str:
+        """Closes a session's context and all of its tabs."""
+        async with self._lock:
+            if (session_id or DEFAULT_SESSION) not in self.sessions:
+                return "Error: No such browser session."
+            await self._close_session(session_id or DEFAULT_SESSION)
+        return f"Closed browser session {session_id or DEFAULT_SESSION}"
 
     async def close(self):
-        """Closes the browser."""
-        if self.browser:
-            await self.browser.close()
-            self.browser = None
-            self.page = None
-        if self.playwright:
-            await self.playwright.stop()
-            self.playwright = None
+        """Closes every session context (the pooled browser stays up)."""
+        async with self._lock:
+            for session_id in list(self.sessions):
+                await self._close_session(session_id)
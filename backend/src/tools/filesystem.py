@@ -1,15 +1,31 @@
+import json
+from typing import Optional
 from ..workspace import Workspace
+from ..utils.transfer import ChunkedTransferManager, file_sha256
+from ..utils.blobstore import BlobStore
+from ..utils.listing import scan_directory, DEFAULT_PAGE_ENTRIES, DEFAULT_MAX_RESPONSE_BYTES
 
 class FilesystemTools:
     def __init__(self, workspace: Workspace, on_change=None):
         self.workspace = workspace
         self.on_change = on_change
+        self.transfers = ChunkedTransferManager(workspace.files_path)
 
-    def read_file(self, path: str) -> str:
+        # Optional content-addressed mode: blobs live beside (not inside) files/
+        self.blobs = None
+        if workspace.config.get("content_addressed_storage", False):
+            self.blobs = BlobStore(workspace.files_path, workspace.blobs_path)
+
+    def read_file(self, path: str, if_none_match: Optional[str] = None) -> str:
         """Reads a file from the workspace."""
         full_path = self.workspace.validate_path(path)
         if not full_path.exists():
             raise FileNotFoundError(f"File not found: {path}")
+
+        if if_none_match:
+            sha256 = self.blobs.hash_of(full_path) if self.blobs else file_sha256(full_path)
+            if sha256 == if_none_match.lower():
+                return json.dumps({"path": path, "sha256": sha256, "not_modified": True})
         
         with open(full_path, "r") as f:
             return f.read()
@@ -23,9 +39,14 @@ class FilesystemTools:
         
         # Ensure parent dirs exist
         full_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(full_path, "w") as f:
-            f.write(content)
+
+        if self.blobs:
+            sha256, changed = self.blobs.write_bytes(full_path, content.encode("utf-8"))
+            if not changed:
+                return f"Unchanged: {path} already has this content (sha256 {sha256})"
+        else:
+            with open(full_path, "w") as f:
+                f.write(content)
             
         # Notify
         if self.on_change:
@@ -45,8 +66,11 @@ class FilesystemTools:
         
         if not full_path.exists():
             raise FileNotFoundError(f"File not found: {path}")
-            
-        full_path.unlink()
+
+        if self.blobs:
+            self.blobs.delete(full_path)
+        else:
+            full_path.unlink()
         
         # Notify
         if self.on_change:
@@ -66,3 +90,64 @@ class FilesystemTools:
             
         files = [p.name for p in full_path.iterdir()]
         return "\n".join(files)
+
+    def list_directory(self, path: str = ".", depth: int = 1, sort_by: str = "name",
+                       reverse: bool = False, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_ENTRIES,
+                       max_bytes: int = DEFAULT_MAX_RESPONSE_BYTES) -> str:
+        """Lists a directory with type, size, mtime and permissions, paged by cursor."""
+        full_path = self.workspace.validate_path(path)
+
+        if not full_path.is_dir():
+            raise NotADirectoryError(f"Not a directory: {path}")
+
+        listing = scan_directory(full_path, self.workspace.files_path, depth=depth, sort_by=sort_by,
+                                 reverse=reverse, cursor=cursor, limit=limit, max_bytes=max_bytes)
+        return json.dumps(listing)
+
+    def begin_upload(self, path: str, size: Optional[int] = None, sha256: Optional[str] = None) -> str:
+        """Starts a chunked upload and returns its upload_id and chunk size."""
+        if not self.workspace.config.get("allow_create_files", False):
+            raise PermissionError("File creation is disabled in this workspace.")
+
+        full_path = self.workspace.validate_path(path)
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        return json.dumps(self.transfers.begin_upload(str(full_path), size, sha256))
+
+    def write_chunk(self, upload_id: str, offset: int, data: str) -> str:
+        """Writes a base64-encoded chunk of an upload at the given byte offset."""
+        return json.dumps(self.transfers.write_chunk(upload_id, offset, data))
+
+    def upload_status(self, upload_id: str) -> str:
+        """Returns the number of bytes received, to resume an interrupted upload."""
+        return json.dumps(self.transfers.upload_status(upload_id))
+
+    def commit_upload(self, upload_id: str, sha256: Optional[str] = None) -> str:
+        """Verifies an upload and moves it into place atomically."""
+        result = self.transfers.commit_upload(upload_id, sha256)
+
+        # Notify
+        if self.on_change:
+            try:
+                self.on_change(result["path"])
+            except Exception:
+                pass
+
+        return json.dumps(result)
+
+    def abort_upload(self, upload_id: str) -> str:
+        """Discards an in-progress upload."""
+        return json.dumps(self.transfers.abort_upload(upload_id))
+
+    def begin_download(self, path: str) -> str:
+        """Returns size, SHA-256 and chunk size of a file for a chunked download."""
+        full_path = self.workspace.validate_path(path)
+        if not full_path.is_file():
+            raise FileNotFoundError(f"File not found: {path}")
+        return json.dumps(self.transfers.begin_download(str(full_path)))
+
+    def read_chunk(self, path: str, offset: int = 0, length: Optional[int] = None) -> str:
+        """Reads a base64-encoded chunk of a file at the given byte offset."""
+        full_path = self.workspace.validate_path(path)
+        if not full_path.is_file():
+            raise FileNotFoundError(f"File not found: {path}")
+        return json.dumps(self.transfers.read_chunk(str(full_path), offset, length))
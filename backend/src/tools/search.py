@@ -0,0 +1,128 @@
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Set
+
+from ..integrations.web_search.fusion import fuse, normalize_results
+from ..utils.progress import report_progress
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CATEGORY = "web_search"
+DEFAULT_TIMEOUT = 8.0
+# Once one provider has answered adequately, others get this long to catch up
+DEFAULT_GRACE = 0.5
+MAX_RESULTS_LIMIT = 50
+
+
+class SearchTools:
+    """
+    Federated search over every loaded ``web_search`` integration.
+
+    Providers are queried concurrently. The answer is assembled as soon as
+    one provider has returned enough results and the others have had a
+    short grace period, or when the deadline passes, whichever is first;
+    a slow or failing provider never holds it up. Providers still running
+    at that point are left to finish in the background so their results
+    land in the search cache for the next call.
+    """
+
+    def __init__(self, registry, grace: float = DEFAULT_GRACE):
+        self.registry = registry
+        self.grace = grace
+        self._background: Set[asyncio.Task] = set()
+
+    def providers(self) -> Dict[str, Any]:
+        """Loaded search integrations by provider name."""
+        return {
+            integration.name: integration
+            for integration in self.registry.integrations.values()
+            if integration.category == SEARCH_CATEGORY and integration.list_tools()
+        }
+
+    async def _query(self, integration, query: str, max_results: int) -> List[Dict[str, str]]:
+        tool = integration.list_tools()[0]
+        args: Dict[str, Any] = {"query": query}
+        # Only pass options the provider's tool declares
+        if "max_results" in tool.get("parameters", {}).get("properties", {}):
+            args["max_results"] = max_results
+        raw = await integration.call_tool(tool["name"], args)
+        if isinstance(raw, str) and raw.startswith("Error"):
+            raise RuntimeError(raw)
+        return normalize_results(raw)
+
+    async def search_web(self, query: str, max_results: int = 10, providers: List[str] = None,
+                         timeout: float = DEFAULT_TIMEOUT) -> str:
+        """
+        Searches the web with all enabled providers at once and returns the
+        merged, de-duplicated results as JSON.
+
+        Args:
+            query: The search query.
+            max_results: Number of merged results to return (default 10).
+            providers: Restrict the search to these providers (e.g. ["duckduckgo"]).
+            timeout: Seconds to wait for providers before answering with what has arrived.
+        """
+        if not query or not query.strip():
+            return "Error: query is required."
+        max_results = max(1, min(max_results or 10, MAX_RESULTS_LIMIT))
+        available = self.providers()
+        if providers:
+            unknown = [p for p in providers if p not in available]
+            if unknown:
+                return f"Error: Unknown or disabled search provider(s): {', '.join(unknown)}. " \
+                       f"Available: {', '.join(available) or 'none'}"
+            available = {p: available[p] for p in providers}
+        if not available:
+            return "Error: No web search providers are enabled."
+
+        start = time.perf_counter()
+        tasks = {
+            asyncio.create_task(self._query(integration, query, max_results)): name
+            for name, integration in available.items()
+        }
+        ranked: Dict[str, List[Dict[str, str]]] = {}
+        status: Dict[str, Dict[str, Any]] = {}
+        deadline = start + timeout
+        pending = set(tasks)
+        done_count = 0
+
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = tasks[task]
+                elapsed = round(time.perf_counter() - start, 3)
+                done_count += 1
+                if task.exception() is not None:
+                    status[name] = {"status": "error", "error": str(task.exception()), "elapsed": elapsed}
+                    await report_progress(done_count, len(tasks), f"{name} failed")
+                    continue
+                ranked[name] = task.result()
+                status[name] = {"status": "ok", "count": len(ranked[name]), "elapsed": elapsed}
+                if len(ranked[name]) >= max_results:
+                    # Adequate answer: give the rest a short grace period, not the whole deadline
+                    deadline = min(deadline, time.perf_counter() + self.grace)
+                await report_progress(done_count, len(tasks), f"{name} returned {len(ranked[name])} results")
+
+        for task in pending:
+            status[tasks[task]] = {"status": "timeout"}
+            # Let it finish (and fill the cache) without waiting for it
+            self._background.add(task)
+            task.add_done_callback(self._finished)
+
+        results = fuse(ranked, max_results)
+        return json.dumps({
+            "query": query,
+            "results": results,
+            "providers": status,
+            "elapsed": round(time.perf_counter() - start, 3),
+        })
+
+    def _finished(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Background search failed: {task.exception()}")
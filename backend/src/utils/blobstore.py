@@ -0,0 +1,318 @@
+import os
+import sys
+import uuid
+import shutil
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Optional, Tuple, Union
+
+from .security import DEFAULT_MAX_BYTES, QuotaExceededError
+from .transfer import file_sha256
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Blobs are shared between paths, so they must never be modified in place
+BLOB_MODE = 0o444
+# ioctl that makes a file share another file's extents copy-on-write (linux/fs.h)
+FICLONE = 0x40049409
+
+
+def clone_file(src: Union[str, os.PathLike], dest: Union[str, os.PathLike]):
+    """
+    Create ``dest`` as an independent copy of ``src``: a reflink where the
+    filesystem supports it (no data copied, blocks shared copy-on-write),
+    otherwise a byte copy. Either way ``dest`` has its own inode.
+    """
+    with open(src, "rb") as source, open(dest, "wb") as target:
+        cloned = False
+        if fcntl is not None and sys.platform.startswith("linux"):
+            try:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+                cloned = True
+            except OSError:
+                pass
+        if not cloned:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        target.flush()
+        os.fsync(target.fileno())
+
+
+def reflinks_supported(directory: Union[str, os.PathLike]) -> bool:
+    """Whether files in ``directory`` can be cloned with FICLONE (btrfs, XFS; not ext4, overlayfs, tmpfs)."""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    src_fd, src = tempfile.mkstemp(dir=directory, prefix=".probe-", suffix=".tmp")
+    dest_fd, dest = tempfile.mkstemp(dir=directory, prefix=".probe-", suffix=".tmp")
+    try:
+        os.write(src_fd, b"probe")
+        fcntl.ioctl(dest_fd, FICLONE, src_fd)
+        return True
+    except OSError:
+        return False
+    finally:
+        for fd, path in ((src_fd, src), (dest_fd, dest)):
+            os.close(fd)
+            os.remove(path)
+
+
+class BlobStore:
+    """
+    Content-addressed storage for files under a sandbox root.
+
+    A SQLite index maps each path to its hash together with the (size,
+    mtime_ns, inode) it had when indexed, so hashes can be answered without
+    reading the file and out-of-band modifications are detected and
+    re-hashed. Writing content a path already has is a no-op (no write, no
+    fsync).
+
+    Where the filesystem supports reflinks (probed when the store opens),
+    file contents also live once in ``<store_dir>/objects/<aa>/<sha256>`` and
+    every path holding that content is a reflink of the blob: its own inode,
+    so writing to one path never changes another or the blob, but sharing
+    the blob's blocks copy-on-write. Copying a file is then a metadata
+    operation. Blobs are reference-counted through the index.
+
+    Elsewhere (ext4, overlayfs, tmpfs) a blob could only be a second full
+    copy of the data, so none is kept: paths are written directly and only
+    the index is maintained.
+    """
+
+    def __init__(self, root_dir: Union[str, os.PathLike], store_dir: Union[str, os.PathLike]):
+        self.root_dir = os.path.realpath(root_dir)
+        self.store_dir = os.path.realpath(store_dir)
+        self.objects_dir = os.path.join(self.store_dir, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        # Paths can only be reflinks of blobs on the same reflink-capable filesystem
+        self.reflinks = (os.stat(self.root_dir).st_dev == os.stat(self.store_dir).st_dev
+                         and reflinks_supported(self.objects_dir))
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.store_dir, "index.db"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS paths ("
+            "path TEXT PRIMARY KEY, sha256 TEXT NOT NULL, size INTEGER, mtime_ns INTEGER, ino INTEGER)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER)"
+        )
+        self._db.commit()
+
+    def contains(self, full_path: Union[str, os.PathLike]) -> bool:
+        """True if ``full_path`` is inside the store directory itself."""
+        real = os.path.realpath(full_path)
+        return real == self.store_dir or real.startswith(self.store_dir + os.sep)
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    # --- Index ---
+
+    def _key(self, full_path: Union[str, os.PathLike]) -> str:
+        return os.path.relpath(os.path.realpath(full_path), self.root_dir)
+
+    def _record(self, full_path: Union[str, os.PathLike], sha256: str):
+        st = os.stat(full_path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO paths (path, sha256, size, mtime_ns, ino) VALUES (?, ?, ?, ?, ?)",
+                (self._key(full_path), sha256, st.st_size, st.st_mtime_ns, st.st_ino),
+            )
+            self._db.commit()
+
+    def lookup(self, full_path: Union[str, os.PathLike]) -> Optional[str]:
+        """Return the indexed hash of a path if the file is unchanged since indexing."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256, size, mtime_ns, ino FROM paths WHERE path = ?", (self._key(full_path),)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            st = os.stat(full_path)
+        except FileNotFoundError:
+            self.forget(full_path)
+            return None
+        if (st.st_size, st.st_mtime_ns, st.st_ino) != tuple(row[1:]):
+            return None
+        return row[0]
+
+    def hash_of(self, full_path: Union[str, os.PathLike]) -> str:
+        """Return the SHA-256 of a file, from the index when possible."""
+        sha256 = self.lookup(full_path)
+        if sha256 is None:
+            sha256 = file_sha256(full_path)
+            self._record(full_path, sha256)
+        return sha256
+
+    def forget(self, full_path: Union[str, os.PathLike]):
+        """Drop a path from the index (after it was deleted)."""
+        with self._lock:
+            self._db.execute("DELETE FROM paths WHERE path = ?", (self._key(full_path),))
+            self._db.commit()
+
+    def rename(self, src: Union[str, os.PathLike], dest: Union[str, os.PathLike]):
+        """Move an index entry along with an os.replace of the file."""
+        with self._lock:
+            self._db.execute("DELETE FROM paths WHERE path = ?", (self._key(dest),))
+            self._db.execute("UPDATE paths SET path = ? WHERE path = ?", (self._key(dest), self._key(src)))
+            self._db.commit()
+
+    # --- Blobs ---
+
+    def _blob_intact(self, sha256: str) -> bool:
+        blob = self.blob_path(sha256)
+        try:
+            st = os.stat(blob)
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            row = self._db.execute("SELECT size, mtime_ns FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        # Blobs are read-only, but root can still write into them in place
+        if row is None or (st.st_size, st.st_mtime_ns) != tuple(row):
+            logger.warning(f"Discarding modified blob {sha256}")
+            os.remove(blob)
+            return False
+        return True
+
+    def _store_blob(self, sha256: str, write, verify: bool = False) -> str:
+        blob = self.blob_path(sha256)
+        if self._blob_intact(sha256):
+            return blob
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(blob))
+        try:
+            with os.fdopen(tmp_fd, "wb") as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            if verify and file_sha256(tmp_path) != sha256:
+                raise RuntimeError("Content changed while it was being stored")
+            os.chmod(tmp_path, BLOB_MODE)
+            os.replace(tmp_path, blob)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        st = os.stat(blob)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO blobs (sha256, size, mtime_ns) VALUES (?, ?, ?)",
+                (sha256, st.st_size, st.st_mtime_ns),
+            )
+            self._db.commit()
+        return blob
+
+    @staticmethod
+    def _write_path(target: Union[str, os.PathLike], write):
+        """Replace ``target`` atomically with what ``write(f)`` writes."""
+        target = os.fspath(target)
+        tmp_path = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.{uuid.uuid4().hex}.tmp")
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+
+    def _place(self, blob: str, target: Union[str, os.PathLike]):
+        self._write_path(target, lambda tmp_path: clone_file(blob, tmp_path))
+
+    @staticmethod
+    def _write_direct(tmp_path: str, chunks) -> str:
+        """Write ``chunks`` to ``tmp_path`` and fsync it; returns their SHA-256."""
+        digest = hashlib.sha256()
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        return digest.hexdigest()
+
+    def _release(self, sha256: Optional[str]):
+        """Remove a blob once no indexed path holds its content any more."""
+        if not sha256 or not self.reflinks:
+            return
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM paths WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone():
+                return
+            self._db.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            self._db.commit()
+        try:
+            os.remove(self.blob_path(sha256))
+        except FileNotFoundError:
+            pass
+
+    # --- Operations ---
+
+    def write_bytes(self, target: Union[str, os.PathLike], data: bytes,
+                    max_bytes: int = DEFAULT_MAX_BYTES) -> Tuple[str, bool]:
+        """
+        Store ``data`` at ``target``.
+
+        Returns (sha256, changed); ``changed`` is False when the target
+        already held identical content and nothing was written.
+        """
+        if len(data) > max_bytes:
+            raise QuotaExceededError(f"Write quota exceeded: {len(data)} > {max_bytes} bytes")
+
+        sha256 = hashlib.sha256(data).hexdigest()
+        previous = self.lookup(target) if os.path.exists(target) else None
+        if previous == sha256:
+            return sha256, False
+
+        sys.audit("mcp.filesystem.write", str(target), max_bytes)
+        if self.reflinks:
+            blob = self._store_blob(sha256, lambda f: f.write(data))
+            self._place(blob, target)
+        else:
+            self._write_path(target, lambda tmp_path: self._write_direct(tmp_path, [data]))
+        self._record(target, sha256)
+        self._release(previous)
+        logger.info(f"AUDIT: Content-addressed write to {target} ({sha256})")
+        return sha256, True
+
+    def copy(self, src: Union[str, os.PathLike], dest: Union[str, os.PathLike]) -> str:
+        """Copy ``src`` to ``dest``: a reflink of its blob where supported, else one pass over the data."""
+        sha256 = self.hash_of(src)
+        if os.path.exists(dest) and self.lookup(dest) == sha256:
+            return sha256
+
+        previous = self.lookup(dest) if os.path.exists(dest) else None
+        if self.reflinks:
+            def write(f):
+                with open(src, "rb") as source:
+                    shutil.copyfileobj(source, f)
+
+            blob = self._store_blob(sha256, write, verify=True)
+            self._place(blob, dest)
+        else:
+            def copy_to(tmp_path):
+                with open(src, "rb") as source:
+                    copied = self._write_direct(tmp_path, iter(lambda: source.read(1024 * 1024), b""))
+                if copied != sha256:
+                    raise RuntimeError("Content changed while it was being copied")
+
+            self._write_path(dest, copy_to)
+        self._record(dest, sha256)
+        self._release(previous)
+        return sha256
+
+    def delete(self, target: Union[str, os.PathLike]):
+        """Delete a path and release its blob if it was the last reference."""
+        sha256 = self.lookup(target)
+        os.remove(target)
+        self.forget(target)
+        self._release(sha256)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
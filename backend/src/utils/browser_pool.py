@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .resource_policy import ResourcePolicy
+
+try:
+    from playwright.async_api import async_playwright
+except ImportError:
+    async_playwright = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 1
+# Chromium leaks memory over long sessions; recycle after this many pages
+DEFAULT_MAX_PAGES_PER_BROWSER = 100
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.active_contexts = 0
+        self.retiring = False
+
+    @property
+    def healthy(self) -> bool:
+        return not self.retiring and self.browser.is_connected()
+
+
+class BrowserPool:
+    """
+    Long-lived Chromium processes shared by every browser-based tool.
+
+    Callers get a fresh, isolated ``BrowserContext`` per call (cheap, no
+    process launch) and release it when done. Browsers are health-checked
+    before use, replaced if they crashed, and retired once they have served
+    ``max_pages_per_browser`` pages and their open contexts are released.
+
+    ``resource_policy`` is the default request filter for scraping callers;
+    pass it (or another policy) to ``acquire_context`` to install it.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE,
+                 max_pages_per_browser: int = DEFAULT_MAX_PAGES_PER_BROWSER,
+                 launch_options: Optional[Dict[str, Any]] = None,
+                 resource_policy: Optional[ResourcePolicy] = None):
+        self.size = max(size, 1)
+        self.resource_policy = resource_policy or ResourcePolicy()
+        self.max_pages_per_browser = max_pages_per_browser
+        self.launch_options = {"headless": True, **(launch_options or {})}
+        self.browsers: List[_PooledBrowser] = []
+        self._owners: Dict[Any, _PooledBrowser] = {}
+        self._playwright = None
+        self._lock = asyncio.Lock()
+        self.launches = 0
+
+    @property
+    def is_available(self) -> bool:
+        return async_playwright is not None
+
+    async def _launch(self) -> _PooledBrowser:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        browser = await self._playwright.chromium.launch(**self.launch_options)
+        self.launches += 1
+        logger.info(f"Browser pool launched Chromium ({len(self.browsers) + 1}/{self.size})")
+        return _PooledBrowser(browser)
+
+    async def _retire(self, pooled: _PooledBrowser):
+        if pooled in self.browsers:
+            self.browsers.remove(pooled)
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.debug(f"Error closing retired browser: {e}")
+
+    async def _pick(self) -> _PooledBrowser:
+        async with self._lock:
+            for pooled in list(self.browsers):
+                if not pooled.browser.is_connected():
+                    logger.warning("Browser pool replacing a disconnected browser")
+                    self.browsers.remove(pooled)
+                elif pooled.retiring and pooled.active_contexts == 0:
+                    await self._retire(pooled)
+
+            # Retiring browsers keep serving their open contexts but take no new ones
+            candidates = [b for b in self.browsers if b.healthy]
+            if len(candidates) < self.size:
+                pooled = await self._launch()
+                self.browsers.append(pooled)
+                return pooled
+            return min(candidates, key=lambda b: b.active_contexts)
+
+    def _count_page(self, pooled: _PooledBrowser):
+        pooled.pages_served += 1
+        if pooled.pages_served >= self.max_pages_per_browser:
+            pooled.retiring = True
+
+    async def acquire_context(self, policy: Optional[ResourcePolicy] = None, **context_options):
+        """Open a new isolated context on a pooled browser. Pair with release_context."""
+        if async_playwright is None:
+            raise RuntimeError("playwright library not installed.")
+        pooled = await self._pick()
+        context = await pooled.browser.new_context(**context_options)
+        if policy is not None:
+            await policy.apply(context)
+        context.on("page", lambda _page: self._count_page(pooled))
+        pooled.active_contexts += 1
+        self._owners[context] = pooled
+        return context
+
+    async def release_context(self, context):
+        """Close a context; retires its browser if it is due for recycling."""
+        pooled = self._owners.pop(context, None)
+        try:
+            await context.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser context: {e}")
+        if pooled is None:
+            return
+        pooled.active_contexts -= 1
+        if pooled.retiring and pooled.active_contexts == 0:
+            async with self._lock:
+                await self._retire(pooled)
+
+    @asynccontextmanager
+    async def context(self, policy: Optional[ResourcePolicy] = None, **context_options) -> AsyncIterator[Any]:
+        """``async with pool.context() as ctx`` for single-call use."""
+        context = await self.acquire_context(policy, **context_options)
+        try:
+            yield context
+        finally:
+            await self.release_context(context)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "browsers": len(self.browsers),
+            "launches": self.launches,
+            "active_contexts": sum(b.active_contexts for b in self.browsers),
+            "pages_served": [b.pages_served for b in self.browsers],
+            "requests_blocked": self.resource_policy.blocked,
+        }
+
+    async def close(self):
+        for context in list(self._owners):
+            await self.release_context(context)
+        for pooled in list(self.browsers):
+            await self._retire(pooled)
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+_pool: Optional[BrowserPool] = None
+
+
+def configure_browser_pool(**options) -> BrowserPool:
+    """Create the process-wide pool with explicit settings (call once at startup)."""
+    global _pool
+    _pool = BrowserPool(**options)
+    return _pool
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the process-wide pool, creating it with defaults if needed."""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool()
+    return _pool
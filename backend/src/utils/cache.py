@@ -0,0 +1,149 @@
+import re
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTL = 600
+
+_MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query, for cache keys."""
+    return re.sub(r"\s+", " ", (query or "").strip()).casefold()
+
+
+class TTLCache:
+    """
+    In-memory, size-bounded LRU cache whose entries expire after a TTL.
+
+    ``get_or_set`` also coalesces concurrent misses on the same key, so a
+    burst of identical calls runs the underlying work once.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL):
+        self.max_entries = max(max_entries, 1)
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._entries.get(key)
+        return item is not None and item[0] > time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._entries.get(key)
+        if item is not None:
+            expires_at, value = item
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return value
+            del self._entries[key]
+            self._expirations += 1
+        self._misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def delete(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_set(self, key: Hashable, factory: Callable[[], Awaitable[Any]],
+                         ttl: Optional[float] = None,
+                         cacheable: Callable[[Any], bool] = lambda value: True) -> Tuple[Any, bool]:
+        """
+        Return ``(value, cached)`` for ``key``, awaiting ``factory()`` on a
+        miss. Results rejected by ``cacheable`` (e.g. errors) are returned
+        but not stored.
+        """
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value, True
+
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            self._coalesced += 1
+            try:
+                return await asyncio.shield(pending), True
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    # This caller was cancelled, not the one computing the value
+                    raise
+                # The caller computing it was cancelled; compute it here instead
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            value = await factory()
+        except asyncio.CancelledError:
+            # Cancellation belongs to this caller alone; waiters retry
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if cacheable(value):
+                self.set(key, value, ttl)
+            return value, False
+        finally:
+            self._pending.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "coalesced": self._coalesced,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
+
+
+_search_cache: Optional[TTLCache] = None
+
+
+def configure_search_cache(**options) -> TTLCache:
+    """Create the process-wide search result cache (call once at startup)."""
+    global _search_cache
+    _search_cache = TTLCache(**options)
+    return _search_cache
+
+
+def get_search_cache() -> Optional[TTLCache]:
+    """Return the search result cache, or None when caching is disabled."""
+    return _search_cache
@@ -0,0 +1,118 @@
+"""
+Result shaping and open-cursor bookkeeping shared by the database integrations.
+"""
+import time
+import uuid
+import base64
+import asyncio
+import datetime
+import decimal
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 10000
+DEFAULT_MAX_CURSORS = 8
+# Idle seconds before an open cursor is closed
+DEFAULT_CURSOR_TTL = 300
+LAYOUTS = ("columnar", "rows")
+
+_PLAIN = (str, int, float, bool, type(None))
+
+
+def json_value(value: Any) -> Any:
+    """A JSON-serializable form of a database value."""
+    if isinstance(value, _PLAIN):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return [json_value(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): json_value(v) for k, v in value.items()}
+    return str(value)
+
+
+def format_rows(columns: List[str], rows: Sequence[Sequence[Any]], layout: str = "columnar") -> Dict[str, Any]:
+    """
+    Shape a page of rows. ``columnar`` lists each column's values together
+    ({"columns": [...], "data": [[col0...], [col1...]]}), so names appear once
+    and each list is homogeneous; ``rows`` keeps one array per row.
+    """
+    if layout == "rows":
+        return {"columns": columns, "rows": [[json_value(v) for v in row] for row in rows]}
+    return {"columns": columns, "data": [[json_value(row[i]) for row in rows] for i in range(len(columns))]}
+
+
+def page_size(value: Any) -> int:
+    return max(1, min(int(value or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+
+
+class _Entry:
+    def __init__(self, state: Any, release: Callable[[], Awaitable[None]]):
+        self.state = state
+        self.release = release
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()
+
+
+class CursorStore:
+    """
+    Open result cursors handed out as opaque ids. A cursor is closed (its
+    ``release`` awaited) when exhausted, after ``ttl`` idle seconds, or
+    least-recently-used first beyond ``max_cursors``.
+    """
+
+    def __init__(self, max_cursors: int = DEFAULT_MAX_CURSORS, ttl: float = DEFAULT_CURSOR_TTL):
+        self.max_cursors = max(max_cursors, 1)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def add(self, state: Any, release: Callable[[], Awaitable[None]]) -> str:
+        await self._expire()
+        while len(self._entries) >= self.max_cursors:
+            oldest = next(iter(self._entries))
+            await self.close(oldest)
+        cursor_id = uuid.uuid4().hex
+        self._entries[cursor_id] = _Entry(state, release)
+        return cursor_id
+
+    async def use(self, cursor_id: str, fn: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run ``fn(state)`` for a cursor, one caller at a time; raises KeyError for unknown ids."""
+        await self._expire()
+        entry = self._entries.get(cursor_id)
+        if entry is None:
+            raise KeyError(f"Unknown or expired cursor: {cursor_id}")
+        async with entry.lock:
+            self._entries.move_to_end(cursor_id)
+            entry.last_used = time.monotonic()
+            return await fn(entry.state)
+
+    async def close(self, cursor_id: str) -> bool:
+        entry = self._entries.pop(cursor_id, None)
+        if entry is None:
+            return False
+        try:
+            await entry.release()
+        except Exception:
+            pass
+        return True
+
+    async def close_all(self):
+        for cursor_id in list(self._entries):
+            await self.close(cursor_id)
+
+    async def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for cursor_id, entry in list(self._entries.items()):
+            if entry.last_used < cutoff and not entry.lock.locked():
+                await self.close(cursor_id)
@@ -0,0 +1,223 @@
+"""
+Document to Markdown conversion with an on-disk cache.
+
+Conversions run in worker processes (see ``convert_document``) and write
+their output as one Markdown file per page into a cache entry keyed by the
+document's SHA-256 and the converter's version, so a document is converted
+once however often or under whatever name it is requested. PDFs are
+converted page by page straight from the file, keeping memory bounded for
+huge documents; other formats go through MarkItDown as a single page.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from .transfer import file_sha256
+
+logger = logging.getLogger(__name__)
+
+try:
+    from markitdown import MarkItDown, __version__ as MARKITDOWN_VERSION
+except ImportError:
+    MarkItDown = None
+    MARKITDOWN_VERSION = None
+
+try:
+    import pdfminer
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+except ImportError:
+    pdfminer = None
+
+# Bump when the Markdown produced for the same input changes
+FORMAT_VERSION = 1
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024
+TEXT_EXTENSIONS = (".md", ".markdown", ".txt")
+PAGE_FILE = "page-{:06d}.md"
+META_FILE = "meta.json"
+# Written by a PDF conversion before its first page, for progress reports
+TOTAL_FILE = "total"
+
+_markitdown = None
+
+
+def converter_for(path: str) -> Optional[Tuple[str, str]]:
+    """(converter, version) that will handle ``path``, or None if none is installed."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in TEXT_EXTENSIONS:
+        return "text", str(FORMAT_VERSION)
+    if extension == ".pdf" and pdfminer is not None:
+        return "pdfminer", f"{pdfminer.__version__}.{FORMAT_VERSION}"
+    if MarkItDown is not None:
+        return "markitdown", f"{MARKITDOWN_VERSION}.{FORMAT_VERSION}"
+    return None
+
+
+def _pdf_pages(path: str, out_dir: str) -> int:
+    with open(path, "rb") as f:
+        try:
+            total = resolve1(resolve1(PDFDocument(PDFParser(f)).catalog["Pages"])["Count"])
+            with open(os.path.join(out_dir, TOTAL_FILE), "w") as t:
+                t.write(str(int(total)))
+        except Exception:
+            pass
+        f.seek(0)
+        count = 0
+        # extract_pages parses lazily, one page at a time
+        for count, page in enumerate(extract_pages(f), 1):
+            text = "".join(element.get_text() for element in page if isinstance(element, LTTextContainer))
+            with open(os.path.join(out_dir, PAGE_FILE.format(count)), "w", encoding="utf-8") as out:
+                out.write(text.strip() + "\n")
+    return count
+
+
+def convert_document(path: str, converter: str, out_dir: str) -> Dict[str, Any]:
+    """Convert ``path`` into page files under ``out_dir``. Runs in a worker process."""
+    global _markitdown
+    title = None
+    if converter == "text":
+        shutil.copyfile(path, os.path.join(out_dir, PAGE_FILE.format(1)))
+        pages = 1
+    elif converter == "pdfminer":
+        pages = _pdf_pages(path, out_dir)
+    else:
+        if _markitdown is None:
+            _markitdown = MarkItDown(enable_plugins=False)
+        result = _markitdown.convert(path)
+        with open(os.path.join(out_dir, PAGE_FILE.format(1)), "w", encoding="utf-8") as out:
+            out.write(result.markdown)
+        title = result.title
+        pages = 1
+    return {"pages": pages, "title": title}
+
+
+class ConversionCache:
+    """
+    Cache entries live in ``<cache_dir>/<key[:2]>/<key>/`` and are built in a
+    temporary directory that is renamed into place when complete, so readers
+    never see half a conversion. Entries are evicted least recently used
+    (by ``meta.json`` mtime, refreshed on hits) beyond ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        # (path, size, mtime_ns, inode) -> sha256, so unchanged files aren't re-hashed
+        self._hashes: Dict[Tuple[str, int, int, int], str] = {}
+
+    def content_hash(self, path: str) -> str:
+        st = os.stat(path)
+        stamp = (os.path.realpath(path), st.st_size, st.st_mtime_ns, st.st_ino)
+        sha = self._hashes.get(stamp)
+        if sha is None:
+            sha = file_sha256(path)
+            if len(self._hashes) > 10000:
+                self._hashes.clear()
+            self._hashes[stamp] = sha
+        return sha
+
+    @staticmethod
+    def key(sha256: str, converter: str, version: str) -> str:
+        return hashlib.sha256(f"{sha256}:{converter}:{version}".encode()).hexdigest()
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        meta_path = os.path.join(self.entry_dir(key), META_FILE)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def begin(self) -> str:
+        return tempfile.mkdtemp(prefix=".tmp-", dir=self.cache_dir)
+
+    def commit(self, key: str, tmp_dir: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+        meta["bytes"] = sum(e.stat().st_size for e in os.scandir(tmp_dir) if e.is_file())
+        with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+            json.dump(meta, f)
+        final = self.entry_dir(key)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        try:
+            os.rename(tmp_dir, final)
+        except OSError:
+            # Another conversion of the same content finished first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        # The caller is about to read this entry, even if it alone exceeds max_bytes
+        self.evict(keep=key)
+        return meta
+
+    def read_pages(self, key: str, start: int, count: int, max_chars: int) -> List[str]:
+        """Pages ``start``.. (1-based), stopping before ``max_chars`` is exceeded but returning at least one."""
+        pages = []
+        used = 0
+        for number in range(start, start + count):
+            try:
+                with open(os.path.join(self.entry_dir(key), PAGE_FILE.format(number)), encoding="utf-8") as f:
+                    text = f.read()
+            except FileNotFoundError:
+                break
+            if pages and used + len(text) > max_chars:
+                break
+            pages.append(text)
+            used += len(text)
+        return pages
+
+    def evict(self, keep: Optional[str] = None):
+        """Remove least recently used entries beyond ``max_bytes``, never the entry ``keep``."""
+        entries = []
+        total = 0
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir() or shard.name.startswith("."):
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    meta_path = os.path.join(entry.path, META_FILE)
+                    with open(meta_path) as f:
+                        size = json.load(f).get("bytes", 0)
+                    entries.append((os.stat(meta_path).st_mtime, size, entry.path))
+                    total += size
+                except (OSError, ValueError):
+                    continue
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(path) == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear_stale(self, max_age: float = 3600):
+        """Remove temporary directories left behind by interrupted conversions."""
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith(".tmp-") and time.time() - entry.stat().st_mtime > max_age:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def count_pages(tmp_dir: str) -> Tuple[int, Optional[int]]:
+    """Pages written so far by a running conversion, and its total when known."""
+    try:
+        names = os.listdir(tmp_dir)
+    except OSError:
+        return 0, None
+    total = None
+    if TOTAL_FILE in names:
+        try:
+            with open(os.path.join(tmp_dir, TOTAL_FILE)) as f:
+                total = int(f.read())
+        except (OSError, ValueError):
+            pass
+    return sum(1 for n in names if n.startswith("page-")), total
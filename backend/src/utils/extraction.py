@@ -0,0 +1,482 @@
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urljoin
+
+from .html_text import extract_text
+
+# Never content
+DROP_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "object", "embed",
+             "head", "link", "meta", "button", "select", "input", "textarea", "dialog"}
+# Page chrome around the content
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "form", "menu"}
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "dialog", "alert"}
+_BOILERPLATE_ATTR = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|footer|sidebar|breadcrumbs?|cookie|consent|banner|advert|ads?|promo|"
+    r"share|sharing|social|comments?|related|popup|modal|newsletter|subscribe|skip-link|toolbar)($|[\s_-])",
+    re.IGNORECASE,
+)
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+             "source", "track", "wbr"}
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "body", "dd", "details", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "html",
+    "li", "main", "nav", "ol", "p", "pre", "section", "summary", "table", "tbody", "td", "tfoot", "th",
+    "thead", "tr", "ul",
+}
+# Opening one of these implicitly closes an open <p>
+_CLOSES_P = BLOCK_TAGS - {"body", "html", "td", "th", "tr", "tbody", "thead", "tfoot", "li", "dd", "dt"}
+
+FORMATS = ("markdown", "text", "html")
+LINK_MODES = ("inline", "summary", "none")
+IMAGE_MODES = ("inline", "alt", "summary", "none")
+# Rough size of a token for budget purposes
+CHARS_PER_TOKEN = 4
+DEFAULT_MAX_CHARS = 20000
+MAX_SUMMARY_ITEMS = 100
+
+
+class Node:
+    __slots__ = ("tag", "attrs", "children", "parent", "_text_len", "_link_len")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Node"] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List[Union["Node", str]] = []
+        self.parent = parent
+        self._text_len: Optional[int] = None
+        self._link_len: Optional[int] = None
+
+    def text_len(self) -> int:
+        if self._text_len is None:
+            self._text_len = sum(
+                c.text_len() if isinstance(c, Node) else len(c.strip()) for c in self.children
+            )
+        return self._text_len
+
+    def link_len(self) -> int:
+        if self._link_len is None:
+            if self.tag == "a":
+                self._link_len = self.text_len()
+            else:
+                self._link_len = sum(c.link_len() for c in self.children if isinstance(c, Node))
+        return self._link_len
+
+    def iter(self):
+        yield self
+        for child in self.children:
+            if isinstance(child, Node):
+                yield from child.iter()
+
+    def text(self) -> str:
+        return "".join(c.text() if isinstance(c, Node) else c for c in self.children)
+
+
+class _TreeBuilder(HTMLParser):
+    """Tolerant HTML to Node tree, with implied end tags for <p>, <li> and table cells."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#root", {})
+        self.stack = [self.root]
+        self.title: Optional[str] = None
+        self._in_title = False
+
+    def _close(self, tag: str):
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def _open_in_scope(self, tag: str, boundary: set) -> bool:
+        for node in reversed(self.stack):
+            if node.tag == tag:
+                return True
+            if node.tag in boundary:
+                return False
+        return False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+            return
+        if (tag == "body" or tag in BLOCK_TAGS) and self._open_in_scope("head", set()):
+            # Content without </head>; never let it end up inside the dropped <head>
+            self._close("head")
+        if tag in _CLOSES_P and self._open_in_scope("p", {"div", "td", "th", "li", "blockquote"}):
+            self._close("p")
+        if tag == "li" and self._open_in_scope("li", {"ul", "ol"}):
+            self._close("li")
+        if tag in ("dt", "dd"):
+            for other in ("dt", "dd"):
+                if self._open_in_scope(other, {"dl"}):
+                    self._close(other)
+        if tag in ("td", "th"):
+            for other in ("td", "th"):
+                if self._open_in_scope(other, {"tr", "table"}):
+                    self._close(other)
+        if tag == "tr" and self._open_in_scope("tr", {"table"}):
+            self._close("tr")
+
+        node = Node(tag, {k: (v or "") for k, v in attrs}, self.stack[-1])
+        self.stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        node = Node(tag, {k: (v or "") for k, v in attrs}, self.stack[-1])
+        self.stack[-1].children.append(node)
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag not in VOID_TAGS:
+            self._close(tag)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title = (self.title or "") + data
+        else:
+            self.stack[-1].children.append(data)
+
+
+def parse(html: str) -> Tuple[Node, Optional[str]]:
+    builder = _TreeBuilder()
+    try:
+        builder.feed(html)
+        builder.close()
+    except Exception:
+        # Keep whatever was parsed before the failure
+        pass
+    title = re.sub(r"\s+", " ", builder.title).strip() if builder.title else None
+    return builder.root, title
+
+
+# --- Boilerplate and main content ---
+
+def _role(node: Node) -> str:
+    return node.attrs.get("role", "").lower()
+
+
+def _within(node: Node, tags: set) -> bool:
+    parent = node.parent
+    while parent is not None:
+        if parent.tag in tags:
+            return True
+        parent = parent.parent
+    return False
+
+
+def _hidden(node: Node) -> bool:
+    attrs = node.attrs
+    if "hidden" in attrs or attrs.get("aria-hidden") == "true":
+        return True
+    style = attrs.get("style", "").replace(" ", "").lower()
+    return "display:none" in style or "visibility:hidden" in style
+
+
+def _boilerplate(node: Node) -> bool:
+    if node.tag in ("header", "footer") and _within(node, {"article", "main"}):
+        # An article's own header holds its title and byline
+        return False
+    if node.tag in BOILERPLATE_TAGS or _role(node) in BOILERPLATE_ROLES:
+        return True
+    marker = f"{node.attrs.get('id', '')} {node.attrs.get('class', '')}"
+    # Content wrappers often carry words like "related" in long class lists; only
+    # treat the node as chrome when it is also link-heavy or short
+    if marker.strip() and _BOILERPLATE_ATTR.search(marker):
+        text = node.text_len()
+        return text < 200 or node.link_len() > 0.5 * text
+    return False
+
+
+def _prune(node: Node, strip_boilerplate: bool):
+    kept = []
+    for child in node.children:
+        if isinstance(child, Node):
+            if child.tag in DROP_TAGS or _hidden(child):
+                continue
+            if strip_boilerplate and _boilerplate(child):
+                continue
+            _prune(child, strip_boilerplate)
+        kept.append(child)
+    node.children = kept
+    node._text_len = node._link_len = None
+
+
+def find_main_content(root: Node) -> Node:
+    """
+    Pick the node holding the main content: the largest <main>/<article>
+    (or role=main) if it carries real text, otherwise the block that
+    accumulates the most paragraph text with the lowest link density.
+    """
+    body = next((n for n in root.iter() if n.tag == "body"), root)
+    total = max(body.text_len(), 1)
+
+    marked = [n for n in body.iter() if n.tag in ("main", "article") or _role(n) == "main"]
+    if marked:
+        best = max(marked, key=lambda n: n.text_len())
+        if best.text_len() >= min(200, total * 0.5):
+            return best
+
+    scores: Dict[int, float] = {}
+    nodes: Dict[int, Node] = {}
+    for node in body.iter():
+        if node.tag not in ("p", "pre", "td", "blockquote", "li"):
+            continue
+        length = node.text_len()
+        if length < 25:
+            continue
+        score = 1 + node.text().count(",") + min(length / 100, 3)
+        parent = node.parent
+        for weight in (1.0, 0.5):
+            if parent is None or parent is root:
+                break
+            scores[id(parent)] = scores.get(id(parent), 0) + score * weight
+            nodes[id(parent)] = parent
+            parent = parent.parent
+
+    best, best_score = None, 0.0
+    for key, score in scores.items():
+        node = nodes[key]
+        density = node.link_len() / max(node.text_len(), 1)
+        score *= 1 - min(density, 0.9)
+        if score > best_score:
+            best, best_score = node, score
+    if best is None or best.text_len() < total * 0.2:
+        return body
+    return best
+
+
+# --- Markdown ---
+
+class _MarkdownRenderer:
+    def __init__(self, base_url: Optional[str], links: str, images: str, plain: bool = False):
+        self.base_url = base_url
+        # Plain text: no Markdown emphasis, heading or code markers
+        self.plain = plain
+        self.link_mode = links
+        self.image_mode = images
+        self.links: List[Dict[str, Any]] = []
+        self.images: List[Dict[str, str]] = []
+        self._link_refs: Dict[str, int] = {}
+
+    def _url(self, value: str) -> Optional[str]:
+        value = value.strip()
+        if not value or value.startswith(("javascript:", "data:", "#")):
+            return None
+        return urljoin(self.base_url, value) if self.base_url else value
+
+    # Inline content
+
+    def inline(self, node: Union[Node, str]) -> str:
+        if isinstance(node, str):
+            return re.sub(r"\s+", " ", node)
+        tag = node.tag
+        if tag == "br":
+            return "\n"
+        if tag == "img":
+            return self._image(node)
+        content = "".join(self.inline(c) for c in node.children)
+        if tag == "a":
+            return self._link(node, content)
+        marker = {"strong": "**", "b": "**", "em": "*", "i": "*", "code": "`", "del": "~~", "s": "~~"}.get(tag)
+        if marker is None or self.plain or not content.strip():
+            return content
+        return _wrap(content, marker, marker)
+
+    def _link(self, node: Node, content: str) -> str:
+        text = content.strip()
+        url = self._url(node.attrs.get("href", ""))
+        if not url or not text or self.link_mode == "none":
+            return content
+        if self.link_mode == "inline":
+            return _wrap(content, "[", f"]({url})")
+        ref = self._link_refs.get(url)
+        if ref is None:
+            ref = len(self.links) + 1
+            self._link_refs[url] = ref
+            self.links.append({"ref": ref, "text": text, "url": url})
+        return _wrap(content, "", f"[{ref}]")
+
+    def _image(self, node: Node) -> str:
+        alt = re.sub(r"\s+", " ", node.attrs.get("alt", "")).strip()
+        src = self._url(node.attrs.get("src", ""))
+        if self.image_mode == "none" or not src:
+            return ""
+        if self.image_mode == "inline":
+            return f"![{alt}]({src})"
+        if self.image_mode == "summary":
+            if len(self.images) < MAX_SUMMARY_ITEMS:
+                self.images.append({"alt": alt, "url": src})
+            return ""
+        return f"[image: {alt}]" if alt else ""
+
+    # Block content
+
+    def blocks(self, node: Node) -> List[str]:
+        out: List[str] = []
+        run: List[str] = []
+
+        def flush():
+            text = _clean_inline("".join(run))
+            if text:
+                out.append(text)
+            run.clear()
+
+        for child in node.children:
+            if isinstance(child, Node) and (child.tag in BLOCK_TAGS or child.tag in ("table", "pre")):
+                flush()
+                out.extend(self.block(child))
+            else:
+                run.append(self.inline(child))
+        flush()
+        return out
+
+    def block(self, node: Node) -> List[str]:
+        tag = node.tag
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            text = _clean_inline("".join(self.inline(c) for c in node.children)).replace("\n", " ")
+            if not text:
+                return []
+            return [text] if self.plain else [f"{'#' * int(tag[1])} {text}"]
+        if tag == "hr":
+            return [] if self.plain else ["---"]
+        if tag == "pre":
+            code = node.text().strip("\n")
+            if not code.strip():
+                return []
+            return [code] if self.plain else [f"```\n{code}\n```"]
+        if tag == "blockquote":
+            inner = "\n\n".join(self.blocks(node))
+            return ["\n".join(f"> {line}" if line else ">" for line in inner.splitlines())] if inner else []
+        if tag in ("ul", "ol"):
+            return self._list(node, ordered=tag == "ol")
+        if tag == "table":
+            return self._table(node)
+        return self.blocks(node)
+
+    def _list(self, node: Node, ordered: bool) -> List[str]:
+        lines = []
+        number = 1
+        for child in node.children:
+            if not isinstance(child, Node) or child.tag != "li":
+                continue
+            marker = f"{number}." if ordered else "-"
+            number += 1
+            body = "\n".join(self.blocks(child))
+            if not body:
+                continue
+            first, *rest = body.splitlines()
+            lines.append(f"{marker} {first}")
+            lines.extend(f"   {line}" if line else "" for line in rest)
+        return ["\n".join(lines)] if lines else []
+
+    def _table(self, node: Node) -> List[str]:
+        rows = []
+        for tr in node.iter():
+            if tr.tag != "tr":
+                continue
+            cells = [c for c in tr.children if isinstance(c, Node) and c.tag in ("td", "th")]
+            row = [_clean_inline("".join(self.inline(c) for c in cell.children)).replace("\n", " ").replace("|", "\\|")
+                   for cell in cells]
+            if any(row):
+                rows.append(row)
+        if not rows:
+            return []
+        width = max(len(r) for r in rows)
+        rows = [r + [""] * (width - len(r)) for r in rows]
+        lines = ["| " + " | ".join(rows[0]) + " |", "|" + " --- |" * width]
+        lines.extend("| " + " | ".join(r) + " |" for r in rows[1:])
+        return ["\n".join(lines)]
+
+
+def _wrap(content: str, before: str, after: str) -> str:
+    """Wrap the non-blank part of ``content``, keeping its surrounding whitespace outside."""
+    stripped = content.strip()
+    lead = content[:len(content) - len(content.lstrip())]
+    trail = content[len(content.rstrip()):]
+    return f"{lead}{before}{stripped}{after}{trail}"
+
+
+def _clean_inline(text: str) -> str:
+    lines = (re.sub(r"[ \t]+", " ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+# --- Budget and pagination ---
+
+def paginate(content: str, offset: int, max_chars: int) -> Tuple[str, Optional[int]]:
+    """Cut ``content`` at ``offset`` to at most ``max_chars``, preferring block boundaries."""
+    offset = min(max(offset, 0), len(content))
+    end = offset + max_chars
+    if end >= len(content):
+        return content[offset:], None
+    window = content[offset:end]
+    for separator in ("\n\n", "\n", " "):
+        cut = window.rfind(separator)
+        if cut >= max_chars // 2:
+            return window[:cut], offset + cut + len(separator)
+    return window, end
+
+
+def extract_content(html: str, url: Optional[str] = None, format: str = "markdown", main_only: bool = True,
+                    links: str = "inline", images: str = "alt", max_chars: Optional[int] = None,
+                    max_tokens: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Reduce an HTML page to readable content within a size budget.
+
+    ``format`` is "markdown" (default), "text" or "html" (raw, only paged).
+    Boilerplate (navigation, headers, footers, cookie banners, hidden and
+    scripted elements) is removed and, with ``main_only``, only the main
+    content block is kept. ``links`` and ``images`` select how they appear:
+    inline, as numbered references/summary lists returned alongside, as alt
+    text only (images), or not at all. The budget is ``max_chars``, or
+    ``max_tokens`` at ~4 characters per token; pass the returned
+    ``next_cursor`` as ``cursor`` to continue.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    if links not in LINK_MODES:
+        raise ValueError(f"links must be one of: {', '.join(LINK_MODES)}")
+    if images not in IMAGE_MODES:
+        raise ValueError(f"images must be one of: {', '.join(IMAGE_MODES)}")
+    if max_chars is None:
+        max_chars = max_tokens * CHARS_PER_TOKEN if max_tokens else DEFAULT_MAX_CHARS
+    max_chars = max(int(max_chars), 100)
+    try:
+        offset = int(cursor) if cursor else 0
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    result: Dict[str, Any] = {"url": url, "format": format, "html_bytes": len(html.encode("utf-8"))}
+    if format == "html":
+        content = html
+        result["title"] = None
+    else:
+        root, title = parse(html)
+        result["title"] = title
+        if format == "markdown":
+            renderer = _MarkdownRenderer(url, links, images)
+        else:
+            renderer = _MarkdownRenderer(url, "none", "none", plain=True)
+        try:
+            _prune(root, strip_boilerplate=main_only)
+            main = find_main_content(root) if main_only else root
+            content = "\n\n".join(renderer.blocks(main))
+        except RecursionError:
+            # Pathologically deep markup; fall back to the flat text extractor
+            content = extract_text(html)
+        if renderer.links and offset == 0:
+            result["links"] = renderer.links[:MAX_SUMMARY_ITEMS]
+        if renderer.images and offset == 0:
+            result["images"] = renderer.images
+
+    page, next_offset = paginate(content, offset, max_chars)
+    result.update({
+        "content": page,
+        "offset": offset,
+        "total_chars": len(content),
+        "next_cursor": str(next_offset) if next_offset is not None else None,
+    })
+    return result
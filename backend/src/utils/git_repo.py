@@ -0,0 +1,409 @@
+"""
+Long-lived access to git repositories through the git binary.
+
+Each open repository keeps a ``git cat-file --batch`` process, so pack
+indexes are loaded once rather than on every call, plus LRU caches of parsed
+commits and trees. Objects are immutable, so the caches never need
+invalidating; refs are resolved again on every call.
+"""
+import os
+import re
+import json
+import heapq
+import base64
+import asyncio
+import datetime
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_REPOS = 8
+DEFAULT_COMMIT_CACHE = 20000
+DEFAULT_TREE_CACHE = 2000
+# Commits examined per log call when filtering by path, before returning a cursor
+DEFAULT_SCAN_BUDGET = 20000
+
+_SHA = re.compile(r"[0-9a-f]{40}(?:[0-9a-f]{24})?")
+
+
+class GitError(RuntimeError):
+    pass
+
+
+class _LRU(OrderedDict):
+    def __init__(self, max_entries: int):
+        super().__init__()
+        self.max_entries = max_entries
+
+    def lookup(self, key):
+        value = self.get(key)
+        if value is not None:
+            self.move_to_end(key)
+        return value
+
+    def store(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        if len(self) > self.max_entries:
+            self.popitem(last=False)
+
+
+def _signature(line: str) -> Dict[str, Any]:
+    """Parse "Name <email> 1700000000 +0100"."""
+    name, _, rest = line.partition(" <")
+    email, _, stamp = rest.partition("> ")
+    seconds, _, offset = stamp.partition(" ")
+    try:
+        sign = -1 if offset.startswith("-") else 1
+        tz = datetime.timezone(sign * datetime.timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5])))
+        date = datetime.datetime.fromtimestamp(int(seconds), tz).isoformat()
+    except (ValueError, IndexError):
+        date = None
+    return {"name": name, "email": email, "time": int(seconds) if seconds.isdigit() else 0, "date": date}
+
+
+def parse_commit(sha: str, data: bytes) -> Dict[str, Any]:
+    header, _, message = data.decode(errors="replace").partition("\n\n")
+    commit: Dict[str, Any] = {"sha": sha, "parents": []}
+    for line in header.split("\n"):
+        key, _, value = line.partition(" ")
+        if key == "tree":
+            commit["tree"] = value
+        elif key == "parent":
+            commit["parents"].append(value)
+        elif key in ("author", "committer"):
+            commit[key] = _signature(value)
+    commit["message"] = message
+    return commit
+
+
+def parse_tree(data: bytes, hash_bytes: int) -> List[Tuple[str, str, str]]:
+    """(mode, name, sha) for each entry of a raw tree object."""
+    entries = []
+    pos = 0
+    while pos < len(data):
+        space = data.index(b" ", pos)
+        nul = data.index(b"\0", space)
+        sha = data[nul + 1:nul + 1 + hash_bytes].hex()
+        entries.append((data[pos:space].decode(), data[space + 1:nul].decode(errors="surrogateescape"), sha))
+        pos = nul + 1 + hash_bytes
+    return entries
+
+
+def entry_type(mode: str) -> str:
+    if mode == "40000":
+        return "tree"
+    if mode == "160000":
+        return "commit"
+    if mode == "120000":
+        return "symlink"
+    return "blob"
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(state, dict):
+        raise ValueError("Invalid cursor")
+    return state
+
+
+def _shas(value: Any) -> List[str]:
+    if not isinstance(value, list) or not all(isinstance(v, str) and _SHA.fullmatch(v) for v in value):
+        raise ValueError("Invalid cursor")
+    return value
+
+
+class _BatchProcess:
+    """A ``git cat-file`` batch process; requests are serialized by a lock."""
+
+    def __init__(self, root: str, mode: str):
+        self.root = root
+        self.mode = mode
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.lock = asyncio.Lock()
+
+    async def _ensure(self):
+        if self.proc is None or self.proc.returncode is not None:
+            self.proc = await asyncio.create_subprocess_exec(
+                "git", "-C", self.root, "cat-file", self.mode,
+                stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+
+    async def request(self, name: str) -> Optional[Tuple[str, str, int, Optional[bytes]]]:
+        """(sha, type, size, data) for an object name, or None if it doesn't exist."""
+        if "\n" in name:
+            raise ValueError("Object names can't contain newlines")
+        async with self.lock:
+            await self._ensure()
+            try:
+                self.proc.stdin.write(name.encode() + b"\n")
+                await self.proc.stdin.drain()
+                header = (await self.proc.stdout.readline()).decode().rstrip("\n")
+                if not header:
+                    raise GitError("git cat-file exited")
+                parts = header.split(" ")
+                if len(parts) != 3:
+                    # "<name> missing" or "<name> ambiguous"
+                    return None
+                sha, kind, size = parts[0], parts[1], int(parts[2])
+                data = None
+                if self.mode == "--batch":
+                    data = (await self.proc.stdout.readexactly(size + 1))[:-1]
+                return sha, kind, size, data
+            except (GitError, ConnectionError, asyncio.IncompleteReadError):
+                # Start over on the next request
+                await self.close()
+                raise GitError(f"git cat-file failed in {self.root}")
+
+    async def close(self):
+        if self.proc is not None and self.proc.returncode is None:
+            self.proc.stdin.close()
+            try:
+                await asyncio.wait_for(self.proc.wait(), 2)
+            except asyncio.TimeoutError:
+                self.proc.kill()
+                await self.proc.wait()
+        self.proc = None
+
+
+class GitRepo:
+    """An opened repository: batch object readers plus commit and tree caches."""
+
+    def __init__(self, root: str, git_dir: str, commit_cache: int = DEFAULT_COMMIT_CACHE,
+                 tree_cache: int = DEFAULT_TREE_CACHE):
+        self.root = root
+        self.git_dir = git_dir
+        self.objects = _BatchProcess(root, "--batch")
+        self.info = _BatchProcess(root, "--batch-check")
+        self.commits = _LRU(commit_cache)
+        self.trees = _LRU(tree_cache)
+        self.hash_bytes = 20
+        self.stats = {"commit_hits": 0, "commit_reads": 0, "tree_hits": 0, "tree_reads": 0}
+
+    @classmethod
+    async def open(cls, path: str, **options) -> "GitRepo":
+        out = await run_git(path, "rev-parse", "--absolute-git-dir", "--is-bare-repository", "--show-object-format")
+        git_dir, bare, object_format = out.split("\n")[:3]
+        root = path if bare == "true" else (await run_git(path, "rev-parse", "--show-toplevel")).strip()
+        repo = cls(root, git_dir, **options)
+        repo.hash_bytes = 32 if object_format.strip() == "sha256" else 20
+        return repo
+
+    async def read(self, name: str) -> Tuple[str, str, bytes]:
+        found = await self.objects.request(name)
+        if found is None:
+            raise GitError(f"Not found: {name}")
+        sha, kind, _, data = found
+        return sha, kind, data
+
+    async def object_info(self, name: str) -> Optional[Tuple[str, str, int]]:
+        found = await self.info.request(name)
+        return None if found is None else found[:3]
+
+    async def resolve(self, rev: str) -> str:
+        """Commit id for a revision expression (branch, tag, sha, HEAD~3, ...)."""
+        info = await self.object_info(f"{rev}^{{commit}}")
+        if info is None:
+            raise GitError(f"Unknown revision: {rev}")
+        return info[0]
+
+    async def commit(self, sha: str) -> Dict[str, Any]:
+        commit = self.commits.lookup(sha)
+        if commit is not None:
+            self.stats["commit_hits"] += 1
+            return commit
+        found_sha, kind, data = await self.read(sha)
+        if kind != "commit":
+            raise GitError(f"{sha} is a {kind}, not a commit")
+        commit = parse_commit(found_sha, data)
+        self.stats["commit_reads"] += 1
+        self.commits.store(found_sha, commit)
+        return commit
+
+    async def tree(self, sha: str) -> List[Tuple[str, str, str]]:
+        entries = self.trees.lookup(sha)
+        if entries is not None:
+            self.stats["tree_hits"] += 1
+            return entries
+        _, kind, data = await self.read(sha)
+        if kind != "tree":
+            raise GitError(f"{sha} is a {kind}, not a tree")
+        entries = parse_tree(data, self.hash_bytes)
+        self.stats["tree_reads"] += 1
+        self.trees.store(sha, entries)
+        return entries
+
+    async def entry(self, tree: str, path: str) -> Optional[Tuple[str, str]]:
+        """(mode, sha) of ``path`` inside a tree, through the tree cache."""
+        mode, sha = "40000", tree
+        for part in [p for p in path.strip("/").split("/") if p]:
+            if mode != "40000":
+                return None
+            for entry_mode, name, entry_sha in await self.tree(sha):
+                if name == part:
+                    mode, sha = entry_mode, entry_sha
+                    break
+            else:
+                return None
+        return mode, sha
+
+    async def log(self, rev: str = "HEAD", max_count: int = 50, cursor: Optional[str] = None,
+                  path: Optional[str] = None, scan_budget: int = DEFAULT_SCAN_BUDGET) -> Dict[str, Any]:
+        """
+        Commits newest first (by committer date, like ``git log``), a page
+        at a time. The cursor holds the walk's frontier, so the next page
+        continues where this one stopped instead of rescanning history,
+        plus the walked commits as new as the frontier, which a frontier
+        commit with the same committer date could otherwise reach again.
+        With ``path`` only commits that changed it are returned; at most
+        ``scan_budget`` commits are examined per call.
+        """
+        if cursor:
+            state = decode_cursor(cursor)
+            frontier, walked = _shas(state.get("frontier")), _shas(state.get("walked", []))
+            path = state.get("path")
+            if path is not None and not isinstance(path, str):
+                raise ValueError("Invalid cursor")
+        else:
+            frontier, walked = [await self.resolve(rev)], []
+        heap = []
+        seen = set(frontier) | set(walked)
+        for sha in frontier:
+            heapq.heappush(heap, (-(await self.commit(sha))["committer"]["time"], sha))
+
+        commits = []
+        scanned = 0
+        while heap and len(commits) < max_count and scanned < scan_budget:
+            _, sha = heapq.heappop(heap)
+            commit = await self.commit(sha)
+            walked.append(sha)
+            scanned += 1
+            if path is None or await self._touches(commit, path):
+                commits.append(commit)
+            for parent in commit["parents"]:
+                if parent not in seen:
+                    seen.add(parent)
+                    heapq.heappush(heap, (-(await self.commit(parent))["committer"]["time"], parent))
+
+        next_cursor = None
+        if heap:
+            # A parent is normally no newer than its children, so walked
+            # commits older than the whole frontier can't be reached again
+            newest = -heap[0][0]
+            walked = [sha for sha in walked if (await self.commit(sha))["committer"]["time"] >= newest]
+            next_cursor = encode_cursor({"frontier": [sha for _, sha in sorted(heap)], "walked": walked,
+                                         "path": path})
+        return {"commits": commits, "scanned": scanned, "cursor": next_cursor}
+
+    async def _touches(self, commit: Dict[str, Any], path: str) -> bool:
+        """Whether ``commit`` changed ``path`` relative to every parent (like git's history simplification)."""
+        here = await self.entry(commit["tree"], path)
+        if not commit["parents"]:
+            return here is not None
+        for parent in commit["parents"]:
+            if await self.entry((await self.commit(parent))["tree"], path) == here:
+                return False
+        return True
+
+    async def lines(self, *args: str, offset: int = 0, limit: int = 500) -> Tuple[List[str], bool]:
+        """
+        Lines ``offset`` to ``offset + limit`` of a git command's output. The
+        command is stopped once enough has been read, so later pages cost
+        proportionally more but no page reads the whole output.
+        """
+        return await run_git_lines(self.root, *args, offset=offset, limit=limit)
+
+    async def close(self):
+        await self.objects.close()
+        await self.info.close()
+
+
+async def run_git(cwd: str, *args: str) -> str:
+    proc = await asyncio.create_subprocess_exec(
+        "git", "-C", cwd, *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    out, err = await proc.communicate()
+    if proc.returncode != 0:
+        raise GitError(err.decode(errors="replace").strip() or f"git {args[0]} failed")
+    return out.decode(errors="replace")
+
+
+async def run_git_lines(cwd: str, *args: str, offset: int = 0, limit: int = 500) -> Tuple[List[str], bool]:
+    proc = await asyncio.create_subprocess_exec(
+        "git", "-C", cwd, *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    lines: List[str] = []
+    more = False
+    completed = False
+    index = 0
+    try:
+        while True:
+            line = await proc.stdout.readline()
+            if not line:
+                break
+            if index >= offset:
+                if len(lines) >= limit:
+                    more = True
+                    break
+                lines.append(line.decode(errors="replace").rstrip("\n"))
+            index += 1
+        completed = not more
+    finally:
+        if not completed and proc.returncode is None:
+            proc.kill()
+        err = await proc.stderr.read() if completed else b""
+        await proc.wait()
+    if completed and proc.returncode != 0:
+        raise GitError(err.decode(errors="replace").strip() or f"git {args[0]} failed")
+    return lines, more
+
+
+class RepoCache:
+    """
+    Opened repositories by worktree root, least recently used closed beyond
+    ``max_repos``. Paths inside a repository map to the same entry.
+    """
+
+    def __init__(self, max_repos: int = DEFAULT_MAX_REPOS, **repo_options):
+        self.max_repos = max(max_repos, 1)
+        self.repo_options = repo_options
+        self.repos: "OrderedDict[str, GitRepo]" = OrderedDict()
+        self._roots: Dict[str, str] = {}
+        self._opening: Dict[str, asyncio.Lock] = {}
+
+    async def get(self, path: str) -> GitRepo:
+        key = os.path.realpath(os.path.expanduser(path))
+        repo = self.repos.get(self._roots.get(key, key))
+        if repo is not None:
+            self.repos.move_to_end(repo.root)
+            return repo
+        async with self._opening.setdefault(key, asyncio.Lock()):
+            repo = self.repos.get(self._roots.get(key, key))
+            if repo is not None:
+                return repo
+            if not os.path.isdir(key):
+                raise GitError(f"Not a directory: {path}")
+            # Nothing is started until the first object read, so a duplicate is cheap to drop
+            opened = await GitRepo.open(key, **self.repo_options)
+            repo = self.repos.get(opened.root)
+            if repo is None:
+                repo = self.repos[opened.root] = opened
+                while len(self.repos) > self.max_repos:
+                    root, evicted = self.repos.popitem(last=False)
+                    self._roots = {k: r for k, r in self._roots.items() if r != root}
+                    await evicted.close()
+            self._roots[key] = repo.root
+            return repo
+
+    async def close(self):
+        for repo in self.repos.values():
+            await repo.close()
+        self.repos.clear()
+        self._roots.clear()
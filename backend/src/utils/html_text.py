@@ -0,0 +1,102 @@
+import re
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+# Elements whose content is never readable text
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe"}
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "tr", "ul",
+}
+
+# Empty mount points used by client-side frameworks
+_APP_ROOT = re.compile(
+    r'<(div|main)[^>]+id=["\'](root|app|__next|__nuxt|svelte|ember-app|main-app)["\'][^>]*>\s*</\1>',
+    re.IGNORECASE,
+)
+_NOSCRIPT_JS = re.compile(r"<noscript[^>]*>[^<]*(enable|requires?|turn on)[^<]*javascript", re.IGNORECASE)
+_SCRIPT_TAG = re.compile(r"<script\b", re.IGNORECASE)
+
+# Below this much visible text a large page is assumed to render client-side
+MIN_TEXT_CHARS = 200
+MIN_HTML_BYTES_FOR_SPA = 2048
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title: Optional[str] = None
+        self._skip_depth = 0
+        self._in_title = False
+        self._in_pre = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "pre":
+            self._in_pre += 1
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "pre" and self._in_pre:
+            self._in_pre -= 1
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title = (self.title or "") + data
+            return
+        if self._skip_depth:
+            return
+        self.parts.append(data if self._in_pre else re.sub(r"\s+", " ", data))
+
+
+def extract(html: str) -> Tuple[Optional[str], str]:
+    """Return (title, text) for an HTML document."""
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        # html.parser is lenient, but never let a broken page fail a fetch
+        pass
+    lines = (line.strip() for line in "".join(parser.parts).splitlines())
+    text = "\n".join(line for line in lines if line)
+    title = parser.title.strip() if parser.title else None
+    return title, text
+
+
+def extract_text(html: str) -> str:
+    """Return the visible text of an HTML document, one block per line."""
+    return extract(html)[1]
+
+
+def needs_browser(html: str, text: Optional[str] = None) -> bool:
+    """
+    Heuristically decide whether ``html`` only becomes readable after
+    JavaScript runs: an empty framework mount point, a <noscript> asking to
+    enable JavaScript, or a sizeable script-heavy page with almost no text.
+    """
+    if text is None:
+        text = extract_text(html)
+    if len(text) >= MIN_TEXT_CHARS * 5:
+        return False
+    if _APP_ROOT.search(html) or _NOSCRIPT_JS.search(html):
+        return True
+    if len(html) >= MIN_HTML_BYTES_FOR_SPA and len(text) < MIN_TEXT_CHARS:
+        return len(_SCRIPT_TAG.findall(html)) > 0
+    return False
@@ -0,0 +1,160 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import brotli  # noqa: F401  (lets aiohttp decode "br" responses)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+DEFAULT_TIMEOUT = 15.0
+# Responses are cut off at this size; pages larger than this are rarely useful as text
+DEFAULT_MAX_RESPONSE_BYTES = 5 * 1024 * 1024
+DEFAULT_CONNECTIONS = 100
+DEFAULT_CONNECTIONS_PER_HOST = 8
+
+
+class HttpResponse:
+    """The parts of a response the fetch tools need, read up to a size cap."""
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], body: bytes,
+                 truncated: bool, elapsed: float):
+        self.url = url
+        self.status = status
+        # Header names are lower-cased
+        self.headers = headers
+        self.body = body
+        self.truncated = truncated
+        self.elapsed = elapsed
+        # Set by HttpCache: "hit", "revalidated", "miss" or "bypass", and the stored entry
+        self.cache_status: Optional[str] = None
+        self.cache_entry = None
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    @property
+    def charset(self) -> str:
+        for part in self.headers.get("content-type", "").split(";")[1:]:
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip('"\'')
+        return "utf-8"
+
+    def text(self) -> str:
+        try:
+            return self.body.decode(self.charset, errors="replace")
+        except LookupError:
+            return self.body.decode("utf-8", errors="replace")
+
+
+class HttpClient:
+    """
+    Process-wide aiohttp session.
+
+    One connection pool is shared by every tool so keep-alive connections,
+    DNS results and TLS sessions are reused across calls. aiohttp negotiates
+    gzip/deflate (and brotli when the ``brotli`` package is installed).
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, connections: int = DEFAULT_CONNECTIONS,
+                 connections_per_host: int = DEFAULT_CONNECTIONS_PER_HOST,
+                 user_agent: str = DEFAULT_USER_AGENT):
+        self.timeout = timeout
+        self.connections = connections
+        self.connections_per_host = connections_per_host
+        self.user_agent = user_agent
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_available(self) -> bool:
+        return aiohttp is not None
+
+    async def session(self) -> "aiohttp.ClientSession":
+        if aiohttp is None:
+            raise RuntimeError("aiohttp library not installed.")
+        if self._session is None or self._session.closed:
+            async with self._lock:
+                if self._session is None or self._session.closed:
+                    connector = aiohttp.TCPConnector(
+                        limit=self.connections,
+                        limit_per_host=self.connections_per_host,
+                        ttl_dns_cache=300,
+                        keepalive_timeout=30,
+                    )
+                    self._session = aiohttp.ClientSession(
+                        connector=connector,
+                        timeout=aiohttp.ClientTimeout(total=self.timeout),
+                        headers={"User-Agent": self.user_agent},
+                        auto_decompress=True,
+                    )
+        return self._session
+
+    async def get(self, url: str, max_bytes: int = DEFAULT_MAX_RESPONSE_BYTES,
+                  headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+                  **kwargs: Any) -> HttpResponse:
+        """GET ``url``, reading at most ``max_bytes`` of the (decompressed) body."""
+        session = await self.session()
+        request_headers = {
+            "Accept": "text/html,application/xhtml+xml,application/json,text/plain;q=0.9,*/*;q=0.8",
+            "Accept-Encoding": ACCEPT_ENCODING,
+            **(headers or {}),
+        }
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        start = time.perf_counter()
+        async with session.get(url, headers=request_headers, **kwargs) as resp:
+            chunks = []
+            size = 0
+            truncated = False
+            async for chunk in resp.content.iter_chunked(64 * 1024):
+                if size + len(chunk) > max_bytes:
+                    chunks.append(chunk[:max_bytes - size])
+                    truncated = True
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+            return HttpResponse(
+                url=str(resp.url),
+                status=resp.status,
+                headers={k.lower(): v for k, v in resp.headers.items()},
+                body=b"".join(chunks),
+                truncated=truncated,
+                elapsed=time.perf_counter() - start,
+            )
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_client: Optional[HttpClient] = None
+
+
+def get_http_client() -> HttpClient:
+    """Return the process-wide HTTP client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = HttpClient()
+    return _client
+
+
+async def close_http_client():
+    if _client is not None:
+        await _client.close()
@@ -0,0 +1,386 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Union
+
+from .http import DEFAULT_MAX_RESPONSE_BYTES, HttpClient, HttpResponse
+from .resource_policy import is_top_level_document
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+# Freshness used when the origin sends no Cache-Control/Expires headers
+DEFAULT_TTL = 300
+CACHEABLE_STATUS = {200, 203}
+# Hop-by-hop and encoding headers that no longer describe the stored (decoded) body
+_DROP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-encoding", "content-length",
+                 "set-cookie", "age"}
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def freshness_lifetime(headers: Dict[str, str], default_ttl: float) -> Optional[float]:
+    """
+    Seconds a response stays fresh, 0 if it must be revalidated on every
+    use, or None if it must not be stored. ``headers`` use lower-case names.
+    The cache is shared, so ``private`` responses are never stored.
+    """
+    cc = parse_cache_control(headers.get("cache-control", ""))
+    if "no-store" in cc or "private" in cc or headers.get("vary", "").strip() == "*":
+        return None
+    if "no-cache" in cc:
+        return 0
+    age = _int(headers.get("age")) or 0
+    for directive in ("s-maxage", "max-age"):
+        if directive in cc:
+            max_age = _int(cc[directive])
+            if max_age is not None:
+                return max(0, max_age - age)
+    if "expires" in headers:
+        expires = _http_date(headers["expires"])
+        if expires is None:
+            # Invalid Expires (e.g. "0") means already expired
+            return 0
+        date = _http_date(headers.get("date", "")) or time.time()
+        return max(0.0, expires - date)
+    return default_ttl
+
+
+def _int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _http_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class CacheEntry:
+    def __init__(self, key: str, url: str, status: int, headers: Dict[str, str], body_path: str,
+                 size: int, stored_at: float, expires_at: float, extra: Dict[str, Any]):
+        self.key = key
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body_path = body_path
+        self.size = size
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.extra = extra
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if "etag" in self.headers:
+            headers["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+    def body(self) -> bytes:
+        with open(self.body_path, "rb") as f:
+            return f.read()
+
+    def response(self, cache_status: str) -> HttpResponse:
+        headers = dict(self.headers)
+        headers["age"] = str(max(0, int(time.time() - self.stored_at)))
+        resp = HttpResponse(self.url, self.status, headers, self.body(), truncated=False, elapsed=0.0)
+        resp.cache_status = cache_status
+        resp.cache_entry = self
+        return resp
+
+
+class HttpCache:
+    """
+    Disk-backed, size-bounded HTTP cache shared by the fetch tools.
+
+    Bodies are stored as files under ``<cache_dir>/bodies`` and indexed in
+    SQLite together with their headers, expiry and any derived data (such
+    as extracted text) in ``extra``. Freshness follows Cache-Control and
+    Expires, falling back to ``default_ttl``; stale entries with an ETag or
+    Last-Modified are revalidated with a conditional request. The least
+    recently used entries are evicted once ``max_bytes`` is exceeded.
+
+    Entries are keyed by URL and a ``variant`` so different renderings of a
+    URL (raw HTML, browser-rendered output) are cached side by side.
+    """
+
+    def __init__(self, cache_dir: Union[str, os.PathLike], max_bytes: int = DEFAULT_CACHE_BYTES,
+                 default_ttl: float = DEFAULT_TTL):
+        self.cache_dir = os.fspath(cache_dir)
+        self.bodies_dir = os.path.join(self.cache_dir, "bodies")
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.metrics = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0, "bypassed": 0}
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.cache_dir, "index.db"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, url TEXT NOT NULL, status INTEGER, headers TEXT, size INTEGER, "
+            "stored_at REAL, expires_at REAL, accessed_at REAL, extra TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._db.commit()
+
+    @staticmethod
+    def _key(url: str, variant: str) -> str:
+        return hashlib.sha256(f"{variant}\n{url}".encode()).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.bodies_dir, key[:2], key)
+
+    # --- Entries ---
+
+    def lookup(self, url: str, variant: str = "") -> Optional[CacheEntry]:
+        """Return the stored entry for ``url`` (fresh or stale), or None."""
+        key = self._key(url, variant)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, size, stored_at, expires_at, extra FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        body_path = self._body_path(key)
+        if not os.path.exists(body_path):
+            self.delete(url, variant)
+            return None
+        status, headers, size, stored_at, expires_at, extra = row
+        return CacheEntry(key, url, status, json.loads(headers), body_path, size, stored_at,
+                          expires_at, json.loads(extra or "{}"))
+
+    def fresh(self, url: str, variant: str = "") -> Optional[CacheEntry]:
+        """
+        Return a fresh entry for ``url`` or None, counting a hit. A miss is
+        counted by the request made instead (``get`` or a routed document
+        navigation), so one fetch isn't counted twice.
+        """
+        entry = self.lookup(url, variant)
+        if entry is not None and entry.fresh:
+            self.metrics["hits"] += 1
+            return entry
+        return None
+
+    def store(self, url: str, status: int, headers: Dict[str, str], body: bytes, variant: str = "",
+              extra: Optional[Dict[str, Any]] = None, ttl: Optional[float] = None) -> Optional[CacheEntry]:
+        """Store a response if it is cacheable; returns the new entry or None."""
+        headers = {k.lower(): v for k, v in headers.items()}
+        lifetime = freshness_lifetime(headers, self.default_ttl) if ttl is None else ttl
+        headers = {k: v for k, v in headers.items() if k not in _DROP_HEADERS}
+        if status not in CACHEABLE_STATUS or lifetime is None or len(body) > self.max_bytes:
+            return None
+
+        key = self._key(url, variant)
+        body_path = self._body_path(key)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(body_path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, body_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, url, status, headers, size, stored_at, expires_at, "
+                "accessed_at, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(headers), len(body), now, now + lifetime, now,
+                 json.dumps(extra or {})),
+            )
+            self._db.commit()
+            self.metrics["stores"] += 1
+        self._evict()
+        return CacheEntry(key, url, status, headers, body_path, len(body), now, now + lifetime, extra or {})
+
+    def refresh(self, entry: CacheEntry, headers: Dict[str, str]) -> CacheEntry:
+        """Extend an entry after a 304 Not Modified, merging the new headers."""
+        merged = {**entry.headers, **{k.lower(): v for k, v in headers.items()}}
+        lifetime = freshness_lifetime(merged, self.default_ttl) or 0
+        merged = {k: v for k, v in merged.items() if k not in _DROP_HEADERS}
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET headers = ?, stored_at = ?, expires_at = ?, accessed_at = ? WHERE key = ?",
+                (json.dumps(merged), now, now + lifetime, now, entry.key),
+            )
+            self._db.commit()
+        entry.headers, entry.stored_at, entry.expires_at = merged, now, now + lifetime
+        return entry
+
+    def update_extra(self, entry: CacheEntry, **extra: Any):
+        """Attach derived data (e.g. extracted text) to an entry."""
+        entry.extra.update(extra)
+        with self._lock:
+            self._db.execute("UPDATE entries SET extra = ? WHERE key = ?", (json.dumps(entry.extra), entry.key))
+            self._db.commit()
+
+    def delete(self, url: str, variant: str = ""):
+        key = self._key(url, variant)
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.commit()
+        try:
+            os.remove(self._body_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                if total <= self.max_bytes:
+                    break
+                victims.append(key)
+                total -= size
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in victims])
+            self._db.commit()
+            self.metrics["evictions"] += len(victims)
+        for key in victims:
+            try:
+                os.remove(self._body_path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.metrics["hits"] + self.metrics["revalidated"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round((self.metrics["hits"] + self.metrics["revalidated"]) / lookups, 3) if lookups else None,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- HTTP ---
+
+    async def get(self, client: HttpClient, url: str, max_bytes: int = DEFAULT_MAX_RESPONSE_BYTES,
+                  bypass: bool = False, **kwargs: Any) -> HttpResponse:
+        """
+        GET through the cache. The response has a ``cache_status`` of "hit",
+        "revalidated", "miss" or "bypass". With ``bypass`` the cache is not
+        read, but the fresh response still replaces the stored entry.
+        """
+        entry = None if bypass else self.lookup(url)
+        if entry is not None and entry.fresh:
+            self.metrics["hits"] += 1
+            return entry.response("hit")
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            headers.update(entry.validators)
+        resp = await client.get(url, max_bytes=max_bytes, headers=headers, **kwargs)
+
+        if resp.status == 304 and entry is not None:
+            self.metrics["revalidated"] += 1
+            return self.refresh(entry, resp.headers).response("revalidated")
+
+        self.metrics["bypassed" if bypass else "misses"] += 1
+        if not resp.truncated:
+            resp.cache_entry = await asyncio.to_thread(self.store, url, resp.status, resp.headers, resp.body)
+        resp.cache_status = "bypass" if bypass else "miss"
+        return resp
+
+    async def install(self, context, bypass: Callable[[], bool] = lambda: False):
+        """
+        Serve top-level document requests of a Playwright context from the
+        cache (with conditional revalidation). Requests carrying cookies or
+        credentials and all sub-resources fall through to earlier route
+        handlers such as the resource policy.
+        """
+        async def handle(route):
+            request = route.request
+            if request.method != "GET" or not is_top_level_document(request) or bypass():
+                await route.fallback()
+                return
+            headers = await request.all_headers()
+            if "cookie" in headers or "authorization" in headers:
+                # Personalized pages must never be served to another session
+                await route.fallback()
+                return
+            await self._route_document(route, request, headers)
+
+        await context.route("**/*", handle)
+
+    async def _route_document(self, route, request, headers: Dict[str, str]):
+        url = request.url
+        entry = self.lookup(url)
+        if entry is not None and entry.fresh:
+            self.metrics["hits"] += 1
+            await route.fulfill(status=entry.status, headers=entry.headers, body=entry.body())
+            return
+
+        headers = dict(headers)
+        if entry is not None:
+            headers.update(entry.validators)
+        try:
+            response = await route.fetch(headers=headers)
+        except Exception as e:
+            logger.debug(f"Cache fetch failed for {url}: {e}")
+            await route.fallback()
+            return
+
+        if response.status == 304 and entry is not None:
+            self.metrics["revalidated"] += 1
+            self.refresh(entry, response.headers)
+            await route.fulfill(status=entry.status, headers=entry.headers, body=entry.body())
+            return
+
+        self.metrics["misses"] += 1
+        body = await response.body()
+        await asyncio.to_thread(self.store, url, response.status, response.headers, body)
+        await route.fulfill(response=response, body=body)
+
+
+_cache: Optional[HttpCache] = None
+
+
+def configure_http_cache(cache_dir: Union[str, os.PathLike], **options) -> HttpCache:
+    """Create the process-wide cache (call once at startup)."""
+    global _cache
+    _cache = HttpCache(cache_dir, **options)
+    return _cache
+
+
+def get_http_cache() -> Optional[HttpCache]:
+    """Return the process-wide cache, or None when caching is disabled."""
+    return _cache
@@ -0,0 +1,109 @@
+import io
+import struct
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from PIL import Image, ImageChops
+except ImportError:
+    Image = None
+    ImageChops = None
+
+FORMATS = ("png", "jpeg", "webp")
+# Formats the browser encodes itself; anything else is transcoded with Pillow
+NATIVE_FORMATS = ("png", "jpeg")
+MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+# Per-channel difference below which two pixels count as equal (absorbs
+# antialiasing and JPEG noise)
+DEFAULT_PIXEL_THRESHOLD = 16
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def normalize_format(format: str) -> str:
+    format = (format or "png").lower()
+    if format == "jpg":
+        format = "jpeg"
+    if format not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    return format
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Width and height of an encoded image, or None if they cannot be read."""
+    if data[:8] == _PNG_SIGNATURE and data[12:16] == b"IHDR":
+        return struct.unpack(">II", data[16:24])
+    if Image is not None:
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                return img.size
+        except Exception:
+            return None
+    return None
+
+
+def transcode(data: bytes, format: str, quality: Optional[int] = None,
+              max_width: Optional[int] = None) -> bytes:
+    """
+    Re-encode ``data`` as ``format``, shrinking it to ``max_width`` pixels
+    wide first. Needs Pillow; the input is returned as is when there is
+    nothing to do.
+    """
+    size = image_size(data)
+    resize = bool(max_width) and (size is None or size[0] > max_width)
+    if not resize and format in NATIVE_FORMATS:
+        return data
+    if Image is None:
+        raise RuntimeError("Pillow is required for WebP output and downscaling (pip install Pillow)")
+
+    with Image.open(io.BytesIO(data)) as img:
+        if resize and img.width > max_width:
+            height = max(1, round(img.height * max_width / img.width))
+            img = img.resize((max_width, height), Image.LANCZOS)
+        if format == "jpeg" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        out = io.BytesIO()
+        options: Dict[str, Any] = {}
+        if format in ("jpeg", "webp"):
+            options["quality"] = quality or 80
+        elif format == "png":
+            options["optimize"] = True
+        img.save(out, format=format.upper(), **options)
+        return out.getvalue()
+
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def visual_diff(previous: bytes, current: bytes,
+                threshold: int = DEFAULT_PIXEL_THRESHOLD) -> Dict[str, Any]:
+    """
+    Compare two captures of the same page.
+
+    With Pillow this reports the fraction of pixels that changed and their
+    bounding box ([left, top, right, bottom]); without it, only whether the
+    encoded images are byte-identical (the browser's encoder is
+    deterministic, so identical pixels give identical bytes).
+    """
+    if previous == current:
+        return {"changed": False, "changed_ratio": 0.0}
+    if Image is None:
+        return {"changed": True}
+    try:
+        with Image.open(io.BytesIO(previous)) as a, Image.open(io.BytesIO(current)) as b:
+            if a.size != b.size:
+                return {"changed": True, "changed_ratio": 1.0, "bbox": [0, 0, *b.size]}
+            diff = ImageChops.difference(a.convert("RGB"), b.convert("RGB")).convert("L")
+            mask = diff.point(lambda p: 255 if p > threshold else 0)
+            bbox = mask.getbbox()
+            if bbox is None:
+                return {"changed": False, "changed_ratio": 0.0}
+            changed = mask.histogram()[255]
+            return {
+                "changed": True,
+                "changed_ratio": round(changed / (b.width * b.height), 6),
+                "bbox": list(bbox),
+            }
+    except Exception:
+        return {"changed": True}
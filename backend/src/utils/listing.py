@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import stat
+import time
+import uuid
+import base64
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+SORT_KEYS = ("name", "size", "mtime", "type")
+
+# Response caps
+DEFAULT_PAGE_ENTRIES = 500
+MAX_PAGE_ENTRIES = 10_000
+DEFAULT_MAX_RESPONSE_BYTES = 64 * 1024
+
+# Hard cap on entries scanned per request, so deep trees cannot stall the server
+MAX_SCAN_ENTRIES = 100_000
+# Sorted scans kept for cursors to continue from
+MAX_CACHED_SCANS = 16
+# A directory modified this recently may change again within the same
+# timestamp tick, unseen; scans of it aren't kept
+RACY_NS = 2_000_000_000
+
+
+def _entry_type(mode: int) -> str:
+    if stat.S_ISDIR(mode):
+        return "directory"
+    if stat.S_ISREG(mode):
+        return "file"
+    if stat.S_ISLNK(mode):
+        return "symlink"
+    return "other"
+
+
+# Files of writes in progress: chunked uploads (transfer.ChunkedTransferManager)
+# and ".<name>.<random>.tmp" from security.atomic_writer and BlobStore
+_TEMP_FILE = re.compile(r"\.upload-.*\.part|\..+\.[0-9a-z_]{8,32}\.tmp")
+
+
+def is_temp_file(name: str) -> bool:
+    return bool(_TEMP_FILE.fullmatch(name))
+
+
+def _encode_cursor(offset: int, scan_id: Optional[str] = None) -> str:
+    state: Dict[str, Any] = {"o": offset}
+    if scan_id:
+        state["s"] = scan_id
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> Tuple[int, Optional[str]]:
+    if not cursor:
+        return 0, None
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        offset = int(state["o"])
+        scan_id = state.get("s")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if offset < 0 or not isinstance(scan_id, (str, type(None))):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return offset, scan_id
+
+
+class _Scan:
+    """A sorted listing, kept so later pages don't rescan and re-sort."""
+
+    def __init__(self, params: tuple, entries: List[Dict[str, Any]], truncated: bool, stamps: Dict[str, int],
+                 started_ns: int):
+        self.params = params
+        self.entries = entries
+        self.truncated = truncated
+        # mtime_ns of every directory read; an entry added, removed or renamed changes one
+        self.stamps = stamps
+        self.racy = any(mtime >= started_ns - RACY_NS for mtime in stamps.values())
+
+    def is_current(self) -> bool:
+        try:
+            return all(os.stat(path).st_mtime_ns == mtime for path, mtime in self.stamps.items())
+        except OSError:
+            return False
+
+
+_scans: "OrderedDict[str, _Scan]" = OrderedDict()
+_scans_lock = threading.Lock()
+
+
+def _cached_scan(scan_id: Optional[str], params: tuple) -> Optional[_Scan]:
+    if not scan_id:
+        return None
+    with _scans_lock:
+        scan = _scans.get(scan_id)
+        if scan is not None:
+            _scans.move_to_end(scan_id)
+    if scan is None or scan.params != params or not scan.is_current():
+        return None
+    return scan
+
+
+def _remember(scan: _Scan) -> str:
+    scan_id = uuid.uuid4().hex[:16]
+    with _scans_lock:
+        _scans[scan_id] = scan
+        while len(_scans) > MAX_CACHED_SCANS:
+            _scans.popitem(last=False)
+    return scan_id
+
+
+def _scan(directory: str, root_dir, depth: int, sort_by: str, reverse: bool,
+          include_hidden: bool, excluded: Set[str]) -> Tuple[List[Dict[str, Any]], bool, Dict[str, int]]:
+    entries: List[Dict[str, Any]] = []
+    stamps: Dict[str, int] = {}
+    scan_truncated = False
+    pending = [(directory, 1)]
+    while pending and not scan_truncated:
+        current, level = pending.pop()
+        try:
+            stamps[current] = os.stat(current).st_mtime_ns
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.name in excluded or is_temp_file(entry.name):
+                        continue
+                    if not include_hidden and entry.name.startswith("."):
+                        continue
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    kind = _entry_type(st.st_mode)
+                    entries.append({
+                        "name": entry.name,
+                        "path": os.path.relpath(entry.path, root_dir),
+                        "type": kind,
+                        "size": st.st_size,
+                        "mtime": st.st_mtime,
+                        "permissions": stat.filemode(st.st_mode),
+                    })
+                    if kind == "directory" and level < depth:
+                        pending.append((entry.path, level + 1))
+                    if len(entries) >= MAX_SCAN_ENTRIES:
+                        scan_truncated = True
+                        break
+        except PermissionError:
+            logger.warning(f"Permission denied while listing {current}")
+
+    if sort_by == "name":
+        entries.sort(key=lambda e: e["path"], reverse=reverse)
+    else:
+        entries.sort(key=lambda e: (e[sort_by], e["path"]), reverse=reverse)
+    return entries, scan_truncated, stamps
+
+
+def scan_directory(
+    directory: Union[str, os.PathLike],
+    root_dir: Union[str, os.PathLike],
+    depth: int = 1,
+    sort_by: str = "name",
+    reverse: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_ENTRIES,
+    max_bytes: int = DEFAULT_MAX_RESPONSE_BYTES,
+    include_hidden: bool = True,
+    exclude: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    List a directory with metadata using os.scandir.
+
+    Each entry carries type, size, mtime and permissions from a single lstat.
+    Symlinks are reported but never followed, so recursion stays inside the
+    sandbox. ``depth`` counts levels below ``directory`` (1 = direct children).
+    Results are paged by ``limit`` entries and by ``max_bytes`` of JSON,
+    whichever is hit first; pass ``next_cursor`` back to continue. The sorted
+    scan behind a cursor is kept while none of the scanned directories
+    change, so later pages are sliced from it instead of listing again. Only
+    directory mtimes are checked, so the size and mtime of a file modified in
+    place may be as old as the first page.
+    Temporary files of uploads and writes in progress are never listed.
+
+    Args:
+        directory: Directory to list (already validated by the caller)
+        root_dir: Sandbox root; entry paths are reported relative to it
+        exclude: Entry names to skip at any level
+    """
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"Invalid sort key '{sort_by}'. Valid keys: {list(SORT_KEYS)}")
+    depth = max(depth, 1)
+    limit = max(1, min(int(limit), MAX_PAGE_ENTRIES))
+    offset, scan_id = _decode_cursor(cursor)
+    directory = os.fspath(directory)
+    excluded = set(exclude or [])
+    params = (directory, os.fspath(root_dir), depth, sort_by, reverse, include_hidden, frozenset(excluded))
+
+    scan = _cached_scan(scan_id, params)
+    if scan is None:
+        started_ns = time.time_ns()
+        entries, truncated, stamps = _scan(directory, root_dir, depth, sort_by, reverse, include_hidden, excluded)
+        scan = _Scan(params, entries, truncated, stamps, started_ns)
+        scan_id = None
+    entries = scan.entries
+
+    page: List[Dict[str, Any]] = []
+    used_bytes = 0
+    index = offset
+    while index < len(entries) and len(page) < limit:
+        entry_bytes = len(json.dumps(entries[index])) + 2
+        if page and used_bytes + entry_bytes > max_bytes:
+            break
+        page.append(entries[index])
+        used_bytes += entry_bytes
+        index += 1
+
+    next_cursor = None
+    if index < len(entries):
+        if scan_id is None and not scan.racy:
+            scan_id = _remember(scan)
+        next_cursor = _encode_cursor(index, scan_id)
+    return {
+        "path": os.path.relpath(directory, root_dir),
+        "entries": page,
+        "total": len(entries),
+        "next_cursor": next_cursor,
+        "scan_truncated": scan.truncated,
+    }
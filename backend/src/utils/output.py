@@ -0,0 +1,40 @@
+class HeadTailBuffer:
+    """
+    Keeps the first and last bytes of a stream up to ``limit`` in total,
+    counting what was dropped in between, so huge command output costs
+    bounded memory but still shows how it started and how it ended.
+    """
+
+    def __init__(self, limit: int):
+        self.head_limit = max(limit, 0) // 2
+        self.tail_limit = max(limit, 0) - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def feed(self, data: bytes):
+        self.total += len(data)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            excess = len(self.tail) - self.tail_limit
+            if excess > 0:
+                del self.tail[:excess]
+
+    @property
+    def omitted(self) -> int:
+        return self.total - len(self.head) - len(self.tail)
+
+    @property
+    def truncated(self) -> bool:
+        return self.omitted > 0
+
+    def text(self) -> str:
+        head = self.head.decode(errors="replace")
+        tail = self.tail.decode(errors="replace")
+        if not self.truncated:
+            return head + tail
+        return f"{head}\n... [{self.omitted} bytes omitted] ...\n{tail}"
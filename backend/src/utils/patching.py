@@ -0,0 +1,134 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(Exception):
+    """Raised when a patch or edit does not apply cleanly."""
+    pass
+
+
+class _Hunk:
+    def __init__(self, old_start: int, old_count: int):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.old_lines: List[str] = []
+        self.new_lines: List[str] = []
+
+    @property
+    def anchor(self) -> int:
+        """0-based index the hunk applies at; an empty old range (``-N,0``) means after line N."""
+        return self.old_start if self.old_count == 0 else max(self.old_start - 1, 0)
+
+
+def _parse_unified_diff(diff: str) -> List[_Hunk]:
+    hunks: List[_Hunk] = []
+    current: Optional[_Hunk] = None
+    last_side = None
+    for line in diff.splitlines(keepends=True):
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = _Hunk(int(header.group(1)), int(header.group(2)) if header.group(2) is not None else 1)
+            hunks.append(current)
+            continue
+        if current is None:
+            # File headers (diff/index/---/+++) before the first hunk
+            continue
+        if line.startswith("\\"):
+            # "\ No newline at end of file" applies to the previous line
+            target = current.old_lines if last_side == "-" else current.new_lines
+            if last_side == " ":
+                for lines in (current.old_lines, current.new_lines):
+                    if lines:
+                        lines[-1] = lines[-1].rstrip("\r\n")
+            elif target:
+                target[-1] = target[-1].rstrip("\r\n")
+            continue
+        tag, body = line[:1], line[1:]
+        if tag == " " or line in ("\n", "\r\n"):
+            body = body if tag == " " else line
+            current.old_lines.append(body)
+            current.new_lines.append(body)
+            last_side = " "
+        elif tag == "-":
+            current.old_lines.append(body)
+            last_side = "-"
+        elif tag == "+":
+            current.new_lines.append(body)
+            last_side = "+"
+        elif line.startswith(("diff ", "--- ", "+++ ", "index ")):
+            # Start of another file's headers; single-file patches only
+            raise PatchError("Patch touches more than one file")
+        else:
+            raise PatchError(f"Malformed patch line: {line.rstrip()!r}")
+    if not hunks:
+        raise PatchError("Patch contains no hunks")
+    return hunks
+
+
+def _find(lines: List[str], needle: List[str], expected: int, start: int) -> int:
+    """Locate ``needle`` at or after ``start``, preferring the position nearest ``expected``."""
+    if not needle:
+        return min(max(expected, start), len(lines))
+    limit = len(lines) - len(needle)
+    candidates = [i for i in range(start, limit + 1) if lines[i:i + len(needle)] == needle]
+    if not candidates:
+        return -1
+    return min(candidates, key=lambda i: abs(i - expected))
+
+
+def apply_unified_diff(text: str, diff: str) -> Tuple[str, int]:
+    """
+    Apply a single-file unified diff to ``text``.
+
+    Hunks are matched on their context and removed lines; when line numbers
+    have drifted the nearest exact match is used. Returns (new_text, hunks).
+    """
+    lines = text.splitlines(keepends=True)
+    hunks = _parse_unified_diff(diff)
+    result: List[str] = []
+    cursor = 0
+    drift = 0
+    for number, hunk in enumerate(hunks, start=1):
+        expected = hunk.anchor + drift
+        position = _find(lines, hunk.old_lines, expected, cursor)
+        if position < 0:
+            raise PatchError(f"Hunk {number} (line {hunk.old_start}) does not match the file")
+        result.extend(lines[cursor:position])
+        result.extend(hunk.new_lines)
+        cursor = position + len(hunk.old_lines)
+        drift = position - hunk.anchor
+    result.extend(lines[cursor:])
+    return "".join(result), len(hunks)
+
+
+def apply_search_replace(text: str, edits: List[Dict[str, Any]]) -> Tuple[str, int]:
+    """
+    Apply search/replace edits in order.
+
+    Each edit is ``{"search": str, "replace": str}``. The search text must
+    occur exactly once unless ``"all": true`` is given, in which case every
+    occurrence is replaced. Returns (new_text, replacements).
+    """
+    replacements = 0
+    for number, edit in enumerate(edits, start=1):
+        search = edit.get("search")
+        replace = edit.get("replace", "")
+        if not search:
+            raise PatchError(f"Edit {number} has an empty search string")
+        occurrences = text.count(search)
+        if occurrences == 0:
+            raise PatchError(f"Edit {number}: search text not found")
+        if edit.get("all", False):
+            text = text.replace(search, replace)
+            replacements += occurrences
+        elif occurrences > 1:
+            raise PatchError(
+                f"Edit {number}: search text occurs {occurrences} times; "
+                "add surrounding context or set all=true"
+            )
+        else:
+            text = text.replace(search, replace, 1)
+            replacements += 1
+    return text, replacements
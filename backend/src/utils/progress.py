@@ -0,0 +1,50 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[float, Optional[float], Optional[str]], Awaitable[None]]
+
+_reporter: ContextVar[Optional[ProgressCallback]] = ContextVar("progress_reporter", default=None)
+
+
+def context_reporter(ctx) -> Optional[ProgressCallback]:
+    """Adapt a FastMCP Context to a progress callback (None without a request)."""
+    if ctx is None:
+        return None
+
+    async def report(progress: float, total: Optional[float] = None, message: Optional[str] = None):
+        try:
+            await ctx.report_progress(progress, total, message)
+        except TypeError:
+            # Older SDKs have no message argument
+            await ctx.report_progress(progress, total)
+
+    return report
+
+
+@contextmanager
+def progress_reporter(callback: Optional[ProgressCallback]) -> Iterator[None]:
+    """
+    Route ``report_progress`` calls made while the block runs (including in
+    integrations, which have no MCP context of their own) to ``callback``.
+    """
+    token = _reporter.set(callback)
+    try:
+        yield
+    finally:
+        _reporter.reset(token)
+
+
+async def report_progress(progress: float, total: Optional[float] = None, message: Optional[str] = None):
+    """Send a progress update for the current tool call; a no-op if nobody listens."""
+    callback = _reporter.get()
+    if callback is None:
+        return
+    try:
+        await callback(progress, total, message)
+    except Exception as e:
+        # Progress is best-effort and must never fail the tool call
+        logger.debug(f"Progress report failed: {e}")
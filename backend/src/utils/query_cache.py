@@ -0,0 +1,207 @@
+"""
+Caches in front of the database integrations: read-only query results keyed
+by normalized SQL and parameters (invalidated per table by writes), and the
+introspected schema (invalidated by DDL).
+
+Table detection is lexical. Writes the SQL doesn't show, such as trigger side
+effects, functions or other clients, are only bounded by the TTL, which is
+why result caching is opt-in.
+"""
+import re
+import json
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from .cache import TTLCache
+
+DEFAULT_QUERY_CACHE_TTL = 60
+DEFAULT_QUERY_CACHE_ENTRIES = 500
+DEFAULT_SCHEMA_TTL = 300
+
+_TOKEN = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|--[^\n]*|/\*.*?\*/|\s+)""", re.DOTALL)
+_IDENT = r"""(?:"(?:[^"]|"")+"|`[^`]+`|\[[^\]]+\]|[\w$]+)(?:\s*\.\s*(?:"(?:[^"]|"")+"|`[^`]+`|\[[^\]]+\]|[\w$]+))*"""
+_FROM_LIST = re.compile(rf"\s+({_IDENT})(?:\s+(?:as\s+)?(?!(?:where|join|on|using|group|order|limit|union|inner|left|right|full|cross|natural)\b)\w+)?(\s*,)?",
+                        re.IGNORECASE)
+_READ_TABLE = re.compile(r"\b(?:from|join)\b", re.IGNORECASE)
+_WRITE_TABLE = re.compile(
+    rf"\b(?:insert\s+(?:or\s+\w+\s+)?into|replace\s+into|update(?:\s+or\s+\w+)?(?:\s+only)?|delete\s+from(?:\s+only)?"
+    rf"|truncate(?:\s+table)?(?:\s+only)?|merge\s+into|copy)\s+({_IDENT})",
+    re.IGNORECASE,
+)
+_DDL = re.compile(r"^\s*(?:create|alter|drop|rename|truncate|comment\s+on|vacuum|reindex|attach|detach)\b",
+                  re.IGNORECASE)
+_READ = re.compile(r"^\s*(?:select|with|values|table)\b", re.IGNORECASE)
+_WRITE_WORD = re.compile(r"\b(?:insert|update|delete|replace|merge|create|alter|drop|truncate|copy|into|nextval|setval)\b",
+                         re.IGNORECASE)
+# Results that differ between runs
+_VOLATILE = re.compile(
+    r"\b(?:random|randomblob|now|current_timestamp|current_date|current_time|localtime|localtimestamp"
+    r"|clock_timestamp|statement_timestamp|timeofday|gen_random_uuid|uuid_generate_v\d|changes"
+    r"|total_changes|last_insert_rowid|txid_current|pg_sleep)\b",
+    re.IGNORECASE,
+)
+
+
+def _strip(sql: str) -> str:
+    """SQL with comments removed and string literals emptied, for analysis."""
+    def replace(m):
+        token = m.group(0)
+        if token.startswith("'"):
+            return "''"
+        if token.startswith(("--", "/*")) or token.isspace():
+            return " "
+        return token
+    return _TOKEN.sub(replace, sql)
+
+
+def normalize_sql(sql: str) -> str:
+    """Whitespace and comments collapsed; literals and identifiers left untouched."""
+    parts = []
+    pos = 0
+    for m in _TOKEN.finditer(sql):
+        if m.start() > pos:
+            parts.append(sql[pos:m.start()])
+        token = m.group(0)
+        if token.startswith(("'", '"', "`")):
+            parts.append(token)
+        elif not parts or parts[-1] != " ":
+            parts.append(" ")
+        pos = m.end()
+    parts.append(sql[pos:])
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def _table_name(ident: str) -> str:
+    last = re.split(r"\s*\.\s*(?=(?:[^\"]*\"[^\"]*\")*[^\"]*$)", ident)[-1]
+    return last.strip('"`[]').replace('""', '"').lower()
+
+
+def referenced_tables(sql: str) -> Set[str]:
+    """Tables (and CTE or function names, harmlessly) a query reads from."""
+    text = _strip(sql)
+    tables = set()
+    for m in _READ_TABLE.finditer(text):
+        pos = m.end()
+        while True:
+            item = _FROM_LIST.match(text, pos)
+            if item is None:
+                break
+            tables.add(_table_name(item.group(1)))
+            if not item.group(2):
+                break
+            pos = item.end()
+    return tables
+
+
+def written_tables(sql: str) -> Set[str]:
+    """Tables a data-modifying statement writes to; empty when it can't tell."""
+    return {_table_name(m.group(1)) for m in _WRITE_TABLE.finditer(_strip(sql))}
+
+
+def is_ddl(sql: str) -> bool:
+    return bool(_DDL.match(_strip(sql)))
+
+
+def may_write(sql: str) -> bool:
+    """Anything but a plain read, which must invalidate cached results."""
+    text = _strip(sql)
+    return not _READ.match(text) or bool(_WRITE_WORD.search(text))
+
+
+def is_cacheable_read(sql: str) -> bool:
+    """A plain, deterministic read whose tables are all visible in the SQL."""
+    text = _strip(sql)
+    return (bool(_READ.match(text)) and not _WRITE_WORD.search(text) and not _VOLATILE.search(text)
+            and "'now'" not in sql.lower()
+            and ";" not in text.strip().rstrip(";") and bool(referenced_tables(sql)))
+
+
+class QueryCache:
+    """
+    Result cache for read-only queries with per-table invalidation.
+
+    Every invalidation bumps a generation counter; a result is only stored if
+    no write happened while it was being computed, so a query racing a write
+    can't put a stale result back.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_QUERY_CACHE_ENTRIES, ttl: float = DEFAULT_QUERY_CACHE_TTL):
+        self.cache = TTLCache(max_entries, ttl)
+        self.generation = 0
+        self._by_table: Dict[str, Set[Hashable]] = {}
+        self._invalidations = 0
+
+    @staticmethod
+    def key(sql: str, params: Any, *extra: Any) -> Hashable:
+        return (normalize_sql(sql), json.dumps(params, sort_keys=True, default=str), *extra)
+
+    def get(self, key: Hashable) -> Any:
+        return self.cache.get(key)
+
+    def put(self, key: Hashable, tables: Iterable[str], value: Any, generation: int):
+        if generation != self.generation:
+            return
+        self.cache.set(key, value)
+        for table in tables:
+            self._by_table.setdefault(table, set()).add(key)
+        if sum(len(keys) for keys in self._by_table.values()) > 2 * self.cache.max_entries:
+            # Forget index entries for results that were evicted or expired
+            for table, keys in list(self._by_table.items()):
+                keys.intersection_update(k for k in keys if k in self.cache)
+                if not keys:
+                    del self._by_table[table]
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None):
+        """Drop results that read any of ``tables`` (everything when None)."""
+        self.generation += 1
+        self._invalidations += 1
+        if tables is None:
+            self.cache.clear()
+            self._by_table.clear()
+            return
+        for table in tables:
+            for key in self._by_table.pop(table, ()):
+                self.cache.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.cache.stats(), "invalidations": self._invalidations}
+
+
+class SchemaCache:
+    """
+    The introspected schema of one database. It is reloaded after
+    ``invalidate()`` (DDL seen), when the database's ``version`` changed, or
+    after ``ttl`` seconds; concurrent callers share one load.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_SCHEMA_TTL):
+        self.ttl = ttl
+        self._value: Any = None
+        self._version: Any = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self._hits = 0
+        self._loads = 0
+
+    def invalidate(self):
+        self._generation += 1
+        self._value = None
+
+    async def get(self, load: Callable[[], Awaitable[Any]], version: Any = None) -> Tuple[Any, bool]:
+        """Return ``(schema, cached)``."""
+        async with self._lock:
+            if (self._value is not None and time.monotonic() - self._loaded_at < self.ttl
+                    and version == self._version):
+                self._hits += 1
+                return self._value, True
+            generation = self._generation
+            value = await load()
+            self._loads += 1
+            if generation == self._generation:
+                self._value, self._version, self._loaded_at = value, version, time.monotonic()
+            return value, False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self._hits, "loads": self._loads, "ttl": self.ttl}
@@ -0,0 +1,281 @@
+"""
+Token-budgeted digests of a git commit: file tree, per-file summaries and as
+much file content as fits.
+
+Everything is keyed by object id, which never changes meaning: file summaries
+by blob SHA, flattened directory listings by tree SHA and finished digests by
+commit SHA plus options. Analysing a new commit therefore only reads the
+blobs and trees that changed, and repeating an analysis is a cache lookup.
+"""
+import re
+import json
+import posixpath
+from fnmatch import fnmatch
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .cache import TTLCache
+from .git_repo import GitRepo
+
+DEFAULT_MAX_TOKENS = 50000
+# Larger files are listed but neither summarized nor included
+DEFAULT_MAX_FILE_BYTES = 512 * 1024
+DEFAULT_SUMMARY_CACHE = 100000
+DEFAULT_DIGEST_CACHE = 32
+DEFAULT_DIGEST_TTL = 3600
+# Rough token estimate used for budgeting, close enough for English and code
+CHARS_PER_TOKEN = 4
+# Used when the caller gives no exclude patterns
+DEFAULT_EXCLUDES = (
+    "*.lock", "package-lock.json", "pnpm-lock.yaml", "*.min.js", "*.min.css", "*.map",
+    "node_modules/", "vendor/", "dist/", "build/", "__pycache__/",
+)
+BINARY_PROBE_BYTES = 8000
+MAX_SYMBOLS = 20
+MAX_DESCRIPTION_CHARS = 160
+
+LANGUAGES = {
+    ".py": "python", ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript", ".go": "go", ".rs": "rust", ".java": "java", ".kt": "kotlin",
+    ".cs": "csharp", ".rb": "ruby", ".php": "php", ".c": "c", ".h": "c", ".cc": "cpp", ".cpp": "cpp",
+    ".hpp": "cpp", ".swift": "swift", ".sh": "shell", ".bash": "shell", ".md": "markdown", ".rst": "rst",
+    ".txt": "text", ".json": "json", ".yaml": "yaml", ".yml": "yaml", ".toml": "toml", ".ini": "ini",
+    ".cfg": "ini", ".html": "html", ".css": "css", ".scss": "scss", ".sql": "sql", ".xml": "xml",
+}
+
+_SYMBOLS = {
+    "python": re.compile(r"^(?:async\s+)?(?:def|class)\s+(\w+)", re.MULTILINE),
+    "javascript": re.compile(r"^(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:function\*?|class|const|let)\s+(\w+)",
+                             re.MULTILINE),
+    "typescript": re.compile(r"^(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?"
+                             r"(?:function\*?|class|interface|type|enum|const|let)\s+(\w+)", re.MULTILINE),
+    "go": re.compile(r"^(?:func|type)\s+(?:\([^)]*\)\s*)?(\w+)", re.MULTILINE),
+    "rust": re.compile(r"^(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:fn|struct|enum|trait|mod)\s+(\w+)", re.MULTILINE),
+    "java": re.compile(r"^\s*(?:public\s+|protected\s+|private\s+)?(?:static\s+|final\s+|abstract\s+)*"
+                       r"(?:class|interface|enum|record)\s+(\w+)", re.MULTILINE),
+    "ruby": re.compile(r"^\s*(?:def|class|module)\s+([\w:.?!]+)", re.MULTILINE),
+    "markdown": re.compile(r"^#{1,3}\s+(.+?)\s*#*$", re.MULTILINE),
+}
+_SYMBOLS["kotlin"] = _SYMBOLS["csharp"] = _SYMBOLS["java"]
+_DOCSTRING = re.compile(r'^\s*(?:#[^\n]*\n\s*)*[rRuU]?("""|\'\'\')\s*(.*?)\s*(?:\1|\n)', re.DOTALL)
+_COMMENT = re.compile(r"^\s*(?:#!?|//+|/\*+|\*|--|;+)\s*(.*?)\s*(?:\*/)?$")
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def language_of(path: str) -> Optional[str]:
+    name = posixpath.basename(path).lower()
+    if name in ("dockerfile", "makefile"):
+        return name
+    return LANGUAGES.get(posixpath.splitext(name)[1])
+
+
+def matches(path: str, patterns: Sequence[str]) -> bool:
+    """
+    gitignore-like matching: ``dir/`` matches a directory at any depth (or
+    from the root if it contains a slash), a pattern with a slash matches the
+    whole path, and anything else the file name.
+    """
+    name = posixpath.basename(path)
+    for pattern in patterns:
+        if pattern.endswith("/"):
+            directory = pattern.strip("/")
+            if "/" in directory:
+                if fnmatch(path, directory + "/*"):
+                    return True
+            elif any(fnmatch(part, directory) for part in path.split("/")[:-1]):
+                return True
+        elif "/" in pattern:
+            if fnmatch(path, pattern.lstrip("/")):
+                return True
+        elif fnmatch(name, pattern):
+            return True
+    return False
+
+
+def summarize(path: str, data: bytes) -> Dict[str, Any]:
+    """Size, language, a one-line description and the top-level symbols of a file."""
+    summary: Dict[str, Any] = {"bytes": len(data), "language": language_of(path)}
+    if b"\0" in data[:BINARY_PROBE_BYTES]:
+        summary["binary"] = True
+        return summary
+    text = data.decode(errors="replace")
+    summary["lines"] = text.count("\n") + (0 if not text or text.endswith("\n") else 1)
+    language = summary["language"]
+    description = None
+    if language == "python":
+        docstring = _DOCSTRING.match(text)
+        if docstring:
+            description = docstring.group(2).split("\n", 1)[0]
+    if description is None:
+        for line in text.split("\n", 50)[:50]:
+            if not line.strip():
+                continue
+            comment = _COMMENT.match(line)
+            if language == "markdown" or comment is None:
+                description = line.strip().lstrip("#").strip()
+            elif comment.group(1):
+                description = comment.group(1)
+            else:
+                continue
+            break
+    if description:
+        summary["description"] = description[:MAX_DESCRIPTION_CHARS]
+    pattern = _SYMBOLS.get(language)
+    if pattern is not None:
+        symbols = list(dict.fromkeys(m.group(1) for m in pattern.finditer(text)))
+        if symbols:
+            summary["symbols"] = symbols[:MAX_SYMBOLS]
+    return summary
+
+
+def _render_tree(paths: List[str]) -> List[str]:
+    lines = []
+    shown: set = set()
+    for path in paths:
+        parts = path.split("/")
+        for depth in range(len(parts) - 1):
+            directory = "/".join(parts[:depth + 1])
+            if directory not in shown:
+                shown.add(directory)
+                lines.append("  " * depth + parts[depth] + "/")
+        lines.append("  " * (len(parts) - 1) + parts[-1])
+    return lines
+
+
+def _content_order(path: str) -> Tuple[int, int, str]:
+    # READMEs first, then shallow files before deep ones
+    readme = posixpath.basename(path).lower().startswith("readme")
+    return (0 if readme else 1, path.count("/"), path)
+
+
+class RepoDigester:
+    """Builds and caches digests; one instance serves every repository."""
+
+    def __init__(self, summary_cache: int = DEFAULT_SUMMARY_CACHE, digest_cache: int = DEFAULT_DIGEST_CACHE,
+                 digest_ttl: float = DEFAULT_DIGEST_TTL):
+        # Keyed by object id, so entries never go stale and only leave by LRU eviction
+        self.summaries = TTLCache(summary_cache, float("inf"))
+        self.listings = TTLCache(max(summary_cache // 10, 1), float("inf"))
+        self.digests = TTLCache(digest_cache, digest_ttl)
+        self.blobs_read = 0
+
+    async def files(self, repo: GitRepo, tree: str) -> List[Tuple[str, str, str]]:
+        """(path, mode, blob sha) of every file under a tree, reusing unchanged subtrees."""
+        listing = self.listings.get((repo.hash_bytes, tree))
+        if listing is not None:
+            return listing
+        listing = []
+        for mode, name, sha in await repo.tree(tree):
+            if mode == "40000":
+                listing.extend((f"{name}/{path}", m, s) for path, m, s in await self.files(repo, sha))
+            elif mode != "160000":
+                listing.append((name, mode, sha))
+        self.listings.set((repo.hash_bytes, tree), listing)
+        return listing
+
+    async def summary(self, repo: GitRepo, path: str, sha: str, max_file_bytes: int) -> Dict[str, Any]:
+        # The same blob can sit under names in different languages
+        key = (sha, language_of(path))
+        summary = self.summaries.get(key)
+        if summary is None:
+            info = await repo.object_info(sha)
+            size = info[2] if info else 0
+            if size > max_file_bytes:
+                summary = {"bytes": size, "language": language_of(path), "too_large": True}
+            else:
+                _, _, data = await repo.read(sha)
+                self.blobs_read += 1
+                summary = summarize(path, data)
+            self.summaries.set(key, summary)
+        return summary
+
+    async def digest(self, repo: GitRepo, commit: Dict[str, Any], include: Sequence[str] = (),
+                     exclude: Optional[Sequence[str]] = None, max_tokens: int = DEFAULT_MAX_TOKENS,
+                     max_file_bytes: int = DEFAULT_MAX_FILE_BYTES) -> Tuple[Dict[str, Any], bool]:
+        """Return ``(digest, cached)`` for a commit."""
+        exclude = DEFAULT_EXCLUDES if exclude is None else tuple(exclude)
+        key = (repo.root, commit["sha"], tuple(include), exclude, max_tokens, max_file_bytes)
+        return await self.digests.get_or_set(
+            key, lambda: self._build(repo, commit, tuple(include), exclude, max_tokens, max_file_bytes),
+        )
+
+    async def _build(self, repo: GitRepo, commit: Dict[str, Any], include: Sequence[str], exclude: Sequence[str],
+                     max_tokens: int, max_file_bytes: int) -> Dict[str, Any]:
+        selected = [
+            (path, sha) for path, mode, sha in await self.files(repo, commit["tree"])
+            if (not include or matches(path, include)) and not matches(path, exclude)
+        ]
+        files = []
+        languages: Dict[str, int] = {}
+        for path, sha in selected:
+            summary = await self.summary(repo, path, sha, max_file_bytes)
+            files.append({"path": path, "sha": sha, **summary})
+            if summary.get("language"):
+                languages[summary["language"]] = languages.get(summary["language"], 0) + 1
+
+        remaining = max_tokens
+        tree_lines = _render_tree([f["path"] for f in files])
+        tree = []
+        tree_truncated = False
+        for i, line in enumerate(tree_lines):
+            cost = estimate_tokens(line) + 1
+            if cost > remaining:
+                tree.append(f"... {len(tree_lines) - i} more entries")
+                tree_truncated = True
+                break
+            tree.append(line)
+            remaining -= cost
+
+        summaries = []
+        for file in files:
+            entry = {k: v for k, v in file.items() if k != "sha"}
+            cost = estimate_tokens(json.dumps(entry))
+            if cost > remaining:
+                break
+            summaries.append(entry)
+            remaining -= cost
+
+        content = []
+        included = 0
+        for file in sorted(files, key=lambda f: _content_order(f["path"])):
+            if file.get("binary") or file.get("too_large"):
+                continue
+            # Cheap pre-check with the byte size before reading the blob
+            if file["bytes"] // CHARS_PER_TOKEN > remaining:
+                continue
+            _, _, data = await repo.read(file["sha"])
+            block = f"{'=' * 48}\nFILE: {file['path']}\n{'=' * 48}\n{data.decode(errors='replace')}\n"
+            cost = estimate_tokens(block)
+            if cost > remaining:
+                continue
+            content.append(block)
+            included += 1
+            remaining -= cost
+
+        text_files = sum(1 for f in files if not f.get("binary") and not f.get("too_large"))
+        return {
+            "commit": commit["sha"],
+            "subject": commit["message"].split("\n", 1)[0],
+            "summary": {
+                "files": len(files),
+                "bytes": sum(f["bytes"] for f in files),
+                "lines": sum(f.get("lines", 0) for f in files),
+                "languages": dict(sorted(languages.items(), key=lambda item: -item[1])),
+            },
+            "tree": "\n".join(tree),
+            "files": summaries,
+            "content": "".join(content),
+            "tokens": max_tokens - remaining,
+            "max_tokens": max_tokens,
+            "files_with_content": included,
+            "truncated": len(summaries) < len(files) or included < text_files or tree_truncated,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "summaries": self.summaries.stats(),
+            "digests": self.digests.stats(),
+            "blobs_read": self.blobs_read,
+        }
@@ -0,0 +1,120 @@
+import logging
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Playwright resource types (request.resource_type)
+RESOURCE_TYPES = {
+    "document", "stylesheet", "image", "media", "font", "script", "texttrack",
+    "xhr", "fetch", "eventsource", "websocket", "manifest", "other",
+}
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font", "stylesheet")
+# Interactive sessions keep images, fonts and styles so screenshots and clicks work
+INTERACTIVE_BLOCKED_TYPES = ("media",)
+
+# Common ad and tracking hosts; subdomains are matched too
+TRACKER_DOMAINS = (
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "google-analytics.com",
+    "googletagmanager.com", "googletagservices.com", "adservice.google.com", "facebook.net",
+    "connect.facebook.net", "amazon-adsystem.com", "adnxs.com", "criteo.com", "criteo.net",
+    "taboola.com", "outbrain.com", "scorecardresearch.com", "quantserve.com", "hotjar.com",
+    "segment.io", "segment.com", "mixpanel.com", "newrelic.com", "nr-data.net", "adsrvr.org",
+    "rubiconproject.com", "pubmatic.com", "moatads.com", "chartbeat.com", "optimizely.com",
+    "clarity.ms", "bat.bing.com", "ads-twitter.com", "static.ads-twitter.com",
+)
+
+# goto() returns at DOMContentLoaded; after that, wait at most this long for the network to settle
+DEFAULT_SETTLE_MS = 3000
+
+
+class ResourcePolicy:
+    """
+    Decides which sub-resources a browser context may load.
+
+    Applied with ``context.route`` so blocked requests are aborted before
+    they reach the network. The top-level document is never blocked; frames
+    are only blocked by domain.
+    """
+
+    def __init__(self, block_types: Iterable[str] = DEFAULT_BLOCKED_TYPES,
+                 block_domains: Iterable[str] = (), block_trackers: bool = True):
+        self.block_types = frozenset(t.lower() for t in block_types) - {"document"}
+        unknown = self.block_types - RESOURCE_TYPES
+        if unknown:
+            raise ValueError(f"Unknown resource types: {', '.join(sorted(unknown))}")
+        domains = set(d.lower().strip(".") for d in block_domains)
+        if block_trackers:
+            domains.update(TRACKER_DOMAINS)
+        self.block_domains = frozenset(domains)
+        self.blocked = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.block_types or self.block_domains)
+
+    def interactive(self) -> "ResourcePolicy":
+        """A variant for pages a user drives: same domain blocklist, only heavy media blocked."""
+        return ResourcePolicy(self.block_types & set(INTERACTIVE_BLOCKED_TYPES),
+                              block_domains=self.block_domains, block_trackers=False)
+
+    def _blocked_host(self, host: str) -> bool:
+        host = host.lower()
+        while host:
+            if host in self.block_domains:
+                return True
+            _, _, host = host.partition(".")
+        return False
+
+    def should_block(self, resource_type: str, url: str, top_level: bool = False) -> bool:
+        if top_level:
+            return False
+        if resource_type in self.block_types:
+            return True
+        host = urlparse(url).hostname
+        return bool(host) and self._blocked_host(host)
+
+    async def _handle(self, route):
+        request = route.request
+        if self.should_block(request.resource_type, request.url, is_top_level_document(request)):
+            self.blocked += 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    async def apply(self, context):
+        """Install the policy on a Playwright BrowserContext."""
+        if self.enabled:
+            await context.route("**/*", self._handle)
+
+
+def is_top_level_document(request) -> bool:
+    """True for the main-frame document request of a Playwright route."""
+    if request.resource_type != "document":
+        return False
+    try:
+        return request.frame.parent_frame is None
+    except Exception:
+        # Service worker requests have no frame
+        return False
+
+
+async def navigate(page, url: str, timeout: int = 30000, settle_ms: int = DEFAULT_SETTLE_MS,
+                   wait_for_selector: Optional[str] = None):
+    """
+    Navigate without waiting for the full ``load`` event.
+
+    Returns once the DOM is parsed and either ``wait_for_selector`` appears
+    or the network has been idle (bounded by ``settle_ms``), which is enough
+    for client-side rendered pages without waiting on slow third parties.
+    """
+    response = await page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+    if wait_for_selector:
+        await page.wait_for_selector(wait_for_selector, timeout=timeout)
+    elif settle_ms > 0:
+        try:
+            await page.wait_for_load_state("networkidle", timeout=settle_ms)
+        except Exception:
+            # Long-polling or streaming pages never go idle; the DOM is good enough
+            logger.debug(f"Network did not settle within {settle_ms}ms for {url}")
+    return response
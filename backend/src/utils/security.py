@@ -121,7 +121,9 @@ def atomic_writer(
     # Audit hook
     sys.audit("mcp.filesystem.write", str(target_path), max_bytes)
     
-    tmp_fd, tmp_path = tempfile.mkstemp(dir=parent_dir, text="b" not in mode)
+    # Named like BlobStore temp files, so listings and the watcher skip it
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=parent_dir, prefix=f".{target_path.name}.", suffix=".tmp",
+                                        text="b" not in mode)
     bytes_written = 0
     
     class QuotaEnforcedFile:
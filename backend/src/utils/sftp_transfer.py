@@ -0,0 +1,234 @@
+"""
+Chunked, pipelined and resumable SFTP file transfers.
+
+The functions here block and are meant to run in worker threads, one per
+file, each on its own SFTP channel. Data goes to ``<destination>.part``
+first and is renamed into place once complete, so an interrupted transfer
+leaves a partial file that the next attempt continues from.
+"""
+import os
+import stat
+import errno
+import hashlib
+import posixpath
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .transfer import HASH_BLOCK_BYTES
+
+DEFAULT_CHUNK_BYTES = 256 * 1024
+# Bytes written or prefetched without waiting for the server's acknowledgement
+DEFAULT_WINDOW_BYTES = 4 * 1024 * 1024
+PART_SUFFIX = ".part"
+# paramiko splits reads and writes into requests of this size
+SFTP_REQUEST_BYTES = 32 * 1024
+
+ByteCallback = Callable[[int], None]
+
+
+class TransferProgress:
+    """Thread-safe byte counters for a batch of file transfers."""
+
+    def __init__(self, total: int = 0):
+        self.total = total
+        self._files: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def callback(self, key: str) -> ByteCallback:
+        """A callback recording how many bytes of ``key`` are done so far."""
+        def update(done: int):
+            with self._lock:
+                self._files[key] = done
+        return update
+
+    @property
+    def done(self) -> int:
+        with self._lock:
+            return sum(self._files.values())
+
+
+def _hash_prefix(f, digest, length: int):
+    remaining = length
+    while remaining > 0:
+        block = f.read(min(HASH_BLOCK_BYTES, remaining))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+
+
+def _remote_size(sftp, path: str) -> Optional[int]:
+    try:
+        return sftp.stat(path).st_size
+    except IOError:
+        return None
+
+
+def upload_file(sftp, local_path: str, remote_path: str, on_bytes: ByteCallback = None,
+                chunk_size: int = DEFAULT_CHUNK_BYTES, window: int = DEFAULT_WINDOW_BYTES,
+                resume: bool = True) -> Dict[str, Any]:
+    """Upload one file, continuing from an earlier partial upload when ``resume`` is set."""
+    size = os.path.getsize(local_path)
+    part = remote_path + PART_SUFFIX
+    offset = _remote_size(sftp, part) if resume else None
+    if offset is None or offset > size:
+        offset = 0
+
+    digest = hashlib.sha256()
+    with open(local_path, "rb") as src:
+        # The part already uploaded still counts toward the checksum
+        _hash_prefix(src, digest, offset)
+        done = offset
+        if on_bytes:
+            on_bytes(done)
+        with sftp.open(part, "r+b" if offset else "wb", bufsize=0) as dst:
+            dst.seek(offset)
+            dst.set_pipelined(True)
+            in_flight = 0
+            while True:
+                block = src.read(chunk_size)
+                if not block:
+                    break
+                if in_flight + len(block) > window:
+                    # An unpipelined write waits for every outstanding ack,
+                    # which bounds the data in flight to the window
+                    dst.set_pipelined(False)
+                    dst.write(block[:SFTP_REQUEST_BYTES])
+                    dst.set_pipelined(True)
+                    dst.write(block[SFTP_REQUEST_BYTES:])
+                    in_flight = max(0, len(block) - SFTP_REQUEST_BYTES)
+                else:
+                    dst.write(block)
+                    in_flight += len(block)
+                digest.update(block)
+                done += len(block)
+                if on_bytes:
+                    on_bytes(done)
+        # Closing waits for the remaining acks
+    _replace_remote(sftp, part, remote_path)
+    return {"bytes": size, "resumed_from": offset, "sha256": digest.hexdigest()}
+
+
+def download_file(sftp, remote_path: str, local_path: str, on_bytes: ByteCallback = None,
+                  chunk_size: int = DEFAULT_CHUNK_BYTES, window: int = DEFAULT_WINDOW_BYTES,
+                  resume: bool = True) -> Dict[str, Any]:
+    """Download one file, continuing from an earlier partial download when ``resume`` is set."""
+    size = sftp.stat(remote_path).st_size
+    part = local_path + PART_SUFFIX
+    offset = os.path.getsize(part) if resume and os.path.exists(part) else 0
+    if offset > size:
+        offset = 0
+
+    digest = hashlib.sha256()
+    parent = os.path.dirname(local_path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(part, "r+b" if offset else "wb") as dst:
+        _hash_prefix(dst, digest, offset)
+        dst.seek(offset)
+        dst.truncate()
+        done = offset
+        if on_bytes:
+            on_bytes(done)
+        with sftp.open(remote_path, "rb") as src:
+            src.seek(offset)
+            if size > offset:
+                # Keep up to a window's worth of read requests outstanding
+                src.prefetch(size, max(1, window // SFTP_REQUEST_BYTES))
+            while done < size:
+                block = src.read(min(chunk_size, size - done))
+                if not block:
+                    break
+                dst.write(block)
+                digest.update(block)
+                done += len(block)
+                if on_bytes:
+                    on_bytes(done)
+    if done < size:
+        raise EOFError(f"{remote_path} ended after {done} of {size} bytes")
+    os.replace(part, local_path)
+    return {"bytes": size, "resumed_from": offset, "sha256": digest.hexdigest()}
+
+
+def _replace_remote(sftp, source: str, target: str):
+    try:
+        sftp.posix_rename(source, target)
+    except IOError:
+        # Server without the posix-rename extension: plain rename can't overwrite
+        try:
+            sftp.remove(target)
+        except IOError:
+            pass
+        sftp.rename(source, target)
+
+
+def remote_makedirs(sftp, path: str):
+    """``mkdir -p`` over SFTP."""
+    parts = []
+    while path not in ("", "/"):
+        try:
+            if stat.S_ISDIR(sftp.stat(path).st_mode):
+                break
+            raise IOError(errno.ENOTDIR, f"Not a directory: {path}")
+        except FileNotFoundError:
+            parts.append(path)
+            path = posixpath.dirname(path)
+    for directory in reversed(parts):
+        sftp.mkdir(directory)
+
+
+def is_remote_dir(sftp, path: str) -> bool:
+    try:
+        return stat.S_ISDIR(sftp.stat(path).st_mode)
+    except IOError:
+        return False
+
+
+def plan_upload(local_path: str, remote_path: str) -> List[Tuple[str, str, int]]:
+    """(local, remote, size) for a file, or for every file under a directory."""
+    if not os.path.isdir(local_path):
+        return [(local_path, remote_path, os.path.getsize(local_path))]
+    files = []
+    for root, _, names in os.walk(local_path):
+        for name in sorted(names):
+            source = os.path.join(root, name)
+            rel = os.path.relpath(source, local_path).replace(os.sep, "/")
+            files.append((source, posixpath.join(remote_path, rel), os.path.getsize(source)))
+    return files
+
+
+def _is_plain_name(name: str) -> bool:
+    """True for a single path component that can't climb out of its directory."""
+    if name in ("", ".", "..") or "\0" in name:
+        return False
+    return not any(sep and sep in name for sep in ("/", os.sep, os.altsep))
+
+
+def plan_download(sftp, remote_path: str, local_path: str,
+                  _root: Optional[str] = None) -> List[Tuple[str, str, int]]:
+    """
+    (remote, local, size) for a file, or for every file under a remote directory.
+
+    Names listed by the server are untrusted: one that isn't a plain file
+    name, or whose target would resolve outside ``local_path``, fails the
+    whole download.
+    """
+    attrs = sftp.stat(remote_path)
+    if not stat.S_ISDIR(attrs.st_mode):
+        return [(remote_path, local_path, attrs.st_size)]
+    root = _root or os.path.realpath(local_path)
+    files = []
+    for entry in sftp.listdir_attr(remote_path):
+        if not _is_plain_name(entry.filename):
+            raise ValueError(f"Unsafe file name from server in {remote_path}: {entry.filename!r}")
+        if entry.filename.endswith(PART_SUFFIX):
+            continue
+        source = posixpath.join(remote_path, entry.filename)
+        target = os.path.join(local_path, entry.filename)
+        if os.path.commonpath([root, os.path.realpath(target)]) != root:
+            raise ValueError(f"Download target escapes {root}: {target}")
+        if stat.S_ISDIR(entry.st_mode):
+            files.extend(plan_download(sftp, source, target, root))
+        elif stat.S_ISREG(entry.st_mode):
+            files.append((source, target, entry.st_size))
+    return files
@@ -0,0 +1,104 @@
+"""
+In-process SQLite connections on worker threads: one writer and a pool of
+read-only readers over a WAL-mode database, so reads never wait for writes
+or for each other.
+"""
+import asyncio
+import sqlite3
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+DEFAULT_READERS = 4
+# Prepared statements kept per connection (sqlite3 caches them by SQL text)
+DEFAULT_STATEMENT_CACHE = 256
+DEFAULT_BUSY_TIMEOUT = 5.0
+
+
+class SqliteWorker:
+    """A connection confined to its own thread, as sqlite3 requires."""
+
+    def __init__(self, name: str):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self.conn: Optional[sqlite3.Connection] = None
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run ``fn(conn, *args)`` on the connection's thread."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, self.conn, *args)
+
+    async def open(self, connect: Callable[[], sqlite3.Connection]):
+        self.conn = await asyncio.get_running_loop().run_in_executor(self.executor, connect)
+
+    async def close(self):
+        if self.conn is not None:
+            await self.run(lambda conn: conn.close())
+            self.conn = None
+        self.executor.shutdown(wait=False)
+
+
+class SqlitePool:
+    """
+    One writer plus ``readers`` read-only connections to the database at
+    ``path``. Readers are opened with ``mode=ro``, so a statement that tries
+    to write on one fails instead of bypassing the writer. An in-memory
+    database can't be shared between connections and uses the writer only.
+    """
+
+    def __init__(self, path: str, readers: int = DEFAULT_READERS,
+                 statement_cache: int = DEFAULT_STATEMENT_CACHE,
+                 busy_timeout: float = DEFAULT_BUSY_TIMEOUT):
+        self.path = path
+        self.memory = path == ":memory:" or path.startswith("file::memory:")
+        # Open cursors can hold readers, so keep at least two when there are any
+        self.reader_count = 0 if self.memory or readers <= 0 else max(readers, 2)
+        self.statement_cache = statement_cache
+        self.busy_timeout = busy_timeout
+        self.writer: Optional[SqliteWorker] = None
+        self._idle: "asyncio.Queue[SqliteWorker]" = asyncio.Queue()
+        self._readers = []
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        if readonly:
+            uri = pathlib.Path(self.path).resolve().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=self.busy_timeout,
+                                   cached_statements=self.statement_cache, isolation_level=None)
+        else:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   cached_statements=self.statement_cache, isolation_level=None)
+            if not self.memory:
+                conn.execute("PRAGMA journal_mode=WAL")
+                # Durable at checkpoints; safe against corruption in WAL mode
+                conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    async def open(self):
+        # The writer goes first: it creates the file and switches it to WAL
+        self.writer = SqliteWorker("sqlite-writer")
+        await self.writer.open(lambda: self._connect(False))
+        for i in range(self.reader_count):
+            reader = SqliteWorker(f"sqlite-reader-{i}")
+            await reader.open(lambda: self._connect(True))
+            self._readers.append(reader)
+            self._idle.put_nowait(reader)
+
+    async def write(self, fn: Callable[..., Any], *args) -> Any:
+        """Run ``fn(conn, *args)`` on the writer; writes are serialized by its single thread."""
+        return await self.writer.run(fn, *args)
+
+    async def acquire_reader(self) -> SqliteWorker:
+        """Take a reader out of the pool (the writer when there are none)."""
+        if not self.reader_count:
+            return self.writer
+        return await self._idle.get()
+
+    def release_reader(self, worker: SqliteWorker):
+        if worker is not self.writer:
+            self._idle.put_nowait(worker)
+
+    async def close(self):
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
+        if self.writer is not None:
+            await self.writer.close()
+            self.writer = None
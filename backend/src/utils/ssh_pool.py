@@ -0,0 +1,276 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+try:
+    import paramiko
+except ImportError:
+    paramiko = None
+
+# Errors that mean the connection went away, as opposed to e.g. a missing file
+TRANSIENT_ERRORS = (EOFError, ConnectionError, TimeoutError) + ((paramiko.SSHException,) if paramiko else ())
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether ``error`` is a lost connection worth reconnecting for."""
+    # paramiko reports a closed channel as a bare OSError("Socket is closed")
+    return isinstance(error, TRANSIENT_ERRORS) or (type(error) is OSError and error.errno is None)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEEPALIVE = 30
+# Connections unused for this long are closed on the next pool access
+DEFAULT_IDLE_TIMEOUT = 300
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_CONNECT_TIMEOUT = 15
+# Concurrent channels per connection; further callers wait for a free one
+DEFAULT_MAX_CHANNELS = 8
+
+PoolKey = Tuple[str, int, str, str]
+
+
+class SshConnection:
+    """An authenticated client whose transport is shared by many channels."""
+
+    def __init__(self, key: PoolKey, client: "paramiko.SSHClient", max_channels: int = None):
+        self.key = key
+        self.client = client
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.channels = 0
+        # Channels open or waiting to open; busy connections are never evicted
+        self.busy = 0
+        # Servers cap sessions per connection (OpenSSH MaxSessions defaults to 10)
+        self.slots = asyncio.Semaphore(max_channels or DEFAULT_MAX_CHANNELS)
+
+    @property
+    def transport(self) -> "paramiko.Transport":
+        return self.client.get_transport()
+
+    @property
+    def active(self) -> bool:
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def open_session(self) -> "paramiko.Channel":
+        """Open a new session channel on the shared transport (blocking)."""
+        self.last_used = time.monotonic()
+        self.channels += 1
+        return self.transport.open_session()
+
+    def open_sftp(self) -> "paramiko.SFTPClient":
+        """Open an SFTP session on the shared transport (blocking)."""
+        self.last_used = time.monotonic()
+        self.channels += 1
+        return paramiko.SFTPClient.from_transport(self.transport)
+
+    def close(self):
+        self.client.close()
+
+
+class SshPool:
+    """
+    Authenticated SSH transports keyed by (host, port, user, credential).
+
+    The TCP connect, key exchange and authentication happen once per key;
+    each command then only opens a session channel on the shared transport,
+    which SSH multiplexes. Transports send keep-alives, dead ones are
+    replaced transparently, and idle ones are closed after ``idle_timeout``
+    or least-recently-used first beyond ``max_connections``.
+    """
+
+    def __init__(self, keepalive: int = DEFAULT_KEEPALIVE, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 max_channels: int = DEFAULT_MAX_CHANNELS):
+        self.keepalive = keepalive
+        self.idle_timeout = idle_timeout
+        self.max_connections = max(max_connections, 1)
+        self.connect_timeout = connect_timeout
+        self.max_channels = max(max_channels, 1)
+        self.connections: "OrderedDict[PoolKey, SshConnection]" = OrderedDict()
+        self._connecting: Dict[PoolKey, asyncio.Lock] = {}
+        self._fingerprints: Dict[Tuple[str, float], str] = {}
+        self._connects = 0
+        self._reuses = 0
+        self._evictions = 0
+
+    @property
+    def is_available(self) -> bool:
+        return paramiko is not None
+
+    def _credential_id(self, password: Optional[str], key_file: Optional[str]) -> str:
+        """Identify the credential without keeping secrets in the pool key."""
+        if key_file:
+            path = os.path.expanduser(key_file)
+            cache_key = (path, os.path.getmtime(path))
+            fingerprint = self._fingerprints.get(cache_key)
+            if fingerprint is None:
+                try:
+                    fingerprint = paramiko.PKey.from_path(path).fingerprint
+                except Exception:
+                    # Encrypted or unsupported key: fall back to the file contents
+                    with open(path, "rb") as f:
+                        fingerprint = "file:" + hashlib.sha256(f.read()).hexdigest()
+                self._fingerprints[cache_key] = fingerprint
+            return fingerprint
+        if password:
+            return "password:" + hashlib.sha256(password.encode()).hexdigest()
+        return "default"
+
+    async def acquire(self, host: str, username: str, port: int = 22, password: Optional[str] = None,
+                      key_file: Optional[str] = None) -> SshConnection:
+        """Return a live pooled connection, connecting and authenticating if needed."""
+        if paramiko is None:
+            raise RuntimeError("paramiko package is required. Install with: pip install paramiko")
+        key = (host, int(port or 22), username, self._credential_id(password, key_file))
+        self._expire_idle()
+
+        conn = self._reuse(key)
+        if conn is not None:
+            return conn
+        lock = self._connecting.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another caller may have connected while we waited
+            conn = self._reuse(key)
+            if conn is not None:
+                return conn
+            client = await asyncio.to_thread(self._connect, host, key[1], username, password, key_file)
+            conn = SshConnection(key, client, self.max_channels)
+            self._connects += 1
+            self.connections[key] = conn
+            for other in list(self.connections.values()):
+                if len(self.connections) <= self.max_connections:
+                    break
+                if other is not conn and not other.busy:
+                    del self.connections[other.key]
+                    self._evictions += 1
+                    other.close()
+            return conn
+
+    def _reuse(self, key: PoolKey) -> Optional[SshConnection]:
+        conn = self.connections.get(key)
+        if conn is None:
+            return None
+        if not conn.active:
+            logger.info(f"SSH transport to {key[2]}@{key[0]}:{key[1]} is gone; reconnecting")
+            self.discard(conn)
+            return None
+        self.connections.move_to_end(key)
+        conn.last_used = time.monotonic()
+        self._reuses += 1
+        return conn
+
+    def _connect(self, host: str, port: int, username: str, password: Optional[str],
+                 key_file: Optional[str]) -> "paramiko.SSHClient":
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        connect_kwargs: Dict[str, Any] = {
+            "hostname": host,
+            "port": port,
+            "username": username,
+            "timeout": self.connect_timeout,
+            "banner_timeout": self.connect_timeout,
+            "auth_timeout": self.connect_timeout,
+        }
+        if key_file:
+            connect_kwargs["key_filename"] = os.path.expanduser(key_file)
+        elif password:
+            connect_kwargs["password"] = password
+            connect_kwargs["look_for_keys"] = False
+            connect_kwargs["allow_agent"] = False
+        else:
+            # Try default key locations
+            connect_kwargs["look_for_keys"] = True
+        try:
+            client.connect(**connect_kwargs)
+        except Exception:
+            client.close()
+            raise
+        if self.keepalive:
+            client.get_transport().set_keepalive(self.keepalive)
+        return client
+
+    def discard(self, conn: SshConnection):
+        """Drop a connection (e.g. after a transport error) so the next call reconnects."""
+        if self.connections.get(conn.key) is conn:
+            del self.connections[conn.key]
+        conn.close()
+
+    def _expire_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for key, conn in list(self.connections.items()):
+            if conn.last_used < cutoff and not conn.busy:
+                logger.info(f"Closing idle SSH connection to {key[2]}@{key[0]}:{key[1]}")
+                del self.connections[key]
+                self._evictions += 1
+                conn.close()
+
+    @asynccontextmanager
+    async def _channel(self, opener: str, host: str, username: str, port: int, password: Optional[str],
+                       key_file: Optional[str], retry: bool = True) -> AsyncIterator[Any]:
+        conn = await self.acquire(host, username, port, password, key_file)
+        dead = False
+        conn.busy += 1
+        try:
+            async with conn.slots:
+                try:
+                    channel = await asyncio.to_thread(getattr(conn, opener))
+                except (paramiko.SSHException, EOFError, OSError):
+                    # A refused channel on a live transport is a real error; a dead
+                    # transport (dropped by the server while idle) gets one reconnect
+                    if conn.active or not retry:
+                        raise
+                    dead = True
+                if not dead:
+                    try:
+                        yield channel
+                    finally:
+                        channel.close()
+        finally:
+            conn.busy -= 1
+            conn.last_used = time.monotonic()
+        if dead:
+            self.discard(conn)
+            async with self._channel(opener, host, username, port, password, key_file, retry=False) as channel:
+                yield channel
+
+    def session(self, host: str, username: str, port: int = 22, password: Optional[str] = None,
+                key_file: Optional[str] = None) -> AsyncIterator["paramiko.Channel"]:
+        """
+        ``async with`` a new session channel on the pooled transport to the
+        host; the channel is closed on exit.
+        """
+        return self._channel("open_session", host, username, port, password, key_file)
+
+    def sftp(self, host: str, username: str, port: int = 22, password: Optional[str] = None,
+             key_file: Optional[str] = None) -> AsyncIterator["paramiko.SFTPClient"]:
+        """``async with`` an SFTP session on the pooled transport to the host."""
+        return self._channel("open_sftp", host, username, port, password, key_file)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self.connections),
+            "max_connections": self.max_connections,
+            "connects": self._connects,
+            "reuses": self._reuses,
+            "evictions": self._evictions,
+            "hosts": [
+                {"host": k[0], "port": k[1], "username": k[2], "channels": c.channels, "busy": c.busy,
+                 "idle": round(time.monotonic() - c.last_used, 1)}
+                for k, c in self.connections.items()
+            ],
+        }
+
+    def close(self):
+        for conn in self.connections.values():
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self.connections.clear()
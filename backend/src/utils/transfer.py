@@ -0,0 +1,262 @@
+import os
+import sys
+import time
+import uuid
+import base64
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Any, Optional, Union
+
+from .security import BoxedPath, QuotaExceededError
+
+logger = logging.getLogger(__name__)
+
+# Default chunk size: 1MB, hard cap per chunk: 8MB
+DEFAULT_CHUNK_BYTES = 1024 * 1024
+MAX_CHUNK_BYTES = 8 * 1024 * 1024
+
+# Default max upload size: 2GB
+DEFAULT_MAX_UPLOAD_BYTES = 2 * 1024 * 1024 * 1024
+
+# Uploads idle for longer than this are discarded
+DEFAULT_SESSION_TTL = 3600
+
+# Block size used when hashing files on disk
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+class TransferError(Exception):
+    """Raised when a chunked transfer request is invalid."""
+    pass
+
+
+def file_sha256(path: Union[str, os.PathLike], block_size: int = HASH_BLOCK_BYTES) -> str:
+    """Hash a file in fixed-size blocks so memory stays bounded."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadSession:
+    """State for one in-progress upload, backed by a temp file next to the target."""
+
+    def __init__(self, target: BoxedPath, tmp_path: str,
+                 expected_size: Optional[int], expected_sha256: Optional[str]):
+        self.upload_id = uuid.uuid4().hex
+        self.target = target
+        self.tmp_path = tmp_path
+        self.expected_size = expected_size
+        self.expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+        self.received = 0
+        self.last_activity = time.monotonic()
+        self.lock = threading.Lock()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "upload_id": self.upload_id,
+            "received": self.received,
+            "expected_size": self.expected_size,
+        }
+
+
+class ChunkedTransferManager:
+    """
+    Chunked upload/download of files inside a sandbox root.
+
+    Uploads are written to a temp file in the target directory and moved into
+    place atomically on commit, after the size and SHA-256 have been verified.
+    Clients resume an interrupted upload by asking for its status and sending
+    chunks from the reported ``received`` offset. Only one chunk is held in
+    memory per call, in both directions.
+    """
+
+    def __init__(
+        self,
+        root_dir: Union[str, os.PathLike],
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        max_upload_bytes: int = DEFAULT_MAX_UPLOAD_BYTES,
+        session_ttl: float = DEFAULT_SESSION_TTL,
+    ):
+        self.root_dir = root_dir
+        self.chunk_bytes = min(chunk_bytes, MAX_CHUNK_BYTES)
+        self.max_upload_bytes = max_upload_bytes
+        self.session_ttl = session_ttl
+        self.uploads: Dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+
+    # --- Uploads ---
+
+    def begin_upload(self, path: str, size: Optional[int] = None, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Start an upload and return its id and the preferred chunk size."""
+        self._expire_sessions()
+        if size is not None and size > self.max_upload_bytes:
+            raise QuotaExceededError(f"Upload size {size} exceeds limit of {self.max_upload_bytes} bytes")
+
+        target = BoxedPath(path, self.root_dir)
+        if target.is_dir():
+            raise TransferError(f"Target is a directory: {path}")
+        parent_dir = target.full_path.parent
+        if not parent_dir.exists():
+            raise FileNotFoundError(f"Directory does not exist: {parent_dir}")
+
+        sys.audit("mcp.filesystem.upload", str(target.full_path), size)
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=parent_dir, prefix=".upload-", suffix=".part")
+        os.close(tmp_fd)
+
+        session = UploadSession(target, tmp_path, size, sha256)
+        with self._lock:
+            self.uploads[session.upload_id] = session
+        logger.info(f"AUDIT: Upload {session.upload_id} started for {target.full_path}")
+        return {**session.status(), "chunk_size": self.chunk_bytes}
+
+    def write_chunk(self, upload_id: str, offset: int, data: str) -> Dict[str, Any]:
+        """
+        Write a base64-encoded chunk at ``offset``.
+
+        Offsets may overlap already-received data (a retried chunk) but must not
+        leave a gap past the current end of the upload.
+        """
+        session = self._get_session(upload_id)
+        raw = base64.b64decode(data, validate=True)
+        if len(raw) > MAX_CHUNK_BYTES:
+            raise TransferError(f"Chunk of {len(raw)} bytes exceeds limit of {MAX_CHUNK_BYTES} bytes")
+
+        with session.lock:
+            if offset < 0 or offset > session.received:
+                raise TransferError(
+                    f"Invalid offset {offset}: upload has received {session.received} bytes"
+                )
+            end = offset + len(raw)
+            limit = session.expected_size if session.expected_size is not None else self.max_upload_bytes
+            if end > limit:
+                raise QuotaExceededError(f"Upload would exceed {limit} bytes")
+
+            with open(session.tmp_path, "r+b") as f:
+                f.seek(offset)
+                f.write(raw)
+            session.received = max(session.received, end)
+            session.last_activity = time.monotonic()
+            return session.status()
+
+    def upload_status(self, upload_id: str) -> Dict[str, Any]:
+        """Return the resume offset of an upload."""
+        session = self._get_session(upload_id)
+        with session.lock:
+            session.last_activity = time.monotonic()
+            return session.status()
+
+    def commit_upload(self, upload_id: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Verify size and hash, then atomically move the upload into place."""
+        session = self._get_session(upload_id)
+        with session.lock:
+            if session.expected_size is not None and session.received != session.expected_size:
+                raise TransferError(
+                    f"Upload incomplete: received {session.received} of {session.expected_size} bytes"
+                )
+
+            with open(session.tmp_path, "r+b") as f:
+                # A retried chunk can never shrink the file, but be defensive
+                f.truncate(session.received)
+                f.flush()
+                os.fsync(f.fileno())
+
+            actual = file_sha256(session.tmp_path)
+            expected = (sha256 or session.expected_sha256 or "").lower()
+            if expected and actual != expected:
+                self._discard(session)
+                raise TransferError(f"Hash mismatch: expected {expected}, got {actual}")
+
+            # Re-validate in case the tree changed while the upload was running
+            target = BoxedPath(session.target.full_path, session.target.root_dir)
+            os.replace(session.tmp_path, target.full_path)
+            with self._lock:
+                self.uploads.pop(upload_id, None)
+
+        logger.info(f"AUDIT: Upload {upload_id} committed to {target.full_path}")
+        return {
+            "path": os.path.relpath(target.full_path, target.root_dir),
+            "size": session.received,
+            "sha256": actual,
+        }
+
+    def abort_upload(self, upload_id: str) -> Dict[str, Any]:
+        """Discard an upload and its temp file."""
+        session = self._get_session(upload_id)
+        with session.lock:
+            self._discard(session)
+        return {"upload_id": upload_id, "aborted": True}
+
+    # --- Downloads ---
+
+    def begin_download(self, path: str) -> Dict[str, Any]:
+        """Return size, hash and chunk size so a client can fetch a file in chunks."""
+        boxed = BoxedPath(path, self.root_dir)
+        if not boxed.is_file():
+            raise TransferError(f"Not a file: {path}")
+        st = os.stat(boxed.full_path)
+        return {
+            "path": os.path.relpath(boxed.full_path, boxed.root_dir),
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha256": file_sha256(boxed.full_path),
+            "chunk_size": self.chunk_bytes,
+        }
+
+    def read_chunk(self, path: str, offset: int = 0, length: Optional[int] = None) -> Dict[str, Any]:
+        """Read at most ``length`` bytes at ``offset`` and return them base64-encoded."""
+        boxed = BoxedPath(path, self.root_dir)
+        if not boxed.is_file():
+            raise TransferError(f"Not a file: {path}")
+        if offset < 0:
+            raise TransferError(f"Invalid offset {offset}")
+        length = min(length or self.chunk_bytes, MAX_CHUNK_BYTES)
+
+        with open(boxed.full_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(offset)
+            raw = f.read(length)
+        return {
+            "path": os.path.relpath(boxed.full_path, boxed.root_dir),
+            "offset": offset,
+            "length": len(raw),
+            "size": size,
+            "eof": offset + len(raw) >= size,
+            "data": base64.b64encode(raw).decode("ascii"),
+        }
+
+    # --- Internals ---
+
+    def _get_session(self, upload_id: str) -> UploadSession:
+        with self._lock:
+            session = self.uploads.get(upload_id)
+        if session is None:
+            raise TransferError(f"Unknown or expired upload: {upload_id}")
+        return session
+
+    def _discard(self, session: UploadSession):
+        with self._lock:
+            self.uploads.pop(session.upload_id, None)
+        if os.path.exists(session.tmp_path):
+            os.remove(session.tmp_path)
+
+    def _expire_sessions(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [s for s in self.uploads.values() if now - s.last_activity > self.session_ttl]
+        for session in expired:
+            logger.info(f"Discarding idle upload {session.upload_id}")
+            self._discard(session)
+
+    def close(self):
+        """Discard all in-progress uploads."""
+        with self._lock:
+            sessions = list(self.uploads.values())
+        for session in sessions:
+            self._discard(session)
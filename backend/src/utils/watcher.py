@@ -0,0 +1,317 @@
+import os
+import sys
+import time
+import errno
+import struct
+import asyncio
+import logging
+import ctypes
+import ctypes.util
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from .listing import is_temp_file
+
+logger = logging.getLogger(__name__)
+
+# Change kinds reported to callbacks
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+
+# inotify constants (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+ChangeCallback = Callable[[Dict[str, str]], None]
+
+
+def coalesce(previous: Optional[str], current: str) -> Optional[str]:
+    """Merge two change kinds for the same path; None means no net change."""
+    if previous is None:
+        return current
+    if previous == CREATED:
+        return None if current == DELETED else CREATED
+    if previous == DELETED:
+        return MODIFIED if current == CREATED else DELETED
+    return DELETED if current == DELETED else MODIFIED
+
+
+class ChangeCoalescer:
+    """
+    Debounces file change events and delivers them in batches.
+
+    Repeated events for a path collapse into one net change (a file created
+    and deleted inside the window disappears entirely). A batch is flushed once
+    no new events arrived for ``debounce`` seconds, or at the latest
+    ``max_delay`` seconds after its first event, so a file that is written
+    continuously still produces regular updates.
+    """
+
+    def __init__(self, callback: ChangeCallback, debounce: float = 0.2, max_delay: float = 1.0):
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.pending: Dict[str, str] = {}
+        self._first_event: Optional[float] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def add(self, path: str, kind: str):
+        """Record a change. Safe to call from any thread once bound to a loop."""
+        loop = self._loop
+        if loop is None:
+            raise RuntimeError("ChangeCoalescer is not bound to an event loop")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._add(path, kind)
+        else:
+            loop.call_soon_threadsafe(self._add, path, kind)
+
+    def _add(self, path: str, kind: str):
+        merged = coalesce(self.pending.get(path), kind)
+        if merged is None:
+            self.pending.pop(path, None)
+        else:
+            self.pending[path] = merged
+
+        now = time.monotonic()
+        if self._first_event is None:
+            self._first_event = now
+        if self._handle:
+            self._handle.cancel()
+        delay = min(self.debounce, max(0.0, self._first_event + self.max_delay - now))
+        self._handle = self._loop.call_later(delay, self.flush)
+
+    def flush(self):
+        """Deliver pending changes immediately."""
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+        self._first_event = None
+        changes, self.pending = self.pending, {}
+        if changes:
+            try:
+                self.callback(changes)
+            except Exception as e:
+                logger.error(f"Change callback failed: {e}")
+
+    def close(self):
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+        self.pending.clear()
+
+
+class InotifyWatcher:
+    """
+    Recursive watcher on Linux inotify, driven by the event loop (no thread).
+
+    New directories get watches as they appear; entries created before the
+    watch was added are reported by scanning the new directory. A queue
+    overflow is reported as a modification of the root (".").
+    """
+
+    def __init__(self, root: Union[str, os.PathLike], coalescer: ChangeCoalescer):
+        self.root = os.path.realpath(root)
+        self.coalescer = coalescer
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._fd = -1
+        self._watches: Dict[int, str] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+        self._loop = loop
+        self._add_tree(self.root, report=False)
+        loop.add_reader(self._fd, self._read_events)
+        logger.info(f"Watching {self.root} with inotify ({len(self._watches)} directories)")
+
+    def stop(self):
+        if self._fd >= 0:
+            if self._loop:
+                self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = -1
+        self._watches.clear()
+
+    def _add_watch(self, path: str) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                logger.warning("inotify watch limit reached; some directories are not watched")
+            return False
+        self._watches[wd] = path
+        return True
+
+    def _add_tree(self, top: str, report: bool):
+        for dirpath, dirnames, filenames in os.walk(top):
+            if not self._add_watch(dirpath):
+                dirnames[:] = []
+                continue
+            if report:
+                for name in dirnames + filenames:
+                    if is_temp_file(name):
+                        continue
+                    self.coalescer.add(self._relative(os.path.join(dirpath, name)), CREATED)
+
+    def _drop_tree(self, top: str):
+        """Stop watching a directory that moved away (its wds would report stale paths)."""
+        prefix = top + os.sep
+        for wd, path in list(self._watches.items()):
+            if path == top or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                self._watches.pop(wd, None)
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root)
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            self._handle_event(wd, mask, os.fsdecode(name))
+
+    def _handle_event(self, wd: int, mask: int, name: str):
+        if mask & IN_Q_OVERFLOW:
+            self.coalescer.add(".", MODIFIED)
+            return
+        directory = self._watches.get(wd)
+        if directory is None:
+            return
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            # Reported by the parent's IN_DELETE / IN_MOVED_FROM
+            return
+        if is_temp_file(name):
+            # Renamed over its target when done, which reports the change
+            return
+
+        path = os.path.join(directory, name) if name else directory
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            self.coalescer.add(self._relative(path), CREATED)
+            if mask & IN_ISDIR:
+                self._add_tree(path, report=True)
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            self.coalescer.add(self._relative(path), DELETED)
+            if mask & IN_ISDIR:
+                self._drop_tree(path)
+        elif not mask & IN_ISDIR:
+            self.coalescer.add(self._relative(path), MODIFIED)
+
+
+class PollingWatcher:
+    """Portable fallback that diffs os.scandir snapshots on an interval."""
+
+    def __init__(self, root: Union[str, os.PathLike], coalescer: ChangeCoalescer, interval: float = 2.0):
+        self.root = os.path.realpath(root)
+        self.coalescer = coalescer
+        self.interval = interval
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        pending = [self.root]
+        while pending:
+            current = pending.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if is_temp_file(entry.name):
+                            continue
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        snapshot[os.path.relpath(entry.path, self.root)] = (st.st_mtime_ns, st.st_size)
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+            except OSError:
+                continue
+        return snapshot
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._snapshot = self._scan()
+        self._task = loop.create_task(self._run())
+        logger.info(f"Watching {self.root} by polling every {self.interval}s")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            current = await asyncio.to_thread(self._scan)
+            previous, self._snapshot = self._snapshot, current
+            for path, state in current.items():
+                if path not in previous:
+                    self.coalescer.add(path, CREATED)
+                elif previous[path] != state:
+                    self.coalescer.add(path, MODIFIED)
+            for path in previous.keys() - current.keys():
+                self.coalescer.add(path, DELETED)
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def create_watcher(root: Union[str, os.PathLike], coalescer: ChangeCoalescer, poll_interval: float = 2.0):
+    """Return an inotify watcher when available, otherwise a polling watcher."""
+    try:
+        return InotifyWatcher(root, coalescer)
+    except OSError as e:
+        logger.info(f"inotify unavailable ({e}); falling back to polling")
+        return PollingWatcher(root, coalescer, poll_interval)
@@ -9,6 +9,8 @@ class Workspace:
         self.config_path = self.root_path / "config.json"
         self.tools_path = self.root_path / "tools"
         self.files_path = self.root_path / "files"
+        self.blobs_path = self.root_path / "blobs"
+        self.cache_path = self.root_path / "cache"
         
         self._ensure_directories()
         self.config = self._load_config()
@@ -22,7 +24,8 @@ class Workspace:
             default_config = {
                 "allow_create_files": True,
                 "allow_delete_files": False,
-                "allow_execute_code": False
+                "allow_execute_code": False,
+                "content_addressed_storage": False
             }
             with open(self.config_path, "w") as f:
                 json.dump(default_config, f, indent=4)
@@ -0,0 +1,267 @@
+import os
+import glob
+import time
+import shutil
+import socket
+import threading
+import subprocess
+
+import pytest
+
+try:
+    import paramiko
+except ImportError:
+    paramiko = None
+
+
+if paramiko is not None:
+    class _Server(paramiko.ServerInterface):
+        """Accepts user "tester" with password "secret"; exec requests run in a local shell."""
+
+        def __init__(self, commands):
+            self.event = threading.Event()
+            self.commands = commands
+
+        def check_auth_password(self, username, password):
+            if username == "tester" and password == "secret":
+                return paramiko.AUTH_SUCCESSFUL
+            return paramiko.AUTH_FAILED
+
+        def get_allowed_auths(self, username):
+            return "password"
+
+        def check_channel_request(self, kind, chanid):
+            if kind == "session":
+                return paramiko.OPEN_SUCCEEDED
+            return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+        def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+            return True
+
+        def check_channel_exec_request(self, channel, command):
+            self.commands.append(command.decode())
+            threading.Thread(target=_run_command, args=(channel, command.decode()), daemon=True).start()
+            return True
+
+
+    class _SftpHandle(paramiko.SFTPHandle):
+        def stat(self):
+            try:
+                return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+            except OSError as e:
+                return paramiko.SFTPServer.convert_errno(e.errno)
+
+    class _SftpServer(paramiko.SFTPServerInterface):
+        """Serves the local filesystem (absolute paths) over SFTP."""
+
+        def _error(self, e):
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+        def open(self, path, flags, attr):
+            try:
+                fd = os.open(path, flags, 0o644)
+            except OSError as e:
+                return self._error(e)
+            if flags & os.O_WRONLY:
+                mode = "ab" if flags & os.O_APPEND else "wb"
+            elif flags & os.O_RDWR:
+                mode = "a+b" if flags & os.O_APPEND else "r+b"
+            else:
+                mode = "rb"
+            f = os.fdopen(fd, mode)
+            handle = _SftpHandle(flags)
+            handle.filename = path
+            handle.readfile = f
+            handle.writefile = f
+            return handle
+
+        def stat(self, path):
+            try:
+                return paramiko.SFTPAttributes.from_stat(os.stat(path))
+            except OSError as e:
+                return self._error(e)
+
+        lstat = stat
+
+        def list_folder(self, path):
+            try:
+                return [paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(path, name)), name)
+                        for name in os.listdir(path)]
+            except OSError as e:
+                return self._error(e)
+
+        def remove(self, path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                return self._error(e)
+            return paramiko.SFTP_OK
+
+        def rename(self, oldpath, newpath):
+            if os.path.exists(newpath):
+                return paramiko.SFTP_FAILURE
+            os.rename(oldpath, newpath)
+            return paramiko.SFTP_OK
+
+        def posix_rename(self, oldpath, newpath):
+            os.replace(oldpath, newpath)
+            return paramiko.SFTP_OK
+
+        def mkdir(self, path, attr):
+            try:
+                os.mkdir(path)
+            except OSError as e:
+                return self._error(e)
+            return paramiko.SFTP_OK
+
+        def chattr(self, path, attr):
+            return paramiko.SFTP_OK
+
+
+def _run_command(channel, command):
+    # The exec request is only acknowledged once the handler has returned;
+    # closing the channel before that makes the client see "Channel closed."
+    time.sleep(0.05)
+    # Like sshd, run the command as its own session and process group leader
+    proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            start_new_session=True)
+
+    def pump(stream, send):
+        for chunk in iter(lambda: stream.read1(32 * 1024), b""):
+            try:
+                send(chunk)
+            except Exception:
+                proc.kill()
+                return
+
+    pumps = [threading.Thread(target=pump, args=(proc.stdout, channel.sendall)),
+             threading.Thread(target=pump, args=(proc.stderr, channel.sendall_stderr))]
+    for t in pumps:
+        t.start()
+    for t in pumps:
+        t.join()
+    status = proc.wait()
+    # Report death by signal the way a shell does
+    channel.send_exit_status(128 - status if status < 0 else status)
+    channel.close()
+
+
+class SshServer:
+    """An in-process SSH server on 127.0.0.1 standing in for sshd."""
+
+    host_key = None
+
+    def __init__(self):
+        if SshServer.host_key is None:
+            SshServer.host_key = paramiko.RSAKey.generate(2048)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(100)
+        self.port = self.sock.getsockname()[1]
+        # Completed TCP+handshake+auth sequences, to tell pooled calls from fresh ones
+        self.connections = 0
+        # Every command received, exactly as sent
+        self.commands = []
+        self.transports = []
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client):
+        transport = paramiko.Transport(client)
+        transport.add_server_key(self.host_key)
+        transport.set_subsystem_handler("sftp", paramiko.SFTPServer, _SftpServer)
+        self.transports.append(transport)
+        try:
+            transport.start_server(server=_Server(self.commands))
+        except Exception:
+            transport.close()
+
+    def drop_connections(self):
+        for transport in self.transports:
+            transport.close()
+
+    def close(self):
+        self.sock.close()
+        self.drop_connections()
+
+
+@pytest.fixture
+def ssh_server():
+    if paramiko is None:
+        pytest.skip("paramiko not installed")
+    server = SshServer()
+    yield server
+    server.close()
+
+
+def _postgres_bindir():
+    initdb = shutil.which("initdb")
+    if initdb:
+        return os.path.dirname(initdb)
+    pg_config = shutil.which("pg_config")
+    if pg_config:
+        return subprocess.run([pg_config, "--bindir"], capture_output=True, text=True).stdout.strip()
+    found = sorted(glob.glob("/usr/lib/postgresql/*/bin/initdb"))
+    return os.path.dirname(found[-1]) if found else None
+
+
+@pytest.fixture(scope="session")
+def postgres_dsn(tmp_path_factory):
+    """
+    DSN of a throwaway PostgreSQL server: $TEST_POSTGRES_DSN if set,
+    otherwise one started from the local binaries in a temporary directory.
+    """
+    pytest.importorskip("asyncpg")
+    if os.environ.get("TEST_POSTGRES_DSN"):
+        yield os.environ["TEST_POSTGRES_DSN"]
+        return
+    bindir = _postgres_bindir()
+    if not bindir or not os.path.exists(os.path.join(bindir, "pg_ctl")):
+        pytest.skip("PostgreSQL server binaries not found")
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        pytest.skip("initdb refuses to run as root; set TEST_POSTGRES_DSN")
+
+    base = tmp_path_factory.mktemp("postgres")
+    data = str(base / "data")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    subprocess.run([os.path.join(bindir, "initdb"), "-D", data, "-U", "postgres", "-A", "trust"],
+                   check=True, capture_output=True)
+    subprocess.run([os.path.join(bindir, "pg_ctl"), "-D", data, "-w", "-l", str(base / "log"),
+                    "-o", f"-p {port} -k {base} -c listen_addresses=127.0.0.1", "start"],
+                   check=True, capture_output=True)
+    try:
+        yield f"postgresql://postgres@127.0.0.1:{port}/postgres"
+    finally:
+        subprocess.run([os.path.join(bindir, "pg_ctl"), "-D", data, "-m", "immediate", "stop"],
+                       capture_output=True)
+
+
+@pytest.fixture
+async def make_integration():
+    """
+    ``await make_integration(SqliteIntegration, config)`` returns an
+    initialized integration; every one made is shut down after the test.
+    """
+    started = []
+
+    async def make(integration_class, config):
+        integration = integration_class(config)
+        await integration.initialize()
+        started.append(integration)
+        return integration
+
+    yield make
+    for integration in reversed(started):
+        await integration.shutdown()
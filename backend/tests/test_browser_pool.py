@@ -0,0 +1,143 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import browser_pool as pool_module
+from src.utils.browser_pool import BrowserPool
+
+
+class StubContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+        self._handlers = []
+
+    def on(self, event, handler):
+        if event == "page":
+            self._handlers.append(handler)
+
+    def open_page(self):
+        for handler in self._handlers:
+            handler(object())
+
+    async def close(self):
+        self.closed = True
+
+
+class StubBrowser:
+    def __init__(self, number):
+        self.number = number
+        self.connected = True
+        self.closed = False
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected and not self.closed
+
+    async def new_context(self, **options):
+        context = StubContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+
+class StubPlaywright:
+    def __init__(self):
+        self.browsers = []
+        self.stopped = False
+        self.chromium = self
+
+    async def start(self):
+        return self
+
+    async def launch(self, **options):
+        browser = StubBrowser(len(self.browsers) + 1)
+        self.browsers.append(browser)
+        return browser
+
+    async def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    stub = StubPlaywright()
+    monkeypatch.setattr(pool_module, "async_playwright", lambda: stub)
+    return stub
+
+
+@pytest.fixture
+async def make_pool():
+    made = []
+
+    def make(**options):
+        pool = BrowserPool(**options)
+        made.append(pool)
+        return pool
+    yield make
+    for pool in made:
+        await pool.close()
+
+
+async def test_launches_up_to_size_then_picks_least_loaded(playwright, make_pool):
+    pool = make_pool(size=2)
+    contexts = [await pool.acquire_context() for _ in range(3)]
+    await pool.release_context(contexts[0])
+    fourth = await pool.acquire_context()
+    stats = pool.stats()
+    assert [c.browser.number for c in contexts] == [1, 2, 1]
+    # Browser 1 dropped to one context when the first was released; both are now equal
+    assert fourth.browser.number == 1
+    assert stats["launches"] == 2 and stats["active_contexts"] == 3
+
+
+async def test_browser_retired_after_max_pages(playwright, make_pool):
+    pool = make_pool(max_pages_per_browser=2)
+    first = await pool.acquire_context()
+    first.open_page()
+    first.open_page()
+    assert pool.browsers[0].retiring
+    # A retiring browser keeps its open context but takes no new ones
+    second = await pool.acquire_context()
+    assert second.browser.number == 2
+    assert not first.browser.closed
+    await pool.release_context(first)
+    assert first.browser.closed
+    stats = pool.stats()
+    assert stats["browsers"] == 1 and stats["launches"] == 2
+
+
+async def test_disconnected_browser_is_replaced(playwright, make_pool):
+    pool = make_pool()
+    first = await pool.acquire_context()
+    await pool.release_context(first)
+    first.browser.connected = False
+    second = await pool.acquire_context()
+    assert (second.browser.number, len(pool.browsers)) == (2, 1)
+
+
+async def test_release_and_close(playwright, make_pool):
+    pool = make_pool()
+    async with pool.context() as scoped:
+        pass
+    kept = await pool.acquire_context()
+    # A context the pool doesn't own is just closed
+    stray = StubContext(None)
+    await pool.release_context(stray)
+    assert pool.stats()["active_contexts"] == 1
+    await pool.close()
+    assert scoped.closed and kept.closed and stray.closed
+    assert kept.browser.closed and playwright.stopped
+
+
+async def test_acquire_without_playwright(monkeypatch, make_pool):
+    monkeypatch.setattr(pool_module, "async_playwright", None)
+    pool = make_pool()
+    with pytest.raises(RuntimeError):
+        await pool.acquire_context()
+    assert pool.is_available is False
@@ -0,0 +1,198 @@
+import sys
+import os
+import io
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.workspace import Workspace
+from src.tools.browser import BrowserTools
+from src.utils.resource_policy import ResourcePolicy
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = "about:blank"
+        self.closed = False
+        self._handlers = []
+
+    def on(self, event, handler):
+        if event == "close":
+            self._handlers.append(handler)
+
+    def is_closed(self):
+        return self.closed
+
+    async def goto(self, url, **options):
+        self.url = url
+
+    async def wait_for_load_state(self, state, **options):
+        pass
+
+    async def content(self):
+        return f"<html><body><p>{self.url}</p></body></html>"
+
+    async def screenshot(self, **options):
+        out = io.BytesIO()
+        Image.new("RGB", (4, 3), "white").save(out, "PNG")
+        return out.getvalue()
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            for handler in self._handlers:
+                handler(self)
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = []
+        self._handlers = []
+
+    def on(self, event, handler):
+        if event == "page":
+            self._handlers.append(handler)
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    def popup(self):
+        """A page the site opened itself (target=_blank, window.open)."""
+        page = FakePage(self)
+        self.pages.append(page)
+        for handler in self._handlers:
+            handler(page)
+        return page
+
+
+class FakePool:
+    def __init__(self):
+        self.resource_policy = ResourcePolicy()
+        self.browser = FakeBrowser()
+        self.contexts = []
+        self.released = []
+
+    async def acquire_context(self, policy=None, **options):
+        context = FakeContext(self.browser)
+        self.contexts.append(context)
+        return context
+
+    async def release_context(self, context):
+        self.released.append(context)
+
+
+@pytest.fixture
+async def make_tools(tmp_path):
+    """``make_tools(**options)`` returns ``(tools, pool)`` over a fake pool."""
+    made = []
+
+    def make(**options):
+        pool = FakePool()
+        tools = BrowserTools(Workspace(str(tmp_path)), pool=pool, **options)
+        made.append(tools)
+        return tools, pool
+    yield make
+    for tools in made:
+        await tools.close()
+
+
+async def test_sessions_are_isolated(tmp_path, make_tools):
+    tools, pool = make_tools()
+    await tools.open_page("https://a.example/", session_id="a")
+    await tools.open_page("https://b.example/", session_id="b")
+    assert await tools.list_tabs("a") == "* t1: https://a.example/"
+    assert await tools.list_tabs("b") == "* t1: https://b.example/"
+    assert len(pool.contexts) == 2
+
+
+async def test_tabs_and_popups(tmp_path, make_tools):
+    tools, pool = make_tools()
+    await tools.open_page("https://one.example/", session_id="s")
+    opened = await tools.open_page("https://two.example/", session_id="s", new_tab=True)
+    pool.contexts[0].popup()
+    tabs = await tools.list_tabs("s")
+    await tools.open_page("https://three.example/", session_id="s", tab_id="t1")
+    switched = await tools.list_tabs("s")
+    closed = await tools.close_tab("t1", session_id="s")
+    after = await tools.list_tabs("s")
+    missing = await tools.get_content(session_id="s", tab_id="t9")
+    assert opened == "Successfully opened https://two.example/ (tab t2)"
+    assert tabs == "  t1: https://one.example/\n* t2: https://two.example/\n  t3: about:blank"
+    assert switched.startswith("* t1: https://three.example/")
+    # Closing the active tab activates the most recently opened one
+    assert closed == "Closed tab t1" and after == "  t2: https://two.example/\n* t3: about:blank"
+    assert missing == "Error: No tab 't9' in session 's'"
+
+
+async def test_least_recently_used_session_is_evicted(tmp_path, make_tools):
+    tools, pool = make_tools(max_sessions=2)
+    for session_id in ("a", "b"):
+        await tools.open_page(f"https://{session_id}.example/", session_id=session_id)
+    await tools.list_tabs("a")
+    await tools.open_page("https://c.example/", session_id="c")
+    assert list(tools.sessions) == ["a", "c"]
+    released = pool.released
+    assert len(released) == 1 and released[0].pages[0].url == "https://b.example/"
+
+
+async def test_session_handed_to_a_call_is_not_evicted(tmp_path, make_tools):
+    tools, pool = make_tools(max_sessions=1)
+    await tools.open_page("https://a.example/", session_id="a")
+    # Handed out but its call hasn't taken session.lock yet
+    session = await tools._session("a")
+    await tools.open_page("https://b.example/", session_id="b")
+    assert list(tools.sessions) == ["a", "b"] and not pool.released
+    session.users -= 1
+    await tools.open_page("https://c.example/", session_id="c")
+    assert "a" not in tools.sessions
+
+
+async def test_max_pages_evicts_other_sessions_then_recycles_background_tabs(tmp_path, make_tools):
+    tools, pool = make_tools(max_pages=2)
+    await tools.open_page("https://other.example/", session_id="other")
+    await tools.open_page("https://one.example/", session_id="s")
+    await tools.open_page("https://two.example/", session_id="s", new_tab=True)
+    assert list(tools.sessions) == ["s"]
+    await tools.open_page("https://three.example/", session_id="s", new_tab=True)
+    assert await tools.list_tabs("s") == "  t2: https://two.example/\n* t3: https://three.example/"
+    assert tools.open_pages == 2
+
+
+async def test_disconnected_browser_starts_a_new_session(tmp_path, make_tools):
+    tools, pool = make_tools()
+    await tools.open_page("https://a.example/", session_id="s")
+    pool.browser.connected = False
+    assert await tools.get_content(session_id="s") == "Error: No page open."
+    pool.browser.connected = True
+    await tools.open_page("https://b.example/", session_id="s")
+    assert await tools.list_tabs("s") == "* t1: https://b.example/"
+    assert (len(pool.contexts), len(pool.released)) == (2, 1)
+
+
+@pytest.mark.skipif(Image is None, reason="Pillow is not installed")
+async def test_screenshot_creates_directories_and_notifies(tmp_path, make_tools):
+    changed = []
+    tools, pool = make_tools(on_change=changed.append)
+    await tools.open_page("https://a.example/", session_id="s")
+    message = await tools.screenshot("shots/2024/a.png", session_id="s")
+    assert message == "Screenshot saved to shots/2024/a.png"
+    assert (tmp_path / "files" / "shots" / "2024" / "a.png").read_bytes().startswith(b"\x89PNG")
+    assert changed == ["shots/2024/a.png"]
@@ -0,0 +1,80 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.extraction import extract_content, paginate
+
+PAGE = """<html><head><title>Install guide</title><script>track()</script>
+<body><nav class="navbar"><a href="/">Home</a> <a href="/docs">Docs</a></nav>
+<div class="cookie-banner">We use cookies <button>OK</button></div>
+<article><header><h1>Installing</h1></header>
+<p>First, install the <b>package</b>, then run <code>pip install x</code>. See <a href="/more">the docs</a>.
+<p>Second paragraph, with commas, and enough text to count as content.
+<ul><li>one<li>two</ul>
+<pre>def f():
+    return 1</pre>
+<table><tr><th>a<th>b<tr><td>1<td>2</table>
+<img src="/diagram.png" alt="Diagram">
+</article>
+<footer>Copyright 2024</footer><div style="display:none">secret</div>
+</body></html>"""
+
+
+def test_markdown_keeps_main_content_only():
+    result = extract_content(PAGE, url="https://example.com/guide/")
+    content = result["content"]
+    assert result["title"] == "Install guide"
+    assert content.startswith("# Installing")
+    assert "First, install the **package**, then run `pip install x`. See [the docs](https://example.com/more)." in content
+    assert "- one\n- two" in content
+    assert "```\ndef f():\n    return 1\n```" in content
+    assert "| a | b |\n| --- | --- |\n| 1 | 2 |" in content
+    assert "[image: Diagram]" in content
+    for boilerplate in ("Home", "cookies", "Copyright", "secret", "track()"):
+        assert boilerplate not in content
+    assert result["next_cursor"] is None
+
+
+def test_link_and_image_summaries():
+    result = extract_content(PAGE, url="https://example.com/guide/", links="summary", images="summary")
+    assert "See the docs[1]." in result["content"]
+    assert result["links"] == [{"ref": 1, "text": "the docs", "url": "https://example.com/more"}]
+    assert result["images"] == [{"alt": "Diagram", "url": "https://example.com/diagram.png"}]
+    assert "diagram.png" not in result["content"]
+
+
+def test_text_format_has_no_markup():
+    content = extract_content(PAGE, format="text")["content"]
+    assert "Installing" in content and "#" not in content and "**" not in content and "`" not in content
+
+
+def test_budget_pagination_covers_everything_once():
+    html = "<html><body><main>" + "".join(f"<p>Paragraph {i} with some filler text.</p>" for i in range(200)) + \
+           "</main></body></html>"
+    full = extract_content(html, max_chars=10 ** 6)["content"]
+    pages, cursor = [], None
+    while True:
+        result = extract_content(html, max_tokens=100, cursor=cursor)
+        assert len(result["content"]) <= 400
+        pages.append(result["content"])
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+    assert len(pages) > 10
+    assert "\n\n".join(pages) == full
+    assert all(p.startswith("Paragraph") for p in pages)
+
+
+def test_paginate_prefers_block_boundaries():
+    assert paginate("aaaa\n\nbbbb", 0, 8) == ("aaaa", 6)
+    assert paginate("aaaa\n\nbbbb", 6, 8) == ("bbbb", None)
+
+
+def test_rejects_bad_options():
+    with pytest.raises(ValueError):
+        extract_content(PAGE, format="pdf")
+    with pytest.raises(ValueError):
+        extract_content(PAGE, cursor="abc")
@@ -0,0 +1,107 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("aiohttp")
+
+from src.integrations.browser.fetch import FetchIntegration
+from src.utils.http import close_http_client
+from src.utils.progress import progress_reporter
+
+
+class _Slow(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/hang"):
+            time.sleep(2)
+        else:
+            time.sleep(0.3)
+        body = f"<html><body><p>Page {self.path}</p></body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Slow)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_fetch_urls_runs_concurrently_in_input_order(origin):
+    urls = [f"{origin}/page{i}" for i in range(6)]
+    progress = []
+
+    async def on_progress(done, total, message):
+        progress.append((done, total))
+
+    async def run():
+        fetch = FetchIntegration({})
+        try:
+            with progress_reporter(on_progress):
+                return await fetch.call_tool("fetch_urls", {
+                    "urls": urls, "render": "http", "concurrency": 6, "per_host": 6,
+                })
+        finally:
+            await close_http_client()
+
+    start = time.perf_counter()
+    result = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert [r["url"] for r in result["results"]] == urls
+    assert [r["text"] for r in result["results"]] == [f"Page /page{i}" for i in range(6)]
+    assert result["succeeded"] == 6 and result["failed"] == 0
+    assert progress == [(i, 6) for i in range(1, 7)]
+    # Six 0.3s pages fetched in parallel, not one after another
+    assert elapsed < 1.5
+
+
+def test_fetch_urls_per_url_timeout_and_host_limit(origin):
+    async def run():
+        fetch = FetchIntegration({})
+        try:
+            return await fetch.call_tool("fetch_urls", {
+                "urls": [f"{origin}/a", f"{origin}/hang", f"{origin}/b"],
+                "render": "http", "per_host": 1, "timeout": 1,
+            })
+        finally:
+            await close_http_client()
+
+    result = asyncio.run(run())
+    by_url = {r["url"]: r for r in result["results"]}
+    assert "Timed out" in by_url[f"{origin}/hang"]["error"]
+    assert by_url[f"{origin}/a"]["text"] == "Page /a"
+    assert by_url[f"{origin}/b"]["text"] == "Page /b"
+    assert result["failed"] == 1
+
+
+def test_fetch_urls_validates_input():
+    fetch = FetchIntegration({})
+    assert "error" in asyncio.run(fetch.call_tool("fetch_urls", {"urls": []}))
+    assert "error" in asyncio.run(fetch.call_tool("fetch_urls", {"urls": ["http://x"] * 101}))
+
+
+def test_fetch_urls_http_only_without_client(monkeypatch):
+    from types import SimpleNamespace
+    from src.integrations.browser import fetch as fetch_module
+
+    monkeypatch.setattr(fetch_module, "get_http_client", lambda: SimpleNamespace(is_available=False))
+    fetch = FetchIntegration({})
+    result = asyncio.run(fetch.call_tool("fetch_urls", {"urls": ["http://x"], "render": "http"}))
+    assert result["results"] == [{"url": "http://x", "error": "Failed to fetch URL: aiohttp not installed"}]
+    assert result["failed"] == 1
@@ -1,4 +1,6 @@
 import os
+import base64
+import hashlib
 import pytest
 import tempfile
 import pathlib
@@ -18,8 +20,87 @@ def test_list_directory(fs_integration):
     (root / "subdir").mkdir()
     
     result = asyncio.run(integration.call_tool("list_directory", {"path": "."}))
-    assert "file1.txt" in result
-    assert "subdir" in result
+    entries = {e["name"]: e for e in result["entries"]}
+    assert entries["file1.txt"]["type"] == "file"
+    assert entries["subdir"]["type"] == "directory"
+
+def test_list_directory_recursive_sorted(fs_integration):
+    integration, root = fs_integration
+    (root / "a").mkdir()
+    (root / "a" / "b").mkdir()
+    (root / "a" / "b" / "deep.txt").write_text("x")
+    (root / "big.txt").write_text("x" * 10000)
+    (root / "small.txt").write_text("x")
+
+    result = asyncio.run(integration.call_tool("list_directory", {"path": ".", "depth": 2}))
+    paths = [e["path"] for e in result["entries"]]
+    assert os.path.join("a", "b") in paths
+    assert os.path.join("a", "b", "deep.txt") not in paths
+
+    result = asyncio.run(integration.call_tool("list_directory", {"path": ".", "sort_by": "size", "reverse": True}))
+    assert result["entries"][0]["name"] == "big.txt"
+    assert result["entries"][0]["size"] == 10000
+    assert result["entries"][0]["permissions"].startswith("-")
+
+def test_list_directory_pagination(fs_integration):
+    integration, root = fs_integration
+    for i in range(25):
+        (root / f"f{i:02d}.txt").touch()
+
+    names = []
+    cursor = None
+    while True:
+        args = {"path": ".", "limit": 10}
+        if cursor:
+            args["cursor"] = cursor
+        result = asyncio.run(integration.call_tool("list_directory", args))
+        assert len(result["entries"]) <= 10
+        names.extend(e["name"] for e in result["entries"])
+        cursor = result["next_cursor"]
+        if not cursor:
+            break
+    assert names == [f"f{i:02d}.txt" for i in range(25)]
+
+    # Byte cap cuts the page short
+    result = asyncio.run(integration.call_tool("list_directory", {"path": ".", "max_bytes": 300}))
+    assert 0 < len(result["entries"]) < 25
+    assert result["next_cursor"]
+
+    # A non-positive limit still makes progress instead of repeating the cursor
+    result = asyncio.run(integration.call_tool("list_directory", {"path": ".", "limit": 0}))
+    assert [e["name"] for e in result["entries"]] == ["f00.txt"] and result["next_cursor"]
+
+def test_list_directory_pages_reuse_scan(tmp_path, monkeypatch):
+    from backend.src.utils import listing
+
+    for i in range(30):
+        (tmp_path / f"f{i:02d}.txt").touch()
+    (tmp_path / ".upload-abc.part").write_text("partial")
+    (tmp_path / ".f00.txt.k2j9x8a1.tmp").write_text("being written")
+    # Settled: scans of just-modified directories aren't kept
+    os.utime(tmp_path, ns=(1_000_000_000, 1_000_000_000))
+    scans = []
+    real_scan = listing._scan
+    monkeypatch.setattr(listing, "_scan", lambda *args: scans.append(1) or real_scan(*args))
+
+    def all_pages(cursor=None):
+        names = []
+        while True:
+            result = listing.scan_directory(tmp_path, tmp_path, limit=10, cursor=cursor)
+            names.extend(e["name"] for e in result["entries"])
+            cursor = result["next_cursor"]
+            if not cursor:
+                return names, result["total"]
+
+    names, total = all_pages()
+    assert names == [f"f{i:02d}.txt" for i in range(30)] and total == 30
+    assert len(scans) == 1
+
+    # A change to the directory invalidates the kept scan
+    first = listing.scan_directory(tmp_path, tmp_path, limit=10)
+    (tmp_path / "f05.txt").unlink()
+    second = listing.scan_directory(tmp_path, tmp_path, limit=10, cursor=first["next_cursor"])
+    assert len(scans) == 3 and second["total"] == 29
 
 def test_read_write_file(fs_integration):
     integration, root = fs_integration
@@ -54,3 +135,199 @@ def test_security_violation(fs_integration):
     # Try to read outside
     result = asyncio.run(integration.call_tool("read_file", {"path": "../outside"}))
     assert "Access Denied" in result
+
+def test_chunked_upload_and_download(fs_integration):
+    integration, root = fs_integration
+    payload = os.urandom(3000)
+    digest = hashlib.sha256(payload).hexdigest()
+
+    started = asyncio.run(integration.call_tool("begin_upload", {"path": "blob.bin", "size": len(payload), "sha256": digest}))
+    upload_id = started["upload_id"]
+    for offset in range(0, len(payload), 1024):
+        chunk = base64.b64encode(payload[offset:offset + 1024]).decode()
+        asyncio.run(integration.call_tool("write_chunk", {"upload_id": upload_id, "offset": offset, "data": chunk}))
+
+    result = asyncio.run(integration.call_tool("commit_upload", {"upload_id": upload_id}))
+    assert result["sha256"] == digest
+    assert (root / "blob.bin").read_bytes() == payload
+    assert not list(root.glob(".upload-*"))
+
+    info = asyncio.run(integration.call_tool("begin_download", {"path": "blob.bin"}))
+    assert info["size"] == len(payload)
+    assert info["sha256"] == digest
+
+    received = b""
+    offset = 0
+    while True:
+        chunk = asyncio.run(integration.call_tool("read_chunk", {"path": "blob.bin", "offset": offset, "length": 1000}))
+        received += base64.b64decode(chunk["data"])
+        offset += chunk["length"]
+        if chunk["eof"]:
+            break
+    assert received == payload
+
+def test_chunked_upload_resume_and_verify(fs_integration):
+    integration, root = fs_integration
+    started = asyncio.run(integration.call_tool("begin_upload", {"path": "resume.txt"}))
+    upload_id = started["upload_id"]
+
+    asyncio.run(integration.call_tool("write_chunk", {"upload_id": upload_id, "offset": 0, "data": base64.b64encode(b"hello ").decode()}))
+    status = asyncio.run(integration.call_tool("upload_status", {"upload_id": upload_id}))
+    assert status["received"] == 6
+
+    # A gap past the received offset is rejected
+    result = asyncio.run(integration.call_tool("write_chunk", {"upload_id": upload_id, "offset": 10, "data": base64.b64encode(b"x").decode()}))
+    assert "Invalid offset" in result
+
+    asyncio.run(integration.call_tool("write_chunk", {"upload_id": upload_id, "offset": status["received"], "data": base64.b64encode(b"world").decode()}))
+    result = asyncio.run(integration.call_tool("commit_upload", {"upload_id": upload_id, "sha256": "0" * 64}))
+    assert "Hash mismatch" in result
+    assert not (root / "resume.txt").exists()
+    assert not list(root.glob(".upload-*"))
+
+@pytest.fixture
+def cas_integration():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        integration = FileSystemIntegration({"root_dir": tmpdir, "content_addressed": True})
+        yield integration, pathlib.Path(tmpdir)
+        asyncio.run(integration.shutdown())
+
+def test_cas_copy_has_own_inode_and_rewrite_skipped(cas_integration):
+    integration, root = cas_integration
+    asyncio.run(integration.call_tool("write_file", {"path": "a.txt", "content": "same"}))
+    asyncio.run(integration.call_tool("copy_file", {"src": "a.txt", "dest": "b.txt"}))
+    assert (root / "b.txt").read_text() == "same"
+    assert os.stat(root / "a.txt").st_ino != os.stat(root / "b.txt").st_ino
+
+    # An in-place write to the copy (as executed code could do) leaves the original alone
+    with open(root / "b.txt", "r+") as f:
+        f.write("SAME")
+    assert (root / "a.txt").read_text() == "same"
+    asyncio.run(integration.call_tool("write_file", {"path": "b.txt", "content": "same"}))
+
+    mtime = os.stat(root / "a.txt").st_mtime_ns
+    result = asyncio.run(integration.call_tool("write_file", {"path": "a.txt", "content": "same"}))
+    assert result.startswith("Unchanged")
+    assert os.stat(root / "a.txt").st_mtime_ns == mtime
+
+    # Rewriting one copy leaves the other intact
+    asyncio.run(integration.call_tool("write_file", {"path": "a.txt", "content": "different"}))
+    assert (root / "a.txt").read_text() == "different"
+    assert (root / "b.txt").read_text() == "same"
+
+    listing = asyncio.run(integration.call_tool("list_directory", {"path": "."}))
+    assert ".cas" not in [e["name"] for e in listing["entries"]]
+    result = asyncio.run(integration.call_tool("read_file", {"path": ".cas/index.db"}))
+    assert "Access Denied" in result
+
+def test_cas_delete_releases_blob(cas_integration):
+    integration, root = cas_integration
+    asyncio.run(integration.call_tool("write_file", {"path": "gone.txt", "content": "bye"}))
+    blob = pathlib.Path(integration.blobs.blob_path(hashlib.sha256(b"bye").hexdigest()))
+    # Blobs are only kept where paths can share their blocks
+    assert blob.exists() == integration.blobs.reflinks
+    asyncio.run(integration.call_tool("delete_file", {"path": "gone.txt"}))
+    assert not blob.exists()
+    assert integration.blobs.lookup(root / "gone.txt") is None
+
+def test_cas_without_reflinks_stores_data_once(cas_integration):
+    integration, root = cas_integration
+    if integration.blobs.reflinks:
+        pytest.skip("filesystem supports reflinks")
+    content = "x" * (4 * 1024 * 1024)
+    asyncio.run(integration.call_tool("write_file", {"path": "big.txt", "content": content}))
+    asyncio.run(integration.call_tool("copy_file", {"src": "big.txt", "dest": "copy.txt"}))
+
+    def usage(path):
+        return sum(os.lstat(os.path.join(d, n)).st_blocks * 512 for d, _, names in os.walk(path) for n in names)
+
+    # One copy per path and nothing in the store beyond its index
+    assert usage(root) < 2 * len(content) + 1024 * 1024
+    assert usage(root / ".cas") < 1024 * 1024
+    result = asyncio.run(integration.call_tool("write_file", {"path": "copy.txt", "content": content}))
+    assert result.startswith("Unchanged")
+
+def test_read_file_if_none_match(fs_integration):
+    integration, root = fs_integration
+    (root / "etag.txt").write_text("cached")
+    digest = hashlib.sha256(b"cached").hexdigest()
+
+    result = asyncio.run(integration.call_tool("read_file", {"path": "etag.txt", "if_none_match": digest}))
+    assert result == {"path": "etag.txt", "sha256": digest, "not_modified": True}
+
+    (root / "etag.txt").write_text("changed")
+    result = asyncio.run(integration.call_tool("read_file", {"path": "etag.txt", "if_none_match": digest}))
+    assert result == "changed"
+
+def test_edit_file_search_replace(fs_integration):
+    integration, root = fs_integration
+    (root / "code.py").write_text("def f():\n    return 1\n\ndef g():\n    return 1\n")
+    base = hashlib.sha256((root / "code.py").read_bytes()).hexdigest()
+
+    # Ambiguous search is rejected
+    result = asyncio.run(integration.call_tool("edit_file", {"path": "code.py", "edits": [{"search": "return 1", "replace": "return 2"}]}))
+    assert "occurs 2 times" in result
+
+    edits = [{"search": "def g():\n    return 1", "replace": "def g():\n    return 2"}]
+    result = asyncio.run(integration.call_tool("edit_file", {"path": "code.py", "edits": edits, "base_sha256": base}))
+    assert result["applied"] == 1
+    assert (root / "code.py").read_text() == "def f():\n    return 1\n\ndef g():\n    return 2\n"
+    assert result["sha256"] == hashlib.sha256((root / "code.py").read_bytes()).hexdigest()
+
+    # The old base hash is now stale
+    result = asyncio.run(integration.call_tool("edit_file", {"path": "code.py", "edits": edits, "base_sha256": base}))
+    assert "Conflict" in result
+
+def test_apply_patch_unified_diff(fs_integration):
+    integration, root = fs_integration
+    lines = [f"line {i}\n" for i in range(1, 21)]
+    (root / "data.txt").write_text("".join(lines))
+    patch = (
+        "--- a/data.txt\n"
+        "+++ b/data.txt\n"
+        "@@ -2,3 +2,3 @@\n"
+        " line 2\n"
+        "-line 3\n"
+        "+line three\n"
+        " line 4\n"
+        "@@ -17,3 +17,4 @@\n"
+        " line 17\n"
+        " line 18\n"
+        "+inserted\n"
+        " line 19\n"
+    )
+    # Line numbers drift by one after an unrelated insertion at the top
+    (root / "data.txt").write_text("header\n" + "".join(lines))
+    result = asyncio.run(integration.call_tool("apply_patch", {"path": "data.txt", "patch": patch}))
+    assert result["applied"] == 2
+    content = (root / "data.txt").read_text().splitlines()
+    assert content[3] == "line three"
+    assert content[19] == "inserted"
+    assert len(content) == 22
+
+    bad = "@@ -1,1 +1,1 @@\n-missing\n+x\n"
+    result = asyncio.run(integration.call_tool("apply_patch", {"path": "data.txt", "patch": bad}))
+    assert "Patch failed" in result
+
+def test_apply_patch_zero_context_insertions(fs_integration):
+    integration, root = fs_integration
+    (root / "data.txt").write_text("".join(f"line {i}\n" for i in range(1, 7)))
+    # As produced by diff -U0: "-N,0" inserts after line N
+    patch = (
+        "--- a/data.txt\n"
+        "+++ b/data.txt\n"
+        "@@ -3,0 +4 @@\n"
+        "+after three\n"
+        "@@ -5,0 +7,2 @@\n"
+        "+x\n"
+        "+y\n"
+    )
+    result = asyncio.run(integration.call_tool("apply_patch", {"path": "data.txt", "patch": patch}))
+    assert result["applied"] == 2
+    assert (root / "data.txt").read_text().splitlines() == [
+        "line 1", "line 2", "line 3", "after three", "line 4", "line 5", "x", "y", "line 6",
+    ]
+
+    top = "@@ -0,0 +1 @@\n+top\n"
+    asyncio.run(integration.call_tool("apply_patch", {"path": "data.txt", "patch": top}))
+    assert (root / "data.txt").read_text().splitlines()[:2] == ["top", "line 1"]
@@ -0,0 +1,133 @@
+import sys
+import os
+import subprocess
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.integrations.vcs.git import GitIntegration
+from src.utils.git_repo import encode_cursor
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Ada", "GIT_AUTHOR_EMAIL": "ada@example.com",
+    "GIT_COMMITTER_NAME": "Ada", "GIT_COMMITTER_EMAIL": "ada@example.com",
+}
+
+
+def _git(repo, *args, date=None):
+    env = {**os.environ, **GIT_ENV}
+    if date is not None:
+        env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = f"{date} +0000"
+    return subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True, text=True, env=env).stdout
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """main: 30 commits touching a.txt, every third also b.txt; a side branch merged at the end."""
+    path = tmp_path / "repo"
+    path.mkdir()
+    _git(path, "init", "-q", "-b", "main")
+    for i in range(30):
+        (path / "a.txt").write_text("".join(f"line {n}\n" for n in range(i + 1)))
+        if i % 3 == 0:
+            (path / "docs").mkdir(exist_ok=True)
+            (path / "docs" / "b.txt").write_text(f"b {i}\n")
+        _git(path, "add", "-A")
+        _git(path, "commit", "-q", "-m", f"commit {i}", date=1700000000 + i * 60)
+    _git(path, "checkout", "-q", "-b", "side", "HEAD~5")
+    (path / "side.txt").write_text("side\n")
+    _git(path, "add", "side.txt")
+    _git(path, "commit", "-q", "-m", "side work", date=1700000000 + 27 * 60 + 30)
+    _git(path, "checkout", "-q", "main")
+    _git(path, "merge", "-q", "--no-ff", "-m", "merge side", "side", date=1700000000 + 31 * 60)
+    return path
+
+
+async def test_log_pages_match_git_log(repo, make_integration):
+    git = await make_integration(GitIntegration, {})
+    pages = [await git.call_tool("git_log", {"path": str(repo), "max_count": 7})]
+    while pages[-1]["cursor"]:
+        pages.append(await git.call_tool("git_log", {"path": str(repo), "max_count": 7,
+                                                     "cursor": pages[-1]["cursor"]}))
+    shas = [c["sha"] for p in pages for c in p["commits"]]
+    assert shas == _git(repo, "log", "--format=%H").split()
+    assert len(pages) == 5
+    assert pages[0]["commits"][0]["subject"] == "merge side"
+    # Each page continues from the previous frontier instead of rescanning
+    assert sum(p["scanned"] for p in pages) == len(shas)
+
+
+async def test_log_pages_never_repeat_commits_with_equal_dates(tmp_path, make_integration):
+    path = tmp_path / "same-second"
+    path.mkdir()
+    _git(path, "init", "-q", "-b", "main")
+    _git(path, "commit", "-q", "--allow-empty", "-m", "root", date=1700000000)
+    for branch in ("x", "y"):
+        _git(path, "checkout", "-q", "-b", branch, "main")
+        for i in range(3):
+            _git(path, "commit", "-q", "--allow-empty", "-m", f"{branch} {i}", date=1700000000)
+    _git(path, "checkout", "-q", "main")
+    _git(path, "merge", "-q", "--no-ff", "-m", "merge x", "x", date=1700000000)
+    _git(path, "merge", "-q", "--no-ff", "-m", "merge y", "y", date=1700000000)
+
+    git = await make_integration(GitIntegration, {})
+    pages = [await git.call_tool("git_log", {"path": str(path), "max_count": 1})]
+    while pages[-1]["cursor"]:
+        pages.append(await git.call_tool("git_log", {"path": str(path), "max_count": 1,
+                                                     "cursor": pages[-1]["cursor"]}))
+    shas = [c["sha"] for p in pages for c in p["commits"]]
+    assert sorted(shas) == sorted(_git(path, "rev-list", "HEAD").split())
+
+
+async def test_log_rejects_malformed_cursors(repo, make_integration):
+    git = await make_integration(GitIntegration, {})
+    for state in ([], {}, {"frontier": ["HEAD"]}, {"frontier": [], "walked": "x"}):
+        cursor = encode_cursor(state)
+        result = await git.call_tool("git_log", {"path": str(repo), "cursor": cursor})
+        assert result == "Error: Invalid cursor"
+
+
+async def test_log_file_filter(repo, make_integration):
+    git = await make_integration(GitIntegration, {})
+    first = await git.call_tool("git_log", {"path": str(repo), "file": "docs/b.txt", "max_count": 4})
+    rest = await git.call_tool("git_log", {"path": str(repo), "cursor": first["cursor"], "max_count": 100})
+    shas = [c["sha"] for c in first["commits"] + rest["commits"]]
+    assert shas == _git(repo, "log", "--format=%H", "--", "docs/b.txt").split()
+    assert len(shas) == 10
+
+
+async def test_repo_cache_reuses_objects(repo, make_integration):
+    git = await make_integration(GitIntegration, {})
+    await git.call_tool("git_log", {"path": str(repo), "max_count": 100})
+    again = await git.call_tool("git_log", {"path": str(repo / "docs"), "max_count": 100})
+    assert len(git.repos.repos) == 1
+    assert again["cache"]["commit_reads"] == 32
+    assert again["cache"]["commit_hits"] >= 32
+
+
+async def test_show_diff_blame_and_ls_tree(repo, make_integration):
+    git = await make_integration(GitIntegration, {})
+    path = str(repo)
+    show = await git.call_tool("git_show", {"path": path, "rev": "main~1", "max_lines": 3})
+    blob = await git.call_tool("git_show", {"path": path, "file": "a.txt", "offset": 28})
+    diff = await git.call_tool("git_diff", {"path": path, "base": "main~3", "target": "main~1"})
+    blame = await git.call_tool("git_blame", {"path": path, "file": "a.txt", "start_line": 5, "max_lines": 20})
+    tree = await git.call_tool("git_ls_tree", {"path": path, "recursive": True, "long": True})
+    page = await git.call_tool("git_ls_tree", {"path": path, "recursive": True, "limit": 2, "offset": 1})
+    missing = await git.call_tool("git_show", {"path": path, "rev": "nope"})
+    option = await git.call_tool("git_diff", {"path": path, "base": "--output=/tmp/x"})
+    assert show["subject"] == "commit 29"
+    assert len(show["patch"]) == 3 and show["next_offset"] == 3
+    assert blob["lines"] == ["line 28", "line 29"] and blob["total_lines"] == 30
+    assert "+line 28" in diff["diff"] and "+line 29" in diff["diff"]
+    assert blame["next_line"] == 25 and blame["total_lines"] == 30
+    assert [h["summary"] for h in blame["hunks"]] == [f"commit {n}" for n in range(4, 24)]
+    assert blame["hunks"][0]["lines"] == ["line 4"]
+    assert [(e["path"], e["type"]) for e in tree["entries"]] == [
+        ("a.txt", "blob"), ("docs", "tree"), ("side.txt", "blob"), ("docs/b.txt", "blob"),
+    ]
+    assert tree["entries"][0]["size"] == len((repo / "a.txt").read_bytes())
+    assert [e["path"] for e in page["entries"]] == ["docs", "side.txt"] and page["next_offset"] == 3
+    assert missing.startswith("Error:")
+    assert option.startswith("Error: Invalid revision")
@@ -0,0 +1,99 @@
+import sys
+import os
+import subprocess
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.integrations.vcs.git_ingest import GitIngestIntegration
+from src.utils.repo_digest import matches, summarize
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Ada", "GIT_AUTHOR_EMAIL": "ada@example.com",
+    "GIT_COMMITTER_NAME": "Ada", "GIT_COMMITTER_EMAIL": "ada@example.com",
+}
+
+
+def _git(repo, *args):
+    return subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True, text=True,
+                          env={**os.environ, **GIT_ENV}).stdout
+
+
+def _commit(repo, files, message):
+    for name, text in files.items():
+        path = repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", message)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "project"
+    path.mkdir()
+    _git(path, "init", "-q", "-b", "main")
+    files = {
+        "README.md": "# Project\n\nDoes things.\n",
+        "package-lock.json": "{}\n",
+        "src/app.py": '"""Application entry point."""\n\nclass App:\n    pass\n\n\ndef main():\n    App()\n',
+        "node_modules/lib/index.js": "module.exports = 1;\n",
+    }
+    files.update({f"src/pkg/mod{i}.py": f"# Module {i}\ndef f{i}():\n    return {i}\n" for i in range(20)})
+    _commit(path, files, "initial")
+    return path
+
+
+def test_summaries_and_patterns():
+    summary = summarize("src/app.py", b'"""Application entry point."""\n\nclass App:\n    pass\n\ndef main():\n    pass\n')
+    assert summary["description"] == "Application entry point."
+    assert summary["symbols"] == ["App", "main"] and summary["lines"] == 7
+    assert summarize("logo.png", b"\x89PNG\0\0")["binary"] is True
+    assert matches("a/node_modules/x.js", ["node_modules/"])
+    assert matches("src/pkg/mod1.py", ["src/*.py"]) and matches("src/pkg/mod1.py", ["*.py"])
+    assert not matches("src/pkg/mod1.py", ["docs/"])
+
+
+async def test_analyze_is_cached_and_incremental(repo, make_integration):
+    ingest = await make_integration(GitIngestIntegration, {})
+    first = await ingest.call_tool("github_analyze", {"repo_url": str(repo)})
+    again = await ingest.call_tool("github_analyze", {"repo_url": str(repo)})
+    _commit(repo, {"src/pkg/mod3.py": "# Module three\ndef g():\n    pass\n"}, "change mod3")
+    changed = await ingest.call_tool("github_analyze", {"repo_url": str(repo)})
+    paths = [f["path"] for f in first["files"]]
+    assert "package-lock.json" not in paths and not any(p.startswith("node_modules/") for p in paths)
+    assert first["summary"]["files"] == 22 and first["blobs_read"] == 22
+    assert first["content"].startswith("=" * 48 + "\nFILE: README.md\n")
+    assert not first["truncated"]
+
+    assert again["cached"] and again["blobs_read"] == 0
+    assert again["elapsed_ms"] < 50
+    assert again["commit"] == first["commit"]
+
+    # Only the changed blob is read again
+    assert not changed["cached"] and changed["blobs_read"] == 1
+    mod3 = next(f for f in changed["files"] if f["path"] == "src/pkg/mod3.py")
+    assert mod3["description"] == "Module three" and mod3["symbols"] == ["g"]
+
+
+async def test_token_budget_and_include(repo, make_integration):
+    ingest = await make_integration(GitIngestIntegration, {})
+    small = await ingest.call_tool("github_analyze", {"repo_url": str(repo), "max_tokens": 400})
+    only = await ingest.call_tool("github_analyze", {"repo_url": str(repo), "include_patterns": ["src/*.py"],
+                                                     "exclude_patterns": ["src/pkg/"]})
+    assert small["truncated"] and small["tokens"] <= 400
+    assert 0 < len(small["files"]) < 22
+    assert [f["path"] for f in only["files"]] == ["src/app.py"]
+
+
+async def test_mirror_read_and_list(repo, tmp_path, make_integration):
+    ingest = await make_integration(GitIngestIntegration, {"clone_dir": str(tmp_path / "mirrors")})
+    url = f"file://{repo}"
+    read = await ingest.call_tool("github_read_file", {"repo_url": url, "file_path": "src/app.py"})
+    listing = await ingest.call_tool("github_list_files", {"repo_url": url, "directory": "src"})
+    missing = await ingest.call_tool("github_read_file", {"repo_url": url, "file_path": "nope.txt"})
+    assert read["content"].startswith('"""Application entry point."""')
+    assert [(e["name"], e["type"]) for e in listing["entries"]] == [("app.py", "blob"), ("pkg", "tree")]
+    assert missing.startswith("Error: No file nope.txt")
+    assert len(os.listdir(tmp_path / "mirrors")) == 1
@@ -0,0 +1,38 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.html_text import extract, extract_text, needs_browser
+
+
+def test_extract_text_skips_scripts_and_keeps_blocks():
+    html = """<html><head><title> Example </title><style>p{}</style></head>
+    <body><h1>Heading</h1><script>var x = "<p>not text</p>";</script>
+    <p>First   paragraph with <b>bold</b> text.</p><ul><li>one</li><li>two</li></ul>
+    <noscript>Please enable JavaScript</noscript></body></html>"""
+    title, text = extract(html)
+    assert title == "Example"
+    assert text.splitlines() == ["Heading", "First paragraph with bold text.", "one", "two"]
+
+
+def test_extract_text_decodes_entities():
+    assert extract_text("<p>Fish &amp; chips&nbsp;&copy;</p>") == "Fish & chips \xa9"
+
+
+def test_needs_browser_detects_spa_shell():
+    shell = '<html><body><div id="root"></div><script src="/app.js"></script></body></html>'
+    assert needs_browser(shell)
+
+    noscript = "<html><body><noscript>You need to enable JavaScript to run this app.</noscript></body></html>"
+    assert needs_browser(noscript)
+
+    bundle = "<html><body><script>" + "x=1;" * 1000 + "</script><p>Loading</p></body></html>"
+    assert needs_browser(bundle)
+
+
+def test_needs_browser_accepts_static_pages():
+    article = "<html><body><article>" + "<p>Plenty of readable text here.</p>" * 50 + "</article>" \
+              '<div id="root"></div><script src="/analytics.js"></script></body></html>'
+    assert not needs_browser(article)
+    assert not needs_browser("<html><body><p>Short but static.</p></body></html>")
@@ -0,0 +1,158 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.http_cache import HttpCache, freshness_lifetime
+
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({"cache-control": "max-age=60"}, 300) == 60
+    assert freshness_lifetime({"cache-control": "public, s-maxage=30, max-age=60"}, 300) == 30
+    assert freshness_lifetime({"cache-control": "max-age=60", "age": "50"}, 300) == 10
+    assert freshness_lifetime({"cache-control": "no-cache"}, 300) == 0
+    assert freshness_lifetime({"cache-control": "no-store"}, 300) is None
+    assert freshness_lifetime({"cache-control": "private, max-age=60"}, 300) is None
+    assert freshness_lifetime({"expires": "0"}, 300) == 0
+    assert freshness_lifetime({
+        "date": "Mon, 01 Jan 2024 00:00:00 GMT",
+        "expires": "Mon, 01 Jan 2024 00:02:00 GMT",
+    }, 300) == 120
+    # No caching headers: configured TTL
+    assert freshness_lifetime({"content-type": "text/html"}, 300) == 300
+
+
+def test_store_lookup_and_variants(tmp_path):
+    cache = HttpCache(tmp_path / "cache", default_ttl=60)
+    url = "https://example.com/doc"
+    entry = cache.store(url, 200, {"Content-Type": "text/html", "ETag": '"v1"', "Content-Encoding": "gzip"},
+                        b"<p>hi</p>")
+    assert entry.fresh
+    assert cache.store(url, 404, {}, b"missing") is None
+    assert cache.store(url, 200, {"Cache-Control": "no-store"}, b"secret", variant="private") is None
+
+    cache.update_extra(entry, text="hi")
+    cache.store(url, 200, {}, b"rendered", variant="rendered")
+
+    found = cache.lookup(url)
+    assert found.body() == b"<p>hi</p>"
+    assert found.extra == {"text": "hi"}
+    assert found.validators == {"If-None-Match": '"v1"'}
+    # Stored body is decoded, so its encoding header must not survive
+    assert "content-encoding" not in found.headers
+    assert cache.lookup(url, "rendered").body() == b"rendered"
+    assert cache.lookup("https://example.com/other") is None
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = HttpCache(tmp_path / "cache", max_bytes=250)
+    for name in ("a", "b", "c"):
+        cache.store(f"https://example.com/{name}", 200, {}, name.encode() * 100)
+        time.sleep(0.01)
+    assert cache.lookup("https://example.com/a") is None
+    assert cache.lookup("https://example.com/b") is not None
+    assert cache.lookup("https://example.com/c") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 200
+
+
+class _Origin(BaseHTTPRequestHandler):
+    requests = []
+    body = b"<html><body><p>Origin content</p></body></html>"
+
+    def do_GET(self):
+        _Origin.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/etag" and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("Cache-Control", "max-age=0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(self.body)))
+        if self.path == "/etag":
+            self.send_header("ETag", '"v1"')
+            self.send_header("Cache-Control", "max-age=0")
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Origin)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _Origin.requests = []
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_get_hits_revalidates_and_bypasses(tmp_path, origin):
+    pytest.importorskip("aiohttp")
+    from src.utils.http import HttpClient
+
+    async def run():
+        client = HttpClient()
+        cache = HttpCache(tmp_path / "cache", default_ttl=60)
+        try:
+            statuses = []
+            for url, bypass in ((f"{origin}/plain", False), (f"{origin}/plain", False),
+                                (f"{origin}/plain", True), (f"{origin}/etag", False), (f"{origin}/etag", False)):
+                resp = await cache.get(client, url, bypass=bypass)
+                assert resp.body == _Origin.body
+                statuses.append(resp.cache_status)
+            return statuses, cache.stats()
+        finally:
+            await client.close()
+            cache.close()
+
+    statuses, stats = asyncio.run(run())
+    assert statuses == ["miss", "hit", "bypass", "miss", "revalidated"]
+    assert _Origin.requests == [("/plain", None), ("/plain", None), ("/etag", None), ("/etag", '"v1"')]
+    assert stats["hits"] == 1 and stats["revalidated"] == 1 and stats["misses"] == 2
+
+
+class _Routed:
+    """Just enough of Playwright's route, request and response for a document request."""
+
+    def __init__(self, url):
+        self.url = url
+        self.request = self
+        self.status = 200
+        self.headers = {"content-type": "text/html", "cache-control": "max-age=60"}
+        self.fulfilled = []
+
+    async def fetch(self, headers):
+        return self
+
+    async def body(self):
+        return b"<p>routed</p>"
+
+    async def fulfill(self, **options):
+        self.fulfilled.append(options)
+
+
+async def test_rendered_miss_is_counted_once(tmp_path):
+    cache = HttpCache(tmp_path / "cache")
+    try:
+        url = "https://example.com/page"
+        assert cache.fresh(url, "rendered:") is None
+        route = _Routed(url)
+        await cache._route_document(route, route, {})
+        again = _Routed(url)
+        await cache._route_document(again, again, {})
+        stats = cache.stats()
+    finally:
+        cache.close()
+    assert (stats["misses"], stats["hits"], stats["stores"]) == (1, 1, 1)
+    assert again.fulfilled[0]["body"] == b"<p>routed</p>"
@@ -0,0 +1,62 @@
+import sys
+import os
+import zlib
+import struct
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import imaging
+from src.utils.imaging import image_size, normalize_format, transcode, visual_diff
+
+
+def _png(width, height, pixel=lambda x, y: (255, 255, 255)):
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(
+        b"\x00" + b"".join(bytes(pixel(x, y)) for x in range(width)) for y in range(height)
+    )
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+def test_normalize_format_and_size():
+    assert normalize_format("JPG") == "jpeg"
+    assert normalize_format(None) == "png"
+    with pytest.raises(ValueError):
+        normalize_format("gif")
+    assert image_size(_png(40, 30)) == (40, 30)
+
+
+def test_transcode_passes_native_formats_through():
+    data = _png(40, 30)
+    assert transcode(data, "png") is data
+    assert transcode(data, "png", max_width=100) is data
+
+
+def test_identical_captures_are_unchanged():
+    data = _png(20, 20)
+    assert visual_diff(data, _png(20, 20)) == {"changed": False, "changed_ratio": 0.0}
+
+
+def test_without_pillow_reports_byte_changes(monkeypatch):
+    monkeypatch.setattr(imaging, "Image", None)
+    assert visual_diff(_png(20, 20), _png(20, 20, lambda x, y: (0, 0, 0))) == {"changed": True}
+    with pytest.raises(RuntimeError):
+        transcode(_png(40, 30), "webp")
+
+
+def test_pixel_diff_and_downscale():
+    pytest.importorskip("PIL")
+    before = _png(100, 50)
+    after = _png(100, 50, lambda x, y: (0, 0, 0) if x < 10 and y < 5 else (255, 255, 255))
+    diff = visual_diff(before, after)
+    assert diff["changed"] is True
+    assert diff["bbox"] == [0, 0, 10, 5]
+    assert diff["changed_ratio"] == 0.01
+
+    small = transcode(before, "webp", quality=50, max_width=50)
+    assert image_size(small) == (50, 25)
@@ -0,0 +1,99 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.integrations.filesystem.markitdown import MarkitdownIntegration
+from src.utils.doc_convert import MarkItDown, pdfminer
+
+
+@pytest.fixture
+def make_converter(tmp_path, make_integration):
+    """``await make_converter(**config)`` returns a converter caching under ``tmp_path``."""
+    async def make(**config):
+        return await make_integration(
+            MarkitdownIntegration, {"cache_dir": str(tmp_path / "cache"), "workers": 2, **config},
+        )
+    return make
+
+
+def _pdf(texts):
+    """A minimal PDF with one line of Helvetica text per page."""
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for i, text in enumerate(texts):
+        page, content = 4 + 2 * i, 5 + 2 * i
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects[content] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        objects[page] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                         b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content)
+        kids.append(b"%d 0 R" % page)
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(texts))
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for number in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[number]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+async def test_cached_by_content(tmp_path, make_converter):
+    (tmp_path / "a.md").write_text("# Notes\n\nHello.\n")
+    (tmp_path / "copy.md").write_text("# Notes\n\nHello.\n")
+    converter = await make_converter()
+    first = await converter.call_tool("convert_to_markdown", {"path": str(tmp_path / "a.md")})
+    again = await converter.call_tool("convert_to_markdown", {"path": str(tmp_path / "a.md")})
+    copy = await converter.call_tool("convert_to_markdown", {"path": str(tmp_path / "copy.md")})
+    (tmp_path / "a.md").write_text("# Notes\n\nChanged.\n")
+    changed = await converter.call_tool("convert_to_markdown", {"path": str(tmp_path / "a.md")})
+    missing = await converter.call_tool("convert_to_markdown", {"path": str(tmp_path / "nope.md")})
+    assert first["markdown"] == "# Notes\n\nHello.\n" and not first["cached"]
+    assert again["cached"] and copy["cached"] and copy["sha256"] == first["sha256"]
+    assert not changed["cached"] and "Changed." in changed["markdown"]
+    assert missing.startswith("Error: Not a file")
+
+
+@pytest.mark.skipif(pdfminer is None, reason="pdfminer.six is not installed")
+async def test_pdf_pages_stream_from_cache(tmp_path, make_converter):
+    (tmp_path / "doc.pdf").write_bytes(_pdf([f"Page number {i}" for i in range(1, 6)]))
+    converter = await make_converter()
+    first = await converter.call_tool("convert_to_markdown", {"path": str(tmp_path / "doc.pdf"), "max_pages": 2})
+    rest = await converter.call_tool("convert_to_markdown", {"path": str(tmp_path / "doc.pdf"),
+                                                              "page": first["next_page"], "max_pages": 10})
+    assert first["pages"] == 5 and (first["page_start"], first["page_end"], first["next_page"]) == (1, 2, 3)
+    assert "<!-- page 1 -->\nPage number 1" in first["markdown"] and "Page number 3" not in first["markdown"]
+    assert rest["cached"] and (rest["page_start"], rest["page_end"], rest["next_page"]) == (3, 5, None)
+    assert "Page number 5" in rest["markdown"]
+
+
+@pytest.mark.skipif(MarkItDown is None or pdfminer is None, reason="markitdown is not installed")
+async def test_batch_conversion(tmp_path, make_converter):
+    (tmp_path / "page.html").write_text("<html><body><h1>Title</h1><p>Body text</p></body></html>")
+    (tmp_path / "doc.pdf").write_bytes(_pdf(["Only page"]))
+    converter = await make_converter()
+    paths = [str(tmp_path / "page.html"), str(tmp_path / "doc.pdf"), str(tmp_path / "missing.docx")]
+    batch = await converter.call_tool("convert_to_markdown", {"paths": paths})
+    html, pdf, missing = batch["results"]
+    assert "# Title" in html["markdown"] and html["converter"].startswith("markitdown")
+    assert pdf["markdown"].strip() == "Only page"
+    assert missing["error"].startswith("Not a file")
+
+
+async def test_entry_larger_than_cache_is_still_returned(tmp_path, make_converter):
+    (tmp_path / "a.md").write_text("# A\n\nFirst document.\n")
+    (tmp_path / "b.md").write_text("# B\n\nSecond document.\n")
+    converter = await make_converter(cache_bytes=1)
+    first = await converter.call_tool("convert_to_markdown", {"path": str(tmp_path / "a.md")})
+    second = await converter.call_tool("convert_to_markdown", {"path": str(tmp_path / "b.md")})
+    again = await converter.call_tool("convert_to_markdown", {"path": str(tmp_path / "a.md")})
+    assert first["markdown"] == "# A\n\nFirst document.\n"
+    assert second["markdown"] == "# B\n\nSecond document.\n"
+    # Only the newest entry is kept
+    assert not again["cached"] and again["markdown"] == first["markdown"]
@@ -0,0 +1,128 @@
+import sys
+import os
+import time
+import asyncio
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+asyncpg = pytest.importorskip("asyncpg")
+
+from src.integrations.database.postgres import PostgresIntegration
+
+
+@pytest.fixture
+async def make_db(postgres_dsn, make_integration):
+    """``await make_db(**config)`` returns an integration over a freshly seeded ``items`` table."""
+    conn = await asyncpg.connect(postgres_dsn)
+    try:
+        await conn.execute("DROP TABLE IF EXISTS items")
+        await conn.execute("CREATE TABLE items (id int PRIMARY KEY, name text, price numeric)")
+        await conn.executemany("INSERT INTO items VALUES ($1, $2, $3)",
+                               [(i, f"item{i}", f"{i}.50") for i in range(1200)])
+    finally:
+        await conn.close()
+
+    async def make(**config):
+        return await make_integration(PostgresIntegration, {"url": postgres_dsn, "pool_size": 3, **config})
+    return make
+
+
+async def test_server_side_cursor_paging(make_db):
+    db = await make_db()
+    first = await db.call_tool("postgres_query", {
+        "query": "SELECT id, name, price FROM items WHERE id >= $1 ORDER BY id", "params": [100], "page_size": 500,
+    })
+    pages = [first]
+    while pages[-1]["cursor"]:
+        pages.append(await db.call_tool("postgres_fetch", {"cursor": pages[-1]["cursor"], "page_size": 500}))
+    empty = await db.call_tool("postgres_query", {"query": "SELECT id FROM items WHERE id < 0"})
+    write = await db.call_tool("postgres_query", {"query": "DELETE FROM items"})
+    assert [p["row_count"] for p in pages] == [500, 500, 100]
+    assert pages[0]["columns"] == ["id", "name", "price"]
+    assert [i for p in pages for i in p["data"][0]] == list(range(100, 1200))
+    assert pages[0]["data"][2][0] == "100.50"
+    assert empty["columns"] == ["id"] and empty["row_count"] == 0 and empty["cursor"] is None
+    assert write.startswith("Error:") and "read-only" in write
+    assert len(db.cursors) == 0
+
+
+async def test_cursors_hold_connections_and_close(make_db):
+    db = await make_db()
+    held = await db.call_tool("postgres_query", {"query": "SELECT id FROM items", "page_size": 10})
+    # Two more cursors than the pool leaves room for: the oldest is closed
+    others = [await db.call_tool("postgres_query", {"query": "SELECT id FROM items", "page_size": 10})
+              for _ in range(2)]
+    evicted = await db.call_tool("postgres_fetch", {"cursor": held["cursor"]})
+    closed = await db.call_tool("postgres_fetch", {"cursor": others[0]["cursor"], "close": True})
+    plain = await db.call_tool("postgres_query", {"query": "SELECT 1 AS one"})
+    assert evicted.startswith("Error: Unknown or expired cursor")
+    assert closed == {"closed": True}
+    assert plain["data"] == [[1]]
+
+
+async def test_timeout_and_cancellation_stop_the_statement(make_db):
+    async def active_sleeps(db):
+        rows = await db.call_tool("postgres_query", {
+            "query": "SELECT count(*) AS n FROM pg_stat_activity WHERE query LIKE 'SELECT pg_sleep%'",
+        })
+        return rows["data"][0][0]
+
+    db = await make_db(read_only=False)
+    start = time.perf_counter()
+    timed_out = await db.call_tool("postgres_query", {"query": "SELECT pg_sleep(5)", "timeout": 0.3})
+    elapsed = time.perf_counter() - start
+
+    task = asyncio.create_task(db.call_tool("postgres_query", {"query": "SELECT pg_sleep(5)"}))
+    await asyncio.sleep(0.3)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(0.3)
+    assert timed_out.startswith("Error: query timed out after 0.3s")
+    assert elapsed < 2
+    assert await active_sleeps(db) == 0
+
+
+async def test_describe_schema_and_query_cache(make_db):
+    db = await make_db(read_only=False, query_cache=True)
+    await db.call_tool("postgres_query", {"query": "DROP TABLE IF EXISTS orders"})
+    await db.call_tool("postgres_query", {
+        "query": "CREATE TABLE orders (id serial PRIMARY KEY, item_id int REFERENCES items(id), qty int NOT NULL)",
+    })
+    schema = await db.call_tool("postgres_describe_schema", {"table": "public.orders"})
+    cached = await db.call_tool("postgres_describe_schema", {"table": "orders"})
+    await db.call_tool("postgres_query", {"query": "ALTER TABLE orders ADD COLUMN note text"})
+    altered = await db.call_tool("postgres_describe_schema", {"table": "orders"})
+
+    query = {"query": "SELECT count(*) AS n FROM orders"}
+    counts = [await db.call_tool("postgres_query", query), await db.call_tool("postgres_query", query)]
+    await db.call_tool("postgres_query", {"query": "INSERT INTO orders (item_id, qty) VALUES ($1, $2)", "params": [1, 2]})
+    counts.append(await db.call_tool("postgres_query", query))
+    await db.call_tool("postgres_query", {"query": "DROP TABLE orders"})
+    orders = schema["tables"][0]
+    assert schema["cached"] is False and cached["cached"] is True
+    assert [c["name"] for c in orders["columns"]] == ["id", "item_id", "qty"]
+    assert orders["columns"][0]["primary_key"] is True and orders["columns"][2]["nullable"] is False
+    assert orders["foreign_keys"][0]["columns"] == ["item_id"]
+    assert orders["foreign_keys"][0]["references"] == "items" and orders["foreign_keys"][0]["ref_columns"] == ["id"]
+    assert altered["cached"] is False and altered["tables"][0]["columns"][-1]["name"] == "note"
+    assert [c["data"] for c in counts] == [[[0]], [[0]], [[1]]]
+    assert [c.get("cached", False) for c in counts] == [False, True, False]
+
+
+async def test_query_cache_invalidated_through_views(make_db):
+    db = await make_db(read_only=False, query_cache=True)
+    await db.call_tool("postgres_query", {"query": "DROP VIEW IF EXISTS totals"})
+    await db.call_tool("postgres_query", {"query": "DROP TABLE IF EXISTS ledger"})
+    await db.call_tool("postgres_query", {"query": "CREATE TABLE ledger (amount int)"})
+    await db.call_tool("postgres_query", {"query": "CREATE VIEW totals AS SELECT count(*) AS n FROM ledger"})
+    query = {"query": "SELECT n FROM totals"}
+    seen = [await db.call_tool("postgres_query", query), await db.call_tool("postgres_query", query)]
+    await db.call_tool("postgres_query", {"query": "INSERT INTO ledger VALUES (5)"})
+    seen.append(await db.call_tool("postgres_query", query))
+    await db.call_tool("postgres_query", {"query": "DROP VIEW totals"})
+    await db.call_tool("postgres_query", {"query": "DROP TABLE ledger"})
+    assert [s["data"] for s in seen] == [[[0]], [[0]], [[1]]]
+    assert [s.get("cached", False) for s in seen] == [False, True, False]
@@ -0,0 +1,46 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.query_cache import (
+    QueryCache, is_cacheable_read, is_ddl, normalize_sql, referenced_tables, written_tables,
+)
+
+
+def test_sql_analysis():
+    assert normalize_sql("SELECT  a -- note\n FROM  t WHERE b = 'x  y';") == "SELECT a FROM t WHERE b = 'x  y'"
+    assert referenced_tables('SELECT * FROM main.t1, t2 AS b JOIN "Orders" o ON o.id = b.id') == {"t1", "t2", "orders"}
+    assert referenced_tables("SELECT * FROM (SELECT * FROM inner_t) s") == {"inner_t"}
+    assert written_tables("INSERT OR REPLACE INTO kv VALUES (1)") == {"kv"}
+    assert written_tables('UPDATE public."Items" SET a = 1') == {"items"}
+    assert written_tables("WITH v AS (SELECT 1) DELETE FROM t") == {"t"}
+    assert is_ddl("  create table x (a int)") and not is_ddl("SELECT 'create table'")
+
+    assert is_cacheable_read("SELECT * FROM t WHERE name = 'insert'")
+    assert not is_cacheable_read("SELECT 1")
+    assert not is_cacheable_read("SELECT random() FROM t")
+    assert not is_cacheable_read("SELECT * FROM t WHERE d > date('now')")
+    assert not is_cacheable_read("WITH v AS (SELECT 1) INSERT INTO t SELECT * FROM v")
+
+
+def test_query_cache_invalidation():
+    cache = QueryCache(max_entries=10, ttl=60)
+    a = cache.key("SELECT * FROM a", [1])
+    b = cache.key("select * from b", [])
+    assert cache.key("SELECT *  FROM a", [1]) == a != cache.key("SELECT * FROM a", [2])
+
+    cache.put(a, {"a"}, "rows of a", cache.generation)
+    cache.put(b, {"b"}, "rows of b", cache.generation)
+    cache.invalidate({"a"})
+    assert cache.get(a) is None and cache.get(b) == "rows of b"
+
+    # A result computed while a write happened is not stored
+    generation = cache.generation
+    cache.invalidate({"c"})
+    cache.put(a, {"a"}, "stale", generation)
+    assert cache.get(a) is None
+
+    cache.invalidate()
+    assert cache.get(b) is None
+    assert cache.stats()["invalidations"] == 3
@@ -0,0 +1,39 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.resource_policy import ResourcePolicy
+
+
+def test_blocks_configured_types_but_not_top_level_document():
+    policy = ResourcePolicy(block_types=["image", "font"], block_trackers=False)
+    assert policy.should_block("image", "https://example.com/a.png")
+    assert policy.should_block("font", "https://example.com/a.woff2")
+    assert not policy.should_block("script", "https://example.com/app.js")
+    assert not policy.should_block("document", "https://example.com/", top_level=True)
+
+
+def test_blocks_domains_and_subdomains():
+    policy = ResourcePolicy(block_types=[], block_domains=["ads.example"], block_trackers=True)
+    assert policy.should_block("script", "https://www.googletagmanager.com/gtm.js")
+    assert policy.should_block("xhr", "https://cdn.ads.example/pixel")
+    assert policy.should_block("document", "https://ads.example/frame.html")
+    assert not policy.should_block("script", "https://notads.example/app.js")
+    assert not policy.should_block("document", "https://ads.example/", top_level=True)
+
+
+def test_interactive_policy_keeps_images_and_domains():
+    policy = ResourcePolicy(block_domains=["ads.example"]).interactive()
+    assert not policy.should_block("image", "https://example.com/a.png")
+    assert not policy.should_block("stylesheet", "https://example.com/a.css")
+    assert policy.should_block("media", "https://example.com/a.mp4")
+    assert policy.should_block("script", "https://doubleclick.net/x.js")
+    assert policy.should_block("image", "https://ads.example/banner.png")
+
+
+def test_rejects_unknown_resource_types():
+    with pytest.raises(ValueError):
+        ResourcePolicy(block_types=["images"])
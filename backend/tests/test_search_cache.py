@@ -0,0 +1,162 @@
+import sys
+import os
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import cache as cache_module
+from src.utils.cache import TTLCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  Python   ASYNCIO\ttutorial ") == "python asyncio tutorial"
+
+
+def test_ttl_and_lru(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    now[0] += 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["evictions"] == 1 and stats["expirations"] == 1
+
+
+def test_get_or_set_coalesces_and_skips_errors():
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ["result"]
+
+    async def run():
+        cache = TTLCache()
+        results = await asyncio.gather(*(cache.get_or_set("q", search) for _ in range(5)))
+        again = await cache.get_or_set("q", search)
+        await cache.get_or_set("bad", lambda: asyncio.sleep(0, "Error: down"),
+                               cacheable=lambda v: isinstance(v, list))
+        return results, again, cache
+
+    results, again, cache = asyncio.run(run())
+    assert len(calls) == 1
+    assert [r[0] for r in results] == [["result"]] * 5
+    assert again == (["result"], True)
+    assert cache.get("bad") is None
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_get_or_set_waiters_recompute_when_owner_cancelled():
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ["result"]
+
+    async def run():
+        cache = TTLCache()
+        owner = asyncio.ensure_future(cache.get_or_set("q", search))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(cache.get_or_set("q", search)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        results = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return results
+
+    results = asyncio.run(run())
+    assert [r[0] for r in results] == [["result"]] * 3
+    # One waiter took over the search; the others coalesced onto it
+    assert len(calls) == 2
+
+
+class _FakeManager:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    async def send_request(self, method, params):
+        self.requests.append(params["arguments"])
+        return self.responses.pop(0)
+
+
+def test_multi_engine_skips_errors_and_honours_no_cache(monkeypatch):
+    from src.integrations.web_search.multi_engine import MultiEngineIntegration
+
+    monkeypatch.setattr(cache_module, "_search_cache", TTLCache(ttl=60))
+    ok = {"content": [{"type": "text", "text": "hit"}]}
+    failed = {"content": [{"type": "text", "text": "rate limited"}], "isError": True}
+
+    async def run():
+        search = MultiEngineIntegration({})
+        search.manager = _FakeManager([failed, ok, ok])
+        seen = [await search.call_tool("search_multi_engine", {"query": "mcp"}) for _ in range(3)]
+        seen.append(await search.call_tool("search_multi_engine", {"query": "mcp", "no_cache": True}))
+        return seen, search.manager.requests
+
+    seen, requests = asyncio.run(run())
+    assert seen == [failed, ok, ok, ok]
+    # The error wasn't cached, the second result was, and no_cache searched again
+    assert len(requests) == 3 and all("no_cache" not in r for r in requests)
+
+
+class _Searx(BaseHTTPRequestHandler):
+    queries = []
+
+    def do_GET(self):
+        _Searx.queries.append(self.path)
+        body = json.dumps({"results": [{"title": "Hit", "url": "https://example.com"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def searx():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Searx)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _Searx.queries = []
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_searxng_served_from_cache(searx, monkeypatch):
+    pytest.importorskip("aiohttp")
+    from src.integrations.web_search.searxng import SearxngIntegration
+    from src.utils.http import close_http_client
+
+    monkeypatch.setattr(cache_module, "_search_cache", TTLCache(ttl=60))
+
+    async def run():
+        searxng = SearxngIntegration({"instance_url": searx + "/"})
+        try:
+            first = await searxng.call_tool("search_searxng", {"query": "MCP servers"})
+            second = await searxng.call_tool("search_searxng", {"query": "  mcp   SERVERS "})
+            fresh = await searxng.call_tool("search_searxng", {"query": "mcp servers", "no_cache": True})
+            return first, second, fresh
+        finally:
+            await close_http_client()
+
+    first, second, fresh = asyncio.run(run())
+    assert first == second == fresh == [{"title": "Hit", "url": "https://example.com"}]
+    assert len(_Searx.queries) == 2
+    assert cache_module.get_search_cache().stats()["hits"] == 1
@@ -0,0 +1,113 @@
+import sys
+import os
+import json
+import time
+import asyncio
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.integrations.base import MCPIntegration
+from src.integrations.web_search.fusion import canonicalize_url, fuse, normalize_results
+from src.tools.search import SearchTools
+
+
+def test_canonicalize_url():
+    key = canonicalize_url("https://example.com/docs/")
+    assert canonicalize_url("http://www.example.com/docs?utm_source=x#intro") == key
+    assert canonicalize_url("https://example.com:443/docs") == key
+    assert canonicalize_url("//duckduckgo.com/l/?uddg=https%3A%2F%2Fexample.com%2Fdocs&rut=abc") == key
+    assert canonicalize_url("https://example.com/docs?b=2&a=1") == canonicalize_url("https://example.com/docs?a=1&b=2")
+    assert canonicalize_url("https://example.com/docs?page=2") != key
+
+
+def test_normalize_results_shapes():
+    ddg = [{"title": "A", "href": "https://a.com", "body": "about a"}]
+    searx = {"results": [{"title": "A", "url": "https://a.com", "content": "about a"}]}
+    mcp = {"content": [{"type": "text", "text": json.dumps(searx["results"])}]}
+    expected = [{"title": "A", "url": "https://a.com", "snippet": "about a"}]
+    assert normalize_results(ddg) == normalize_results(searx) == normalize_results(mcp) == expected
+    assert normalize_results("not json") == []
+
+
+def test_fuse_rewards_agreement():
+    def r(url, snippet=""):
+        return {"title": url, "url": url, "snippet": snippet}
+
+    fused = fuse({
+        "one": [r("https://a.com"), r("https://b.com"), r("https://c.com")],
+        "two": [r("https://www.c.com/", "longer snippet"), r("https://d.com")],
+    })
+    assert [e["url"] for e in fused] == ["https://c.com", "https://a.com", "https://b.com", "https://d.com"]
+    assert fused[0]["providers"] == ["one", "two"]
+    assert fused[0]["snippet"] == "longer snippet"
+    assert len(fuse({"one": [r("https://a.com"), r("https://b.com")]}, max_results=1)) == 1
+
+
+class _Provider(MCPIntegration):
+    def __init__(self, name, results, delay=0.0, fail=False):
+        super().__init__({})
+        self.category = "web_search"
+        self.name = name
+        self.results = results
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def list_tools(self):
+        return [{"name": f"search_{self.name}", "parameters": {"properties": {"query": {}}}}]
+
+    async def call_tool(self, tool_name, args):
+        self.calls.append(args)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return "Error: provider down"
+        return [{"title": u, "url": u} for u in self.results]
+
+
+def _registry(*providers):
+    return SimpleNamespace(integrations={f"web_search.{p.name}": p for p in providers})
+
+
+def test_search_web_merges_without_waiting_for_slow_providers():
+    fast = _Provider("fast", ["https://a.com", "https://b.com"])
+    other = _Provider("other", ["https://b.com", "https://c.com"], delay=0.05)
+    slow = _Provider("slow", ["https://z.com"], delay=5)
+    broken = _Provider("broken", [], fail=True)
+    tools = SearchTools(_registry(fast, other, slow, broken), grace=0.2)
+
+    async def run():
+        start = time.perf_counter()
+        result = json.loads(await tools.search_web("query", max_results=2, timeout=3))
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(run())
+    assert elapsed < 1
+    assert [r["url"] for r in result["results"]] == ["https://b.com", "https://a.com"]
+    assert result["providers"]["fast"]["status"] == "ok"
+    assert result["providers"]["other"]["status"] == "ok"
+    assert result["providers"]["slow"]["status"] == "timeout"
+    assert result["providers"]["broken"]["status"] == "error"
+    assert result["providers"]["broken"]["error"] == "Error: provider down"
+
+
+def test_search_web_deadline_and_provider_filter():
+    slow = _Provider("slow", ["https://z.com"], delay=5)
+    few = _Provider("few", ["https://a.com"])
+    tools = SearchTools(_registry(slow, few))
+
+    result = json.loads(asyncio.run(tools.search_web("query", max_results=5, timeout=0.3)))
+    # "few" answered but not adequately, so the deadline applies
+    assert [r["url"] for r in result["results"]] == ["https://a.com"]
+    assert result["providers"]["slow"]["status"] == "timeout"
+
+    assert asyncio.run(tools.search_web("query", providers=["few"])).startswith("{")
+    assert len(slow.calls) == 1
+    assert asyncio.run(tools.search_web("query", providers=["nope"])).startswith("Error")
+    assert asyncio.run(tools.search_web("  ")).startswith("Error")
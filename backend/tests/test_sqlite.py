@@ -0,0 +1,160 @@
+import sys
+import os
+import time
+import asyncio
+import statistics
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.integrations.database.sqlite import SqliteIntegration
+from src.utils.db_results import format_rows
+
+
+def test_format_rows_layouts():
+    rows = [(1, "a", b"\x00"), (2, None, None)]
+    assert format_rows(["id", "name", "blob"], rows) == {
+        "columns": ["id", "name", "blob"], "data": [[1, 2], ["a", None], ["AA==", None]],
+    }
+    assert format_rows(["id"], [(1,), (2,)], "rows") == {"columns": ["id"], "rows": [[1], [2]]}
+
+
+async def test_executemany_and_cursor_paging(tmp_path, make_integration):
+    db = await make_integration(SqliteIntegration, {"path": str(tmp_path / "t.db")})
+    await db.call_tool("sqlite_query", {"query": "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"})
+    batch = await db.call_tool("sqlite_executemany", {
+        "query": "INSERT INTO items VALUES (?, ?)", "params": [[i, f"item{i}"] for i in range(1050)],
+    })
+    first = await db.call_tool("sqlite_query", {"query": "SELECT id, name FROM items ORDER BY id", "page_size": 500})
+    pages = [first]
+    while pages[-1]["cursor"]:
+        pages.append(await db.call_tool("sqlite_fetch", {"cursor": pages[-1]["cursor"], "page_size": 500}))
+    gone = await db.call_tool("sqlite_fetch", {"cursor": first["cursor"]})
+    assert batch["rows_affected"] == 1050
+    assert [p["row_count"] for p in pages] == [500, 500, 50]
+    assert pages[0]["columns"] == ["id", "name"]
+    ids = [i for p in pages for i in p["data"][0]]
+    assert ids == list(range(1050))
+    assert pages[-1]["data"][1][-1] == "item1049"
+    assert gone.startswith("Error: Unknown or expired cursor")
+    assert len(db.cursors) == 0
+
+
+async def test_reads_use_readers_and_writes_fall_back_to_writer(tmp_path, make_integration):
+    db = await make_integration(SqliteIntegration, {"path": str(tmp_path / "t.db"), "readers": 2})
+    await db.call_tool("sqlite_query", {"query": "CREATE TABLE t (x INTEGER)"})
+    await db.call_tool("sqlite_query", {"query": "INSERT INTO t VALUES (?)", "params": [1]})
+    # Starts like a read but writes: retried on the writer
+    cte = await db.call_tool("sqlite_query", {"query": "WITH v(x) AS (VALUES (2)) INSERT INTO t SELECT x FROM v"})
+    # An open cursor pins a reader while other reads carry on
+    held = await db.call_tool("sqlite_query", {"query": "SELECT x FROM t", "page_size": 1})
+    reads = await asyncio.gather(*(
+        db.call_tool("sqlite_query", {"query": "SELECT count(*) AS n FROM t", "layout": "rows"}) for _ in range(20)
+    ))
+    mode = await db.pool.write(lambda conn: conn.execute("PRAGMA journal_mode").fetchone()[0])
+    bad = await db.call_tool("sqlite_query", {"query": "SELECT nope FROM t"})
+    assert cte["rows_affected"] == 1
+    assert held["cursor"] and held["data"] == [[1]]
+    assert all(r["rows"] == [[2]] for r in reads)
+    assert mode == "wal"
+    assert bad.startswith("Error: no such column")
+
+
+async def test_in_memory_database_and_point_lookup_latency(tmp_path, make_integration):
+    for path in (":memory:", tmp_path / "kv.db"):
+        db = await make_integration(SqliteIntegration, {"path": str(path)})
+        await db.call_tool("sqlite_query", {"query": "CREATE TABLE kv (k INTEGER PRIMARY KEY, v TEXT)"})
+        await db.call_tool("sqlite_executemany", {
+            "query": "INSERT INTO kv VALUES (:k, :v)", "params": [{"k": i, "v": str(i)} for i in range(10000)],
+        })
+        timings = []
+        for i in range(300):
+            start = time.perf_counter()
+            result = await db.call_tool("sqlite_query", {"query": "SELECT v FROM kv WHERE k = ?", "params": [i]})
+            timings.append(time.perf_counter() - start)
+            assert result["data"] == [[str(i)]]
+        # Typically well under a millisecond; generous for slow CI machines
+        assert statistics.median(timings) < 0.005
+
+
+async def test_describe_schema_is_cached_until_ddl(tmp_path, make_integration):
+    import sqlite3
+
+    path = tmp_path / "schema.db"
+    db = await make_integration(SqliteIntegration, {"path": str(path)})
+    await db.call_tool("sqlite_query", {"query": "CREATE TABLE authors (id INTEGER PRIMARY KEY, name TEXT NOT NULL)"})
+    await db.call_tool("sqlite_query", {
+        "query": "CREATE TABLE books (id INTEGER PRIMARY KEY, author_id INTEGER REFERENCES authors(id), title TEXT)",
+    })
+    await db.call_tool("sqlite_query", {"query": "CREATE UNIQUE INDEX books_title ON books (title)"})
+    first = await db.call_tool("sqlite_describe_schema", {})
+    again = await db.call_tool("sqlite_describe_schema", {"table": "BOOKS"})
+    await db.call_tool("sqlite_query", {"query": "ALTER TABLE books ADD COLUMN year INTEGER"})
+    after_ddl = await db.call_tool("sqlite_describe_schema", {"table": "books"})
+    # Schema changes from another connection are noticed too
+    other = sqlite3.connect(str(path))
+    other.execute("CREATE VIEW titles AS SELECT title FROM books")
+    other.close()
+    external = await db.call_tool("sqlite_describe_schema", {})
+    missing = await db.call_tool("sqlite_describe_schema", {"table": "nope"})
+    assert first["cached"] is False and [t["name"] for t in first["tables"]] == ["authors", "books"]
+    books = again["tables"][0]
+    assert again["cached"] is True and books["name"] == "books"
+    assert books["columns"][0] == {"name": "id", "type": "INTEGER", "nullable": False, "default": None, "primary_key": True}
+    assert books["foreign_keys"] == [{"columns": ["author_id"], "references": "authors", "ref_columns": ["id"]}]
+    assert {"name": "books_title", "unique": True, "columns": ["title"]} in books["indexes"]
+    assert after_ddl["cached"] is False and after_ddl["tables"][0]["columns"][-1]["name"] == "year"
+    assert external["cached"] is False and [t["type"] for t in external["tables"]] == ["table", "table", "view"]
+    assert missing == "Error: No table or view named nope"
+
+
+async def test_query_cache_invalidated_by_writes_to_touched_tables(tmp_path, make_integration):
+    db = await make_integration(SqliteIntegration, {"path": str(tmp_path / "q.db"), "query_cache": True})
+    await db.call_tool("sqlite_query", {"query": "CREATE TABLE a (x INTEGER)"})
+    await db.call_tool("sqlite_query", {"query": "CREATE TABLE b (x INTEGER)"})
+    await db.call_tool("sqlite_executemany", {"query": "INSERT INTO a VALUES (?)", "params": [[1], [2]]})
+    query = {"query": "SELECT sum(x) AS total FROM a"}
+    seen = [await db.call_tool("sqlite_query", query), await db.call_tool("sqlite_query", query)]
+    await db.call_tool("sqlite_query", {"query": "INSERT INTO b VALUES (10)"})
+    seen.append(await db.call_tool("sqlite_query", query))
+    await db.call_tool("sqlite_query", {"query": "UPDATE a SET x = x * 10"})
+    seen.append(await db.call_tool("sqlite_query", query))
+    seen.append(await db.call_tool("sqlite_query", {**query, "no_cache": True}))
+    assert [s["data"] for s in seen] == [[[3]], [[3]], [[3]], [[30]], [[30]]]
+    assert [s.get("cached", False) for s in seen] == [False, True, True, False, False]
+
+
+async def test_query_cache_invalidated_through_views(tmp_path, make_integration):
+    db = await make_integration(SqliteIntegration, {"path": str(tmp_path / "v.db"), "query_cache": True})
+    await db.call_tool("sqlite_query", {"query": "CREATE TABLE t (x INTEGER)"})
+    await db.call_tool("sqlite_query", {"query": "CREATE VIEW v AS SELECT x FROM t"})
+    query = {"query": "SELECT count(*) AS n FROM v"}
+    seen = [await db.call_tool("sqlite_query", query), await db.call_tool("sqlite_query", query)]
+    await db.call_tool("sqlite_query", {"query": "INSERT INTO t VALUES (1)"})
+    seen.append(await db.call_tool("sqlite_query", query))
+    assert [s["data"] for s in seen] == [[[0]], [[0]], [[1]]]
+    assert [s.get("cached", False) for s in seen] == [False, True, False]
+
+
+async def test_writer_statement_pages_from_memory(tmp_path, make_integration):
+    db = await make_integration(SqliteIntegration, {"path": str(tmp_path / "w.db")})
+    await db.call_tool("sqlite_query", {"query": "CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)"})
+    first = await db.call_tool("sqlite_query", {
+        "query": "INSERT INTO t (name) VALUES ('a'), ('b'), ('c') RETURNING id", "page_size": 1,
+    })
+    # Committed while the rest of the RETURNING rows are still being paged
+    visible = await db.call_tool("sqlite_query", {"query": "SELECT count(*) FROM t"})
+    rest = await db.call_tool("sqlite_fetch", {"cursor": first["cursor"], "page_size": 5})
+    assert first["data"] == [[1]] and first["cursor"]
+    assert visible["data"] == [[3]]
+    assert rest["data"] == [[2, 3]] and rest["cursor"] is None
+
+
+async def test_reads_without_readers_page_past_the_writer_cap(make_integration):
+    db = await make_integration(SqliteIntegration, {"path": ":memory:"})
+    await db.call_tool("sqlite_query", {"query": "CREATE TABLE t (x INTEGER)"})
+    await db.call_tool("sqlite_executemany", {"query": "INSERT INTO t VALUES (?)", "params": [[i] for i in range(10200)]})
+    page = await db.call_tool("sqlite_query", {"query": "SELECT x FROM t ORDER BY x", "page_size": 100})
+    rest = await db.call_tool("sqlite_fetch", {"cursor": page["cursor"], "page_size": 10000})
+    last = await db.call_tool("sqlite_fetch", {"cursor": rest["cursor"], "page_size": 10000})
+    assert "truncated" not in page and page["row_count"] == 100
+    assert rest["row_count"] == 10000 and last["data"] == [list(range(10100, 10200))] and last["cursor"] is None
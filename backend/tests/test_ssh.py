@@ -0,0 +1,401 @@
+import sys
+import os
+import time
+import stat
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("paramiko")
+
+from src.integrations.command.ssh import SshIntegration
+from src.utils.sftp_transfer import plan_download
+
+
+def _args(server, **extra):
+    return {"host": "127.0.0.1", "port": server.port, "username": "tester", "password": "secret", **extra}
+
+
+def test_commands_reuse_one_transport(ssh_server):
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            first = await ssh.call_tool("ssh_execute", _args(ssh_server, command="echo hello; echo oops >&2; exit 3"))
+            start = time.perf_counter()
+            rest = await asyncio.gather(*(
+                ssh.call_tool("ssh_execute", _args(ssh_server, command=f"echo {i}")) for i in range(10)
+            ))
+            return first, rest, time.perf_counter() - start, ssh.pool.stats()
+        finally:
+            await ssh.shutdown()
+
+    first, rest, elapsed, stats = asyncio.run(run())
+    assert {k: first[k] for k in ("output", "error", "exit_code")} == {"output": "hello\n", "error": "oops\n", "exit_code": 3}
+    assert first["timed_out"] is False and first["truncated"] is False
+    assert [r["output"] for r in rest] == [f"{i}\n" for i in range(10)]
+    assert ssh_server.connections == 1
+    assert stats["connects"] == 1 and stats["reuses"] == 10
+    assert stats["hosts"][0]["channels"] == 11
+
+
+def test_reconnects_after_transport_drops(ssh_server):
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            await ssh.call_tool("ssh_execute", _args(ssh_server, command="true"))
+            ssh_server.drop_connections()
+            await asyncio.sleep(0.2)
+            return await ssh.call_tool("ssh_execute", _args(ssh_server, command="echo back"))
+        finally:
+            await ssh.shutdown()
+
+    assert asyncio.run(run())["output"] == "back\n"
+    assert ssh_server.connections == 2
+
+
+def test_credentials_are_part_of_the_pool_key(ssh_server):
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            bad = await ssh.call_tool("ssh_execute", _args(ssh_server, password="wrong", command="true"))
+            good = await ssh.call_tool("ssh_execute", _args(ssh_server, command="true"))
+            return bad, good
+        finally:
+            await ssh.shutdown()
+
+    bad, good = asyncio.run(run())
+    assert bad.startswith("SSH Error")
+    assert good["exit_code"] == 0
+
+
+def test_command_sent_untouched_without_timeout(ssh_server):
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            plain = await ssh.call_tool("ssh_execute", _args(ssh_server, command="echo $0"))
+            timed = await ssh.call_tool("ssh_execute", _args(ssh_server, command="echo 'it''s'", timeout=5))
+            return plain, timed
+        finally:
+            await ssh.shutdown()
+
+    plain, timed = asyncio.run(run())
+    assert ssh_server.commands[0] == "echo $0"
+    # With a timeout the command runs under an explicit sh that reports its PID
+    assert ssh_server.commands[1].startswith("exec sh -c ")
+    assert timed["output"] == "its\n" and timed["exit_code"] == 0
+
+def test_parse_host():
+    from src.integrations.command.ssh import parse_host
+
+    assert parse_host("web1", "ops") == {"host": "web1", "username": "ops", "port": 22}
+    assert parse_host("root@db:2222", "ops") == {"host": "db", "username": "root", "port": 2222}
+    assert parse_host("admin@[::1]:2200") == {"host": "::1", "username": "admin", "port": 2200}
+    assert parse_host({"host": "h", "port": 23}, "ops") == {"host": "h", "username": "ops", "port": 23}
+    with pytest.raises(ValueError):
+        parse_host("nouser")
+
+
+def test_execute_many_concurrently_with_timeouts(ssh_server):
+    from src.utils.progress import progress_reporter
+
+    progress = []
+
+    async def on_progress(done, total, message):
+        progress.append((done, total, message))
+
+    hosts = [f"tester@127.0.0.1:{ssh_server.port}", {"host": "127.0.0.1", "port": ssh_server.port}]
+
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            with progress_reporter(on_progress):
+                return await ssh.call_tool("ssh_execute_many", {
+                    "hosts": hosts + [f"tester@127.0.0.1:{ssh_server.port}"] * 4 + ["tester@127.0.0.1:1"],
+                    "username": "tester", "password": "secret", "timeout": 2,
+                    "command": "sleep 0.5; echo up",
+                })
+        finally:
+            await ssh.shutdown()
+
+    start = time.perf_counter()
+    result = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert result["succeeded"] == 6 and result["failed"] == 1
+    assert all(r["output"] == "up\n" for r in result["results"][:6])
+    assert result["results"][6]["exit_code"] is None and "SSH Error" in result["results"][6]["error"]
+    # Six 0.5s commands ran side by side over one pooled connection
+    assert elapsed < 2.5
+    assert ssh_server.connections == 1
+    assert [p[0] for p in progress] == list(range(1, 8))
+    assert any(p[2].endswith("exit 0: up") for p in progress)
+
+
+def test_execute_many_host_timeout(ssh_server):
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            return await ssh.call_tool("ssh_execute_many", {
+                "hosts": [f"127.0.0.1:{ssh_server.port}"], "username": "tester", "password": "secret",
+                "command": "sleep 5", "timeout": 0.5,
+            })
+        finally:
+            await ssh.shutdown()
+
+    start = time.perf_counter()
+    result = asyncio.run(run())
+    assert result["results"][0]["timed_out"] is True
+    assert result["results"][0]["exit_code"] is None
+    assert result["failed"] == 1
+    assert time.perf_counter() - start < 3
+
+
+def test_execute_interleaves_streams_with_bounded_output(ssh_server):
+    from src.utils.output import HeadTailBuffer
+
+    buffer = HeadTailBuffer(8)
+    buffer.feed(b"abcdef")
+    buffer.feed(b"ghijkl")
+    assert buffer.text() == "abcd\n... [4 bytes omitted] ...\nijkl"
+
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            # Several MB on stderr before anything on stdout
+            return await ssh.call_tool("ssh_execute", _args(
+                ssh_server, command="head -c 3000000 /dev/zero | tr '\\0' e >&2; echo done", max_output=1000,
+            ))
+        finally:
+            await ssh.shutdown()
+
+    result = asyncio.run(asyncio.wait_for(run(), 20))
+    assert result["exit_code"] == 0
+    assert result["output"] == "done\n"
+    assert result["error_bytes"] == 3000000 and result["truncated"] is True
+    assert result["error"].startswith("e" * 500) and result["error"].endswith("e" * 500)
+    assert "[2999000 bytes omitted]" in result["error"]
+
+
+def test_execute_streams_output_as_progress(ssh_server):
+    from src.utils.progress import progress_reporter
+
+    updates = []
+
+    async def record(progress, total, message):
+        updates.append((time.perf_counter(), message))
+
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            with progress_reporter(record):
+                result = await ssh.call_tool("ssh_execute", _args(
+                    ssh_server, command="echo one; sleep 0.5; echo two >&2; sleep 0.5; echo three",
+                ))
+            return result, time.perf_counter()
+        finally:
+            await ssh.shutdown()
+
+    result, finished = asyncio.run(run())
+    assert result["output"] == "one\nthree\n" and result["error"] == "two\n"
+    streamed = "".join(m for _, m in updates)
+    assert streamed.index("one") < streamed.index("[stderr] two") < streamed.index("three")
+    # The first line arrived well before the command finished
+    first = next(t for t, m in updates if "one" in m)
+    assert finished - first > 0.8
+    assert not any("__ssh_mcp_pid" in m for _, m in updates)
+
+
+def test_execute_timeout_kills_remote_command(ssh_server, tmp_path):
+    marker = tmp_path / "survived"
+
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            start = time.perf_counter()
+            result = await ssh.call_tool("ssh_execute", _args(
+                ssh_server, command=f"echo started; sleep 1.5; touch {marker}", timeout=0.3,
+            ))
+            return result, time.perf_counter() - start
+        finally:
+            await ssh.shutdown()
+
+    result, elapsed = asyncio.run(run())
+    assert result["timed_out"] is True and result["exit_code"] is None
+    assert result["output"] == "started\n"
+    assert elapsed < 1.5
+    time.sleep(2)
+    assert not marker.exists()
+
+
+def test_execute_with_pty(ssh_server):
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            return await ssh.call_tool("ssh_execute", _args(ssh_server, command="echo tty", pty=True))
+        finally:
+            await ssh.shutdown()
+
+    result = asyncio.run(run())
+    assert result["exit_code"] == 0 and result["output"].strip() == "tty"
+
+
+def test_upload_download_resume_and_verify(ssh_server, tmp_path):
+    import hashlib
+
+    data = os.urandom(3 * 1024 * 1024 + 123)
+    source = tmp_path / "artifact.bin"
+    source.write_bytes(data)
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    # Left behind by an interrupted upload
+    (remote / "artifact.bin.part").write_bytes(data[:1024 * 1024])
+    progress = []
+
+    async def on_progress(done, total, message):
+        progress.append((done, total))
+
+    async def run():
+        from src.utils.progress import progress_reporter
+
+        ssh = SshIntegration({})
+        try:
+            with progress_reporter(on_progress):
+                up = await ssh.call_tool("ssh_upload", _args(
+                    ssh_server, local_path=str(source), remote_path=str(remote), chunk_size=64 * 1024,
+                    window=256 * 1024,
+                ))
+                down = await ssh.call_tool("ssh_download", _args(
+                    ssh_server, remote_path=str(remote / "artifact.bin"), local_path=str(tmp_path / "back.bin"),
+                ))
+            return up, down
+        finally:
+            await ssh.shutdown()
+
+    up, down = asyncio.run(run())
+    sha = hashlib.sha256(data).hexdigest()
+    assert up["failed"] == 0
+    assert up["files"][0]["resumed_from"] == 1024 * 1024
+    assert up["files"][0]["sha256"] == sha and up["files"][0]["verified"] is True
+    assert (remote / "artifact.bin").read_bytes() == data
+    assert not (remote / "artifact.bin.part").exists()
+    assert down["files"][0]["verified"] is True
+    assert (tmp_path / "back.bin").read_bytes() == data
+    assert progress[-1] == (len(data), len(data))
+    assert ssh_server.connections == 1
+
+
+def test_directory_transfer_in_parallel(ssh_server, tmp_path):
+    tree = tmp_path / "tree"
+    (tree / "sub").mkdir(parents=True)
+    for i in range(6):
+        (tree / ("sub" if i % 2 else "") / f"f{i}.txt").write_text(f"file {i}\n" * 1000)
+    remote = tmp_path / "remote" / "copy"
+
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            up = await ssh.call_tool("ssh_upload", _args(
+                ssh_server, local_path=str(tree), remote_path=str(remote), parallel=3,
+            ))
+            down = await ssh.call_tool("ssh_download", _args(
+                ssh_server, remote_path=str(remote), local_path=str(tmp_path / "restored"), verify=False,
+            ))
+            missing = await ssh.call_tool("ssh_download", _args(
+                ssh_server, remote_path=str(tmp_path / "nope"), local_path=str(tmp_path / "x"),
+            ))
+            return up, down, missing
+        finally:
+            await ssh.shutdown()
+
+    up, down, missing = asyncio.run(run())
+    assert up["succeeded"] == 6 and down["succeeded"] == 6
+    for i in range(6):
+        rel = os.path.join("sub" if i % 2 else "", f"f{i}.txt")
+        assert (remote / rel).read_text() == (tree / rel).read_text()
+        assert (tmp_path / "restored" / rel).read_text() == (tree / rel).read_text()
+    assert missing.startswith("SSH Error")
+
+
+def test_upload_resumes_after_disconnect(ssh_server, tmp_path, monkeypatch):
+    from src.utils import sftp_transfer
+
+    data = os.urandom(2 * 1024 * 1024)
+    source = tmp_path / "big.bin"
+    source.write_bytes(data)
+    target = tmp_path / "big.copy"
+    original = sftp_transfer.TransferProgress.callback
+    dropped = []
+
+    def flaky(self, key):
+        update = original(self, key)
+
+        def on_bytes(done):
+            update(done)
+            if done >= 1024 * 1024 and not dropped:
+                dropped.append(done)
+                ssh_server.drop_connections()
+        return on_bytes
+
+    monkeypatch.setattr(sftp_transfer.TransferProgress, "callback", flaky)
+
+    async def run():
+        ssh = SshIntegration({})
+        try:
+            return await ssh.call_tool("ssh_upload", _args(
+                ssh_server, local_path=str(source), remote_path=str(target), chunk_size=128 * 1024,
+            ))
+        finally:
+            await ssh.shutdown()
+
+    result = asyncio.run(run())
+    assert result["failed"] == 0, result
+    assert result["files"][0]["retries"] == 1
+    assert result["files"][0]["resumed_from"] > 0
+    assert result["files"][0]["verified"] is True
+    assert target.read_bytes() == data
+
+
+class _Listing:
+    """An SFTP client whose server lists whatever names it is given."""
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    def _node(self, path):
+        node = self.tree
+        for part in [p for p in path.split("/") if p]:
+            node = node[part]
+        return node
+
+    @staticmethod
+    def _attrs(node, **extra):
+        return SimpleNamespace(st_mode=stat.S_IFDIR if isinstance(node, dict) else stat.S_IFREG, st_size=0, **extra)
+
+    def stat(self, path):
+        return self._attrs(self._node(path))
+
+    def listdir_attr(self, path):
+        return [self._attrs(node, filename=name) for name, node in self._node(path).items()]
+
+
+@pytest.mark.parametrize("name", ["..", ".", "../escape", "a/b"])
+def test_plan_download_rejects_unsafe_names(tmp_path, name):
+    sftp = _Listing({"dir": {"ok.txt": b"", "sub": {name: b""}}})
+    with pytest.raises(ValueError):
+        plan_download(sftp, "/dir", str(tmp_path / "out"))
+
+
+def test_plan_download_stays_under_local_path(tmp_path):
+    sftp = _Listing({"dir": {"a.txt": b"", "sub": {"b.txt": b""}}})
+    out = tmp_path / "out"
+    assert [local for _, local, _ in plan_download(sftp, "/dir", str(out))] == [
+        str(out / "a.txt"), str(out / "sub" / "b.txt"),
+    ]
+    # A local symlink can't redirect the download elsewhere either
+    out.mkdir()
+    (out / "sub").symlink_to(tmp_path)
+    with pytest.raises(ValueError):
+        plan_download(sftp, "/dir", str(out))
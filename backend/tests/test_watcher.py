@@ -0,0 +1,118 @@
+import os
+import json
+import asyncio
+import tempfile
+import pytest
+from backend.src.workspace import Workspace
+from backend.src.resources import WorkspaceResources, path_to_uri, uri_to_path
+from backend.src.utils.watcher import ChangeCoalescer, PollingWatcher, create_watcher
+
+class FakeSession:
+    def __init__(self):
+        self.updated = []
+        self.list_changed = 0
+
+    async def send_resource_updated(self, uri):
+        self.updated.append(uri)
+
+    async def send_resource_list_changed(self):
+        self.list_changed += 1
+
+def test_coalescer_merges_events():
+    async def run():
+        batches = []
+        coalescer = ChangeCoalescer(batches.append, debounce=0.05)
+        coalescer.bind(asyncio.get_running_loop())
+        coalescer.add("a.txt", "created")
+        coalescer.add("a.txt", "modified")
+        coalescer.add("tmp", "created")
+        coalescer.add("tmp", "deleted")
+        coalescer.add("b.txt", "modified")
+        coalescer.add("b.txt", "deleted")
+        await asyncio.sleep(0.2)
+        return batches
+
+    assert asyncio.run(run()) == [{"a.txt": "created", "b.txt": "deleted"}]
+
+@pytest.mark.parametrize("polling", [False, True])
+def test_watcher_reports_external_changes(polling):
+    async def run(root):
+        batches = []
+        coalescer = ChangeCoalescer(batches.append, debounce=0.05)
+        coalescer.bind(asyncio.get_running_loop())
+        if polling:
+            watcher = PollingWatcher(root, coalescer, interval=0.05)
+        else:
+            watcher = create_watcher(root, coalescer)
+        watcher.start(asyncio.get_running_loop())
+        try:
+            os.mkdir(os.path.join(root, "sub"))
+            with open(os.path.join(root, "sub", "new.txt"), "w") as f:
+                f.write("x")
+            # Written aside and renamed into place, like atomic_writer does
+            temp = os.path.join(root, "sub", ".saved.txt.k2j9x8a1.tmp")
+            with open(temp, "w") as f:
+                f.write("y")
+            await asyncio.sleep(0.1)
+            os.replace(temp, os.path.join(root, "sub", "saved.txt"))
+            with open(os.path.join(root, ".upload-abc.part"), "w") as f:
+                f.write("partial")
+            await asyncio.sleep(0.4)
+        finally:
+            watcher.stop()
+        merged = {}
+        for batch in batches:
+            merged.update(batch)
+        return merged
+
+    with tempfile.TemporaryDirectory() as root:
+        changes = asyncio.run(run(root))
+        assert changes.get(os.path.join("sub", "new.txt")) == "created"
+        assert changes.get(os.path.join("sub", "saved.txt")) == "created"
+        assert not [path for path in changes if path.endswith((".tmp", ".part"))]
+
+def test_uri_round_trip():
+    assert uri_to_path(path_to_uri("dir/my file.txt")) == "dir/my file.txt"
+    assert path_to_uri("dir", directory=True) == "workspace:///dir/"
+    assert uri_to_path(path_to_uri(".", directory=True)) == "."
+
+def test_resources_publish_to_subscribers():
+    async def run(workspace):
+        resources = WorkspaceResources(workspace, debounce=0.05)
+        await resources.start()
+        file_session, dir_session, other_session = FakeSession(), FakeSession(), FakeSession()
+        resources.subscribe(path_to_uri("docs/a.md"), file_session)
+        resources.subscribe(path_to_uri("docs", directory=True), dir_session)
+        resources.subscribe(path_to_uri("other.txt"), other_session)
+        try:
+            (workspace.files_path / "docs").mkdir()
+            (workspace.files_path / "docs" / "a.md").write_text("hello")
+            await asyncio.sleep(0.4)
+        finally:
+            await resources.stop()
+        return resources, file_session, dir_session, other_session
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workspace = Workspace(tmpdir)
+        resources, file_session, dir_session, other_session = asyncio.run(run(workspace))
+
+        assert path_to_uri("docs/a.md") in file_session.updated
+        assert dir_session.updated.count(path_to_uri("docs", directory=True)) >= 1
+        assert other_session.updated == []
+        assert other_session.list_changed >= 1
+
+        changes = resources.changes_since(0)
+        assert {"path": "docs/a.md", "kind": "created"} in changes["changes"]
+        assert resources.changes_since(changes["sequence"])["changes"] == []
+
+        listing = json.loads(resources.read(path_to_uri("docs", directory=True)))
+        assert [e["name"] for e in listing["entries"]] == ["a.md"]
+        assert resources.read(path_to_uri("docs/a.md")) == "hello"
+
+def test_binary_resource_read_as_bytes(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    resources = WorkspaceResources(workspace)
+    (workspace.files_path / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n\xff")
+    (workspace.files_path / "notes.txt").write_text("caf\u00e9\r\n", encoding="utf-8", newline="")
+    assert resources.read(path_to_uri("image.png")) == b"\x89PNG\r\n\x1a\n\xff"
+    assert resources.read(path_to_uri("notes.txt")) == "caf\u00e9\r\n"